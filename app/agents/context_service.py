@@ -1,22 +1,233 @@
 """Context service for retrieving database schema and metadata."""
 
-from typing import Dict, List
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+from .schema_formats import (
+    SCHEMA_FORMATS,
+    TableInfo,
+    build_tables,
+    estimate_tokens,
+    render_schema,
+    render_table,
+)
 from ..core.db_client import DbClient
 from ..utils.logger import setup_logger
+from ..utils.metrics import OPERATION_LATENCY, record_cache_lookup
 
 logger = setup_logger(__name__)
 
+# Cheap change detector: hashes table/column names, types and nullability,
+# the index and key constraint OIDs and the comments, straight from the
+# system catalogs instead of going through information_schema and
+# re-rendering the prompt text. Row estimates change with every ANALYZE, so
+# only their order of magnitude is included.
+SCHEMA_FINGERPRINT_QUERY = """
+    SELECT md5(
+        (
+            SELECT string_agg(
+                c.relname || '.' || a.attname || ':' || a.atttypid::text
+                    || ':' || a.attnotnull::text,
+                ',' ORDER BY c.relname, a.attnum
+            )
+            FROM pg_catalog.pg_class c
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid
+            WHERE n.nspname = 'public'
+              AND c.relkind IN ('r', 'v', 'm', 'p', 'f')
+              AND a.attnum > 0
+              AND NOT a.attisdropped
+        )
+        || ';' || COALESCE((
+            SELECT string_agg(i.indexrelid::text, ',' ORDER BY i.indexrelid)
+            FROM pg_catalog.pg_index i
+            JOIN pg_catalog.pg_class c ON c.oid = i.indrelid
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public'
+        ), '')
+        || ';' || COALESCE((
+            SELECT string_agg(con.oid::text, ',' ORDER BY con.oid)
+            FROM pg_catalog.pg_constraint con
+            JOIN pg_catalog.pg_namespace n ON n.oid = con.connamespace
+            WHERE n.nspname = 'public' AND con.contype IN ('p', 'u', 'f')
+        ), '')
+        || ';' || COALESCE((
+            SELECT string_agg(
+                d.objoid::text || '.' || d.objsubid::text || ':' || md5(d.description),
+                ',' ORDER BY d.objoid, d.objsubid
+            )
+            FROM pg_catalog.pg_description d
+            JOIN pg_catalog.pg_class c
+                ON c.oid = d.objoid AND d.classoid = 'pg_catalog.pg_class'::regclass
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public'
+        ), '')
+        || ';' || COALESCE((
+            SELECT string_agg(
+                c.oid::text || ':' || floor(log(c.reltuples::numeric))::text,
+                ',' ORDER BY c.oid
+            )
+            FROM pg_catalog.pg_class c
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public'
+              AND c.relkind IN ('r', 'm')
+              AND c.reltuples >= 1
+        ), '')
+    ) AS fingerprint;
+"""
+
+FOREIGN_KEYS_QUERY = """
+    SELECT
+        src.relname AS table_name,
+        a.attname AS column_name,
+        ref.relname AS referenced_table,
+        ra.attname AS referenced_column
+    FROM pg_catalog.pg_constraint con
+    JOIN pg_catalog.pg_class src ON src.oid = con.conrelid
+    JOIN pg_catalog.pg_class ref ON ref.oid = con.confrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = src.relnamespace
+    CROSS JOIN LATERAL unnest(con.conkey, con.confkey) AS k(attnum, ref_attnum)
+    JOIN pg_catalog.pg_attribute a
+        ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+    JOIN pg_catalog.pg_attribute ra
+        ON ra.attrelid = con.confrelid AND ra.attnum = k.ref_attnum
+    WHERE con.contype = 'f' AND n.nspname = 'public'
+    ORDER BY src.relname, con.conname;
+"""
+
+# column_name is NULL for table-level comments
+COMMENTS_QUERY = """
+    SELECT c.relname AS table_name, a.attname AS column_name, d.description
+    FROM pg_catalog.pg_description d
+    JOIN pg_catalog.pg_class c
+        ON c.oid = d.objoid AND d.classoid = 'pg_catalog.pg_class'::regclass
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_catalog.pg_attribute a
+        ON a.attrelid = c.oid AND a.attnum = d.objsubid AND d.objsubid > 0
+    WHERE n.nspname = 'public';
+"""
+
+
+# One row per valid index with its key columns (or expressions) in order;
+# primary keys come from the index backing them. INCLUDE columns are left
+# out as they can't be searched on.
+INDEXES_QUERY = """
+    SELECT
+        c.relname AS table_name,
+        ic.relname AS index_name,
+        ix.indisprimary AS is_primary,
+        ix.indisunique AS is_unique,
+        am.amname AS method,
+        ARRAY(
+            SELECT pg_catalog.pg_get_indexdef(ix.indexrelid, k, true)
+            FROM generate_series(1, ix.indnkeyatts) AS k
+            ORDER BY k
+        ) AS columns,
+        pg_catalog.pg_get_expr(ix.indpred, ix.indrelid, true) AS predicate
+    FROM pg_catalog.pg_index ix
+    JOIN pg_catalog.pg_class c ON c.oid = ix.indrelid
+    JOIN pg_catalog.pg_class ic ON ic.oid = ix.indexrelid
+    JOIN pg_catalog.pg_am am ON am.oid = ic.relam
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = 'public' AND ix.indisvalid
+    ORDER BY c.relname, NOT ix.indisprimary, ic.relname;
+"""
+
+# Planner row estimates; row_estimate is NULL for tables never analyzed or
+# vacuumed (reltuples = -1) and for views. A partitioned table's estimate is
+# the sum of its partitions'.
+TABLE_STATS_QUERY = """
+    SELECT
+        c.relname AS table_name,
+        c.relkind AS kind,
+        CASE
+            WHEN c.relkind = 'p' THEN (
+                SELECT sum(p.reltuples)::bigint
+                FROM pg_catalog.pg_inherits inh
+                JOIN pg_catalog.pg_class p ON p.oid = inh.inhrelid
+                WHERE inh.inhparent = c.oid AND p.reltuples >= 0
+            )
+            WHEN c.relkind IN ('r', 'm') AND c.reltuples >= 0
+                THEN c.reltuples::bigint
+        END AS row_estimate
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = 'public' AND c.relkind IN ('r', 'v', 'm', 'p', 'f');
+"""
+
+
+@dataclass
+class SchemaCatalog:
+    """Cached snapshot of the introspected schema.
+
+    Attributes:
+        schema_info: Raw column rows from information_schema
+        formatted: Schema rendered as prompt text, in the service's format
+        fingerprint: Catalog fingerprint taken when the snapshot was loaded
+        loaded_at: Monotonic timestamp of the load
+        table_blocks: Rendered prompt text per table
+        foreign_keys: Foreign key column pairs from ``get_foreign_keys``
+        comments: Table and column comments from ``get_comments``
+        indexes: Indexes (including primary keys) from ``get_indexes``
+        table_stats: Relation kinds and row estimates from ``get_table_stats``
+        tables: Description of each table combining all of the above, which
+            the schema formats are rendered from
+    """
+
+    schema_info: List[Dict]
+    formatted: str
+    fingerprint: Optional[str]
+    loaded_at: float
+    table_blocks: Dict[str, str] = field(default_factory=dict)
+    foreign_keys: List[Dict] = field(default_factory=list)
+    comments: List[Dict] = field(default_factory=list)
+    indexes: List[Dict] = field(default_factory=list)
+    table_stats: List[Dict] = field(default_factory=list)
+    tables: Dict[str, TableInfo] = field(default_factory=dict)
+
+    @property
+    def table_names(self) -> List[str]:
+        """Names of all tables in the catalog."""
+        return sorted(self.table_blocks)
+
 
 class ContextService:
     """Retrieves and formats database context for SQL generation."""
 
-    def __init__(self, db_client: DbClient):
+    def __init__(
+        self,
+        db_client: DbClient,
+        cache_ttl: Optional[float] = None,
+        check_interval: float = 30.0,
+        schema_format: str = "verbose",
+    ):
         """Initialize with a database client.
 
         Args:
             db_client: Database client for executing queries
+            cache_ttl: Maximum age in seconds of the cached schema before it is
+                reloaded unconditionally (None = no age limit)
+            check_interval: Seconds between schema fingerprint checks; the
+                cached schema is served without touching the database in between
+            schema_format: Layout of the schema in the prompt: "verbose",
+                "ddl" or "compact" (see ``schema_formats``)
+
+        Raises:
+            ValueError: If the schema format is unknown
         """
+        if schema_format not in SCHEMA_FORMATS:
+            raise ValueError(
+                f"Unknown schema format '{schema_format}': "
+                f"use one of {', '.join(SCHEMA_FORMATS)}"
+            )
         self.db_client = db_client
+        self.schema_format = schema_format
+        self.cache_ttl = cache_ttl
+        self.check_interval = check_interval
+        self._catalog: Optional[SchemaCatalog] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
 
     def get_schema_info(self) -> List[Dict]:
         """Get database schema information.
@@ -29,6 +240,7 @@ class ContextService:
                 table_name,
                 column_name,
                 data_type,
+                udt_name,
                 is_nullable
             FROM information_schema.columns
             WHERE table_schema = 'public'
@@ -44,34 +256,199 @@ class ContextService:
             logger.error(f"Failed to retrieve schema: {e}")
             raise
 
+    def get_foreign_keys(self) -> List[Dict]:
+        """Get foreign key column pairs between public tables.
+
+        Returns:
+            List of dictionaries with table_name, column_name, referenced_table
+            and referenced_column
+        """
+        try:
+            return self.db_client.run_sql(FOREIGN_KEYS_QUERY)
+        except Exception as e:
+            logger.error(f"Failed to retrieve foreign keys: {e}")
+            raise
+
+    def get_comments(self) -> List[Dict]:
+        """Get table and column comments.
+
+        Returns:
+            List of dictionaries with table_name, column_name (None for a table
+            comment) and description
+        """
+        try:
+            return self.db_client.run_sql(COMMENTS_QUERY)
+        except Exception as e:
+            logger.error(f"Failed to retrieve comments: {e}")
+            raise
+
+    def get_indexes(self) -> List[Dict]:
+        """Get the indexes of public tables, primary keys included.
+
+        Returns:
+            List of dictionaries with table_name, index_name, is_primary,
+            is_unique, method, columns (key columns or expressions, in order)
+            and predicate (None unless the index is partial)
+        """
+        try:
+            return self.db_client.run_sql(INDEXES_QUERY)
+        except Exception as e:
+            logger.error(f"Failed to retrieve indexes: {e}")
+            raise
+
+    def get_table_stats(self) -> List[Dict]:
+        """Get the kind and planner row estimate of each public relation.
+
+        Returns:
+            List of dictionaries with table_name, kind (pg_class.relkind) and
+            row_estimate (None if unknown)
+        """
+        try:
+            return self.db_client.run_sql(TABLE_STATS_QUERY)
+        except Exception as e:
+            logger.error(f"Failed to retrieve table statistics: {e}")
+            raise
+
+    def get_schema_fingerprint(self) -> Optional[str]:
+        """Get a cheap fingerprint of the current schema.
+
+        Returns:
+            Hex digest that changes whenever a table or column changes
+        """
+        result = self.db_client.run_sql(SCHEMA_FINGERPRINT_QUERY)
+        return result[0]["fingerprint"] if result else None
+
+    def get_catalog(self) -> SchemaCatalog:
+        """Get the cached schema catalog, refreshing it if the schema changed.
+
+        Within ``check_interval`` the cached catalog is returned as-is. After
+        that the schema fingerprint is compared and the catalog is only
+        reloaded when it differs or when ``cache_ttl`` has expired.
+
+        Returns:
+            Current schema catalog
+        """
+        with self._lock:
+            now = time.monotonic()
+            catalog = self._catalog
+            if catalog is not None and not self._is_expired(catalog, now):
+                if now - self._checked_at < self.check_interval:
+                    record_cache_lookup("schema", "hit")
+                    return catalog
+
+                with OPERATION_LATENCY.time(
+                    component="schema", operation="fingerprint"
+                ):
+                    fingerprint = self.get_schema_fingerprint()
+                self._checked_at = now
+                if fingerprint == catalog.fingerprint:
+                    record_cache_lookup("schema", "hit")
+                    return catalog
+                logger.info("Schema fingerprint changed, reloading schema")
+
+            record_cache_lookup("schema", "miss")
+            with OPERATION_LATENCY.time(component="schema", operation="load"):
+                self._catalog = self._load_catalog()
+            return self._catalog
+
+    def invalidate_schema_cache(self) -> None:
+        """Drop the cached schema so the next request reloads it."""
+        with self._lock:
+            self._catalog = None
+        logger.info("Schema cache invalidated")
+
+    @property
+    def schema_fingerprint(self) -> Optional[str]:
+        """Fingerprint of the cached schema, or None if nothing is cached."""
+        catalog = self._catalog
+        return catalog.fingerprint if catalog else None
+
+    def _is_expired(self, catalog: SchemaCatalog, now: float) -> bool:
+        """Check whether a catalog is older than the configured TTL."""
+        return self.cache_ttl is not None and now - catalog.loaded_at >= self.cache_ttl
+
+    def _load_catalog(self) -> SchemaCatalog:
+        """Introspect the schema and render it for the prompt.
+
+        The fingerprint is taken before introspection so a change racing
+        with the load is picked up by the next check.
+        """
+        fingerprint = self.get_schema_fingerprint()
+        catalog = SchemaCatalog(
+            schema_info=self.get_schema_info(),
+            formatted="",
+            fingerprint=fingerprint,
+            loaded_at=0.0,
+            foreign_keys=self.get_foreign_keys(),
+            comments=self.get_comments(),
+            indexes=self.get_indexes(),
+            table_stats=self.get_table_stats(),
+        )
+        catalog.tables = build_tables(
+            catalog.schema_info,
+            catalog.foreign_keys,
+            catalog.comments,
+            catalog.indexes,
+            catalog.table_stats,
+        )
+        catalog.table_blocks = {
+            name: render_table(table, self.schema_format)
+            for name, table in catalog.tables.items()
+        }
+        catalog.formatted = render_schema(catalog.tables.values(), self.schema_format)
+        catalog.loaded_at = self._checked_at = time.monotonic()
+        return catalog
+
     def format_schema_for_llm(self) -> str:
         """Format schema information as a readable string for LLM context.
 
+        Served from the schema catalog cache; see ``get_catalog``.
+
         Returns:
             Formatted schema string
         """
-        schema_info = self.get_schema_info()
-
-        # Group columns by table
-        tables = {}
-        for row in schema_info:
-            table = row["table_name"]
-            if table not in tables:
-                tables[table] = []
-
-            nullable = "NULL" if row["is_nullable"] == "YES" else "NOT NULL"
-            tables[table].append(
-                f"  - {row['column_name']} ({row['data_type']}) {nullable}"
-            )
+        return self.get_catalog().formatted
+
+    def render_schema(self, table_names: Iterable[str]) -> str:
+        """Format only the given tables, in the same layout as the full schema.
+
+        Args:
+            table_names: Tables to include; unknown names are ignored
+
+        Returns:
+            Formatted schema string
+        """
+        tables = self.get_catalog().tables
+        return render_schema(
+            (tables[name] for name in sorted(set(table_names)) if name in tables),
+            self.schema_format,
+        )
 
-        # Format as readable text
-        formatted = "Database Schema:\n\n"
-        for table, columns in sorted(tables.items()):
-            formatted += f"Table: {table}\n"
-            formatted += "\n".join(columns)
-            formatted += "\n\n"
+    def format_sizes(
+        self, table_names: Optional[Iterable[str]] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """Measure the schema text in every format, to pick the cheapest.
 
-        return formatted.strip()
+        Args:
+            table_names: Tables to include (all tables if None)
+
+        Returns:
+            Dictionary of format name to its "chars" and estimated "tokens"
+        """
+        tables = self.get_catalog().tables
+        selected = [
+            tables[name]
+            for name in (tables if table_names is None else sorted(set(table_names)))
+            if name in tables
+        ]
+        sizes = {}
+        for schema_format in SCHEMA_FORMATS:
+            text = render_schema(selected, schema_format)
+            sizes[schema_format] = {
+                "chars": len(text),
+                "tokens": estimate_tokens(text),
+            }
+        return sizes
 
     def get_sample_data(self, table_name: str, limit: int = 3) -> List[Dict]:
         """Get sample rows from a table.
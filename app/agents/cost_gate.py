@@ -0,0 +1,142 @@
+"""Pre-execution cost check of generated SQL using the planner's estimates."""
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+from ..core.db_client import DbClient
+from ..utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class QueryCostError(Exception):
+    """Raised when generated SQL is estimated to be too expensive to run."""
+
+    def __init__(self, message: str, plan: "PlanSummary"):
+        super().__init__(message)
+        self.plan = plan
+
+
+@dataclass(frozen=True)
+class PlanSummary:
+    """Planner estimates for a query, from ``EXPLAIN (FORMAT JSON)``.
+
+    Attributes:
+        total_cost: Estimated total cost of the plan (planner units)
+        startup_cost: Estimated cost before the first row is returned
+        plan_rows: Estimated number of rows returned
+        node_type: Type of the top plan node
+        relations: Relations scanned by the plan
+        seq_scans: Relations read with a sequential scan
+    """
+
+    total_cost: float
+    startup_cost: float
+    plan_rows: int
+    node_type: str
+    relations: Tuple[str, ...] = ()
+    seq_scans: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_plan(cls, plan: Dict[str, Any]) -> "PlanSummary":
+        """Summarize the top-level ``Plan`` node of an EXPLAIN JSON document."""
+        relations, seq_scans = [], []
+        for node in _walk(plan):
+            relation = node.get("Relation Name")
+            if relation is None:
+                continue
+            if node.get("Schema") not in (None, "public"):
+                relation = f"{node['Schema']}.{relation}"
+            if relation not in relations:
+                relations.append(relation)
+            if node.get("Node Type") == "Seq Scan" and relation not in seq_scans:
+                seq_scans.append(relation)
+        return cls(
+            total_cost=float(plan.get("Total Cost", 0.0)),
+            startup_cost=float(plan.get("Startup Cost", 0.0)),
+            plan_rows=int(plan.get("Plan Rows", 0)),
+            node_type=plan.get("Node Type", ""),
+            relations=tuple(relations),
+            seq_scans=tuple(seq_scans),
+        )
+
+
+def _walk(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield a plan node and all of its descendants."""
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _walk(child)
+
+
+class CostGate:
+    """Rejects SQL whose estimated cost or row count is over a limit.
+
+    Runs ``EXPLAIN (FORMAT JSON)`` (without ANALYZE, so nothing executes) and
+    compares the planner's estimates with the configured thresholds. Estimates
+    are only as good as the table statistics, so thresholds should leave
+    headroom.
+    """
+
+    def __init__(
+        self,
+        db_client: DbClient,
+        max_cost: Optional[float] = None,
+        max_rows: Optional[int] = None,
+        max_reprompts: int = 1,
+    ):
+        """Initialize the gate.
+
+        Args:
+            db_client: Database client used to run EXPLAIN
+            max_cost: Highest allowed estimated total cost (no limit if None)
+            max_rows: Highest allowed estimated row count (no limit if None)
+            max_reprompts: Times the LLM is asked for a cheaper query before
+                the question is rejected (0 = reject immediately)
+        """
+        self.db_client = db_client
+        self.max_cost = max_cost
+        self.max_rows = max_rows
+        self.max_reprompts = max_reprompts
+
+    def explain(
+        self, sql_query: str, statement_timeout_ms: Optional[int] = None
+    ) -> PlanSummary:
+        """Get the planner's estimates for a query.
+
+        Args:
+            sql_query: Validated read-only SQL
+            statement_timeout_ms: Cancel planning after this many milliseconds
+
+        Returns:
+            Summary of the query plan
+        """
+        rows = self.db_client.run_sql(
+            f"EXPLAIN (FORMAT JSON) {sql_query}",
+            statement_timeout_ms=statement_timeout_ms,
+            read_only=True,
+        )
+        document = rows[0]["QUERY PLAN"]
+        if isinstance(document, str):
+            document = json.loads(document)
+        return PlanSummary.from_plan(document[0]["Plan"])
+
+    def violation(self, plan: PlanSummary) -> Optional[str]:
+        """Describe how a plan exceeds the limits.
+
+        Args:
+            plan: Summary from ``explain``
+
+        Returns:
+            Reason the query is too expensive, or None if it is within limits
+        """
+        if self.max_cost is not None and plan.total_cost > self.max_cost:
+            return (
+                f"Estimated cost {plan.total_cost:.0f} exceeds the limit of "
+                f"{self.max_cost:.0f}"
+            )
+        if self.max_rows is not None and plan.plan_rows > self.max_rows:
+            return (
+                f"Estimated {plan.plan_rows} rows exceeds the limit of "
+                f"{self.max_rows}"
+            )
+        return None
@@ -1,11 +1,15 @@
 """LLM client wrapper for text-to-SQL generation."""
 
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
 from langchain_anthropic import ChatAnthropic
 from ..utils.logger import setup_logger
+from ..utils.metrics import LLM_TOKENS, OPERATION_LATENCY
 
 logger = setup_logger(__name__)
 
+# System message as plain text or as content blocks (e.g. with cache_control)
+SystemContent = Union[str, List[Dict[str, Any]]]
+
 
 class LLMClient:
     """Wrapper for LLM API calls, making it easier to test and swap providers."""
@@ -39,7 +43,30 @@ class LLMClient:
         """
         try:
             logger.info("Sending request to LLM for SQL generation")
-            response = self.llm.invoke(prompt)
+            with OPERATION_LATENCY.time(component="llm", operation="invoke"):
+                response = self.llm.invoke(prompt)
+            self._record_usage(response)
+            sql_query = response.content.strip()
+            logger.info(f"Generated SQL query: {sql_query[:100]}...")
+            return sql_query
+        except Exception as e:
+            logger.error(f"LLM generation failed: {e}")
+            raise
+
+    async def agenerate_sql(self, prompt: str) -> str:
+        """Async counterpart of ``generate_sql`` that does not block the event loop.
+
+        Args:
+            prompt: Full prompt including schema and user question
+
+        Returns:
+            Generated SQL query string
+        """
+        try:
+            logger.info("Sending async request to LLM for SQL generation")
+            with OPERATION_LATENCY.time(component="llm", operation="invoke"):
+                response = await self.llm.ainvoke(prompt)
+            self._record_usage(response)
             sql_query = response.content.strip()
             logger.info(f"Generated SQL query: {sql_query[:100]}...")
             return sql_query
@@ -48,12 +75,12 @@ class LLMClient:
             raise
 
     def generate_with_system_message(
-        self, system_message: str, user_message: str
+        self, system_message: SystemContent, user_message: str
     ) -> str:
         """Generate SQL with separate system and user messages.
 
         Args:
-            system_message: System instructions
+            system_message: System instructions, as text or content blocks
             user_message: User question
 
         Returns:
@@ -62,10 +89,135 @@ class LLMClient:
         try:
             logger.info("Sending request to LLM with system message")
             messages = [("system", system_message), ("user", user_message)]
-            response = self.llm.invoke(messages)
+            with OPERATION_LATENCY.time(component="llm", operation="invoke"):
+                response = self.llm.invoke(messages)
+            self._record_usage(response)
+            sql_query = response.content.strip()
+            logger.info(f"Generated SQL query: {sql_query[:100]}...")
+            return sql_query
+        except Exception as e:
+            logger.error(f"LLM generation failed: {e}")
+            raise
+
+    async def agenerate_with_system_message(
+        self, system_message: SystemContent, user_message: str
+    ) -> str:
+        """Async counterpart of ``generate_with_system_message``.
+
+        Args:
+            system_message: System instructions, as text or content blocks
+            user_message: User question
+
+        Returns:
+            Generated SQL query string
+        """
+        try:
+            logger.info("Sending async request to LLM with system message")
+            messages = [("system", system_message), ("user", user_message)]
+            with OPERATION_LATENCY.time(component="llm", operation="invoke"):
+                response = await self.llm.ainvoke(messages)
+            self._record_usage(response)
             sql_query = response.content.strip()
             logger.info(f"Generated SQL query: {sql_query[:100]}...")
             return sql_query
         except Exception as e:
             logger.error(f"LLM generation failed: {e}")
             raise
+
+    def stream_with_system_message(
+        self, system_message: SystemContent, user_message: str
+    ) -> Iterator[str]:
+        """Stream the generated SQL as text fragments as the model emits them.
+
+        The fragments are raw model output; join them and clean the result
+        the same way as ``generate_with_system_message`` output.
+
+        Args:
+            system_message: System instructions, as text or content blocks
+            user_message: User question
+
+        Yields:
+            Text fragments of the response
+        """
+        try:
+            logger.info("Streaming request to LLM with system message")
+            messages = [("system", system_message), ("user", user_message)]
+            with OPERATION_LATENCY.time(component="llm", operation="stream"):
+                for chunk in self.llm.stream(messages):
+                    self._record_usage(chunk)
+                    text = self._chunk_text(chunk)
+                    if text:
+                        yield text
+        except Exception as e:
+            logger.error(f"LLM streaming failed: {e}")
+            raise
+
+    async def astream_with_system_message(
+        self, system_message: SystemContent, user_message: str
+    ) -> AsyncIterator[str]:
+        """Async counterpart of ``stream_with_system_message``.
+
+        Args:
+            system_message: System instructions, as text or content blocks
+            user_message: User question
+
+        Yields:
+            Text fragments of the response
+        """
+        try:
+            logger.info("Streaming async request to LLM with system message")
+            messages = [("system", system_message), ("user", user_message)]
+            with OPERATION_LATENCY.time(component="llm", operation="stream"):
+                async for chunk in self.llm.astream(messages):
+                    self._record_usage(chunk)
+                    text = self._chunk_text(chunk)
+                    if text:
+                        yield text
+        except Exception as e:
+            logger.error(f"LLM streaming failed: {e}")
+            raise
+
+    @staticmethod
+    def _chunk_text(chunk: Any) -> str:
+        """Text carried by a streamed message chunk.
+
+        Anthropic chunks hold either a string or a list of content blocks.
+        """
+        content = chunk.content
+        if isinstance(content, str):
+            return content
+        return "".join(
+            block.get("text", "")
+            for block in content
+            if isinstance(block, dict) and block.get("type") == "text"
+        )
+
+    def _record_usage(self, response: Any) -> None:
+        """Count the tokens reported for a response, including prompt cache use.
+
+        Streamed chunks each report their own share, so this is called once
+        per chunk when streaming. Input tokens include those read from and
+        written to the prompt cache.
+        """
+        usage = getattr(response, "usage_metadata", None)
+        if not isinstance(usage, dict):
+            return
+        counts = {
+            "input": usage.get("input_tokens"),
+            "output": usage.get("output_tokens"),
+        }
+        details = usage.get("input_token_details")
+        if isinstance(details, dict):
+            counts["cache_read"] = details.get("cache_read")
+            # Cache writes are split by TTL when the API reports it
+            counts["cache_write"] = sum(
+                details.get(key) or 0
+                for key in (
+                    "cache_creation",
+                    "ephemeral_5m_input_tokens",
+                    "ephemeral_1h_input_tokens",
+                )
+            )
+        for token_type, count in counts.items():
+            if isinstance(count, int) and count > 0:
+                LLM_TOKENS.inc(count, type=token_type)
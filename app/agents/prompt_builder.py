@@ -1,6 +1,6 @@
 """Prompt builder for text-to-SQL generation."""
 
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 
 class PromptBuilder:
@@ -16,13 +16,16 @@ Guidelines:
 1. Generate ONLY the SQL query, no explanations or markdown formatting
 2. Use proper PostgreSQL syntax
 3. Generate only SELECT queries (read-only)
-4. Use appropriate JOINs when querying multiple tables
-5. Include WHERE clauses for filtering when relevant
+4. Use appropriate JOINs when querying multiple tables, joining along the foreign keys shown in the schema
+5. Include WHERE clauses for filtering when relevant; on large tables (see the estimated row counts) prefer filters and sorts the listed indexes and primary keys can serve
 6. Use LIMIT when appropriate to avoid returning too many rows
 7. Return the raw SQL query without ```sql``` markers or additional text
 
 Database Schema:
 {schema}"""
+        self._cached_prefix: Optional[Tuple[Tuple[Any, str], List[Dict[str, Any]]]] = (
+            None
+        )
 
     def build_system_message(self, schema: str) -> str:
         """Build system message with schema context.
@@ -35,6 +38,40 @@ Database Schema:
         """
         return self.system_template.format(schema=schema)
 
+    def build_cached_system_message(
+        self, schema: str, fingerprint: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Build the system message as a cacheable prompt prefix.
+
+        The instructions and schema form one text block marked with an
+        Anthropic ``cache_control`` breakpoint, so repeated requests read the
+        prefix from the provider's prompt cache instead of processing it
+        again. The blocks are built once and reused until the schema
+        fingerprint (or the schema text, e.g. a different pruned subset)
+        changes. The breakpoint is always set; when the prefix is shorter
+        than the model's minimum cacheable length, the API ignores it and
+        the prefix is processed uncached.
+
+        Args:
+            schema: Formatted database schema string
+            fingerprint: Version of the schema the text was rendered from
+
+        Returns:
+            Content blocks for the system message (shared; do not modify)
+        """
+        key = (fingerprint, schema)
+        cached = self._cached_prefix
+        if cached is None or cached[0] != key:
+            blocks = [
+                {
+                    "type": "text",
+                    "text": self.build_system_message(schema),
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ]
+            cached = self._cached_prefix = (key, blocks)
+        return cached[1]
+
     def build_user_message(self, question: str) -> str:
         """Build user message from question.
 
@@ -46,6 +83,54 @@ Database Schema:
         """
         return f"Generate a SQL query to answer: {question}"
 
+    def add_value_hints(self, message: str, value_hints: str) -> str:
+        """Append the actual values of columns the question refers to.
+
+        Args:
+            message: User message from ``build_user_message`` or
+                ``build_retry_message``
+            value_hints: Column values (see ``ValueProfiler.render_hints``)
+
+        Returns:
+            User message for LLM
+        """
+        return (
+            f"{message}\n\nValues stored in columns the question may refer to "
+            f"(filter with these exact spellings):\n{value_hints}"
+        )
+
+    def build_retry_message(self, question: str, sql_query: str, problem: str) -> str:
+        """Build a user message asking to correct a rejected query.
+
+        Args:
+            question: User's natural language question
+            sql_query: Previously generated SQL
+            problem: Why the SQL was rejected
+
+        Returns:
+            User message for LLM
+        """
+        return (
+            f"{self.build_user_message(question)}\n\n"
+            f"{self.build_rejection_message(sql_query, problem)}"
+        )
+
+    def build_rejection_message(self, sql_query: str, problem: str) -> str:
+        """Build the part of a retry message explaining why SQL was rejected.
+
+        Args:
+            sql_query: Previously generated SQL
+            problem: Why the SQL was rejected
+
+        Returns:
+            Text to append to the original user message
+        """
+        return (
+            f"This query was rejected:\n{sql_query}\n\n"
+            f"Problem: {problem}\n\n"
+            "Write a corrected query that answers the question."
+        )
+
     def build_full_prompt(self, schema: str, question: str) -> str:
         """Build complete prompt combining schema and question.
 
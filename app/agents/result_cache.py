@@ -0,0 +1,422 @@
+"""Cache of query results with table-level invalidation."""
+
+import hashlib
+import select
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from ..core.db_client import DbClient
+from ..utils.logger import setup_logger
+from ..utils.metrics import record_cache_lookup
+
+logger = setup_logger(__name__)
+
+# Per-table version built from the modification counters. Inserts, updates
+# and deletes bump the tuple counters; TRUNCATE resets the live/dead counts.
+TABLE_VERSIONS_QUERY = """
+    SELECT schemaname, relname,
+           concat_ws(':', n_tup_ins, n_tup_upd, n_tup_del, n_live_tup,
+                     n_dead_tup) AS version
+    FROM pg_stat_user_tables
+"""
+
+# Functions whose result changes between executions of the same SQL
+VOLATILE_FUNCTIONS = frozenset(
+    {
+        "clock_timestamp",
+        "current_date",
+        "current_time",
+        "current_timestamp",
+        "gen_random_uuid",
+        "localtime",
+        "localtimestamp",
+        "now",
+        "random",
+        "statement_timestamp",
+        "timeofday",
+        "transaction_timestamp",
+        "txid_current",
+    }
+)
+
+TableVersions = Dict[str, str]
+
+
+class TableVersionTracker:
+    """Reads per-table modification counters from ``pg_stat_user_tables``.
+
+    Counters are polled at most once per ``check_interval`` seconds. Postgres
+    publishes a backend's counters when it commits while busy, or within about
+    10 seconds once it goes idle, so a cached result can be served for up to
+    ``check_interval`` plus that delay after its tables change. Use
+    ``TableChangeListener`` when writers can send notifications instead.
+    """
+
+    def __init__(self, db_client: DbClient, check_interval: float = 1.0):
+        """Initialize the tracker.
+
+        Args:
+            db_client: Database client used to read the statistics view
+            check_interval: Seconds between polls of the statistics view
+        """
+        self.db_client = db_client
+        self.check_interval = check_interval
+        self._versions: TableVersions = {}
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def versions(self) -> TableVersions:
+        """Get the current version of every user table.
+
+        Returns:
+            Dictionary keyed by ``schema.table`` (and bare ``table`` for the
+            public schema) of version strings
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at >= self.check_interval:
+                self._versions = self._load()
+                self._checked_at = now
+            return self._versions
+
+    def _load(self) -> TableVersions:
+        """Query the statistics view."""
+        versions = {}
+        for row in self.db_client.run_sql(TABLE_VERSIONS_QUERY):
+            version = row["version"]
+            versions[f"{row['schemaname']}.{row['relname']}"] = version
+            if row["schemaname"] == "public":
+                versions[row["relname"]] = version
+        return versions
+
+
+@dataclass
+class CachedResult:
+    """A cached query result.
+
+    Attributes:
+        rows: Rows returned by the query
+        tables: Tables the query reads, with their versions when it ran
+        created_at: Monotonic time when the entry was stored
+        size: Estimated memory footprint in bytes
+    """
+
+    rows: List[Dict[str, Any]]
+    tables: Tuple[Tuple[str, str], ...]
+    created_at: float
+    size: int
+
+
+def estimate_size(rows: List[Dict[str, Any]]) -> int:
+    """Estimate the memory held by a list of row dictionaries.
+
+    Counts the list, each row dict and each value; column name strings are
+    shared between rows and ignored.
+
+    Args:
+        rows: Query result rows
+
+    Returns:
+        Approximate size in bytes
+    """
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row.values():
+            size += sys.getsizeof(value)
+    return size
+
+
+class ResultCache:
+    """LRU cache of query results bounded by an estimated memory budget.
+
+    Entries expire after ``ttl`` seconds and are dropped as soon as any table
+    they read has a newer version in the ``TableVersionTracker``. Queries
+    that read no table, read relations the tracker does not know (views,
+    functions, foreign tables) or call volatile functions are not cached,
+    since their staleness cannot be detected.
+    """
+
+    def __init__(
+        self,
+        tracker: TableVersionTracker,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: Optional[float] = 300.0,
+        max_entry_fraction: float = 0.25,
+    ):
+        """Initialize the cache.
+
+        Args:
+            tracker: Source of table versions
+            max_bytes: Memory budget for all cached rows
+            ttl: Entry lifetime in seconds (None = until invalidated)
+            max_entry_fraction: Largest share of the budget a single result
+                may take; bigger results are not cached
+        """
+        self.tracker = tracker
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_entry_bytes = int(max_bytes * max_entry_fraction)
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+            "evictions": 0,
+            "stores": 0,
+            "uncacheable": 0,
+            "oversized": 0,
+        }
+
+    @staticmethod
+    def make_key(normalized_sql: str, *scope: Any) -> str:
+        """Build the key for normalized SQL run under a scope (limits, schema)."""
+        raw = "|".join(str(part) for part in scope) + "|" + normalized_sql
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_deterministic(normalized_sql: str) -> bool:
+        """Check that normalized SQL calls no volatile function."""
+        return VOLATILE_FUNCTIONS.isdisjoint(normalized_sql.split(" "))
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Look up rows for a key, dropping the entry if it went stale.
+
+        Args:
+            key: Key from ``make_key``
+
+        Returns:
+            Cached rows, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and not self._is_fresh(entry):
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+                    self._stats["invalidations"] += 1
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self._stats["misses"] += 1
+            else:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+        record_cache_lookup("result", "miss" if entry is None else "hit")
+        return None if entry is None else entry.rows
+
+    def snapshot(self, tables: Iterable[str]) -> Optional[TableVersions]:
+        """Capture table versions before running a query.
+
+        Take the snapshot before executing, so a write racing the query
+        leaves the stored entry already stale.
+
+        Args:
+            tables: Tables the query reads
+
+        Returns:
+            Versions of those tables, or None if there are none or any is
+            untracked
+        """
+        tables = tuple(tables)
+        if not tables:
+            return None
+        current = self.tracker.versions()
+        versions = {}
+        for table in tables:
+            if table not in current:
+                return None
+            versions[table] = current[table]
+        return versions
+
+    def put(
+        self,
+        key: str,
+        rows: List[Dict[str, Any]],
+        versions: Optional[TableVersions],
+    ) -> bool:
+        """Store rows for a key.
+
+        Args:
+            key: Key from ``make_key``
+            rows: Rows to cache
+            versions: Snapshot from ``snapshot`` (None or empty = uncacheable)
+
+        Returns:
+            True if the rows were cached
+        """
+        if not versions:
+            self._record("uncacheable")
+            return False
+        size = estimate_size(rows)
+        if size > self.max_entry_bytes:
+            self._record("oversized")
+            return False
+
+        entry = CachedResult(
+            rows=rows,
+            tables=tuple(sorted(versions.items())),
+            created_at=time.monotonic(),
+            size=size,
+        )
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            self._stats["stores"] += 1
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+        return True
+
+    def invalidate_table(self, table: str) -> int:
+        """Drop every entry that reads a table.
+
+        Args:
+            table: Table name as used in queries
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            keys = [
+                key
+                for key, entry in self._entries.items()
+                if any(name == table for name, _ in entry.tables)
+            ]
+            for key in keys:
+                self._remove(key)
+            self._stats["invalidations"] += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters, entry count and memory use."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        stats["max_bytes"] = self.max_bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _is_fresh(self, entry: CachedResult) -> bool:
+        """Check an entry against its TTL and the current table versions."""
+        if self.ttl is not None and time.monotonic() - entry.created_at >= self.ttl:
+            return False
+        current = self.tracker.versions()
+        return all(current.get(table) == version for table, version in entry.tables)
+
+    def _remove(self, key: str) -> None:
+        """Remove an entry; caller holds the lock."""
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _record(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+
+class TableChangeListener:
+    """Invalidates cached results on ``NOTIFY <channel>, '<table>'``.
+
+    Runs a background thread holding a dedicated LISTEN connection. Writers
+    (typically a statement-level trigger) notify with the changed table's
+    name, which drops the affected entries immediately. After a lost
+    connection the whole cache is cleared, since notifications may have been
+    missed.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        cache: ResultCache,
+        channel: str = "table_changes",
+        reconnect_delay: float = 5.0,
+    ):
+        """Initialize the listener.
+
+        Args:
+            connect: Factory returning a new psycopg2 connection
+            cache: Result cache to invalidate
+            channel: Notification channel to LISTEN on
+            reconnect_delay: Seconds to wait before reconnecting after an error
+        """
+        self.connect = connect
+        self.cache = cache
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start listening in a daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="result-cache-listener", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the listener thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def handle(self, payload: str) -> int:
+        """Invalidate the entries for a notified table name.
+
+        Both the schema-qualified and bare forms of public tables are
+        dropped, since queries may use either.
+
+        Args:
+            payload: Table name sent with the notification
+
+        Returns:
+            Number of entries dropped
+        """
+        table = payload.strip()
+        names = {table}
+        if table.startswith("public."):
+            names.add(table[len("public.") :])
+        elif "." not in table:
+            names.add(f"public.{table}")
+        return sum(self.cache.invalidate_table(name) for name in names)
+
+    def _run(self) -> None:
+        """Listen until stopped, reconnecting on errors."""
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = self.connect()
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                logger.info(f"Listening for table changes on '{self.channel}'")
+                while not self._stop.is_set():
+                    if select.select([connection], [], [], 1.0)[0]:
+                        connection.poll()
+                        while connection.notifies:
+                            self.handle(connection.notifies.pop(0).payload)
+            except Exception as e:
+                logger.warning(f"Table change listener failed: {e}")
+                self.cache.clear()
+                self._stop.wait(self.reconnect_delay)
+            finally:
+                if connection is not None:
+                    connection.close()
@@ -0,0 +1,486 @@
+"""Schema renderers for the prompt, and a prompt size estimator.
+
+The schema is usually the largest part of the prompt, so its layout is a
+trade-off between tokens and how easily the model reads it:
+
+- ``verbose``: one line per column with its full type and nullability
+- ``ddl``: ``CREATE TABLE`` statements with abbreviated types, which models
+  read fluently
+- ``compact``: one line per table, with abbreviated types, ``!`` for NOT NULL
+  and columns shared by many tables (e.g. ``last_update``) typed only once
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SCHEMA_FORMATS = ("verbose", "ddl", "compact")
+
+# Longest comment kept in the prompt; longer ones are cut at a word boundary
+COMMENT_MAX_CHARS = 160
+
+# A column is typed once for the whole schema (compact format) when at
+# least this many tables have it with the same type and nullability
+SHARED_COLUMN_MIN_TABLES = 3
+
+# Shorter PostgreSQL spellings of information_schema type names
+TYPE_ABBREVIATIONS = {
+    "integer": "int",
+    "character varying": "varchar",
+    "character": "char",
+    "timestamp with time zone": "timestamptz",
+    "timestamp without time zone": "timestamp",
+    "time with time zone": "timetz",
+    "time without time zone": "time",
+    "double precision": "float8",
+    "boolean": "bool",
+}
+
+# information_schema spelling of the built-in types whose internal name
+# (udt_name) differs, for array elements: ``_int4`` is ``integer[]``
+UDT_TYPE_NAMES = {
+    "bool": "boolean",
+    "bpchar": "character",
+    "float4": "real",
+    "float8": "double precision",
+    "int2": "smallint",
+    "int4": "integer",
+    "int8": "bigint",
+    "time": "time without time zone",
+    "timestamp": "timestamp without time zone",
+    "timestamptz": "timestamp with time zone",
+    "timetz": "time with time zone",
+    "varchar": "character varying",
+}
+
+# Labels for relation kinds that are not plain tables
+_KIND_LABELS = {"v": "view", "m": "materialized view", "f": "foreign table"}
+
+# Word pieces, short digit groups, whitespace runs and single symbols
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}| {2,}|\n|[^\sA-Za-z\d]")
+
+
+@dataclass
+class ColumnInfo:
+    """One column as shown to the model.
+
+    Attributes:
+        name: Column name
+        data_type: Type name from information_schema
+        nullable: Whether the column accepts NULL
+        primary_key: Whether the column is part of the primary key
+        references: ``table.column`` targets of its foreign keys
+        comment: Column comment, on one line
+        udt_name: Underlying type name (e.g. ``order_status`` when
+            ``data_type`` is "USER-DEFINED", ``_int4`` for an integer array)
+    """
+
+    name: str
+    data_type: str
+    nullable: bool
+    primary_key: bool = False
+    references: List[str] = field(default_factory=list)
+    comment: Optional[str] = None
+    udt_name: Optional[str] = None
+
+    @property
+    def type_name(self) -> str:
+        """Type as shown to the model (see ``column_type``)."""
+        return column_type(self.data_type, self.udt_name)
+
+
+@dataclass
+class TableInfo:
+    """One table (or view) as shown to the model.
+
+    Attributes:
+        name: Table name
+        columns: Columns in definition order
+        kind: pg_class.relkind ("r" for a table, "v" for a view...)
+        row_estimate: Planner row estimate (None if unknown)
+        comment: Table comment, on one line
+        indexes: Index rows from ``ContextService.get_indexes``, primary key
+            excluded
+    """
+
+    name: str
+    columns: List[ColumnInfo] = field(default_factory=list)
+    kind: str = "r"
+    row_estimate: Optional[int] = None
+    comment: Optional[str] = None
+    indexes: List[Dict] = field(default_factory=list)
+
+
+def build_tables(
+    schema_info: List[Dict],
+    foreign_keys: Iterable[Dict] = (),
+    comments: Iterable[Dict] = (),
+    indexes: Iterable[Dict] = (),
+    table_stats: Iterable[Dict] = (),
+) -> Dict[str, TableInfo]:
+    """Combine the catalog query results into one description per table.
+
+    Args:
+        schema_info: Column rows from ``ContextService.get_schema_info``
+        foreign_keys: Rows from ``ContextService.get_foreign_keys``
+        comments: Rows from ``ContextService.get_comments``
+        indexes: Rows from ``ContextService.get_indexes``
+        table_stats: Rows from ``ContextService.get_table_stats``
+
+    Returns:
+        Dictionary of table name to TableInfo, sorted by table name
+    """
+    primary_keys = set()
+    table_indexes: Dict[str, List[Dict]] = {}
+    for index in indexes:
+        if index["is_primary"]:
+            primary_keys.update(
+                (index["table_name"], column) for column in index["columns"]
+            )
+        else:
+            table_indexes.setdefault(index["table_name"], []).append(index)
+
+    references: Dict[Tuple[str, str], List[str]] = {}
+    for row in foreign_keys:
+        references.setdefault((row["table_name"], row["column_name"]), []).append(
+            f"{row['referenced_table']}.{row['referenced_column']}"
+        )
+
+    descriptions = {
+        (row["table_name"], row["column_name"]): shorten_comment(row["description"])
+        for row in comments
+    }
+    stats = {row["table_name"]: row for row in table_stats}
+
+    tables: Dict[str, TableInfo] = {}
+    for row in schema_info:
+        table, column = row["table_name"], row["column_name"]
+        if table not in tables:
+            table_stat = stats.get(table, {})
+            tables[table] = TableInfo(
+                name=table,
+                kind=table_stat.get("kind", "r"),
+                row_estimate=table_stat.get("row_estimate"),
+                comment=descriptions.get((table, None)),
+                indexes=table_indexes.get(table, []),
+            )
+        tables[table].columns.append(
+            ColumnInfo(
+                name=column,
+                data_type=row["data_type"],
+                nullable=row["is_nullable"] == "YES",
+                primary_key=(table, column) in primary_keys,
+                references=references.get((table, column), []),
+                comment=descriptions.get((table, column)),
+                udt_name=row.get("udt_name"),
+            )
+        )
+    return dict(sorted(tables.items()))
+
+
+def render_schema(tables: Iterable[TableInfo], format: str = "verbose") -> str:
+    """Render tables as the schema section of the prompt.
+
+    Args:
+        tables: Tables to include, in the order to show them
+        format: "verbose", "ddl" or "compact"
+
+    Returns:
+        Schema text, starting with "Database Schema:"
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    tables = list(tables)
+    if format == "compact":
+        shared = shared_columns(tables)
+        lines = [
+            "Database Schema:",
+            "(one table per line; ! = NOT NULL, PK = primary key, "
+            "-> = foreign key, ~N = estimated rows, idx = indexes)",
+        ]
+        if shared:
+            lines.append(
+                "Shared columns, typed here once: "
+                + ", ".join(
+                    f"{name} {_compact_type(data_type, nullable)}"
+                    for name, data_type, nullable in shared
+                )
+            )
+        lines.extend(render_compact_table(table, shared) for table in tables)
+        return "\n".join(lines)
+    if format == "ddl":
+        return _join_blocks(render_ddl_table(table) for table in tables)
+    if format == "verbose":
+        return _join_blocks(render_verbose_table(table) for table in tables)
+    raise ValueError(
+        f"Unknown schema format '{format}': use one of {', '.join(SCHEMA_FORMATS)}"
+    )
+
+
+def render_table(table: TableInfo, format: str = "verbose") -> str:
+    """Render one table on its own, without the schema header.
+
+    Args:
+        table: Table to render
+        format: "verbose", "ddl" or "compact"
+
+    Returns:
+        Table text in the given format
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if format == "compact":
+        return render_compact_table(table, [])
+    if format == "ddl":
+        return render_ddl_table(table)
+    if format == "verbose":
+        return render_verbose_table(table)
+    raise ValueError(
+        f"Unknown schema format '{format}': use one of {', '.join(SCHEMA_FORMATS)}"
+    )
+
+
+def render_verbose_table(table: TableInfo) -> str:
+    """Render a table as a header line plus one line per column."""
+    details = []
+    if table.kind in _KIND_LABELS:
+        details.append(_KIND_LABELS[table.kind])
+    if table.row_estimate is not None:
+        details.append(f"~{table.row_estimate:,} rows")
+    header = f"Table: {table.name}"
+    if details:
+        header += f" ({', '.join(details)})"
+    lines = [header + _trailing_comment(table.comment)]
+
+    for column in table.columns:
+        nullable = "NULL" if column.nullable else "NOT NULL"
+        line = f"  - {column.name} ({column.type_name}) {nullable}"
+        if column.primary_key:
+            line += " PK"
+        for target in column.references:
+            line += f" FK -> {target}"
+        lines.append(line + _trailing_comment(column.comment))
+
+    if table.indexes:
+        indexes = "; ".join(_index_summary(index) for index in table.indexes)
+        lines.append(f"  Indexes: {indexes}")
+    return "\n".join(lines)
+
+
+def render_ddl_table(table: TableInfo) -> str:
+    """Render a table as a ``CREATE TABLE`` statement with abbreviated types."""
+    notes = []
+    if table.row_estimate is not None:
+        notes.append(f"~{table.row_estimate:,} rows")
+    if table.comment:
+        notes.append(table.comment)
+    lines = [f"-- {'; '.join(notes)}"] if notes else []
+
+    keyword = _KIND_LABELS.get(table.kind, "table").upper()
+    lines.append(f"CREATE {keyword} {table.name} (")
+    primary_key = [column.name for column in table.columns if column.primary_key]
+    definitions = []
+    for column in table.columns:
+        definition = f"{column.name} {abbreviate_type(column.type_name)}"
+        if len(primary_key) == 1 and column.primary_key:
+            definition += " PRIMARY KEY"
+        elif not column.nullable:
+            definition += " NOT NULL"
+        for target in column.references:
+            referenced_table, referenced_column = target.rsplit(".", 1)
+            definition += f" REFERENCES {referenced_table}({referenced_column})"
+        definitions.append((definition, column.comment))
+    if len(primary_key) > 1:
+        definitions.append((f"PRIMARY KEY ({', '.join(primary_key)})", None))
+
+    for position, (definition, comment) in enumerate(definitions):
+        separator = "," if position < len(definitions) - 1 else ""
+        lines.append(f"  {definition}{separator}{_trailing_comment(comment)}")
+    lines.append(");")
+
+    for index in table.indexes:
+        unique = "UNIQUE " if index["is_unique"] else ""
+        method = f"USING {index['method']} " if index["method"] != "btree" else ""
+        statement = (
+            f"CREATE {unique}INDEX ON {table.name} {method}"
+            f"({', '.join(index['columns'])})"
+        )
+        if index["predicate"]:
+            statement += f" WHERE {index['predicate']}"
+        lines.append(statement + ";")
+    return "\n".join(lines)
+
+
+def render_compact_table(
+    table: TableInfo, shared: Iterable[Tuple[str, str, bool]] = ()
+) -> str:
+    """Render a table on one line.
+
+    Args:
+        table: Table to render
+        shared: (name, type, nullable) of the columns typed once in the
+            schema header; those are listed by name only
+
+    Returns:
+        e.g. ``film ~1k: film_id int PK, title text!, ...; idx (title)``
+    """
+    shared = set(shared)
+    header = table.name
+    if table.kind in _KIND_LABELS:
+        header += f" [{_KIND_LABELS[table.kind]}]"
+    if table.row_estimate is not None:
+        header += f" ~{_abbreviate_count(table.row_estimate)}"
+    if table.comment:
+        header += f' "{table.comment}"'
+
+    columns = []
+    for column in table.columns:
+        if (column.name, column.type_name, column.nullable) in shared and not (
+            column.primary_key or column.references or column.comment
+        ):
+            columns.append(column.name)
+            continue
+        if column.primary_key:
+            # PK implies NOT NULL
+            text = f"{column.name} {abbreviate_type(column.type_name)} PK"
+        else:
+            text = f"{column.name} {_compact_type(column.type_name, column.nullable)}"
+        for target in column.references:
+            text += f" -> {target}"
+        if column.comment:
+            text += f' "{column.comment}"'
+        columns.append(text)
+
+    line = f"{header}: {', '.join(columns)}"
+    if table.indexes:
+        line += "; idx " + ", ".join(_index_summary(index) for index in table.indexes)
+    return line
+
+
+def shared_columns(
+    tables: Iterable[TableInfo], min_tables: int = SHARED_COLUMN_MIN_TABLES
+) -> List[Tuple[str, str, bool]]:
+    """Find plain columns that many tables have with the same type.
+
+    Key and commented columns are never shared, as their markers are
+    specific to a table.
+
+    Args:
+        tables: Tables being rendered
+        min_tables: Tables that must have the column
+
+    Returns:
+        Sorted (name, type, nullable) of each shared column
+    """
+    counts = Counter(
+        (column.name, column.type_name, column.nullable)
+        for table in tables
+        for column in table.columns
+        if not (column.primary_key or column.references or column.comment)
+    )
+    return sorted(key for key, count in counts.items() if count >= min_tables)
+
+
+def column_type(data_type: str, udt_name: Optional[str] = None) -> str:
+    """Name a column's type the way it would be declared.
+
+    information_schema reports enums, composite and extension types (e.g.
+    ``citext``) as "USER-DEFINED" and arrays as "ARRAY"; the real type is in
+    ``udt_name``.
+
+    Args:
+        data_type: Type name from information_schema
+        udt_name: Underlying type name, if known
+
+    Returns:
+        e.g. ``order_status`` or ``integer[]``; ``data_type`` when there is
+        no better name
+    """
+    if not udt_name:
+        return data_type
+    if data_type == "USER-DEFINED":
+        return udt_name
+    if data_type == "ARRAY" and udt_name.startswith("_"):
+        element = udt_name[1:]
+        return f"{UDT_TYPE_NAMES.get(element, element)}[]"
+    return data_type
+
+
+def abbreviate_type(data_type: str) -> str:
+    """Shorter PostgreSQL spelling of a type name, e.g. ``timestamptz``."""
+    if data_type.endswith("[]"):
+        return abbreviate_type(data_type[:-2]) + "[]"
+    return TYPE_ABBREVIATIONS.get(data_type, data_type)
+
+
+def shorten_comment(description: Optional[str]) -> Optional[str]:
+    """Put a comment on one line and cut it to ``COMMENT_MAX_CHARS``."""
+    if not description:
+        return None
+    text = " ".join(description.split())
+    if len(text) > COMMENT_MAX_CHARS:
+        text = text[:COMMENT_MAX_CHARS].rsplit(" ", 1)[0] + "..."
+    return text
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of LLM tokens in a text without a tokenizer.
+
+    Letters count one token per 8 (common words and identifier parts are
+    single tokens), digits one per 3, and every symbol, newline and
+    indentation run one each. It's a rough figure meant for comparing
+    schema formats; the exact count is in the LLM usage metrics.
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        Estimated token count
+    """
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        tokens += math.ceil(len(piece) / 8) if piece[0].isalpha() else 1
+    return tokens
+
+
+def _join_blocks(blocks: Iterable[str]) -> str:
+    """Join per-table blocks under the schema header."""
+    return ("Database Schema:\n\n" + "\n\n".join(blocks)).strip()
+
+
+def _trailing_comment(comment: Optional[str]) -> str:
+    """Render a comment as a trailing ``-- ...``."""
+    return f" -- {comment}" if comment else ""
+
+
+def _index_summary(index: Dict) -> str:
+    """Render an index as its key columns with its kind, e.g. ``UNIQUE (a, b)``."""
+    parts = []
+    if index["is_unique"]:
+        parts.append("UNIQUE")
+    if index["method"] != "btree":
+        parts.append(index["method"])
+    parts.append(f"({', '.join(index['columns'])})")
+    if index["predicate"]:
+        parts.append(f"WHERE {index['predicate']}")
+    return " ".join(parts)
+
+
+def _compact_type(data_type: str, nullable: bool) -> str:
+    """Abbreviated type with ``!`` marking NOT NULL."""
+    return abbreviate_type(data_type) + ("" if nullable else "!")
+
+
+def _abbreviate_count(count: int) -> str:
+    """Round a row count to two significant figures, e.g. ``16k`` or ``1.2M``."""
+    for divisor, suffix in ((1_000_000_000, "G"), (1_000_000, "M"), (1_000, "k")):
+        if count >= divisor:
+            value = f"{count / divisor:.2g}"
+            if "e" in value:
+                value = f"{count / divisor:.0f}"
+            return value + suffix
+    return str(count)
@@ -0,0 +1,184 @@
+"""Schema retrieval: pick the tables relevant to a question."""
+
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from .context_service import SchemaCatalog
+from ..utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_WORD = re.compile(r"[A-Za-z0-9]+")
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+TableIndex = Dict[str, Dict[str, Set[str]]]
+
+_STOPWORDS = {
+    "a", "all", "an", "and", "are", "as", "at", "be", "by", "do", "does",
+    "each", "for", "from", "give", "have", "how", "i", "id", "in", "is", "it",
+    "list", "many", "me", "most", "much", "of", "on", "or", "per", "show",
+    "that", "the", "their", "there", "to", "top", "was", "were", "what",
+    "when", "where", "which", "who", "with",
+}  # fmt: skip
+
+# Relative weight of a question token matching each part of a table
+TABLE_NAME_WEIGHT = 3.0
+COLUMN_NAME_WEIGHT = 1.0
+COMMENT_WEIGHT = 0.5
+
+
+def _stem(word: str) -> str:
+    """Crude plural folding so "actors" matches "actor" and "categories" "category"."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> Set[str]:
+    """Split text or an identifier into stemmed, lowercase tokens.
+
+    Identifiers are split on underscores and camelCase boundaries, so
+    ``film_actor`` and ``filmActor`` both yield ``{"film", "actor"}``.
+
+    Args:
+        text: Question, identifier or comment
+
+    Returns:
+        Set of tokens without stopwords
+    """
+    tokens = set()
+    for word in _WORD.findall(_CAMEL.sub(" ", text or "")):
+        word = word.lower()
+        if word not in _STOPWORDS:
+            tokens.add(_stem(word))
+    return tokens
+
+
+class SchemaRetriever:
+    """Ranks tables by lexical relevance to a question.
+
+    Question tokens are matched against table names, column names and
+    comments. The top ``top_k`` tables are kept, plus their foreign-key
+    neighbours so the model can still write the joins.
+    """
+
+    def __init__(self, top_k: int = 5, max_tables: int = 12):
+        """Initialize the retriever.
+
+        Args:
+            top_k: Number of best-scoring tables to keep
+            max_tables: Upper bound on tables after adding join partners
+        """
+        self.top_k = top_k
+        self.max_tables = max(max_tables, top_k)
+        self._index_fingerprint = None
+        self._index: TableIndex = {}
+        self._neighbors: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def score_tables(self, question: str, catalog: SchemaCatalog) -> Dict[str, float]:
+        """Score every table against the question.
+
+        Args:
+            question: User's natural language question
+            catalog: Schema catalog to rank
+
+        Returns:
+            Dictionary of table name to relevance score (tables scoring 0 omitted)
+        """
+        index, _ = self._get_index(catalog)
+        return self._score(tokenize(question), index)
+
+    def _score(self, question_tokens: Set[str], index: TableIndex) -> Dict[str, float]:
+        """Weighted token overlap between the question and each table."""
+        scores = {}
+        for table, parts in index.items():
+            score = (
+                TABLE_NAME_WEIGHT * len(question_tokens & parts["name"])
+                + COLUMN_NAME_WEIGHT * len(question_tokens & parts["columns"])
+                + COMMENT_WEIGHT * len(question_tokens & parts["comments"])
+            )
+            if score > 0:
+                scores[table] = score
+        return scores
+
+    def select_tables(
+        self, question: str, catalog: SchemaCatalog
+    ) -> Optional[List[str]]:
+        """Pick the tables to include in the prompt for a question.
+
+        Args:
+            question: User's natural language question
+            catalog: Schema catalog to select from
+
+        Returns:
+            Sorted table names, or None if nothing matched and the full schema
+            should be used
+        """
+        index, neighbors = self._get_index(catalog)
+        scores = self._score(tokenize(question), index)
+        if not scores:
+            logger.info("No table matched the question, using full schema")
+            return None
+
+        ranked = sorted(scores, key=lambda table: (-scores[table], table))
+        selected = ranked[: self.top_k]
+
+        # Join partners: neighbours linking two selected tables (junction
+        # tables) first, then the rest by their own score.
+        selected_set = set(selected)
+        candidates = set()
+        for table in selected:
+            candidates |= neighbors.get(table, set())
+        candidates -= selected_set
+        links = {
+            table: len(neighbors.get(table, set()) & selected_set)
+            for table in candidates
+        }
+        partners = sorted(
+            candidates,
+            key=lambda table: (-(links[table] > 1), -scores.get(table, 0), table),
+        )
+        selected.extend(partners[: self.max_tables - len(selected)])
+
+        logger.info(
+            f"Selected {len(selected)} of {len(catalog.table_names)} tables: "
+            f"{', '.join(sorted(selected))}"
+        )
+        return sorted(selected)
+
+    def _get_index(
+        self, catalog: SchemaCatalog
+    ) -> Tuple[TableIndex, Dict[str, Set[str]]]:
+        """Get the table index, tokenizing the catalog once per schema version."""
+        with self._lock:
+            if not self._index or self._index_fingerprint != catalog.fingerprint:
+                self._index, self._neighbors = self._index_catalog(catalog)
+                self._index_fingerprint = catalog.fingerprint
+            return self._index, self._neighbors
+
+    def _index_catalog(
+        self, catalog: SchemaCatalog
+    ) -> Tuple[TableIndex, Dict[str, Set[str]]]:
+        """Build the per-table token sets and the foreign-key adjacency."""
+        index: TableIndex = defaultdict(
+            lambda: {"name": set(), "columns": set(), "comments": set()}
+        )
+        for row in catalog.schema_info:
+            parts = index[row["table_name"]]
+            parts["name"] = tokenize(row["table_name"])
+            parts["columns"] |= tokenize(row["column_name"])
+        for row in catalog.comments:
+            if row["table_name"] in index:
+                index[row["table_name"]]["comments"] |= tokenize(row["description"])
+
+        neighbors: Dict[str, Set[str]] = defaultdict(set)
+        for row in catalog.foreign_keys:
+            if row["table_name"] != row["referenced_table"]:
+                neighbors[row["table_name"]].add(row["referenced_table"])
+                neighbors[row["referenced_table"]].add(row["table_name"])
+
+        return dict(index), dict(neighbors)
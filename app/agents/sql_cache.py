@@ -0,0 +1,410 @@
+"""Cache of generated SQL keyed on question, schema version and model."""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+from ..utils.logger import setup_logger
+from ..utils.metrics import record_cache_lookup
+
+logger = setup_logger(__name__)
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!]+$")
+
+# Tokens with digits or symbols (numbers, operators, signs) carry the
+# question's literal values, which near-duplicates must agree on
+_LITERAL = re.compile(r"\d|[^\w\s]")
+
+# Stats counter -> result label of the cache lookup metric
+_LOOKUP_RESULTS = {"hits": "hit", "near_hits": "near_hit", "misses": "miss"}
+
+_SQLITE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sql_cache (
+        key TEXT PRIMARY KEY,
+        scope TEXT NOT NULL,
+        question TEXT NOT NULL,
+        sql_query TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used REAL NOT NULL
+    )
+"""
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so trivial variations share a cache entry.
+
+    Lowercases, collapses whitespace and strips trailing "?", "." and "!", so
+    "How many actors are there?" and "how many  actors are there" match.
+    Operators, signs and decimal points are kept, so "total > 100" and
+    "total < 100" or "-5" and "5" never share an entry.
+
+    Args:
+        question: User's natural language question
+
+    Returns:
+        Normalized question text
+    """
+    return _TRAILING_PUNCTUATION.sub("", " ".join(question.lower().split()))
+
+
+def literals(text: str) -> List[str]:
+    """Tokens of normalized text that contain digits or symbols.
+
+    Args:
+        text: Normalized question text
+
+    Returns:
+        Numbers, operators and other symbolic tokens, in order
+    """
+    return [token for token in text.split() if _LITERAL.search(token)]
+
+
+def shingles(text: str, size: int = 2) -> Set[str]:
+    """Split normalized text into overlapping token shingles.
+
+    Args:
+        text: Normalized question text
+        size: Number of tokens per shingle
+
+    Returns:
+        Set of shingles (the whole text if it has fewer tokens than ``size``)
+    """
+    tokens = text.split()
+    if len(tokens) <= size:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i : i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Jaccard similarity of two sets (0.0 when both are empty)."""
+    if not a and not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class CachedSQL:
+    """A cached SQL generation.
+
+    Attributes:
+        question: Normalized question the SQL was generated for
+        sql_query: Generated (and validated) SQL
+        scope: Hash of schema fingerprint, model and temperature
+        created_at: Unix timestamp when the entry was stored
+    """
+
+    question: str
+    sql_query: str
+    scope: str
+    created_at: float
+
+
+class InMemorySQLCacheBackend:
+    """In-process LRU backend with optional TTL."""
+
+    def __init__(self, max_entries: int = 1000, ttl: Optional[float] = None):
+        """Initialize the backend.
+
+        Args:
+            max_entries: Maximum entries kept before least recently used are evicted
+            ttl: Entry lifetime in seconds (None = no expiry)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CachedSQL]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedSQL]:
+        """Get an entry and mark it as recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._is_expired(entry):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CachedSQL) -> None:
+        """Store an entry, evicting the least recently used ones if full."""
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def entries(self, scope: str) -> List[CachedSQL]:
+        """Get all live entries in a scope (for near-duplicate lookup)."""
+        with self._lock:
+            return [
+                entry
+                for entry in self._entries.values()
+                if entry.scope == scope and not self._is_expired(entry)
+            ]
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _is_expired(self, entry: CachedSQL) -> bool:
+        return self.ttl is not None and time.time() - entry.created_at >= self.ttl
+
+
+class SQLiteSQLCacheBackend:
+    """On-disk SQLite backend so cached SQL survives restarts.
+
+    Shares the LRU/TTL semantics of the in-memory backend; recency is tracked
+    in a ``last_used`` column.
+    """
+
+    def __init__(
+        self, path: str, max_entries: int = 10000, ttl: Optional[float] = None
+    ):
+        """Open (and create if needed) the cache database.
+
+        Args:
+            path: SQLite database file
+            max_entries: Maximum entries kept before least recently used are evicted
+            ttl: Entry lifetime in seconds (None = no expiry)
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SQLITE_SCHEMA)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS sql_cache_scope ON sql_cache (scope)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS sql_cache_last_used ON sql_cache (last_used)"
+        )
+        self._conn.commit()
+        logger.info(f"Opened SQL cache database at {path}")
+
+    def get(self, key: str) -> Optional[CachedSQL]:
+        """Get an entry and mark it as recently used."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT question, sql_query, scope, created_at FROM sql_cache "
+                "WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            entry = CachedSQL(*row)
+            if self._is_expired(entry):
+                self._conn.execute("DELETE FROM sql_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE sql_cache SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            return entry
+
+    def set(self, key: str, entry: CachedSQL) -> None:
+        """Store an entry, evicting the least recently used ones if full."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sql_cache "
+                "(key, scope, question, sql_query, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    entry.scope,
+                    entry.question,
+                    entry.sql_query,
+                    entry.created_at,
+                    time.time(),
+                ),
+            )
+            self._conn.execute(
+                "DELETE FROM sql_cache WHERE key IN ("
+                "  SELECT key FROM sql_cache ORDER BY last_used DESC"
+                "  LIMIT -1 OFFSET ?"
+                ")",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def entries(self, scope: str) -> List[CachedSQL]:
+        """Get all live entries in a scope (for near-duplicate lookup)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question, sql_query, scope, created_at FROM sql_cache "
+                "WHERE scope = ?",
+                (scope,),
+            ).fetchall()
+        return [
+            entry
+            for entry in (CachedSQL(*row) for row in rows)
+            if not self._is_expired(entry)
+        ]
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM sql_cache")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the cache database."""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sql_cache").fetchone()[0]
+
+    def _is_expired(self, entry: CachedSQL) -> bool:
+        return self.ttl is not None and time.time() - entry.created_at >= self.ttl
+
+
+class SQLCache:
+    """Question-to-SQL cache so repeated questions skip the LLM.
+
+    Entries are keyed on the normalized question plus a scope made of the
+    schema fingerprint, model and temperature, so a schema change or a model
+    switch never serves stale SQL. An optional near-duplicate lookup matches
+    questions whose token shingles overlap above ``similarity_threshold``
+    and whose numbers and operators are identical.
+    """
+
+    def __init__(
+        self,
+        backend: Any = None,
+        similarity_threshold: Optional[float] = None,
+        shingle_size: int = 2,
+    ):
+        """Initialize the cache.
+
+        Args:
+            backend: Storage backend (in-memory LRU if not provided)
+            similarity_threshold: Minimum Jaccard similarity for a near-duplicate
+                hit, between 0 and 1 (None = exact matches only)
+            shingle_size: Tokens per shingle for near-duplicate matching
+        """
+        self.backend = backend if backend is not None else InMemorySQLCacheBackend()
+        self.similarity_threshold = similarity_threshold
+        self.shingle_size = shingle_size
+        self._stats = {"hits": 0, "near_hits": 0, "misses": 0, "stores": 0}
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def make_scope(schema_fingerprint: Any, model: Any, temperature: Any) -> str:
+        """Hash the parts of the key that are not the question."""
+        raw = f"{schema_fingerprint}|{model}|{temperature}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def make_key(normalized_question: str, scope: str) -> str:
+        """Build the exact-match key for a normalized question in a scope."""
+        raw = f"{scope}|{normalized_question}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(
+        self, question: str, schema_fingerprint: Any, model: Any, temperature: Any
+    ) -> Optional[CachedSQL]:
+        """Look up SQL for a question.
+
+        Args:
+            question: User's natural language question
+            schema_fingerprint: Fingerprint of the schema the SQL must match
+            model: LLM model name
+            temperature: LLM temperature
+
+        Returns:
+            Cached entry, or None on a miss
+        """
+        normalized = normalize_question(question)
+        scope = self.make_scope(schema_fingerprint, model, temperature)
+
+        entry = self.backend.get(self.make_key(normalized, scope))
+        if entry is not None:
+            self._record("hits")
+            return entry
+
+        if self.similarity_threshold is not None:
+            entry = self._find_similar(normalized, scope)
+            if entry is not None:
+                self._record("near_hits")
+                logger.info(f"Near-duplicate SQL cache hit: '{entry.question}'")
+                return entry
+
+        self._record("misses")
+        return None
+
+    def put(
+        self,
+        question: str,
+        sql_query: str,
+        schema_fingerprint: Any,
+        model: Any,
+        temperature: Any,
+    ) -> None:
+        """Store generated SQL for a question.
+
+        Args:
+            question: User's natural language question
+            sql_query: Validated SQL generated for it
+            schema_fingerprint: Fingerprint of the schema the SQL was built for
+            model: LLM model name
+            temperature: LLM temperature
+        """
+        normalized = normalize_question(question)
+        scope = self.make_scope(schema_fingerprint, model, temperature)
+        self.backend.set(
+            self.make_key(normalized, scope),
+            CachedSQL(
+                question=normalized,
+                sql_query=sql_query,
+                scope=scope,
+                created_at=time.time(),
+            ),
+        )
+        self._record("stores")
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the current number of entries."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["near_hits"] + stats["misses"]
+        stats["entries"] = len(self.backend)
+        stats["hit_rate"] = (
+            round((stats["hits"] + stats["near_hits"]) / lookups, 4) if lookups else 0.0
+        )
+        return stats
+
+    def _find_similar(self, normalized: str, scope: str) -> Optional[CachedSQL]:
+        """Find the most similar cached question above the threshold."""
+        target = shingles(normalized, self.shingle_size)
+        target_literals = literals(normalized)
+        best, best_score = None, self.similarity_threshold
+        for entry in self.backend.entries(scope):
+            if literals(entry.question) != target_literals:
+                continue
+            score = jaccard(target, shingles(entry.question, self.shingle_size))
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def _record(self, counter: str) -> None:
+        with self._stats_lock:
+            self._stats[counter] += 1
+        if counter in _LOOKUP_RESULTS:
+            record_cache_lookup("sql", _LOOKUP_RESULTS[counter])
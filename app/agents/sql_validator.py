@@ -0,0 +1,540 @@
+"""Tokenizer-based validator for generated SQL.
+
+Generated SQL is split into PostgreSQL lexical tokens, so keywords inside
+string literals, quoted identifiers, comments or longer identifiers (e.g.
+``created_at``) are never mistaken for statements. The token stream is then
+parsed into a small statement tree that must match an allow-list: a single
+SELECT / VALUES / TABLE statement, optionally preceded by CTEs whose bodies
+are themselves read-only queries.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+# Leading whitespace is consumed with each token. Alternatives are ordered by
+# frequency, with comments ahead of operators so "--" and "/*" are not
+# swallowed as operators.
+_TOKEN_RE = re.compile(
+    r"""
+    \s*(?:
+      (?P<word>(?![EeBbXxNn]'|[Uu]&['"])[^\W\d][\w$]*)
+    | (?P<punct>[(),;\[\]])
+    | (?P<string>(?:[BbXxNn]|[Uu]&)?'(?:[^']|'')*')
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[Ee][+-]?\d+)?)
+    | (?P<line_comment>--[^\n]*)
+    | (?P<block_comment>/\*)
+    | (?P<op>::|[<>=!~+\-*/%^&|#@?.:]+)
+    | (?P<qident>(?:[Uu]&)?"(?:[^"]|"")*")
+    | (?P<param>\$\d+)
+    | (?P<dollar>\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$)
+    | (?P<estring>[Ee]'(?:[^'\\]|\\.|'')*')
+    )""",
+    re.VERBOSE,
+)
+
+# Statements a generated query may be
+QUERY_STARTS = frozenset({"SELECT", "WITH", "VALUES", "TABLE"})
+
+# Words that can turn an otherwise read-only statement into a write
+# (data-modifying CTEs, SELECT INTO, row locks) or run DDL
+FORBIDDEN_KEYWORDS = frozenset(
+    {
+        "ALTER",
+        "CREATE",
+        "DELETE",
+        "DROP",
+        "GRANT",
+        "INSERT",
+        "INTO",
+        "MERGE",
+        "REVOKE",
+        "TRUNCATE",
+        "UPDATE",
+    }
+)
+
+# Functions with side effects on the server, sessions, sequences, advisory
+# locks or large objects
+FORBIDDEN_FUNCTIONS = frozenset(
+    {
+        "dblink",
+        "dblink_exec",
+        "lo_creat",
+        "lo_create",
+        "lo_export",
+        "lo_from_bytea",
+        "lo_import",
+        "lo_put",
+        "lo_unlink",
+        "nextval",
+        "pg_advisory_lock",
+        "pg_advisory_lock_shared",
+        "pg_advisory_xact_lock",
+        "pg_advisory_xact_lock_shared",
+        "pg_cancel_backend",
+        "pg_create_restore_point",
+        "pg_ls_dir",
+        "pg_read_binary_file",
+        "pg_read_file",
+        "pg_reload_conf",
+        "pg_rotate_logfile",
+        "pg_stat_file",
+        "pg_switch_wal",
+        "pg_terminate_backend",
+        "pg_try_advisory_lock",
+        "pg_try_advisory_lock_shared",
+        "pg_try_advisory_xact_lock",
+        "pg_try_advisory_xact_lock_shared",
+        "set_config",
+        "setval",
+    }
+)
+
+# Words that end a FROM list at the current nesting level
+_FROM_TERMINATORS = frozenset(
+    {
+        "EXCEPT",
+        "FETCH",
+        "FOR",
+        "GROUP",
+        "HAVING",
+        "INTERSECT",
+        "LIMIT",
+        "OFFSET",
+        "ORDER",
+        "SELECT",
+        "UNION",
+        "WHERE",
+        "WINDOW",
+    }
+)
+
+
+class SQLSyntaxError(ValueError):
+    """Raised when SQL cannot be tokenized (e.g. an unterminated literal)."""
+
+
+class Token(NamedTuple):
+    """A lexical token.
+
+    Attributes:
+        kind: word, qident, string, number, param, punct or op
+        value: Token text as written
+        upper: Uppercased text, for keyword comparisons
+        start: Offset of the token in the SQL text
+        end: Offset just past the token
+    """
+
+    kind: str
+    value: str
+    upper: str
+    start: int
+    end: int
+
+
+@dataclass(frozen=True)
+class CommonTableExpression:
+    """A WITH-clause entry.
+
+    Attributes:
+        name: CTE name
+        kind: Leading keyword of its body (SELECT, VALUES, ...)
+    """
+
+    name: str
+    kind: str
+
+
+@dataclass(frozen=True)
+class Statement:
+    """Parsed shape of an allow-listed statement.
+
+    Attributes:
+        kind: Leading keyword of the main query (SELECT, VALUES or TABLE)
+        ctes: CTEs defined by a leading WITH clause
+        tables: Tables referenced in FROM/JOIN clauses, excluding CTE names
+        functions: Set-returning functions called in FROM/JOIN clauses
+    """
+
+    kind: str
+    ctes: Tuple[CommonTableExpression, ...]
+    tables: Tuple[str, ...]
+    functions: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class ValidationResult:
+    """Outcome of validating a SQL string.
+
+    Attributes:
+        is_valid: Whether the SQL is a single read-only query
+        reason: Why the SQL was rejected (None if valid)
+        statement: Parsed statement (None if invalid)
+        normalized: Canonical text: comments dropped, whitespace collapsed,
+            unquoted words lowercased, literals kept
+        fingerprint: Hash of ``normalized`` with literals replaced by ``?``,
+            shared by queries that differ only in their constants
+        trimmed_sql: The statement as written, without the comments,
+            whitespace and semicolons around it, so it can be wrapped in a
+            subquery (e.g. for a LIMIT or COPY)
+    """
+
+    is_valid: bool
+    reason: Optional[str] = None
+    statement: Optional[Statement] = None
+    normalized: str = ""
+    fingerprint: str = ""
+    trimmed_sql: str = ""
+
+    @property
+    def tables(self) -> Tuple[str, ...]:
+        """Tables referenced by the statement (empty if invalid)."""
+        return self.statement.tables if self.statement else ()
+
+    @property
+    def functions(self) -> Tuple[str, ...]:
+        """Functions read from like tables (empty if invalid)."""
+        return self.statement.functions if self.statement else ()
+
+
+def tokenize(sql: str) -> List[Token]:
+    """Split SQL into tokens, dropping whitespace and comments.
+
+    Args:
+        sql: SQL text
+
+    Returns:
+        List of tokens
+
+    Raises:
+        SQLSyntaxError: On unterminated literals or comments, or stray characters
+    """
+    tokens = []
+    pos, length = 0, len(sql)
+    while pos < length:
+        match = _TOKEN_RE.match(sql, pos)
+        if match is None:
+            if sql[pos:].isspace():
+                break
+            pos += len(sql[pos:]) - len(sql[pos:].lstrip())
+            raise SQLSyntaxError(
+                f"Unexpected character {sql[pos]!r} at position {pos} "
+                "(unterminated literal?)"
+            )
+        kind = match.lastgroup
+        start, end = match.start(kind), match.end()
+        if kind == "word":
+            value = match.group(kind)
+            tokens.append(Token(kind, value, value.upper(), start, end))
+        elif kind == "block_comment":
+            end = _skip_block_comment(sql, start)
+        elif kind == "dollar":
+            closing = sql.find(match.group(kind), end)
+            if closing < 0:
+                raise SQLSyntaxError(f"Unterminated dollar-quoted string at {start}")
+            end = closing + end - start
+            value = sql[start:end]
+            tokens.append(Token("string", value, value, start, end))
+        elif kind != "line_comment":
+            value = match.group(kind)
+            kind = "string" if kind == "estring" else kind
+            tokens.append(Token(kind, value, value, start, end))
+        pos = end
+    return tokens
+
+
+def _skip_block_comment(sql: str, start: int) -> int:
+    """Return the offset after a (possibly nested) block comment."""
+    depth, pos = 0, start
+    while pos < len(sql):
+        pair = sql[pos : pos + 2]
+        if pair == "/*":
+            depth += 1
+            pos += 2
+        elif pair == "*/":
+            depth -= 1
+            pos += 2
+            if depth == 0:
+                return pos
+        else:
+            pos += 1
+    raise SQLSyntaxError(f"Unterminated block comment at {start}")
+
+
+class SQLValidator:
+    """Validates that generated SQL is a single read-only query."""
+
+    def validate(self, sql: str) -> ValidationResult:
+        """Validate SQL against the read-only allow-list.
+
+        Results are memoized, so re-validating SQL served from a cache is
+        effectively free.
+
+        Args:
+            sql: SQL text to validate
+
+        Returns:
+            ValidationResult; ``is_valid`` is False with a ``reason`` on rejection
+        """
+        return _validate(sql)
+
+    def is_safe(self, sql: str) -> bool:
+        """Check if SQL is a single read-only query."""
+        return _validate(sql).is_valid
+
+
+@lru_cache(maxsize=2048)
+def _validate(sql: str) -> ValidationResult:
+    """Tokenize, split, parse and check a SQL string."""
+    try:
+        tokens = tokenize(sql)
+    except SQLSyntaxError as e:
+        return ValidationResult(False, str(e))
+
+    statements = _split_statements(tokens)
+    if not statements:
+        return ValidationResult(False, "Empty query")
+    if len(statements) > 1:
+        return ValidationResult(False, "Multiple statements are not allowed")
+    tokens = statements[0]
+
+    reason = _check_parentheses(tokens) or _check_forbidden(tokens)
+    if reason:
+        return ValidationResult(False, reason)
+
+    statement, reason = _parse_statement(tokens)
+    if reason:
+        return ValidationResult(False, reason)
+
+    canonical = [_canonical(token) for token in tokens]
+    normalized = " ".join(canonical)
+    literal_free = " ".join(
+        "?" if token.kind in ("string", "number") else text
+        for token, text in zip(tokens, canonical)
+    )
+    return ValidationResult(
+        is_valid=True,
+        statement=statement,
+        normalized=normalized,
+        fingerprint=hashlib.sha1(literal_free.encode("utf-8")).hexdigest(),
+        trimmed_sql=sql[tokens[0].start : tokens[-1].end],
+    )
+
+
+def _split_statements(tokens: List[Token]) -> List[List[Token]]:
+    """Split tokens on top-level semicolons, dropping empty statements."""
+    statements, current = [], []
+    for token in tokens:
+        if token.value == ";":
+            if current:
+                statements.append(current)
+            current = []
+        else:
+            current.append(token)
+    if current:
+        statements.append(current)
+    return statements
+
+
+def _check_parentheses(tokens: List[Token]) -> Optional[str]:
+    """Check that parentheses are balanced."""
+    depth = 0
+    for token in tokens:
+        if token.value == "(":
+            depth += 1
+        elif token.value == ")":
+            depth -= 1
+            if depth < 0:
+                return "Unbalanced parentheses"
+    return "Unbalanced parentheses" if depth else None
+
+
+def _check_forbidden(tokens: List[Token]) -> Optional[str]:
+    """Reject write keywords, row locks and side-effecting functions."""
+    for i, token in enumerate(tokens):
+        if token.kind not in ("word", "qident"):
+            continue
+        # A quoted name calls the same function, e.g. "set_config"(...)
+        name = _canonical(token)
+        if (
+            name in FORBIDDEN_FUNCTIONS
+            and i + 1 < len(tokens)
+            and tokens[i + 1].value == "("
+        ):
+            return f"Statement calls forbidden function {name}"
+        if token.kind != "word":
+            continue
+        if token.upper in FORBIDDEN_KEYWORDS:
+            return f"Statement contains forbidden keyword {token.upper}"
+        if token.upper == "FOR" and i + 1 < len(tokens):
+            following = tokens[i + 1].upper
+            if following in ("SHARE", "NO", "KEY"):
+                return "Row-locking clauses are not allowed"
+    return None
+
+
+def _parse_statement(tokens: List[Token]) -> Tuple[Optional[Statement], Optional[str]]:
+    """Parse the allow-listed statement shape.
+
+    Returns:
+        Tuple of (statement, None) on success or (None, reason) on rejection
+    """
+    ctes: List[CommonTableExpression] = []
+    pos = 0
+    if tokens[0].upper == "WITH":
+        pos = 1
+        if pos < len(tokens) and tokens[pos].upper == "RECURSIVE":
+            pos += 1
+        while True:
+            cte, pos, reason = _parse_cte(tokens, pos)
+            if reason:
+                return None, reason
+            ctes.append(cte)
+            if pos < len(tokens) and tokens[pos].value == ",":
+                pos += 1
+                continue
+            break
+
+    if pos >= len(tokens):
+        return None, "WITH clause is not followed by a query"
+    kind = _query_kind(tokens, pos)
+    if kind not in QUERY_STARTS - {"WITH"}:
+        return None, f"Only SELECT queries are allowed, got {tokens[pos].value}"
+
+    cte_names = {cte.name for cte in ctes}
+    relations, functions = _from_items(tokens)
+    tables = tuple(table for table in relations if table not in cte_names)
+    statement = Statement(
+        kind=kind, ctes=tuple(ctes), tables=tables, functions=tuple(functions)
+    )
+    return statement, None
+
+
+def _parse_cte(
+    tokens: List[Token], pos: int
+) -> Tuple[Optional[CommonTableExpression], int, Optional[str]]:
+    """Parse ``name [(columns)] AS [[NOT] MATERIALIZED] (query)``."""
+    if pos >= len(tokens) or tokens[pos].kind not in ("word", "qident"):
+        return None, pos, "Malformed WITH clause"
+    name = _canonical(tokens[pos])
+    pos += 1
+    if pos < len(tokens) and tokens[pos].value == "(":
+        pos = _matching_paren(tokens, pos) + 1
+    if pos >= len(tokens) or tokens[pos].upper != "AS":
+        return None, pos, f"Malformed CTE {name}"
+    pos += 1
+    if pos < len(tokens) and tokens[pos].upper == "NOT":
+        pos += 1
+    if pos < len(tokens) and tokens[pos].upper == "MATERIALIZED":
+        pos += 1
+    if pos >= len(tokens) or tokens[pos].value != "(":
+        return None, pos, f"Malformed CTE {name}"
+    close = _matching_paren(tokens, pos)
+    kind = _query_kind(tokens, pos + 1) if pos + 1 < close else ""
+    if kind not in QUERY_STARTS:
+        return None, pos, f"CTE {name} must be a read-only query"
+    return CommonTableExpression(name=name, kind=kind), close + 1, None
+
+
+def _query_kind(tokens: List[Token], pos: int) -> str:
+    """Leading keyword of a query, looking through opening parentheses."""
+    while pos < len(tokens) and tokens[pos].value == "(":
+        pos += 1
+    return tokens[pos].upper if pos < len(tokens) else ""
+
+
+def _matching_paren(tokens: List[Token], pos: int) -> int:
+    """Index of the parenthesis closing the one at ``pos``."""
+    depth = 0
+    for i in range(pos, len(tokens)):
+        if tokens[i].value == "(":
+            depth += 1
+        elif tokens[i].value == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    return len(tokens) - 1
+
+
+def _from_items(tokens: List[Token]) -> Tuple[List[str], List[str]]:
+    """Collect names following FROM, JOIN, TABLE and FROM-list commas.
+
+    Returns:
+        Tuple of (relation names, set-returning function names)
+    """
+    tables: List[str] = []
+    functions: List[str] = []
+    from_active = {}
+    # Depths of parentheses holding an expression (e.g. function arguments),
+    # where FROM is part of the syntax: extract(year FROM x), trim(... FROM x)
+    expression = {}
+    depth = 0
+    expect_table = False
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.value == "(":
+            depth += 1
+            # "FROM (a JOIN b ...)" nests a join; "FROM (SELECT ...)" a query
+            query = _query_kind(tokens, i) in QUERY_STARTS
+            nested_join = expect_table and not query
+            from_active[depth] = nested_join
+            expression[depth] = not (query or nested_join)
+            expect_table = nested_join
+        elif token.value == ")":
+            from_active[depth] = False
+            expression[depth] = False
+            depth -= 1
+        elif token.value == "," and from_active.get(depth):
+            expect_table = True
+        elif token.upper == "FROM" and expression.get(depth):
+            expect_table = False
+        elif token.kind == "word" and token.upper in ("FROM", "JOIN", "TABLE"):
+            from_active[depth] = True
+            expect_table = True
+        elif token.kind == "word" and token.upper in _FROM_TERMINATORS:
+            from_active[depth] = False
+            expect_table = False
+        elif (
+            expect_table
+            and token.kind == "word"
+            and token.upper
+            in (
+                "LATERAL",
+                "ONLY",
+            )
+        ):
+            pass
+        elif expect_table and token.kind in ("word", "qident"):
+            # Consume a possibly schema-qualified name
+            parts = [_canonical(token)]
+            while (
+                i + 2 < len(tokens)
+                and tokens[i + 1].value == "."
+                and tokens[i + 2].kind in ("word", "qident")
+            ):
+                parts.append(_canonical(tokens[i + 2]))
+                i += 2
+            # A name followed by "(" is a set-returning function, not a table
+            name = ".".join(parts)
+            is_call = i + 1 < len(tokens) and tokens[i + 1].value == "("
+            names = functions if is_call else tables
+            if name not in names:
+                names.append(name)
+            expect_table = False
+        else:
+            expect_table = False
+        i += 1
+    return tables, functions
+
+
+def _canonical(token: Token) -> str:
+    """Case-fold unquoted words; keep literals and quoted identifiers as written."""
+    if token.kind == "word":
+        return token.value.lower()
+    if token.kind == "qident":
+        return token.value[1:-1].replace('""', '"')
+    return token.value
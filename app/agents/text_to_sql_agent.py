@@ -1,14 +1,155 @@
 """Text-to-SQL agent orchestrator."""
 
-from typing import Dict, List, Any
+import asyncio
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from typing import (
+    Any,
+    AsyncIterator,
+    BinaryIO,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 from .context_service import ContextService
-from .llm_client import LLMClient
+from .cost_gate import CostGate, PlanSummary, QueryCostError
+from .llm_client import LLMClient, SystemContent
 from .prompt_builder import PromptBuilder
+from .result_cache import ResultCache, TableVersions
+from .schema_formats import estimate_tokens
+from .schema_retriever import SchemaRetriever
+from .sql_cache import SQLCache, normalize_question
+from .sql_validator import SQLValidator, ValidationResult
+from .value_profiler import ValueProfiler
+from ..core.async_db_client import AsyncDbClient
+from ..core.columnar import ColumnarResult
+from ..core.export import export_query, iter_export
 from ..core.db_client import DbClient
 from ..utils.logger import setup_logger
+from ..utils.metrics import (
+    COALESCED_QUESTIONS,
+    COST_GATE_CHECKS,
+    QUESTIONS,
+    ROWS_RETURNED,
+    SQL_REPAIRS,
+    STAGE_LATENCY,
+)
+from ..utils.single_flight import SingleFlight
 
 logger = setup_logger(__name__)
 
+# SQLSTATE classes of errors in the query itself, which the LLM can fix:
+# cardinality violations, data exceptions and syntax/access rule violations
+REPAIRABLE_SQLSTATE_CLASSES = ("21", "22", "42")
+# ...except missing privileges, which no rewrite of the query can fix
+INSUFFICIENT_PRIVILEGE = "42501"
+
+
+# Executed rows: dictionaries, or column arrays for the columnar format
+Rows = Union[List[Dict[str, Any]], ColumnarResult]
+
+
+@dataclass
+class QueryResult:
+    """Outcome of a single generate, validate and execute pipeline run.
+
+    Attributes:
+        question: Natural language question that was asked
+        sql_query: SQL that was generated and executed
+        results: Rows returned by the query
+        timings: Per-stage latency in milliseconds
+        sql_cache_hit: Whether the SQL came from the SQL cache instead of the LLM
+        result_cache_hit: Whether the rows came from the result cache instead
+            of the database
+        metadata: Extra details about the run (e.g. schema pruning statistics)
+        truncated: Whether rows were dropped because the row cap was reached
+        validation: Parsed form of the SQL (set once the SQL passed validation)
+        plan: Planner estimates for the SQL (set when a cost gate is enabled)
+        columnar: Rows as column arrays, set instead of ``results`` when the
+            columnar result format was requested
+        schema: Schema context loaded for the question
+        prompt: System and user messages of the first LLM call, reused when
+            asking for a corrected query
+    """
+
+    question: str
+    sql_query: str = ""
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+    sql_cache_hit: bool = False
+    result_cache_hit: bool = False
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    truncated: bool = False
+    validation: Optional[ValidationResult] = None
+    plan: Optional[PlanSummary] = None
+    columnar: Optional[ColumnarResult] = None
+    schema: Optional[str] = field(default=None, repr=False)
+    prompt: Optional[Tuple[SystemContent, str]] = field(default=None, repr=False)
+
+    @property
+    def row_count(self) -> int:
+        """Number of rows returned by the query."""
+        if self.columnar is not None:
+            return self.columnar.row_count
+        return len(self.results)
+
+
+@dataclass
+class BatchItem:
+    """Outcome of one question in a batch.
+
+    Attributes:
+        question: Question as submitted
+        result: Pipeline result (None if the question failed)
+        error: Exception raised while answering (None on success)
+    """
+
+    question: str
+    result: Optional[QueryResult] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the question was answered."""
+        return self.error is None
+
+
+def _is_repairable(error: Exception) -> bool:
+    """Whether a database error was caused by the SQL itself."""
+    pgcode = getattr(error, "pgcode", None)
+    return (
+        bool(pgcode)
+        and pgcode[:2] in REPAIRABLE_SQLSTATE_CLASSES
+        and pgcode != INSUFFICIENT_PRIVILEGE
+    )
+
+
+def _repair_problem(error: Exception) -> str:
+    """Describe a database error for the repair prompt."""
+    return (
+        f"PostgreSQL rejected it with this error:\n{str(error).strip()}\n"
+        "Fix the query using only tables and columns from the schema."
+    )
+
+
+@contextmanager
+def _timed(timings: Dict[str, float], stage: str) -> Iterator[None]:
+    """Record the wall-clock duration of a block under ``stage`` (ms).
+
+    The duration is also observed in the stage latency histogram.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings[stage] = round(elapsed * 1000, 3)
+        STAGE_LATENCY.observe(elapsed, stage=stage)
+
 
 class TextToSQLAgent:
     """Orchestrates the text-to-SQL generation process."""
@@ -19,6 +160,20 @@ class TextToSQLAgent:
         llm_client: LLMClient,
         context_service: ContextService = None,
         prompt_builder: PromptBuilder = None,
+        async_db_client: AsyncDbClient = None,
+        sql_cache: Optional[SQLCache] = None,
+        schema_retriever: Optional[SchemaRetriever] = None,
+        statement_timeout_ms: Optional[int] = None,
+        max_rows: Optional[int] = None,
+        sql_validator: Optional[SQLValidator] = None,
+        result_cache: Optional[ResultCache] = None,
+        single_flight: bool = True,
+        prompt_caching: bool = False,
+        cost_gate: Optional[CostGate] = None,
+        max_repair_attempts: int = 0,
+        repair_timeout: Optional[float] = None,
+        export_timeout_ms: Optional[int] = None,
+        value_profiler: Optional[ValueProfiler] = None,
     ):
         """Initialize the agent with required components.
 
@@ -27,11 +182,53 @@ class TextToSQLAgent:
             llm_client: LLM client for SQL generation
             context_service: Optional context service (created if not provided)
             prompt_builder: Optional prompt builder (created if not provided)
+            async_db_client: Optional async wrapper around ``db_client`` used by
+                the async pipeline (created if not provided)
+            sql_cache: Optional question-to-SQL cache (disabled if not provided)
+            schema_retriever: Optional retriever that prunes the schema to the
+                tables relevant to each question (full schema if not provided)
+            statement_timeout_ms: Cancel generated queries running longer than
+                this many milliseconds (no timeout if not provided)
+            max_rows: Hard cap on rows returned per query; results over the
+                cap are cut and flagged as truncated (no cap if not provided)
+            sql_validator: Optional validator for generated SQL (created if not
+                provided)
+            result_cache: Optional cache of query results keyed by normalized
+                SQL (disabled if not provided)
+            single_flight: Share one in-flight run among concurrent calls for
+                the same normalized question and schema version
+            prompt_caching: Send the instructions and schema as a cacheable
+                prompt prefix (Anthropic prompt caching)
+            cost_gate: Optional EXPLAIN-based check that rejects (or asks the
+                LLM to rewrite) SQL estimated to be too expensive
+            max_repair_attempts: Times SQL the database rejects (e.g. an
+                unknown column) is sent back to the LLM with the error to be
+                fixed (0 disables repair)
+            repair_timeout: Seconds after the start of a run past which no
+                new repair is attempted (no limit if not provided)
+            export_timeout_ms: Cancel bulk exports running longer than this
+                many milliseconds (no timeout if not provided)
+            value_profiler: Optional profiler whose column values matching
+                the question are added to the prompt (none if not provided)
         """
         self.db_client = db_client
         self.llm_client = llm_client
         self.context_service = context_service or ContextService(db_client)
         self.prompt_builder = prompt_builder or PromptBuilder()
+        self.async_db_client = async_db_client or AsyncDbClient(db_client)
+        self.sql_cache = sql_cache
+        self.schema_retriever = schema_retriever
+        self.statement_timeout_ms = statement_timeout_ms
+        self.max_rows = max_rows
+        self.sql_validator = sql_validator or SQLValidator()
+        self.result_cache = result_cache
+        self.single_flight = SingleFlight() if single_flight else None
+        self.prompt_caching = prompt_caching
+        self.cost_gate = cost_gate
+        self.max_repair_attempts = max_repair_attempts
+        self.repair_timeout = repair_timeout
+        self.export_timeout_ms = export_timeout_ms
+        self.value_profiler = value_profiler
         logger.info("TextToSQLAgent initialized")
 
     def generate_sql(self, question: str) -> str:
@@ -40,61 +237,920 @@ class TextToSQLAgent:
         Args:
             question: User's natural language question
 
+        Returns:
+            Generated SQL query string
+        """
+        return self._generate_sql(QueryResult(question=question))
+
+    async def agenerate_sql(self, question: str) -> str:
+        """Async counterpart of ``generate_sql``.
+
+        Args:
+            question: User's natural language question
+
+        Returns:
+            Generated SQL query string
+        """
+        return await self._agenerate_sql(QueryResult(question=question))
+
+    def _generate_sql(self, result: QueryResult) -> str:
+        """Generate SQL for ``result.question``, recording stage timings on it.
+
+        Args:
+            result: In-progress pipeline result
+
         Returns:
             Generated SQL query string
         """
         try:
-            # Get schema context
-            logger.info(f"Generating SQL for question: {question}")
-            schema = self.context_service.format_schema_for_llm()
+            schema = self._load_schema(result)
+            cached_sql = self._lookup_cached_sql(result)
+            if cached_sql is not None:
+                return cached_sql
 
-            # Build prompt
-            system_message = self.prompt_builder.build_system_message(schema)
-            user_message = self.prompt_builder.build_user_message(question)
+            system_message, user_message = self._build_prompt(result, schema)
 
             # Generate SQL
-            sql_query = self.llm_client.generate_with_system_message(
-                system_message, user_message
-            )
+            with _timed(result.timings, "llm"):
+                sql_query = self.llm_client.generate_with_system_message(
+                    system_message, user_message
+                )
+
+            return self._finish_sql(sql_query)
 
-            # Clean up the query (remove markdown formatting if present)
-            sql_query = self._clean_sql_query(sql_query)
+        except Exception as e:
+            logger.error(f"Failed to generate SQL: {e}")
+            raise
+
+    async def _agenerate_sql(self, result: QueryResult) -> str:
+        """Async counterpart of ``_generate_sql``.
 
-            logger.info(f"Successfully generated SQL: {sql_query}")
-            return sql_query
+        Schema lookup may hit the database, so it runs on the DB worker threads.
+        """
+        try:
+            schema = await self.async_db_client.run_sync(self._load_schema, result)
+            cached_sql = await self._alookup_cached_sql(result)
+            if cached_sql is not None:
+                return cached_sql
+
+            system_message, user_message = self._build_prompt(result, schema)
+
+            # Generate SQL
+            with _timed(result.timings, "llm"):
+                sql_query = await self.llm_client.agenerate_with_system_message(
+                    system_message, user_message
+                )
+
+            return self._finish_sql(sql_query)
 
         except Exception as e:
             logger.error(f"Failed to generate SQL: {e}")
             raise
 
-    def execute_query(self, question: str) -> List[Dict[str, Any]]:
-        """Generate SQL from question and execute it.
+    def _load_schema(self, result: QueryResult) -> str:
+        """Get the schema context for the prompt, pruned if a retriever is set.
+
+        The schema is loaded once per result and kept on it for re-prompts.
+        """
+        if result.schema is None:
+            logger.info(f"Generating SQL for question: {result.question}")
+            with _timed(result.timings, "schema"):
+                result.schema = self._select_schema(result)
+        return result.schema
+
+    def _select_schema(self, result: QueryResult) -> str:
+        """Render the full schema, or the tables the retriever picks."""
+        if self.schema_retriever is None:
+            return self.context_service.format_schema_for_llm()
+
+        catalog = self.context_service.get_catalog()
+        tables = self.schema_retriever.select_tables(result.question, catalog)
+        schema = (
+            catalog.formatted
+            if tables is None
+            else self.context_service.render_schema(tables)
+        )
+        result.metadata["schema_pruning"] = {
+            "tables_total": len(catalog.table_names),
+            "tables_selected": (
+                len(catalog.table_names) if tables is None else len(tables)
+            ),
+            "schema_chars_full": len(catalog.formatted),
+            "schema_chars_sent": len(schema),
+            "schema_tokens_sent": estimate_tokens(schema),
+            "reduction": (
+                round(1 - len(schema) / len(catalog.formatted), 4)
+                if catalog.formatted
+                else 0.0
+            ),
+        }
+        return schema
+
+    def _build_prompt(
+        self, result: QueryResult, schema: str
+    ) -> Tuple[SystemContent, str]:
+        """Build the system and user messages for the LLM.
+
+        The messages are kept on the result so re-prompts can reuse them.
+
+        Returns:
+            Tuple of (system message, user message)
+        """
+        with _timed(result.timings, "prompt"):
+            if self.prompt_caching:
+                system_message = self.prompt_builder.build_cached_system_message(
+                    schema, self.context_service.schema_fingerprint
+                )
+            else:
+                system_message = self.prompt_builder.build_system_message(schema)
+            user_message = self._with_value_hints(
+                result, self.prompt_builder.build_user_message(result.question)
+            )
+        result.prompt = (system_message, user_message)
+        return result.prompt
+
+    def _with_value_hints(self, result: QueryResult, user_message: str) -> str:
+        """Add the profiled column values the question refers to, if any."""
+        if self.value_profiler is None:
+            return user_message
+        matches = self.value_profiler.relevant_values(result.question)
+        if not matches:
+            return user_message
+        result.metadata["value_hints"] = [
+            f"{profile.table}.{profile.column}" for profile, _ in matches
+        ]
+        return self.prompt_builder.add_value_hints(
+            user_message, self.value_profiler.render_hints(matches)
+        )
+
+    def _lookup_cached_sql(self, result: QueryResult) -> Optional[str]:
+        """Return previously generated SQL for the question, if cached."""
+        if self.sql_cache is None:
+            return None
+        with _timed(result.timings, "sql_cache"):
+            entry = self.sql_cache.get(result.question, *self._sql_cache_scope())
+        if entry is None:
+            return None
+        logger.info("SQL cache hit, skipping LLM call")
+        result.sql_cache_hit = True
+        return entry.sql_query
+
+    def _store_cached_sql(self, result: QueryResult) -> None:
+        """Remember validated SQL so the next identical question skips the LLM."""
+        if self.sql_cache is None or result.sql_cache_hit:
+            return
+        self.sql_cache.put(result.question, result.sql_query, *self._sql_cache_scope())
+
+    async def _alookup_cached_sql(self, result: QueryResult) -> Optional[str]:
+        """Async counterpart of ``_lookup_cached_sql``.
+
+        The SQLite backend reads from disk, so the lookup runs on the DB
+        worker threads.
+        """
+        if self.sql_cache is None:
+            return None
+        return await self.async_db_client.run_sync(self._lookup_cached_sql, result)
+
+    async def _astore_cached_sql(self, result: QueryResult) -> None:
+        """Async counterpart of ``_store_cached_sql`` (see ``_alookup_cached_sql``)."""
+        if self.sql_cache is None or result.sql_cache_hit:
+            return
+        await self.async_db_client.run_sync(self._store_cached_sql, result)
+
+    def _sql_cache_scope(self) -> Tuple[Any, Any, Any]:
+        """Schema version, model and temperature that cached SQL depends on."""
+        return (
+            self.context_service.schema_fingerprint,
+            self.llm_client.model,
+            self.llm_client.temperature,
+        )
+
+    def _finish_sql(self, sql_query: str) -> str:
+        """Clean up raw LLM output into a SQL query."""
+        # Clean up the query (remove markdown formatting if present)
+        sql_query = self._clean_sql_query(sql_query)
+
+        logger.info(f"Successfully generated SQL: {sql_query}")
+        return sql_query
+
+    def answer(self, question: str, columnar: bool = False) -> QueryResult:
+        """Generate SQL once, validate it and execute it.
+
+        The SQL in the returned result is exactly the SQL that was executed.
+        Concurrent calls for the same question share one run (see
+        ``single_flight``).
 
         Args:
             question: User's natural language question
+            columnar: Fetch rows as column arrays into ``QueryResult.columnar``
+                instead of row dictionaries (bypasses the result cache)
 
         Returns:
-            Query results as list of dictionaries
+            QueryResult with the SQL, rows and per-stage timings
         """
+        if self.single_flight is None:
+            return self._answer(question, columnar)
+        result, shared = self.single_flight.do(
+            self._flight_key("answer_columnar" if columnar else "answer", question),
+            lambda: self._answer(question, columnar),
+        )
+        return self._shared_result(result, question) if shared else result
+
+    def _answer(self, question: str, columnar: bool = False) -> QueryResult:
+        """Run the full pipeline for one question."""
+        result = QueryResult(question=question)
+        start = time.perf_counter()
         try:
             # Generate SQL
-            sql_query = self.generate_sql(question)
+            result.sql_query = self._generate_sql(result)
 
-            # Validate query is SELECT only (safety check)
-            if not self._is_safe_query(sql_query):
-                raise ValueError("Only SELECT queries are allowed")
+            # Execute it, asking the LLM to fix SQL the database rejects
+            while True:
+                try:
+                    rows = self._execute(result, columnar)
+                    break
+                except Exception as e:
+                    if not self._can_repair(result, e, start):
+                        raise
+                    self._repair(result, e)
+            self._apply_row_cap(result, rows)
 
-            # Execute query
+            return self._finish_result(result, start)
+
+        except Exception as e:
+            self._record_failure(result)
+            logger.error(f"Failed to execute query: {e}")
+            raise
+
+    def _execute(self, result: QueryResult, columnar: bool = False) -> Rows:
+        """Approve and run the SQL in ``result``, using the result cache.
+
+        Returns:
+            Rows, including the extra row used to detect truncation
+        """
+        self._approve(result, capped=True)
+        if columnar:
+            logger.info("Executing generated SQL query (columnar)")
+            with _timed(result.timings, "execute"):
+                rows = self.db_client.run_sql_columnar(
+                    self._statement(result), **self._execution_limits()
+                )
+            self._store_cached_sql(result)
+            return rows
+
+        # Execute query, unless the result cache has fresh rows for it
+        rows, versions = self._lookup_cached_result(result)
+        if rows is None:
             logger.info("Executing generated SQL query")
-            results = self.db_client.run_sql(sql_query)
-            logger.info(f"Query returned {len(results)} rows")
+            with _timed(result.timings, "execute"):
+                rows = self.db_client.run_sql(
+                    self._statement(result), **self._execution_limits(versions)
+                )
+            self._store_cached_result(result, rows, versions)
+        self._store_cached_sql(result)
+        return rows
 
-            return results
+    async def aanswer(self, question: str, columnar: bool = False) -> QueryResult:
+        """Async counterpart of ``answer`` for use inside an event loop.
+
+        Args:
+            question: User's natural language question
+            columnar: Fetch rows as column arrays (see ``answer``)
+
+        Returns:
+            QueryResult with the SQL, rows and per-stage timings
+        """
+        if self.single_flight is None:
+            return await self._aanswer(question, columnar)
+        result, shared = await self.single_flight.ado(
+            self._flight_key("answer_columnar" if columnar else "answer", question),
+            lambda: self._aanswer(question, columnar),
+        )
+        return self._shared_result(result, question) if shared else result
+
+    async def _aanswer(self, question: str, columnar: bool = False) -> QueryResult:
+        """Run the full async pipeline for one question."""
+        result = QueryResult(question=question)
+        start = time.perf_counter()
+        try:
+            # Generate SQL
+            result.sql_query = await self._agenerate_sql(result)
+
+            # Execute it, asking the LLM to fix SQL the database rejects
+            while True:
+                try:
+                    rows = await self._aexecute(result, columnar)
+                    break
+                except Exception as e:
+                    if not self._can_repair(result, e, start):
+                        raise
+                    await self._arepair(result, e)
+            self._apply_row_cap(result, rows)
+
+            return self._finish_result(result, start)
 
         except Exception as e:
+            self._record_failure(result)
             logger.error(f"Failed to execute query: {e}")
             raise
 
+    async def _aexecute(self, result: QueryResult, columnar: bool = False) -> Rows:
+        """Async counterpart of ``_execute``."""
+        await self._aapprove(result, capped=True)
+        if columnar:
+            logger.info("Executing generated SQL query (columnar)")
+            with _timed(result.timings, "execute"):
+                rows = await self.async_db_client.run_sql_columnar(
+                    self._statement(result), **self._execution_limits()
+                )
+            await self._astore_cached_sql(result)
+            return rows
+
+        # Execute query, unless the result cache has fresh rows for it
+        rows, versions = None, None
+        if self.result_cache is not None:
+            # The freshness check may poll table statistics
+            rows, versions = await self.async_db_client.run_sync(
+                self._lookup_cached_result, result
+            )
+        if rows is None:
+            logger.info("Executing generated SQL query")
+            with _timed(result.timings, "execute"):
+                rows = await self.async_db_client.run_sql(
+                    self._statement(result), **self._execution_limits(versions)
+                )
+            self._store_cached_result(result, rows, versions)
+        await self._astore_cached_sql(result)
+        return rows
+
+    def prepare(self, question: str) -> QueryResult:
+        """Generate and validate SQL without executing it.
+
+        Used by streaming delivery, where rows are fetched separately with
+        ``stream_rows``.
+
+        Args:
+            question: User's natural language question
+
+        Returns:
+            QueryResult with the validated SQL and no rows
+        """
+        if self.single_flight is None:
+            return self._prepare(question)
+        result, shared = self.single_flight.do(
+            self._flight_key("prepare", question), lambda: self._prepare(question)
+        )
+        return self._shared_result(result, question) if shared else result
+
+    def _prepare(self, question: str) -> QueryResult:
+        """Generate and validate SQL for one question."""
+        result = QueryResult(question=question)
+        result.sql_query = self._generate_sql(result)
+        self._approve(result)
+        return result
+
+    async def aprepare(self, question: str) -> QueryResult:
+        """Async counterpart of ``prepare``.
+
+        Args:
+            question: User's natural language question
+
+        Returns:
+            QueryResult with the validated SQL and no rows
+        """
+        if self.single_flight is None:
+            return await self._aprepare(question)
+        result, shared = await self.single_flight.ado(
+            self._flight_key("prepare", question), lambda: self._aprepare(question)
+        )
+        return self._shared_result(result, question) if shared else result
+
+    async def _aprepare(self, question: str) -> QueryResult:
+        """Generate and validate SQL for one question without blocking the loop."""
+        result = QueryResult(question=question)
+        result.sql_query = await self._agenerate_sql(result)
+        await self._aapprove(result)
+        return result
+
+    async def astream_prepare(self, question: str) -> AsyncIterator[Tuple[str, Any]]:
+        """Generate SQL token by token, then validate it without executing.
+
+        Streamed runs are never coalesced, since each caller needs its own
+        tokens. A cached SQL query is emitted as a single token.
+
+        Args:
+            question: User's natural language question
+
+        Yields:
+            ``("token", text)`` for each fragment of raw model output as it
+            arrives, then ``("validated", QueryResult)`` once the cleaned SQL
+            passed validation (ready for ``stream_rows``)
+
+        Raises:
+            ValueError: If the generated SQL fails validation
+        """
+        result = QueryResult(question=question)
+        schema = await self.async_db_client.run_sync(self._load_schema, result)
+        sql_query = await self._alookup_cached_sql(result)
+        if sql_query is not None:
+            yield "token", sql_query
+        else:
+            system_message, user_message = self._build_prompt(result, schema)
+            fragments = []
+            start = time.perf_counter()
+            with _timed(result.timings, "llm"):
+                async for text in self.llm_client.astream_with_system_message(
+                    system_message, user_message
+                ):
+                    if not fragments:
+                        result.timings["llm_first_token"] = round(
+                            (time.perf_counter() - start) * 1000, 3
+                        )
+                    fragments.append(text)
+                    yield "token", text
+            sql_query = self._finish_sql("".join(fragments))
+
+        result.sql_query = sql_query
+        await self._aapprove(result)
+        yield "validated", result
+
+    def _flight_key(self, operation: str, question: str) -> str:
+        """Identity of a run for coalescing: operation, question and schema."""
+        return (
+            f"{operation}|{self.context_service.schema_fingerprint}|"
+            f"{normalize_question(question)}"
+        )
+
+    def _shared_result(self, result: QueryResult, question: str) -> QueryResult:
+        """Copy of a leader's result for a caller that joined its run."""
+        COALESCED_QUESTIONS.inc()
+        logger.info("Joined an identical in-flight question")
+        return replace(
+            result,
+            question=question,
+            metadata={**result.metadata, "coalesced": True},
+        )
+
+    def export(
+        self, result: QueryResult, destination: BinaryIO, format: str = "csv"
+    ) -> int:
+        """Write the full result of prepared SQL to a binary file-like object.
+
+        Uses ``COPY ... TO STDOUT``, so rows never become Python objects. The
+        row cap does not apply to exports; ``export_timeout_ms`` does.
+
+        Args:
+            result: Result from ``prepare``/``aprepare``
+            destination: Binary file-like object (e.g. a local file opened
+                with ``"wb"``) receiving the export
+            format: "csv" or "parquet"
+
+        Returns:
+            Number of rows exported
+        """
+        logger.info(f"Exporting generated SQL query as {format}")
+        with _timed(result.timings, "export"):
+            row_count = export_query(
+                self.db_client,
+                self._statement(result),
+                destination,
+                format=format,
+                statement_timeout_ms=self.export_timeout_ms,
+            )
+        logger.info(f"Exported {row_count} rows")
+        self._store_cached_sql(result)
+        return row_count
+
+    def iter_export(self, result: QueryResult, format: str = "csv") -> Iterator[bytes]:
+        """Stream the export of prepared SQL as byte chunks (see ``export``).
+
+        Args:
+            result: Result from ``prepare``/``aprepare``
+            format: "csv" or "parquet"
+
+        Yields:
+            Chunks of the exported file
+        """
+        return iter_export(lambda destination: self.export(result, destination, format))
+
+    def stream_rows(
+        self, result: QueryResult, batch_size: int = 1000
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Execute prepared SQL, yielding rows in batches with flat memory use.
+
+        The SQL is cached only once every batch was fetched without error.
+
+        Args:
+            result: Result from ``prepare``/``aprepare``
+            batch_size: Rows fetched per round trip
+
+        Yields:
+            Lists of rows as dictionaries
+        """
+        logger.info("Streaming generated SQL query")
+        yield from self.db_client.stream_sql(
+            self._statement(result),
+            batch_size=batch_size,
+            statement_timeout_ms=self.statement_timeout_ms,
+            read_only=True,
+        )
+        self._store_cached_sql(result)
+
+    def _execution_limits(
+        self, versions: Optional[TableVersions] = None
+    ) -> Dict[str, Any]:
+        """Row cap, timeout and routing for ``DbClient.run_sql``.
+
+        One row over the cap is requested so truncation can be detected.
+        Validated SQL is read-only, so it may run on a replica, except when
+        its rows will be cached: table versions are read on the primary, and
+        rows from a lagging replica would be cached as current.
+
+        Args:
+            versions: Table versions snapshotted for the result cache, if any
+        """
+        limits = {
+            "max_rows": self.max_rows + 1 if self.max_rows else None,
+            "statement_timeout_ms": self.statement_timeout_ms,
+            "read_only": True,
+        }
+        if versions is not None:
+            limits["use_replica"] = False
+        return limits
+
+    def _result_cache_key(self, result: QueryResult) -> Optional[str]:
+        """Key for the validated SQL, or None if its result must not be cached."""
+        if self.result_cache is None or result.validation is None:
+            return None
+        # Rows read from functions change without any table version moving
+        if result.validation.functions or not result.validation.tables:
+            return None
+        normalized = result.validation.normalized
+        if not self.result_cache.is_deterministic(normalized):
+            return None
+        return self.result_cache.make_key(
+            normalized, self.context_service.schema_fingerprint, self.max_rows
+        )
+
+    def _lookup_cached_result(
+        self, result: QueryResult
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[TableVersions]]:
+        """Get cached rows for the SQL, or snapshot table versions on a miss.
+
+        Returns:
+            Tuple of (cached rows, None) on a hit, or (None, versions of the
+            tables read) to pass to ``_store_cached_result`` after executing
+        """
+        key = self._result_cache_key(result)
+        if key is None:
+            return None, None
+        with _timed(result.timings, "result_cache"):
+            rows = self.result_cache.get(key)
+            if rows is not None:
+                logger.info("Result cache hit, skipping query execution")
+                result.result_cache_hit = True
+                return rows, None
+            return None, self.result_cache.snapshot(result.validation.tables)
+
+    def _store_cached_result(
+        self,
+        result: QueryResult,
+        rows: List[Dict[str, Any]],
+        versions: Optional[TableVersions],
+    ) -> None:
+        """Cache freshly executed rows against the table versions seen before."""
+        key = self._result_cache_key(result)
+        if key is not None:
+            self.result_cache.put(key, rows, versions)
+
+    def _apply_row_cap(self, result: QueryResult, rows: Rows) -> None:
+        """Store rows on the result, cutting them at the row cap."""
+        columnar = isinstance(rows, ColumnarResult)
+        row_count = rows.row_count if columnar else len(rows)
+        if self.max_rows and row_count > self.max_rows:
+            logger.warning(f"Result truncated to {self.max_rows} rows")
+            rows = rows.truncate(self.max_rows) if columnar else rows[: self.max_rows]
+            result.truncated = True
+        if columnar:
+            result.columnar = rows
+        else:
+            result.results = rows
+
+    def _approve(self, result: QueryResult, capped: bool = False) -> None:
+        """Validate the SQL and enforce the cost gate.
+
+        Args:
+            result: In-progress result holding the SQL
+            capped: Whether the SQL will run under the row cap (answers), as
+                opposed to returning every row (streaming and exports)
+
+        Raises:
+            ValueError: If the query is not a read-only SELECT
+            QueryCostError: If the query stays over the cost gate's limits
+        """
+        self._validate(result)
+        self._check_cost(result, capped)
+
+    async def _aapprove(self, result: QueryResult, capped: bool = False) -> None:
+        """Async counterpart of ``_approve``."""
+        self._validate(result)
+        await self._acheck_cost(result, capped)
+
+    def _validate(self, result: QueryResult) -> None:
+        """Validate query is SELECT only (safety check).
+
+        Raises:
+            ValueError: If the query is not a read-only SELECT
+        """
+        with _timed(result.timings, "validate"):
+            validation = self.sql_validator.validate(result.sql_query)
+        if not validation.is_valid:
+            logger.warning(f"Unsafe query rejected: {validation.reason}")
+            raise ValueError(f"Only SELECT queries are allowed: {validation.reason}")
+        result.validation = validation
+
+    @staticmethod
+    def _statement(result: QueryResult) -> str:
+        """Validated SQL without trailing comments or semicolons, safe to wrap."""
+        if result.validation is None:
+            return result.sql_query
+        return result.validation.trimmed_sql
+
+    def _costed_statement(self, result: QueryResult, capped: bool) -> str:
+        """The statement as it will run, wrapped in the row cap's LIMIT if any.
+
+        The planner's estimate for a LIMIT-wrapped query reflects the rows
+        actually fetched, so a capped answer is not rejected for the cost of
+        rows it would never read.
+        """
+        statement = self._statement(result)
+        if capped and self.max_rows:
+            return DbClient._limit_query(statement, self.max_rows + 1)
+        return statement
+
+    def _check_cost(self, result: QueryResult, capped: bool = False) -> None:
+        """Explain the SQL and ask for a cheaper query while it is over budget.
+
+        Args:
+            result: In-progress result holding the SQL
+            capped: Whether to explain the SQL under the row cap (see
+                ``_costed_statement``)
+
+        Raises:
+            QueryCostError: If the query is still over the limits after the
+                allowed re-prompts
+        """
+        if self.cost_gate is None:
+            return
+        for attempt in range(self.cost_gate.max_reprompts + 1):
+            with _timed(result.timings, "explain"):
+                result.plan = self.cost_gate.explain(
+                    self._costed_statement(result, capped), self.statement_timeout_ms
+                )
+            problem = self._cost_problem(result, attempt)
+            if problem is None:
+                return
+            result.sql_query = self._reprompt(result, problem)
+            self._validate(result)
+
+    async def _acheck_cost(self, result: QueryResult, capped: bool = False) -> None:
+        """Async counterpart of ``_check_cost``."""
+        if self.cost_gate is None:
+            return
+        for attempt in range(self.cost_gate.max_reprompts + 1):
+            with _timed(result.timings, "explain"):
+                result.plan = await self.async_db_client.run_sync(
+                    self.cost_gate.explain,
+                    self._costed_statement(result, capped),
+                    self.statement_timeout_ms,
+                )
+            problem = self._cost_problem(result, attempt)
+            if problem is None:
+                return
+            result.sql_query = await self._areprompt(result, problem)
+            self._validate(result)
+
+    def _cost_problem(self, result: QueryResult, attempt: int) -> Optional[str]:
+        """Check ``result.plan`` against the gate.
+
+        Returns:
+            Reason to re-prompt, or None if the plan is within limits
+
+        Raises:
+            QueryCostError: If the plan is over the limits and no re-prompt
+                is left
+        """
+        problem = self.cost_gate.violation(result.plan)
+        if problem is None:
+            COST_GATE_CHECKS.inc(outcome="passed")
+            return None
+        if attempt >= self.cost_gate.max_reprompts:
+            COST_GATE_CHECKS.inc(outcome="rejected")
+            logger.warning(f"Expensive query rejected: {problem}")
+            raise QueryCostError(f"Query rejected: {problem}", result.plan)
+        COST_GATE_CHECKS.inc(outcome="reprompted")
+        result.metadata["reprompts"] = result.metadata.get("reprompts", 0) + 1
+        logger.info(f"Expensive query, asking for a cheaper one: {problem}")
+        return (
+            f"{problem}. Write a cheaper query: join on keys instead of cross "
+            "joining, filter as early as possible and aggregate or LIMIT large "
+            "results."
+        )
+
+    def _reprompt(
+        self, result: QueryResult, problem: str, stage: str = "reprompt"
+    ) -> str:
+        """Ask the LLM to rewrite the rejected SQL in ``result``.
+
+        The messages of the first attempt are reused with the rejection
+        appended, so the schema is not loaded again and the system message
+        is served from the prompt cache when it is enabled.
+
+        Args:
+            result: In-progress result holding the rejected SQL
+            problem: Why the SQL was rejected
+            stage: Name the LLM call is timed under
+
+        Returns:
+            New SQL query string
+        """
+        if result.prompt is None:
+            # The SQL came from the SQL cache, so no prompt was built for it
+            self._build_prompt(result, self._load_schema(result))
+        system_message, user_message = self._retry_prompt(result, problem)
+        with _timed(result.timings, stage):
+            sql_query = self.llm_client.generate_with_system_message(
+                system_message, user_message
+            )
+        return self._finish_sql(sql_query)
+
+    async def _areprompt(
+        self, result: QueryResult, problem: str, stage: str = "reprompt"
+    ) -> str:
+        """Async counterpart of ``_reprompt``."""
+        if result.prompt is None:
+            schema = await self.async_db_client.run_sync(self._load_schema, result)
+            self._build_prompt(result, schema)
+        system_message, user_message = self._retry_prompt(result, problem)
+        with _timed(result.timings, stage):
+            sql_query = await self.llm_client.agenerate_with_system_message(
+                system_message, user_message
+            )
+        return self._finish_sql(sql_query)
+
+    def _can_repair(self, result: QueryResult, error: Exception, start: float) -> bool:
+        """Check whether a failed execution should be sent back to the LLM.
+
+        Only errors in the SQL itself (SQLSTATE classes 21, 22 and 42 except
+        permission errors) are repaired, within the attempt and time budgets.
+        """
+        if self.max_repair_attempts <= 0 or not _is_repairable(error):
+            return False
+        attempts = len(result.metadata.get("repairs", ()))
+        if attempts >= self.max_repair_attempts:
+            logger.warning(f"Giving up on SQL repair after {attempts} attempts")
+            return False
+        elapsed = time.perf_counter() - start
+        if self.repair_timeout is not None and elapsed >= self.repair_timeout:
+            logger.warning(f"Giving up on SQL repair after {elapsed:.1f}s")
+            return False
+        return True
+
+    def _repair(self, result: QueryResult, error: Exception) -> None:
+        """Replace the failed SQL in ``result`` with the LLM's correction."""
+        failed_sql, start = result.sql_query, time.perf_counter()
+        logger.info(f"Asking the LLM to repair SQL after: {error}")
+        result.sql_query = self._reprompt(result, _repair_problem(error), "repair")
+        self._record_repair(result, failed_sql, error, start)
+
+    async def _arepair(self, result: QueryResult, error: Exception) -> None:
+        """Async counterpart of ``_repair``."""
+        failed_sql, start = result.sql_query, time.perf_counter()
+        logger.info(f"Asking the LLM to repair SQL after: {error}")
+        result.sql_query = await self._areprompt(
+            result, _repair_problem(error), "repair"
+        )
+        self._record_repair(result, failed_sql, error, start)
+
+    def _record_repair(
+        self, result: QueryResult, failed_sql: str, error: Exception, start: float
+    ) -> None:
+        """Note a repair attempt and its latency in the result's metadata."""
+        SQL_REPAIRS.inc(outcome="attempted")
+        result.metadata.setdefault("repairs", []).append(
+            {
+                "sql_query": failed_sql,
+                "error": str(error),
+                "ms": round((time.perf_counter() - start) * 1000, 3),
+            }
+        )
+
+    def _retry_prompt(
+        self, result: QueryResult, problem: str
+    ) -> Tuple[SystemContent, str]:
+        """Build messages asking for a corrected version of the current SQL.
+
+        Appends the rejection to the first attempt's messages in
+        ``result.prompt``.
+        """
+        system_message, user_message = result.prompt
+        rejection = self.prompt_builder.build_rejection_message(
+            result.sql_query, problem
+        )
+        result.sql_cache_hit = False
+        return system_message, f"{user_message}\n\n{rejection}"
+
+    def _finish_result(self, result: QueryResult, start: float) -> QueryResult:
+        """Record the total latency and row count of a completed pipeline run."""
+        logger.info(f"Query returned {result.row_count} rows")
+        if result.metadata.get("repairs"):
+            SQL_REPAIRS.inc(outcome="succeeded")
+        elapsed = time.perf_counter() - start
+        result.timings["total"] = round(elapsed * 1000, 3)
+        STAGE_LATENCY.observe(elapsed, stage="total")
+        ROWS_RETURNED.observe(result.row_count)
+        QUESTIONS.inc(status="ok")
+        return result
+
+    def _record_failure(self, result: QueryResult) -> None:
+        """Count a pipeline run that ended in an error."""
+        QUESTIONS.inc(status="error")
+        if result.metadata.get("repairs"):
+            SQL_REPAIRS.inc(outcome="failed")
+
+    def execute_many(
+        self, questions: List[str], max_concurrency: int = 8
+    ) -> List[BatchItem]:
+        """Answer a batch of questions concurrently.
+
+        Blocking wrapper around ``aexecute_many`` for callers outside an
+        event loop.
+
+        Args:
+            questions: Natural language questions
+            max_concurrency: Questions processed at the same time
+
+        Returns:
+            One BatchItem per question, in input order
+        """
+        return asyncio.run(self.aexecute_many(questions, max_concurrency))
+
+    async def aexecute_many(
+        self, questions: List[str], max_concurrency: int = 8
+    ) -> List[BatchItem]:
+        """Answer a batch of questions concurrently.
+
+        The schema is loaded once before fanning out, questions that normalize
+        to the same text are answered once, and at most ``max_concurrency``
+        questions run their LLM call and query at the same time. A failing
+        question is reported in its own item without affecting the others.
+
+        Args:
+            questions: Natural language questions
+            max_concurrency: Questions processed at the same time
+
+        Returns:
+            One BatchItem per question, in input order
+        """
+        unique: Dict[str, str] = {}
+        for question in questions:
+            unique.setdefault(normalize_question(question), question)
+        logger.info(
+            f"Answering batch of {len(questions)} questions "
+            f"({len(unique)} unique, concurrency {max_concurrency})"
+        )
+
+        # Warm the schema cache so concurrent questions don't each load it
+        await self.async_db_client.run_sync(self.context_service.get_catalog)
+
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run(question: str) -> BatchItem:
+            async with semaphore:
+                try:
+                    return BatchItem(question, result=await self.aanswer(question))
+                except Exception as e:
+                    return BatchItem(question, error=e)
+
+        outcomes = await asyncio.gather(*(run(q) for q in unique.values()))
+        by_key = dict(zip(unique, outcomes))
+        items = []
+        for question in questions:
+            outcome = by_key[normalize_question(question)]
+            items.append(BatchItem(question, outcome.result, outcome.error))
+        return items
+
+    def execute_query(self, question: str) -> List[Dict[str, Any]]:
+        """Generate SQL from question and execute it.
+
+        Args:
+            question: User's natural language question
+
+        Returns:
+            Query results as list of dictionaries
+        """
+        return self.answer(question).results
+
     def _clean_sql_query(self, sql_query: str) -> str:
         """Clean SQL query by removing markdown formatting.
 
@@ -117,7 +1173,7 @@ class TextToSQLAgent:
         return sql_query.strip()
 
     def _is_safe_query(self, sql_query: str) -> bool:
-        """Check if query is safe (SELECT only).
+        """Check if query is safe (a single read-only query).
 
         Args:
             sql_query: SQL query to validate
@@ -125,26 +1181,7 @@ class TextToSQLAgent:
         Returns:
             True if query is safe, False otherwise
         """
-        sql_upper = sql_query.strip().upper()
-
-        # Must start with SELECT
-        if not sql_upper.startswith("SELECT"):
-            logger.warning(f"Unsafe query detected: does not start with SELECT")
-            return False
-
-        # Check for dangerous keywords
-        dangerous_keywords = [
-            "DROP",
-            "DELETE",
-            "UPDATE",
-            "INSERT",
-            "ALTER",
-            "CREATE",
-            "TRUNCATE",
-        ]
-        for keyword in dangerous_keywords:
-            if keyword in sql_upper:
-                logger.warning(f"Unsafe query detected: contains {keyword}")
-                return False
-
-        return True
+        validation = self.sql_validator.validate(sql_query)
+        if not validation.is_valid:
+            logger.warning(f"Unsafe query detected: {validation.reason}")
+        return validation.is_valid
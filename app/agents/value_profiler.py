@@ -0,0 +1,389 @@
+"""Column value profiles: the actual values of low-cardinality text columns.
+
+The model can't guess how values are spelled (``'active'`` or ``'Active'``,
+``'USA'`` or ``'United States'``), and a wrong guess silently returns no
+rows. A background thread samples the text columns of each table and keeps
+the distinct values of those with few of them; the values a question
+mentions are then shown to the model next to the question.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+from .context_service import ContextService
+from .schema_formats import ColumnInfo, TableInfo
+from .schema_retriever import tokenize
+from ..core.db_client import DbClient
+from ..utils.logger import setup_logger
+from ..utils.metrics import OPERATION_LATENCY
+
+logger = setup_logger(__name__)
+
+# information_schema types whose values are worth profiling ("USER-DEFINED"
+# covers enums and citext)
+TEXT_TYPES = {"text", "character varying", "character", "USER-DEFINED"}
+
+# Relation kinds that support TABLESAMPLE: tables, materialized views and
+# partitioned tables
+SAMPLED_KINDS = {"r", "m", "p"}
+
+
+@dataclass
+class ColumnProfile:
+    """Distinct values of a low-cardinality column, from a sample of its table.
+
+    Attributes:
+        table: Table name
+        column: Column name
+        values: Distinct non-null values seen, sorted
+        sampled_rows: Rows in the sample
+        null_fraction: Share of sampled rows where the column is NULL
+        complete: Whether the sample was the whole table, so no value is
+            missing
+        value_tokens: Words of each value, for matching questions
+    """
+
+    table: str
+    column: str
+    values: List[str]
+    sampled_rows: int
+    null_fraction: float
+    complete: bool
+    value_tokens: List[Set[str]] = field(default_factory=list, repr=False)
+
+    def __post_init__(self):
+        if not self.value_tokens:
+            self.value_tokens = [tokenize(value) for value in self.values]
+
+
+class ValueProfiler:
+    """Profiles low-cardinality text columns in the background.
+
+    Every ``refresh_interval`` seconds (and soon after the schema changes)
+    each table is sampled with one query: ``TABLESAMPLE SYSTEM`` reads
+    about ``sample_rows`` rows' worth of pages, capped with a LIMIT, so a
+    profile costs the same on a large table as on a small one. A text
+    column is kept when its sample holds at most ``max_distinct`` distinct
+    values no longer than ``max_value_length``, and (for a partial sample)
+    values repeat, which rules out names and other free text.
+    """
+
+    def __init__(
+        self,
+        db_client: DbClient,
+        context_service: ContextService,
+        refresh_interval: float = 3600.0,
+        sample_rows: int = 10000,
+        max_distinct: int = 100,
+        max_value_length: int = 64,
+        max_prompt_values: int = 40,
+        statement_timeout_ms: Optional[int] = 10000,
+        check_interval: float = 60.0,
+    ):
+        """Initialize the profiler.
+
+        Args:
+            db_client: Database client running the sampling queries
+            context_service: Source of the tables and columns to profile
+            refresh_interval: Seconds between full refreshes
+            sample_rows: Rows sampled per table
+            max_distinct: Most distinct values a profiled column may have
+            max_value_length: Longest value a profiled column may have
+            max_prompt_values: Most values shown to the model per question
+            statement_timeout_ms: Cancel a table's sampling query after this
+                many milliseconds (no timeout if None)
+            check_interval: Seconds between schema change checks
+        """
+        self.db_client = db_client
+        self.context_service = context_service
+        self.refresh_interval = refresh_interval
+        self.sample_rows = sample_rows
+        self.max_distinct = max_distinct
+        self.max_value_length = max_value_length
+        self.max_prompt_values = max_prompt_values
+        self.statement_timeout_ms = statement_timeout_ms
+        self.check_interval = check_interval
+        self._profiles: Dict[Tuple[str, str], ColumnProfile] = {}
+        self._fingerprint: Optional[str] = None
+        self._refreshed_at: Optional[float] = None
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Profile in a daemon thread, starting right away."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="value-profiler", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the profiler thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def refresh(self) -> int:
+        """Profile every table now.
+
+        A table whose sampling query fails keeps its previous profiles.
+
+        Returns:
+            Number of profiled columns
+        """
+        catalog = self.context_service.get_catalog()
+        profiles: Dict[Tuple[str, str], ColumnProfile] = {}
+        with OPERATION_LATENCY.time(component="value_profiler", operation="refresh"):
+            for table in catalog.tables.values():
+                try:
+                    table_profiles = self.profile_table(table)
+                except Exception as e:
+                    logger.warning(f"Failed to profile values of {table.name}: {e}")
+                    with self._lock:
+                        self._failures += 1
+                        table_profiles = [
+                            profile
+                            for (name, _), profile in self._profiles.items()
+                            if name == table.name
+                        ]
+                for profile in table_profiles:
+                    profiles[(profile.table, profile.column)] = profile
+
+        with self._lock:
+            self._profiles = profiles
+            self._fingerprint = catalog.fingerprint
+            self._refreshed_at = time.monotonic()
+        logger.info(f"Profiled values of {len(profiles)} columns")
+        return len(profiles)
+
+    def profile_table(self, table: TableInfo) -> List[ColumnProfile]:
+        """Sample a table and profile its low-cardinality text columns.
+
+        Args:
+            table: Table from the schema catalog
+
+        Returns:
+            Profiles of the columns that qualify
+        """
+        columns = self.candidate_columns(table)
+        if not columns:
+            return []
+        # Tables without a row estimate (never analyzed) are read up to the
+        # LIMIT rather than sampled
+        sampling = (
+            table.row_estimate is not None and table.row_estimate > self.sample_rows
+        )
+        query = self._sample_query(table, columns, sampling)
+        row = self.db_client.run_sql(
+            query, statement_timeout_ms=self.statement_timeout_ms, read_only=True
+        )[0]
+
+        sampled_rows = row["sampled_rows"]
+        complete = not sampling and sampled_rows < self.sample_rows
+        profiles = []
+        for position, column in enumerate(columns):
+            distinct = row[f"distinct_{position}"]
+            non_null = row[f"non_null_{position}"]
+            if not non_null or distinct > self.max_distinct:
+                continue
+            if row[f"max_length_{position}"] > self.max_value_length:
+                continue
+            # In a partial sample, values that don't repeat are likely names,
+            # codes or other free text rather than a closed set
+            if not complete and distinct > non_null / 2:
+                continue
+            profiles.append(
+                ColumnProfile(
+                    table=table.name,
+                    column=column.name,
+                    values=list(row[f"values_{position}"]),
+                    sampled_rows=sampled_rows,
+                    null_fraction=round(1 - non_null / sampled_rows, 4),
+                    complete=complete,
+                )
+            )
+        return profiles
+
+    @staticmethod
+    def candidate_columns(table: TableInfo) -> List[ColumnInfo]:
+        """Text columns of a table worth sampling (keys are left out)."""
+        if table.kind not in SAMPLED_KINDS:
+            return []
+        return [
+            column
+            for column in table.columns
+            if column.data_type in TEXT_TYPES
+            and not column.primary_key
+            and not column.references
+        ]
+
+    def relevant_values(self, question: str) -> List[Tuple[ColumnProfile, List[str]]]:
+        """Find the profiled values a question refers to.
+
+        A value is relevant when all of its words appear in the question,
+        whatever their case (so "Active users" finds ``'active'``). A column
+        whose table and column names the question both use (e.g. "films by
+        rating") contributes all of its values. At most ``max_prompt_values``
+        are returned, values matched directly taking precedence.
+
+        Args:
+            question: User's question
+
+        Returns:
+            (profile, values) pairs, by table and column
+        """
+        question_tokens = tokenize(question)
+        if not question_tokens:
+            return []
+        with self._lock:
+            profiles = sorted(self._profiles.values(), key=_profile_key)
+
+        matches = []
+        for profile in profiles:
+            found = [
+                (value, tokens)
+                for value, tokens in zip(profile.values, profile.value_tokens)
+                if _mentions(question_tokens, tokens)
+            ]
+            # "PG-13" in the question shouldn't also offer 'PG'
+            values = [
+                value
+                for value, tokens in found
+                if not any(tokens < other for _, other in found)
+            ]
+            if values:
+                matches.append((profile, values))
+
+        named = {(profile.table, profile.column) for profile, _ in matches}
+        for profile in profiles:
+            column_tokens = tokenize(profile.column)
+            if (
+                (profile.table, profile.column) not in named
+                and column_tokens
+                and column_tokens <= question_tokens
+                and tokenize(profile.table) & question_tokens
+            ):
+                matches.append((profile, profile.values))
+
+        selected = []
+        budget = self.max_prompt_values
+        for profile, values in matches:
+            if budget <= 0:
+                break
+            selected.append((profile, values[:budget]))
+            budget -= len(values[:budget])
+        return sorted(selected, key=lambda match: _profile_key(match[0]))
+
+    @staticmethod
+    def render_hints(matches: List[Tuple[ColumnProfile, List[str]]]) -> str:
+        """Render matched values for the prompt.
+
+        Args:
+            matches: Result of ``relevant_values``
+
+        Returns:
+            One line per column listing its values as SQL literals
+        """
+        lines = []
+        for profile, values in matches:
+            literals = ", ".join(_literal(value) for value in values)
+            omitted = len(profile.values) - len(values)
+            if omitted > 0:
+                literals += f" (and {omitted} more)"
+            lines.append(f"- {profile.table}.{profile.column}: {literals}")
+        return "\n".join(lines)
+
+    def stats(self) -> Dict[str, Any]:
+        """Profile counts and freshness, for health reporting."""
+        with self._lock:
+            age = (
+                None
+                if self._refreshed_at is None
+                else round(time.monotonic() - self._refreshed_at, 1)
+            )
+            return {
+                "columns": len(self._profiles),
+                "values": sum(len(p.values) for p in self._profiles.values()),
+                "age_seconds": age,
+                "failures": self._failures,
+            }
+
+    def _sample_query(
+        self, table: TableInfo, columns: List[ColumnInfo], sampling: bool
+    ) -> str:
+        """One query computing the statistics of every column from a sample."""
+        sample = ""
+        if sampling:
+            percent = min(100.0, 100.0 * self.sample_rows / table.row_estimate)
+            sample = f" TABLESAMPLE SYSTEM ({percent:.6f})"
+
+        selected = []
+        aggregates = ["count(*) AS sampled_rows"]
+        for position, column in enumerate(columns):
+            value = f"c{position}"
+            selected.append(f"{_quote(column.name)}::text AS {value}")
+            aggregates += [
+                f"count(DISTINCT {value}) AS distinct_{position}",
+                f"count({value}) AS non_null_{position}",
+                f"COALESCE(max(length({value})), 0) AS max_length_{position}",
+                f"(array_agg(DISTINCT {value} ORDER BY {value}) "
+                f"FILTER (WHERE {value} IS NOT NULL))[1:{self.max_distinct}] "
+                f"AS values_{position}",
+            ]
+        return (
+            f"SELECT {', '.join(aggregates)} FROM ("
+            f"SELECT {', '.join(selected)} "
+            f"FROM public.{_quote(table.name)}{sample} "
+            f"LIMIT {self.sample_rows}"
+            f") AS sample"
+        )
+
+    def _run(self) -> None:
+        """Refresh on schedule and after schema changes until stopped."""
+        while not self._stop.is_set():
+            try:
+                if self._due():
+                    self.refresh()
+            except Exception as e:
+                logger.warning(f"Value profiling failed: {e}")
+                with self._lock:
+                    self._failures += 1
+            self._stop.wait(min(self.check_interval, self.refresh_interval))
+
+    def _due(self) -> bool:
+        """Whether the profiles are missing, too old or from an older schema."""
+        with self._lock:
+            refreshed_at, fingerprint = self._refreshed_at, self._fingerprint
+        if refreshed_at is None:
+            return True
+        if time.monotonic() - refreshed_at >= self.refresh_interval:
+            return True
+        return self.context_service.get_catalog().fingerprint != fingerprint
+
+
+def _profile_key(profile: ColumnProfile) -> Tuple[str, str]:
+    return profile.table, profile.column
+
+
+def _mentions(question_tokens: Set[str], value_tokens: Set[str]) -> bool:
+    """Whether every word of a value is in the question (numbers alone don't count)."""
+    return (
+        bool(value_tokens)
+        and value_tokens <= question_tokens
+        and not all(token.isdigit() for token in value_tokens)
+    )
+
+
+def _quote(identifier: str) -> str:
+    """Quote an identifier for SQL."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _literal(value: str) -> str:
+    """Quote a value as a SQL string literal."""
+    return "'" + value.replace("'", "''") + "'"
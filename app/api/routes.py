@@ -1,12 +1,44 @@
 """FastAPI application for text-to-SQL queries."""
 
-from fastapi import FastAPI, HTTPException
+import datetime
+import importlib.util
+import json
+import math
+from dataclasses import asdict
+from urllib.parse import quote
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import AsyncIterator, Iterator, List, Dict, Any, Optional, Union
 from ..config import Config
-from ..core.db_client import DbClient
+from ..core.columnar import ARROW_STREAM_MEDIA_TYPE
+from ..core.connection_pool import PoolTimeoutError
+from ..core.export import EXPORT_FORMATS
+from ..core.db_client import DatabaseUnavailableError, DbClient, QueryTimeoutError
+from ..core.resilience import CircuitOpenError
+from ..agents.context_service import ContextService
+from ..agents.cost_gate import CostGate, QueryCostError
 from ..agents.llm_client import LLMClient
-from ..agents.text_to_sql_agent import TextToSQLAgent
+from ..agents.result_cache import (
+    ResultCache,
+    TableChangeListener,
+    TableVersionTracker,
+)
+from ..agents.schema_retriever import SchemaRetriever
+from ..agents.sql_cache import (
+    InMemorySQLCacheBackend,
+    SQLCache,
+    SQLiteSQLCacheBackend,
+    normalize_question,
+)
+from ..agents.text_to_sql_agent import QueryResult, TextToSQLAgent
+from ..agents.value_profiler import ValueProfiler
+from ..utils.metrics import CONTENT_TYPE, POOL_CONNECTIONS, REGISTRY
+
+# Result formats of /ask_question and the Accept type selecting "columns"
+RESULT_FORMATS = ("rows", "columns", "arrow")
+COLUMNS_MEDIA_TYPE = "application/vnd.text2sql.columns+json"
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -15,27 +47,169 @@ app = FastAPI(
     version="0.1.0",
 )
 
-# Global instances (initialized on startup)
+# Name under which requests select the DB_* database
+DEFAULT_DATABASE = "default"
+
+# Largest number of rows streaming endpoints fetch per round trip
+MAX_BATCH_SIZE = 10000
+
+# Global instances (initialized on startup); ``agent`` and ``db_client``
+# serve the default database, ``agents`` every database by name
+config = None
 db_client = None
 agent = None
+agents: Dict[str, TextToSQLAgent] = {}
+table_listener = None
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database and agent on startup."""
-    global db_client, agent
+    """Initialize databases and agents on startup."""
+    global config, db_client, agent, table_listener
 
     config = Config()
-    db_client = DbClient(config)
     llm_client = LLMClient(api_key=config.ANTHROPIC_API_KEY)
-    agent = TextToSQLAgent(db_client=db_client, llm_client=llm_client)
+    agent = build_agent(config, llm_client)
+    db_client = agent.db_client
+    agents.clear()
+    agents[DEFAULT_DATABASE] = agent
+    for name in config.DB_DATABASES:
+        agents[name] = build_agent(config.database_config(name), llm_client)
+    for database_agent in agents.values():
+        if database_agent.value_profiler:
+            database_agent.value_profiler.start()
+
+    if agent.result_cache and config.RESULT_CACHE_NOTIFY_CHANNEL:
+        table_listener = TableChangeListener(
+            db_client.connect_to_postgres,
+            agent.result_cache,
+            channel=config.RESULT_CACHE_NOTIFY_CHANNEL,
+        )
+        table_listener.start()
+    REGISTRY.set_collector("pool", collect_pool_metrics)
+
+
+def build_agent(config: Config, llm_client: LLMClient) -> TextToSQLAgent:
+    """Create a database client and agent (with its own schema cache)."""
+    db_client = DbClient(config)
+    context_service = ContextService(
+        db_client,
+        cache_ttl=config.SCHEMA_CACHE_TTL or None,
+        check_interval=config.SCHEMA_CHECK_INTERVAL,
+        schema_format=config.SCHEMA_FORMAT,
+    )
+    return TextToSQLAgent(
+        db_client=db_client,
+        llm_client=llm_client,
+        context_service=context_service,
+        value_profiler=(
+            ValueProfiler(
+                db_client,
+                context_service,
+                refresh_interval=config.VALUE_PROFILE_INTERVAL,
+                sample_rows=config.VALUE_PROFILE_SAMPLE_ROWS,
+                max_distinct=config.VALUE_PROFILE_MAX_DISTINCT,
+                max_prompt_values=config.VALUE_PROFILE_MAX_PROMPT_VALUES,
+            )
+            if config.VALUE_PROFILE_INTERVAL > 0
+            else None
+        ),
+        sql_cache=build_sql_cache(config),
+        schema_retriever=(
+            SchemaRetriever(
+                top_k=config.SCHEMA_PRUNING_TOP_K,
+                max_tables=config.SCHEMA_PRUNING_MAX_TABLES,
+            )
+            if config.SCHEMA_PRUNING_TOP_K > 0
+            else None
+        ),
+        statement_timeout_ms=config.QUERY_TIMEOUT_MS or None,
+        max_rows=config.QUERY_MAX_ROWS or None,
+        export_timeout_ms=config.EXPORT_TIMEOUT_MS or None,
+        result_cache=build_result_cache(config, db_client),
+        single_flight=config.SINGLE_FLIGHT_ENABLED,
+        prompt_caching=config.PROMPT_CACHING_ENABLED,
+        cost_gate=build_cost_gate(config, db_client),
+        max_repair_attempts=config.REPAIR_MAX_ATTEMPTS,
+        repair_timeout=config.REPAIR_TIMEOUT or None,
+    )
+
+
+def get_agent(database: Optional[str]) -> TextToSQLAgent:
+    """Agent for a named database, or the default one if no name is given."""
+    name = database or DEFAULT_DATABASE
+    if name not in agents:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown database '{name}': use one of {', '.join(agents)}",
+        )
+    return agents[name]
+
+
+def collect_pool_metrics() -> None:
+    """Mirror connection pool occupancy into gauges before a scrape."""
+    if db_client is None:
+        return
+    stats = db_client.pool_stats()
+    for state in ("in_use", "idle", "size"):
+        POOL_CONNECTIONS.set(stats[state], state=state)
+
+
+def build_sql_cache(config: Config) -> Optional[SQLCache]:
+    """Create the generated-SQL cache selected by configuration."""
+    backend_name = config.SQL_CACHE_BACKEND.lower()
+    ttl = config.SQL_CACHE_TTL or None
+    if backend_name == "none":
+        return None
+    if backend_name == "sqlite":
+        backend = SQLiteSQLCacheBackend(
+            config.SQL_CACHE_PATH, max_entries=config.SQL_CACHE_MAX_ENTRIES, ttl=ttl
+        )
+    elif backend_name == "memory":
+        backend = InMemorySQLCacheBackend(
+            max_entries=config.SQL_CACHE_MAX_ENTRIES, ttl=ttl
+        )
+    else:
+        raise ValueError(f"Unknown SQL_CACHE_BACKEND: '{config.SQL_CACHE_BACKEND}'")
+    return SQLCache(backend, similarity_threshold=config.SQL_CACHE_SIMILARITY or None)
+
+
+def build_result_cache(config: Config, db_client: DbClient) -> Optional[ResultCache]:
+    """Create the query result cache if it has a memory budget."""
+    if config.RESULT_CACHE_MAX_BYTES <= 0:
+        return None
+    return ResultCache(
+        TableVersionTracker(
+            db_client, check_interval=config.RESULT_CACHE_CHECK_INTERVAL
+        ),
+        max_bytes=config.RESULT_CACHE_MAX_BYTES,
+        ttl=config.RESULT_CACHE_TTL or None,
+    )
+
+
+def build_cost_gate(config: Config, db_client: DbClient) -> Optional[CostGate]:
+    """Create the EXPLAIN cost gate, or None if no limit is configured."""
+    if config.COST_GATE_MAX_COST <= 0 and config.COST_GATE_MAX_ROWS <= 0:
+        return None
+    return CostGate(
+        db_client,
+        max_cost=config.COST_GATE_MAX_COST or None,
+        max_rows=config.COST_GATE_MAX_ROWS or None,
+        max_reprompts=config.COST_GATE_REPROMPTS,
+    )
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Close database connection on shutdown."""
-    if db_client:
-        db_client.close()
+    REGISTRY.set_collector("pool", None)
+    if table_listener:
+        table_listener.stop()
+    for database_agent in agents.values():
+        if database_agent.value_profiler:
+            database_agent.value_profiler.stop()
+        database_agent.async_db_client.close()
+        database_agent.db_client.close()
 
 
 # Request/Response models
@@ -43,6 +217,8 @@ class QuestionRequest(BaseModel):
     """Request model for asking questions."""
 
     question: str
+    # Named database to query (DB_DATABASES); the default database if None
+    database: Optional[str] = None
 
 
 class QuestionResponse(BaseModel):
@@ -52,45 +228,510 @@ class QuestionResponse(BaseModel):
     sql_query: str
     results: List[Dict[str, Any]]
     row_count: int
+    truncated: bool = False
+    metadata: Dict[str, Any] = {}
+    timings: Optional[Dict[str, float]] = None
+
+
+class BatchQuestionRequest(BaseModel):
+    """Request model for asking several questions at once."""
+
+    questions: List[str]
+    database: Optional[str] = None
+
+
+class BatchItemResponse(BaseModel):
+    """Answer to one question of a batch, or the error it failed with."""
+
+    question: str
+    status_code: int = 200
+    sql_query: Optional[str] = None
+    results: List[Dict[str, Any]] = []
+    row_count: int = 0
+    truncated: bool = False
+    metadata: Dict[str, Any] = {}
+    error: Optional[Union[str, Dict[str, Any]]] = None
+
+
+class BatchQuestionResponse(BaseModel):
+    """Response model for batch answers, in request order."""
+
+    results: List[BatchItemResponse]
+    count: int
+    unique_count: int
+    failed: int
 
 
 # API Endpoints
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy", "service": "chat-with-pgdb"}
+    """Health check endpoint.
+
+    The status is "degraded" while a database's circuit breaker is not
+    closed (requests to it fail fast with 503).
+    """
+    databases = {
+        name: {
+            "database": database_agent.db_client.config.DB_NAME,
+            "pool": database_agent.db_client.pool_stats(),
+            "circuit_breaker": database_agent.db_client.breaker_stats(),
+            "replicas": database_agent.db_client.replica_stats(),
+            "value_profiles": (
+                database_agent.value_profiler.stats()
+                if database_agent.value_profiler
+                else None
+            ),
+        }
+        for name, database_agent in agents.items()
+    }
+    degraded = any(
+        database["circuit_breaker"]["state"] != "closed"
+        for database in databases.values()
+    )
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "service": "chat-with-pgdb",
+        "pool": db_client.pool_stats() if db_client else None,
+        "circuit_breaker": db_client.breaker_stats() if db_client else None,
+        "sql_cache": agent.sql_cache.stats() if agent and agent.sql_cache else None,
+        "result_cache": (
+            agent.result_cache.stats() if agent and agent.result_cache else None
+        ),
+        "single_flight": (
+            agent.single_flight.stats() if agent and agent.single_flight else None
+        ),
+        "databases": databases,
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint with pipeline latency, token and cache metrics."""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.post("/schema/refresh")
+async def refresh_schema(database: Optional[str] = None):
+    """Invalidate a database's cached schema so the next question reloads it."""
+    database_agent = get_agent(database)
+    database_agent.context_service.invalidate_schema_cache()
+    if database_agent.result_cache:
+        database_agent.result_cache.clear()
+    return {"status": "invalidated"}
+
+
+@app.get("/schema/formats")
+async def schema_formats(database: Optional[str] = None):
+    """Compare the prompt size of the schema in each format.
+
+    Sizes are for the full schema; token counts are estimates (see
+    ``schema_formats.estimate_tokens``).
+    """
+    database_agent = get_agent(database)
+    context_service = database_agent.context_service
+    sizes = await database_agent.async_db_client.run_sync(context_service.format_sizes)
+    return {"current": context_service.schema_format, "formats": sizes}
 
 
 @app.post("/ask_question", response_model=QuestionResponse)
-async def ask_question(request: QuestionRequest):
+async def ask_question(
+    request: QuestionRequest,
+    include_timings: bool = False,
+    format: Optional[str] = None,
+    accept: Optional[str] = Header(None),
+):
     """
     Generate SQL from natural language question and execute it.
 
+    Results are returned as row objects by default. Analytic clients can ask
+    for column arrays instead, as compact JSON (``format=columns`` or
+    ``Accept: application/vnd.text2sql.columns+json``) or as an Arrow IPC
+    stream (``format=arrow`` or ``Accept: application/vnd.apache.arrow.stream``).
+
     Args:
         request: QuestionRequest containing the natural language question
+        include_timings: Add per-stage latencies (ms) to the response
+        format: Result format: "rows" (default), "columns" or "arrow"
+        accept: Accept header, used when ``format`` is not given
 
     Returns:
-        QuestionResponse with SQL query and results
+        QuestionResponse with SQL query and results, or the columnar encoding
     """
+    result_format = negotiate_format(format, accept)
+    database_agent = get_agent(request.database)
     try:
-        # Generate SQL
-        sql_query = agent.generate_sql(request.question)
+        # Generate, validate and execute in a single pass
+        result = await database_agent.aanswer(
+            request.question, columnar=result_format != "rows"
+        )
+    except Exception as e:
+        raise to_http_exception(e)
+
+    if result_format != "rows":
+        return await columnar_response(result, result_format, include_timings)
+    return QuestionResponse(
+        question=request.question,
+        sql_query=result.sql_query,
+        results=result.results,
+        row_count=result.row_count,
+        truncated=result.truncated,
+        metadata=result_metadata(result),
+        timings=result.timings if include_timings else None,
+    )
+
+
+@app.post("/ask_questions", response_model=BatchQuestionResponse)
+async def ask_questions(request: BatchQuestionRequest):
+    """
+    Answer a batch of questions concurrently.
 
-        # Execute query
-        results = agent.execute_query(request.question)
+    The schema is loaded once, duplicate questions are answered once, and a
+    failing question is reported in its own item with the status code it
+    would have had on ``/ask_question``.
 
-        return QuestionResponse(
-            question=request.question,
-            sql_query=sql_query,
-            results=results,
-            row_count=len(results),
+    Args:
+        request: BatchQuestionRequest containing the questions
+
+    Returns:
+        BatchQuestionResponse with one item per question, in request order
+    """
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="No questions provided")
+    if len(request.questions) > config.BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many questions: at most {config.BATCH_MAX_QUESTIONS} allowed",
         )
 
-    except ValueError as e:
-        # Safety validation errors
-        raise HTTPException(status_code=400, detail=str(e))
+    database_agent = get_agent(request.database)
+    try:
+        items = await database_agent.aexecute_many(
+            request.questions, max_concurrency=config.BATCH_MAX_CONCURRENCY
+        )
+    except Exception as e:
+        raise to_http_exception(e)
+
+    responses = []
+    for item in items:
+        if item.ok:
+            result = item.result
+            responses.append(
+                BatchItemResponse(
+                    question=item.question,
+                    sql_query=result.sql_query,
+                    results=result.results,
+                    row_count=result.row_count,
+                    truncated=result.truncated,
+                    metadata=result_metadata(result),
+                )
+            )
+        else:
+            error = to_http_exception(item.error)
+            responses.append(
+                BatchItemResponse(
+                    question=item.question,
+                    status_code=error.status_code,
+                    error=error.detail,
+                )
+            )
+
+    return BatchQuestionResponse(
+        results=responses,
+        count=len(responses),
+        unique_count=len({normalize_question(q) for q in request.questions}),
+        failed=sum(not item.ok for item in items),
+    )
+
+
+@app.post("/ask_question/stream")
+async def ask_question_stream(
+    request: QuestionRequest, batch_size: int = Query(1000, ge=1, le=MAX_BATCH_SIZE)
+):
+    """
+    Generate SQL from a question and stream its results as NDJSON.
+
+    Rows are read with a server-side cursor and written as they arrive, so
+    memory stays flat regardless of result size. The first line is a
+    ``meta`` record with the SQL, followed by one ``row`` record per row and a
+    final ``end`` record with the row count (or an ``error`` record).
+
+    Args:
+        request: QuestionRequest containing the natural language question
+        batch_size: Rows fetched from the database per round trip (1 to
+            MAX_BATCH_SIZE)
+
+    Returns:
+        StreamingResponse of newline-delimited JSON records
+    """
+    database_agent = get_agent(request.database)
+    try:
+        result = await database_agent.aprepare(request.question)
     except Exception as e:
-        # General errors
+        raise to_http_exception(e)
+
+    return StreamingResponse(
+        ndjson_records(database_agent, result, batch_size),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.post("/ask_question/export")
+async def ask_question_export(request: QuestionRequest, format: str = "csv"):
+    """
+    Generate SQL from a question and stream its full result as a file.
+
+    The validated query is wrapped in ``COPY (...) TO STDOUT`` and the bytes
+    are sent as the server produces them, as CSV or (converted on the fly by
+    pyarrow) Parquet. Exports are not row-capped. The SQL is returned in the
+    URL-encoded ``X-SQL-Query`` header.
+
+    Args:
+        request: QuestionRequest containing the natural language question
+        format: "csv" (default) or "parquet"
+
+    Returns:
+        StreamingResponse of the exported file
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format '{format}': use one of {', '.join(EXPORT_FORMATS)}",
+        )
+    if format == "parquet" and importlib.util.find_spec("pyarrow") is None:
         raise HTTPException(
-            status_code=500, detail=f"Error processing question: {str(e)}"
+            status_code=406, detail="Parquet exports require pyarrow on the server"
         )
+    database_agent = get_agent(request.database)
+    try:
+        result = await database_agent.aprepare(request.question)
+    except Exception as e:
+        raise to_http_exception(e)
+
+    return StreamingResponse(
+        database_agent.iter_export(result, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="result.{format}"',
+            "X-SQL-Query": quote(" ".join(result.sql_query.split())),
+        },
+    )
+
+
+@app.post("/ask_question/sse")
+async def ask_question_sse(
+    request: QuestionRequest, batch_size: int = Query(1000, ge=1, le=MAX_BATCH_SIZE)
+):
+    """
+    Stream SQL generation and results as Server-Sent Events.
+
+    Emits a ``token`` event for each fragment of SQL as the model writes it,
+    a ``validated`` event with the final SQL once it passed validation, a
+    ``rows`` event per fetched batch and a final ``end`` event with the row
+    count. Failures at any stage are sent as an ``error`` event carrying the
+    status code the JSON endpoint would have returned.
+
+    Args:
+        request: QuestionRequest containing the natural language question
+        batch_size: Rows fetched from the database per round trip (1 to
+            MAX_BATCH_SIZE)
+
+    Returns:
+        StreamingResponse of ``text/event-stream`` events
+    """
+    return StreamingResponse(
+        sse_events(get_agent(request.database), request.question, batch_size),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def negotiate_format(format: Optional[str], accept: Optional[str]) -> str:
+    """Pick the result format from the query parameter, else the Accept header.
+
+    Raises:
+        HTTPException: 400 for an unknown format, 406 for Arrow without pyarrow
+    """
+    if format is None:
+        accept = accept or ""
+        if ARROW_STREAM_MEDIA_TYPE in accept:
+            format = "arrow"
+        elif COLUMNS_MEDIA_TYPE in accept:
+            format = "columns"
+        else:
+            format = "rows"
+    if format not in RESULT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format '{format}': use one of {', '.join(RESULT_FORMATS)}",
+        )
+    if format == "arrow" and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(
+            status_code=406, detail="Arrow results require pyarrow on the server"
+        )
+    return format
+
+
+async def columnar_response(
+    result: QueryResult, result_format: str, include_timings: bool
+) -> Response:
+    """Encode a columnar result as compact JSON or an Arrow IPC stream.
+
+    Encoding is CPU-bound, so it runs on the threadpool.
+    """
+    fields = {
+        "question": result.question,
+        "sql_query": result.sql_query,
+        "row_count": result.row_count,
+        "truncated": result.truncated,
+        "metadata": result_metadata(result),
+    }
+    if include_timings:
+        fields["timings"] = result.timings
+
+    if result_format == "columns":
+        body = await run_in_threadpool(
+            result.columnar.to_json, fields, default=json_default
+        )
+        return Response(body, media_type="application/json")
+
+    # Arrow schema metadata holds strings; other fields are JSON-encoded
+    metadata = {
+        key: (
+            value if isinstance(value, str) else json.dumps(value, default=json_default)
+        )
+        for key, value in fields.items()
+    }
+    body = await run_in_threadpool(result.columnar.to_arrow_ipc, metadata)
+    return Response(body, media_type=ARROW_STREAM_MEDIA_TYPE)
+
+
+def to_http_exception(error: Exception) -> HTTPException:
+    """Map a pipeline error to the HTTP error returned to the client."""
+    if isinstance(error, ValueError):
+        # Safety validation errors
+        return HTTPException(status_code=400, detail=str(error))
+    if isinstance(error, QueryCostError):
+        # Generated query estimated to be too expensive to run
+        return HTTPException(
+            status_code=422,
+            detail={"message": str(error), "plan": asdict(error.plan)},
+        )
+    if isinstance(error, QueryTimeoutError):
+        # Generated query exceeded its statement timeout
+        return HTTPException(status_code=504, detail=str(error))
+    if isinstance(error, PoolTimeoutError):
+        # All database connections busy
+        return HTTPException(status_code=503, detail=str(error))
+    if isinstance(error, CircuitOpenError):
+        # Database known to be down: failing fast until the breaker probes it
+        return HTTPException(
+            status_code=503,
+            detail=str(error),
+            headers={"Retry-After": str(math.ceil(error.retry_after))},
+        )
+    if isinstance(error, DatabaseUnavailableError):
+        # Database unreachable even after retries
+        return HTTPException(status_code=503, detail=str(error))
+    # General errors
+    return HTTPException(
+        status_code=500, detail=f"Error processing question: {str(error)}"
+    )
+
+
+def result_metadata(result: QueryResult) -> Dict[str, Any]:
+    """Pipeline metadata returned alongside a result.
+
+    Includes the cache hits and, when the cost gate ran, the plan summary.
+    """
+    metadata = {
+        **result.metadata,
+        "sql_cache_hit": result.sql_cache_hit,
+        "result_cache_hit": result.result_cache_hit,
+    }
+    if result.plan is not None:
+        metadata["plan"] = asdict(result.plan)
+    return metadata
+
+
+def json_default(value: Any) -> Any:
+    """Encode database values the standard json module can't.
+
+    Matches the JSON endpoint: dates as ISO 8601, decimals and anything else
+    as strings.
+    """
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def ndjson_records(
+    database_agent: TextToSQLAgent, result: QueryResult, batch_size: int
+) -> Iterator[str]:
+    """Render a prepared query's rows as NDJSON, one chunk per fetched batch.
+
+    Runs in Starlette's threadpool, so the blocking fetches don't stall the
+    event loop.
+    """
+    meta = {
+        "type": "meta",
+        "question": result.question,
+        "sql_query": result.sql_query,
+        "metadata": result_metadata(result),
+    }
+    yield json.dumps(meta) + "\n"
+
+    row_count = 0
+    try:
+        for batch in database_agent.stream_rows(result, batch_size=batch_size):
+            row_count += len(batch)
+            yield "".join(
+                json.dumps({"type": "row", "data": row}, default=json_default) + "\n"
+                for row in batch
+            )
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+        return
+
+    yield json.dumps({"type": "end", "row_count": row_count}) + "\n"
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=json_default)}\n\n"
+
+
+async def sse_events(
+    database_agent: TextToSQLAgent, question: str, batch_size: int
+) -> AsyncIterator[str]:
+    """Generate, validate and execute a question as a stream of SSE events."""
+    try:
+        async for event, value in database_agent.astream_prepare(question):
+            if event == "token":
+                yield sse_event("token", {"text": value})
+            else:
+                result = value
+        yield sse_event(
+            "validated",
+            {
+                "sql_query": result.sql_query,
+                "metadata": result_metadata(result),
+                "timings": result.timings,
+            },
+        )
+
+        row_count = 0
+        # The fetches block, so run them on the threadpool
+        rows = database_agent.stream_rows(result, batch_size=batch_size)
+        async for batch in iterate_in_threadpool(rows):
+            row_count += len(batch)
+            yield sse_event("rows", batch)
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        error = to_http_exception(e)
+        yield sse_event(
+            "error", {"status_code": error.status_code, "detail": error.detail}
+        )
+        return
+
+    yield sse_event("end", {"row_count": row_count})
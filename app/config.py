@@ -1,6 +1,9 @@
 """Configuration management for Vanna Server."""
 
+import copy
 import os
+import re
+from typing import List
 from dotenv import load_dotenv
 
 
@@ -19,8 +22,178 @@ class Config:
         )  # Allow empty password for local dev
         self.DB_PORT: int = int(os.getenv("DB_PORT", "5432"))
 
+        # Connection pool: size bounds and seconds to wait for a free connection
+        self.DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+        self.DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+        self.DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+        # Retries after transient failures (connection refused or lost, server
+        # restarting): extra connection attempts, extra attempts of read-only
+        # queries, and the exponential backoff between them (seconds, with
+        # full jitter)
+        self.DB_CONNECT_RETRIES: int = int(os.getenv("DB_CONNECT_RETRIES", "2"))
+        self.DB_QUERY_RETRIES: int = int(os.getenv("DB_QUERY_RETRIES", "2"))
+        self.DB_RETRY_BACKOFF: float = float(os.getenv("DB_RETRY_BACKOFF", "0.1"))
+        self.DB_RETRY_MAX_BACKOFF: float = float(os.getenv("DB_RETRY_MAX_BACKOFF", "2"))
+
+        # Circuit breaker: after DB_BREAKER_THRESHOLD consecutive failures to
+        # reach the database (0 disables it), requests fail fast with 503 for
+        # DB_BREAKER_RESET_TIMEOUT seconds before one probes it again
+        self.DB_BREAKER_THRESHOLD: int = int(os.getenv("DB_BREAKER_THRESHOLD", "5"))
+        self.DB_BREAKER_RESET_TIMEOUT: float = float(
+            os.getenv("DB_BREAKER_RESET_TIMEOUT", "30")
+        )
+
+        # Read replicas (comma-separated host[:port], same database name and
+        # credentials). Generated queries are spread over replicas lagging at
+        # most DB_REPLICA_MAX_LAG seconds (0 = no limit), each checked every
+        # DB_REPLICA_CHECK_INTERVAL seconds; the primary serves them when no
+        # replica is usable
+        self.DB_REPLICAS: List[str] = self._get_list("DB_REPLICAS")
+        self.DB_REPLICA_MAX_LAG: float = float(os.getenv("DB_REPLICA_MAX_LAG", "30"))
+        self.DB_REPLICA_CHECK_INTERVAL: float = float(
+            os.getenv("DB_REPLICA_CHECK_INTERVAL", "5")
+        )
+
+        # Additional named databases requests can select (see database_config)
+        self.DB_DATABASES: List[str] = self._get_list("DB_DATABASES")
+
+        # Limits on generated queries: statement timeout in milliseconds and
+        # a hard row cap (0 disables either)
+        self.QUERY_TIMEOUT_MS: int = int(os.getenv("QUERY_TIMEOUT_MS", "30000"))
+        self.QUERY_MAX_ROWS: int = int(os.getenv("QUERY_MAX_ROWS", "10000"))
+        # Bulk exports are not row-capped and get their own timeout
+        self.EXPORT_TIMEOUT_MS: int = int(os.getenv("EXPORT_TIMEOUT_MS", "600000"))
+
+        # EXPLAIN cost gate: reject generated queries whose estimated total
+        # cost or row count is above these limits (0 = no limit), after
+        # asking the LLM for a cheaper query up to COST_GATE_REPROMPTS times
+        self.COST_GATE_MAX_COST: float = float(os.getenv("COST_GATE_MAX_COST", "0"))
+        self.COST_GATE_MAX_ROWS: int = int(os.getenv("COST_GATE_MAX_ROWS", "0"))
+        self.COST_GATE_REPROMPTS: int = int(os.getenv("COST_GATE_REPROMPTS", "1"))
+
+        # SQL repair: times SQL the database rejects is sent back to the LLM
+        # with the error (0 disables), and seconds after which a run stops
+        # attempting repairs (0 = no limit)
+        self.REPAIR_MAX_ATTEMPTS: int = int(os.getenv("REPAIR_MAX_ATTEMPTS", "2"))
+        self.REPAIR_TIMEOUT: float = float(os.getenv("REPAIR_TIMEOUT", "60"))
+
+        # Schema cache: seconds between fingerprint checks, and an optional
+        # hard maximum age (0 disables the age limit)
+        self.SCHEMA_CHECK_INTERVAL: float = float(
+            os.getenv("SCHEMA_CHECK_INTERVAL", "30")
+        )
+        self.SCHEMA_CACHE_TTL: float = float(os.getenv("SCHEMA_CACHE_TTL", "0"))
+
+        # Schema layout in the prompt: "verbose", "ddl" or "compact" (compare
+        # their sizes with GET /schema/formats)
+        self.SCHEMA_FORMAT: str = os.getenv("SCHEMA_FORMAT", "verbose")
+
+        # Schema pruning: keep the N most relevant tables plus their join
+        # partners, capped at SCHEMA_PRUNING_MAX_TABLES (0 disables pruning)
+        self.SCHEMA_PRUNING_TOP_K: int = int(os.getenv("SCHEMA_PRUNING_TOP_K", "0"))
+        self.SCHEMA_PRUNING_MAX_TABLES: int = int(
+            os.getenv("SCHEMA_PRUNING_MAX_TABLES", "12")
+        )
+
+        # Column value profiles: seconds between background refreshes (0
+        # disables profiling), rows sampled per table, most distinct values a
+        # profiled text column may have, and most values added to a prompt
+        self.VALUE_PROFILE_INTERVAL: float = float(
+            os.getenv("VALUE_PROFILE_INTERVAL", "0")
+        )
+        self.VALUE_PROFILE_SAMPLE_ROWS: int = int(
+            os.getenv("VALUE_PROFILE_SAMPLE_ROWS", "10000")
+        )
+        self.VALUE_PROFILE_MAX_DISTINCT: int = int(
+            os.getenv("VALUE_PROFILE_MAX_DISTINCT", "100")
+        )
+        self.VALUE_PROFILE_MAX_PROMPT_VALUES: int = int(
+            os.getenv("VALUE_PROFILE_MAX_PROMPT_VALUES", "40")
+        )
+
+        # Batch endpoint: questions answered concurrently and maximum batch size
+        self.BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+        self.BATCH_MAX_QUESTIONS: int = int(os.getenv("BATCH_MAX_QUESTIONS", "100"))
+
+        # Share one run among concurrent identical questions
+        self.SINGLE_FLIGHT_ENABLED: bool = (
+            os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+        )
+
         # LLM Configuration
         self.ANTHROPIC_API_KEY: str = self._get_required("ANTHROPIC_API_KEY")
+        # Mark the instructions-plus-schema system prompt as a cacheable prefix
+        self.PROMPT_CACHING_ENABLED: bool = (
+            os.getenv("PROMPT_CACHING_ENABLED", "true").lower() == "true"
+        )
+
+        # Generated SQL cache: backend is "memory", "sqlite" or "none";
+        # TTL in seconds (0 = no expiry); similarity enables near-duplicate
+        # matching above that Jaccard threshold (0 = exact matches only)
+        self.SQL_CACHE_BACKEND: str = os.getenv("SQL_CACHE_BACKEND", "memory")
+        self.SQL_CACHE_PATH: str = os.getenv("SQL_CACHE_PATH", "sql_cache.db")
+        self.SQL_CACHE_MAX_ENTRIES: int = int(
+            os.getenv("SQL_CACHE_MAX_ENTRIES", "1000")
+        )
+        self.SQL_CACHE_TTL: float = float(os.getenv("SQL_CACHE_TTL", "86400"))
+        self.SQL_CACHE_SIMILARITY: float = float(os.getenv("SQL_CACHE_SIMILARITY", "0"))
+
+        # Query result cache: memory budget in bytes (0 disables it), entry
+        # TTL in seconds (0 = until invalidated) and seconds between polls of
+        # the table modification counters used for invalidation
+        self.RESULT_CACHE_MAX_BYTES: int = int(os.getenv("RESULT_CACHE_MAX_BYTES", "0"))
+        self.RESULT_CACHE_TTL: float = float(os.getenv("RESULT_CACHE_TTL", "300"))
+        self.RESULT_CACHE_CHECK_INTERVAL: float = float(
+            os.getenv("RESULT_CACHE_CHECK_INTERVAL", "1")
+        )
+        # Optional NOTIFY channel carrying changed table names for immediate
+        # invalidation (empty = statistics polling only)
+        self.RESULT_CACHE_NOTIFY_CHANNEL: str = os.getenv(
+            "RESULT_CACHE_NOTIFY_CHANNEL", ""
+        )
+
+    def database_config(self, name: str) -> "Config":
+        """Configuration for one of the named databases of DB_DATABASES.
+
+        Connection settings come from ``DB_<NAME>_HOST``, ``_PORT``, ``_NAME``,
+        ``_USER``, ``_PASSWORD`` and ``_REPLICAS`` (``<NAME>`` upper-cased,
+        other characters than letters and digits replaced by ``_``), falling
+        back to the default database's. The database name defaults to
+        ``name``, and replicas are inherited only when the host is too. All
+        other settings are shared, except that a SQLite SQL cache gets its
+        own file.
+
+        Args:
+            name: Name listed in DB_DATABASES
+
+        Returns:
+            Copy of this configuration pointing at the named database
+
+        Raises:
+            ValueError: If the name is not in DB_DATABASES
+        """
+        if name not in self.DB_DATABASES:
+            raise ValueError(f"Unknown database '{name}'")
+        prefix = "DB_" + re.sub(r"[^A-Za-z0-9]", "_", name).upper() + "_"
+
+        database = copy.copy(self)
+        database.DB_HOST = os.getenv(prefix + "HOST", self.DB_HOST)
+        database.DB_PORT = int(os.getenv(prefix + "PORT", str(self.DB_PORT)))
+        database.DB_NAME = os.getenv(prefix + "NAME", name)
+        database.DB_USER = os.getenv(prefix + "USER", self.DB_USER)
+        database.DB_PASSWORD = os.getenv(prefix + "PASSWORD", self.DB_PASSWORD)
+        if os.getenv(prefix + "REPLICAS") is not None:
+            database.DB_REPLICAS = self._get_list(prefix + "REPLICAS")
+        elif os.getenv(prefix + "HOST") is not None:
+            database.DB_REPLICAS = []
+        root, extension = os.path.splitext(self.SQL_CACHE_PATH)
+        database.SQL_CACHE_PATH = f"{root}.{name}{extension}"
+        return database
+
+    def _get_list(self, key: str) -> List[str]:
+        """Get a comma-separated environment variable as a list (empty if unset)."""
+        return [item.strip() for item in os.getenv(key, "").split(",") if item.strip()]
 
     def _get_required(self, key: str) -> str:
         """Get required environment variable or raise error."""
@@ -0,0 +1,89 @@
+"""Asyncio front-end for the pooled DbClient."""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from .columnar import ColumnarResult
+from .db_client import DbClient
+from ..utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class AsyncDbClient:
+    """Runs DbClient calls without blocking the event loop.
+
+    Blocking psycopg2 calls are dispatched to a dedicated thread pool sized to
+    the connection pool, so there is never more than one waiting thread per
+    connection and coroutines simply await their turn.
+    """
+
+    def __init__(self, db_client: DbClient, max_workers: Optional[int] = None):
+        """Initialize with a database client.
+
+        Args:
+            db_client: Pooled database client that executes the queries
+            max_workers: Worker threads (defaults to the pool's max size)
+        """
+        self.db_client = db_client
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def run_sql(self, query: str, **kwargs: Any) -> Any:
+        """Execute a SQL query; same contract as ``DbClient.run_sql``.
+
+        Args:
+            query: SQL query to execute
+            **kwargs: Execution limits passed through to ``DbClient.run_sql``
+
+        Returns:
+            Rows as a list of dictionaries, or the affected row count
+        """
+        return await self.run_sync(self.db_client.run_sql, query, **kwargs)
+
+    async def run_sql_columnar(self, query: str, **kwargs: Any) -> ColumnarResult:
+        """Execute a query; same contract as ``DbClient.run_sql_columnar``.
+
+        Args:
+            query: SQL query to execute
+            **kwargs: Execution limits passed through to the client
+
+        Returns:
+            Result as column arrays
+        """
+        return await self.run_sync(self.db_client.run_sql_columnar, query, **kwargs)
+
+    async def run_sync(
+        self, func: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        """Run a blocking, database-bound callable on the DB worker threads.
+
+        Args:
+            func: Callable to run
+            *args: Positional arguments for ``func``
+            **kwargs: Keyword arguments for ``func``
+
+        Returns:
+            Whatever ``func`` returns
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), functools.partial(func, *args, **kwargs)
+        )
+
+    def close(self) -> None:
+        """Shut down the worker threads (the DbClient is left open)."""
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Create the worker pool on first use."""
+        if self._executor is None:
+            workers = self.max_workers or self.db_client.pool.max_size
+            self._executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="db"
+            )
+            logger.info(f"Started async DB executor with {workers} workers")
+        return self._executor
@@ -0,0 +1,106 @@
+"""Column-oriented query results and their Arrow IPC encoding."""
+
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+@dataclass
+class ColumnarResult:
+    """Query result stored as one array per column.
+
+    Attributes:
+        columns: Column names, in select-list order
+        data: One sequence of values per column, all of the same length
+        type_codes: PostgreSQL type OID of each column
+    """
+
+    columns: List[str]
+    data: List[Sequence[Any]]
+    type_codes: List[int]
+
+    @classmethod
+    def from_cursor(cls, cursor: Any) -> "ColumnarResult":
+        """Fetch every row of an executed tuple cursor and transpose it.
+
+        Args:
+            cursor: psycopg2 cursor (default tuple rows) after ``execute``
+
+        Returns:
+            ColumnarResult with the cursor's columns
+        """
+        description = cursor.description or ()
+        columns = [column.name for column in description]
+        rows = cursor.fetchall() if description else []
+        return cls(
+            columns=columns,
+            data=list(zip(*rows)) if rows else [() for _ in columns],
+            type_codes=[column.type_code for column in description],
+        )
+
+    @property
+    def row_count(self) -> int:
+        """Number of rows in the result."""
+        return len(self.data[0]) if self.data else 0
+
+    def truncate(self, max_rows: int) -> "ColumnarResult":
+        """Copy of the result keeping only the first ``max_rows`` rows."""
+        return ColumnarResult(
+            columns=self.columns,
+            data=[values[:max_rows] for values in self.data],
+            type_codes=self.type_codes,
+        )
+
+    def to_json(
+        self, extra: Dict[str, Any], default: Optional[Callable[[Any], Any]] = None
+    ) -> str:
+        """Encode as compact column-oriented JSON.
+
+        Args:
+            extra: Additional top-level fields (question, SQL, metadata...)
+            default: Encoder for values the json module can't handle
+
+        Returns:
+            JSON object with ``columns`` (names) and ``data`` (one array per
+            column) next to the extra fields
+        """
+        document = {**extra, "columns": self.columns, "data": self.data}
+        return json.dumps(document, default=default, separators=(",", ":"))
+
+    def to_arrow_ipc(self, metadata: Optional[Dict[str, str]] = None) -> bytes:
+        """Encode as an Arrow IPC stream (one record batch).
+
+        Column types are inferred from the values; columns whose values
+        have no common Arrow type (e.g. mixed JSON values) are sent as
+        strings. Requires ``pyarrow``.
+
+        Args:
+            metadata: Key/value pairs stored in the Arrow schema metadata
+
+        Returns:
+            Arrow IPC stream bytes, readable with ``pyarrow.ipc.open_stream``
+
+        Raises:
+            ImportError: If pyarrow is not installed
+        """
+        import pyarrow as pa
+
+        table = pa.Table.from_arrays(
+            [_arrow_array(pa, values) for values in self.data], names=self.columns
+        )
+        if metadata:
+            table = table.replace_schema_metadata(metadata)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+def _arrow_array(pa: Any, values: Sequence[Any]) -> Any:
+    """Build an Arrow array, falling back to strings if types don't unify."""
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if value is None else str(value) for value in values])
@@ -0,0 +1,240 @@
+"""Thread-safe PostgreSQL connection pool."""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from ..utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available before the checkout timeout."""
+
+
+class ConnectionPool:
+    """Bounded pool of database connections shared between threads.
+
+    Each connection is used by one caller at a time. Connections are reset
+    (rollback and ``RESET ALL``) when they are returned; a connection that
+    fails the reset is considered unhealthy and discarded.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+    ):
+        """Initialize the pool.
+
+        Args:
+            connect: Factory returning a new DB-API connection
+            min_size: Connections opened up front by ``open``
+            max_size: Maximum number of open connections
+            timeout: Default seconds to wait for a free connection
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(
+                f"Invalid pool size: min_size={min_size}, max_size={max_size}"
+            )
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+
+        self._idle: List[Any] = []
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # Metrics
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def open(self) -> None:
+        """Open ``min_size`` connections so the first requests don't pay for them."""
+        with self._cond:
+            missing = self.min_size - self._size
+            self._size += max(missing, 0)
+        for _ in range(max(missing, 0)):
+            try:
+                connection = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append(connection)
+                self._cond.notify()
+
+    def getconn(self, timeout: Optional[float] = None) -> Any:
+        """Check out a connection, opening a new one if below ``max_size``.
+
+        Args:
+            timeout: Seconds to wait for a free connection (pool default if None)
+
+        Returns:
+            A connection owned by the caller until ``putconn``
+
+        Raises:
+            PoolTimeoutError: If no connection became available in time
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        deadline = start + timeout
+        connection = None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+                if self._idle:
+                    connection = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available after {timeout:.1f}s "
+                        f"({self._in_use}/{self.max_size} in use)"
+                    )
+                self._cond.wait(remaining)
+            self._in_use += 1
+
+        if connection is None:
+            try:
+                connection = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+
+        waited = time.perf_counter() - start
+        with self._cond:
+            self._checkouts += 1
+            self._wait_time_total += waited
+            self._wait_time_max = max(self._wait_time_max, waited)
+        return connection
+
+    def putconn(self, connection: Any, discard: bool = False) -> None:
+        """Return a connection to the pool.
+
+        Args:
+            connection: Connection previously obtained from ``getconn``
+            discard: Close the connection instead of reusing it
+        """
+        healthy = not discard and not self._closed and self._reset(connection)
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy and not self._closed:
+                self._idle.append(connection)
+            else:
+                self._size -= 1
+                self._discarded += 1
+            self._cond.notify()
+
+        if not healthy:
+            self._close_connection(connection)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Context manager that checks a connection out and returns it.
+
+        Args:
+            timeout: Seconds to wait for a free connection (pool default if None)
+
+        Yields:
+            A connection owned by the caller for the duration of the block
+        """
+        connection = self.getconn(timeout)
+        try:
+            yield connection
+        finally:
+            self.putconn(connection)
+
+    def clear(self) -> None:
+        """Close all idle connections; in-use ones are closed when returned unhealthy."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._discarded += len(idle)
+            self._cond.notify_all()
+        for connection in idle:
+            self._close_connection(connection)
+
+    def close(self) -> None:
+        """Close the pool and every idle connection."""
+        with self._cond:
+            self._closed = True
+        self.clear()
+
+    @property
+    def closed(self) -> bool:
+        """Whether the pool has been closed."""
+        return self._closed
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pool usage metrics.
+
+        Returns:
+            Dictionary with sizes, checkout counters and wait times (seconds)
+        """
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "wait_time_total": round(self._wait_time_total, 6),
+                "wait_time_max": round(self._wait_time_max, 6),
+                "wait_time_avg": round(
+                    self._wait_time_total / self._checkouts if self._checkouts else 0.0,
+                    6,
+                ),
+            }
+
+    def _reset(self, connection: Any) -> bool:
+        """Roll back and reset session state; doubles as a health check.
+
+        Returns:
+            True if the connection is healthy and can be reused
+        """
+        if connection.closed:
+            return False
+        try:
+            connection.rollback()
+            connection.autocommit = True
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("RESET ALL")
+            finally:
+                connection.autocommit = False
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding unhealthy connection: {e}")
+            return False
+
+    def _close_connection(self, connection: Any) -> None:
+        """Close a connection, ignoring errors from already-broken ones."""
+        try:
+            connection.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled connection: {e}")
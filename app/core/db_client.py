@@ -1,95 +1,621 @@
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
 from ..config import Config
 from ..utils.logger import setup_logger
+from ..utils.metrics import DB_RETRIES, OPERATION_LATENCY
+from .columnar import ColumnarResult
+from .connection_pool import ConnectionPool, PoolTimeoutError
+from .replicas import Replica, ReplicaSet
+from .resilience import CircuitBreaker, backoff_delay
 
 logger = setup_logger(__name__)
 
+# Seconds to wait when connecting to a replica, so an unreachable one is
+# given up on quickly in favour of the next replica or the primary
+REPLICA_CONNECT_TIMEOUT = 5
+
+# SQLSTATEs meaning the server is unreachable or going away rather than the
+# query being wrong: connection exceptions (class 08), shutdowns and
+# restarts, and too many connections
+TRANSIENT_SQLSTATE_CLASSES = ("08",)
+TRANSIENT_SQLSTATES = ("57P01", "57P02", "57P03", "53300")
+
+
+class QueryTimeoutError(Exception):
+    """Raised when a query is cancelled by its statement timeout."""
+
+
+class QueryExecutionError(Exception):
+    """Raised when the database rejects or fails a query.
+
+    Attributes:
+        pgcode: SQLSTATE reported by the server, if any
+    """
+
+    def __init__(self, message: str, pgcode: Optional[str] = None):
+        super().__init__(message)
+        self.pgcode = pgcode
+
+
+class DatabaseUnavailableError(QueryExecutionError):
+    """Raised when the database can't be reached or dropped the connection."""
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a psycopg2 error means the server is unreachable or restarting."""
+    import psycopg2
+
+    pgcode = getattr(error, "pgcode", None)
+    if pgcode:
+        return pgcode[:2] in TRANSIENT_SQLSTATE_CLASSES or pgcode in TRANSIENT_SQLSTATES
+    # No SQLSTATE: the connection itself failed (e.g. server closed it)
+    return isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError))
+
 
 class DbClient:
     def __init__(self, config: Config):
         self.config = config
-        self.connection = None
+        self.breaker = CircuitBreaker(
+            f"Database {config.DB_NAME}",
+            failure_threshold=config.DB_BREAKER_THRESHOLD or None,
+            reset_timeout=config.DB_BREAKER_RESET_TIMEOUT,
+        )
+        self.pool = ConnectionPool(
+            self._connect_primary,
+            min_size=config.DB_POOL_MIN_SIZE,
+            max_size=config.DB_POOL_MAX_SIZE,
+            timeout=config.DB_POOL_TIMEOUT,
+        )
+        self.replicas = self._build_replicas() if config.DB_REPLICAS else None
 
         try:
             logger.info("Initializing db_client")
-            self.connection = self._connect_database()
+            self._connect_database()
 
         except Exception as e:
             logger.error(f"Failed to initialize client: {e}")
 
     def _connect_database(self) -> None:
-        """Connect to PostgreSQL database."""
+        """Open the pool's minimum number of PostgreSQL connections."""
         try:
             logger.info(f"Connecting to db with {self.config}")
-            connection = self.connect_to_postgres()
-            logger.info("Database connection established")
-            return connection
+            self.pool.open()
+            logger.info("Database connection pool established")
         except Exception as e:
+            self.breaker.record_failure()
             logger.error(f"Database connection failed: {e}")
 
-    def ensure_db_connection(self) -> None:
-        """Ensure database connection is active, reconnect if needed."""
+    def ensure_db_connection(self) -> bool:
+        """Check that the database answers, dropping idle connections if not.
+
+        Returns:
+            True if the database answered ``SELECT 1``
+        """
         try:
             self.run_sql("SELECT 1")
+            return True
         except Exception as e:
-            logger.warning(f"Database connection lost: {e}. Reconnecting...")
-        try:
-            self._connect_database()
-        except Exception as reconnect_error:
-            logger.error(f"Reconnection failed: {reconnect_error}")
+            logger.warning(f"Database connection check failed: {e}")
+            self.pool.clear()
+            return False
+
+    def _connect_primary(self):
+        """Connect to the primary, retrying with exponential backoff and jitter.
+
+        Raises:
+            DatabaseUnavailableError: If every attempt failed
+        """
+        attempts = self.config.DB_CONNECT_RETRIES + 1
+        for attempt in range(attempts):
+            try:
+                return self.connect_to_postgres()
+            except DatabaseUnavailableError as e:
+                if attempt + 1 == attempts:
+                    raise
+                delay = self._retry_delay(attempt)
+                DB_RETRIES.inc(operation="connect")
+                logger.warning(f"{e}; retrying connection in {delay:.2f}s")
+                time.sleep(delay)
+
+    def _retry_delay(self, attempt: int) -> float:
+        """Backoff before retry number ``attempt`` (from 0)."""
+        return backoff_delay(
+            attempt, self.config.DB_RETRY_BACKOFF, self.config.DB_RETRY_MAX_BACKOFF
+        )
+
+    def _build_replicas(self) -> ReplicaSet:
+        """Create a lazily-opened connection pool per configured replica."""
+        replicas = []
+        for endpoint in self.config.DB_REPLICAS:
+            host, port = self._parse_endpoint(endpoint)
 
-    def connect_to_postgres(self):
-        """Connect to a PostgreSQL database and return the connection object."""
+            def connect(host: str = host, port: int = port):
+                return self.connect_to_postgres(
+                    host, port, connect_timeout=REPLICA_CONNECT_TIMEOUT
+                )
+
+            pool = ConnectionPool(
+                connect,
+                min_size=0,
+                max_size=self.config.DB_POOL_MAX_SIZE,
+                timeout=self.config.DB_POOL_TIMEOUT,
+            )
+            replicas.append(Replica(f"{host}:{port}", pool))
+        return ReplicaSet(
+            replicas,
+            max_lag=self.config.DB_REPLICA_MAX_LAG or None,
+            check_interval=self.config.DB_REPLICA_CHECK_INTERVAL,
+        )
+
+    def _parse_endpoint(self, endpoint: str) -> Tuple[str, int]:
+        """Split ``host[:port]`` (port defaults to DB_PORT)."""
+        host, _, port = endpoint.strip().rpartition(":")
+        if host and port.isdigit():
+            return host, int(port)
+        return endpoint.strip(), self.config.DB_PORT
+
+    def connect_to_postgres(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        connect_timeout: Optional[int] = None,
+    ):
+        """Connect to a PostgreSQL database and return the connection object.
+
+        Args:
+            host: Server to connect to (DB_HOST if None, e.g. a replica)
+            port: Port of the server (DB_PORT if None)
+            connect_timeout: Seconds to wait for the connection (libpq default
+                if None)
+        """
         import psycopg2
 
         logger.info(f"Entered connect_to_postgres with :{self.config}")
         try:
             logger.info("Entered try block in connect_to_postgres")
             db_config = {
-                "host": self.config.DB_HOST,
-                "port": self.config.DB_PORT,
+                "host": host or self.config.DB_HOST,
+                "port": port or self.config.DB_PORT,
                 "database": self.config.DB_NAME,
                 "user": self.config.DB_USER,
                 "password": self.config.DB_PASSWORD,
             }
-            self.connection = psycopg2.connect(**db_config)
-            return self.connection
+            if connect_timeout:
+                db_config["connect_timeout"] = connect_timeout
+            return psycopg2.connect(**db_config)
         except Exception as e:
-            raise Exception(f"Failed to connect to PostgreSQL: {str(e)}")
+            raise DatabaseUnavailableError(
+                f"Failed to connect to PostgreSQL: {str(e)}"
+            ) from e
 
-    def run_sql(self, query):
-        """Execute a SQL query and return the results as a list of dictionaries."""
-        import psycopg2.extras
+    def run_sql(
+        self,
+        query,
+        max_rows: Optional[int] = None,
+        statement_timeout_ms: Optional[int] = None,
+        read_only: bool = False,
+        use_replica: bool = True,
+    ):
+        """Execute a SQL query and return the results as a list of dictionaries.
 
-        cursor = None
-        try:
-            cursor = self.connection.cursor(
-                cursor_factory=psycopg2.extras.RealDictCursor
-            )
-            cursor.execute(query)
+        Args:
+            query: SQL query to execute
+            max_rows: Return at most this many rows; the query is wrapped in a
+                LIMIT so the server stops producing rows at the cap
+            statement_timeout_ms: Cancel the query after this many milliseconds
+            read_only: The query does not write, so it may run on a replica
+            use_replica: Let a read-only query run on a replica; False keeps
+                it on the primary while still retrying it as read-only
 
-            # If it's a SELECT query, fetch results
-            if query.strip().upper().startswith("SELECT"):
+        Raises:
+            QueryTimeoutError: If the statement timeout cancelled the query
+        """
+        import psycopg2.extras
+
+        def fetch(cursor, connection):
+            # If the statement returns rows (SELECT, WITH, VALUES...), fetch them
+            if cursor.description is not None:
                 results = cursor.fetchall()
                 return [dict(row) for row in results]
             else:
                 # For INSERT, UPDATE, DELETE, etc.
-                self.connection.commit()
+                connection.commit()
                 return {"affected_rows": cursor.rowcount}
-        except Exception as e:
-            if self.connection:
-                self.connection.rollback()
-            raise Exception(f"Query execution failed: {str(e)}")
+
+        return self._execute(
+            query,
+            fetch,
+            max_rows=max_rows,
+            statement_timeout_ms=statement_timeout_ms,
+            cursor_factory=psycopg2.extras.RealDictCursor,
+            operation="run_sql",
+            read_only=read_only,
+            use_replica=use_replica,
+        )
+
+    def run_sql_columnar(
+        self,
+        query: str,
+        max_rows: Optional[int] = None,
+        statement_timeout_ms: Optional[int] = None,
+        read_only: bool = False,
+    ) -> ColumnarResult:
+        """Execute a query and return its result as column arrays.
+
+        Rows are fetched as plain tuples and transposed, without building a
+        dictionary per row, which is much cheaper for wide results.
+
+        Args:
+            query: SELECT query to execute
+            max_rows: Return at most this many rows (see ``run_sql``)
+            statement_timeout_ms: Cancel the query after this many milliseconds
+            read_only: The query does not write, so it may run on a replica
+
+        Raises:
+            QueryTimeoutError: If the statement timeout cancelled the query
+        """
+        return self._execute(
+            query,
+            lambda cursor, connection: ColumnarResult.from_cursor(cursor),
+            max_rows=max_rows,
+            statement_timeout_ms=statement_timeout_ms,
+            operation="run_sql_columnar",
+            read_only=read_only,
+        )
+
+    def copy_to(
+        self,
+        query: str,
+        destination: BinaryIO,
+        statement_timeout_ms: Optional[int] = None,
+        read_only: bool = False,
+    ) -> int:
+        """Export a query's result as CSV with ``COPY (...) TO STDOUT``.
+
+        The server renders the CSV (with a header line) and the bytes are
+        written to ``destination`` as they arrive, without building any
+        Python object per row.
+
+        Args:
+            query: SELECT query to export
+            destination: Binary file-like object receiving the CSV bytes
+            statement_timeout_ms: Cancel the export after this many milliseconds
+            read_only: The query does not write, so it may run on a replica
+
+        Returns:
+            Number of rows exported
+
+        Raises:
+            QueryTimeoutError: If the statement timeout cancelled the export
+        """
+        return self._execute(
+            self._copy_query(query),
+            lambda cursor, connection: cursor.rowcount,
+            max_rows=None,
+            statement_timeout_ms=statement_timeout_ms,
+            operation="copy_to",
+            execute=lambda cursor, sql: cursor.copy_expert(sql, destination),
+            read_only=read_only,
+        )
+
+    def _execute(
+        self,
+        query: str,
+        fetch: Callable[[Any, Any], Any],
+        max_rows: Optional[int],
+        statement_timeout_ms: Optional[int],
+        operation: str,
+        cursor_factory: Any = None,
+        execute: Optional[Callable[[Any, str], Any]] = None,
+        read_only: bool = False,
+        use_replica: bool = True,
+    ) -> Any:
+        """Run a query on a pooled connection and hand the cursor to ``fetch``.
+
+        Read-only queries go to the next usable replica, if any. If a replica
+        can't be reached (or cancels the query because of a recovery
+        conflict), the query is retried on the next replica and finally on
+        the primary. A custom ``execute`` (COPY) writes its output as it
+        runs, so it is never retried once it has started.
+
+        Args:
+            query: SQL query to execute
+            fetch: Builds the result from the executed cursor and connection
+            max_rows: Wrap the query in a LIMIT of this many rows
+            statement_timeout_ms: Cancel the query after this many milliseconds
+            operation: Operation label for the latency metric
+            cursor_factory: psycopg2 cursor factory (tuple rows if None)
+            execute: Runs the query on the cursor (``cursor.execute`` if None)
+            read_only: The query does not write, so it may run on a replica
+            use_replica: Let a read-only query run on a replica
+
+        Raises:
+            QueryTimeoutError: If the statement timeout cancelled the query
+            QueryExecutionError: If the database reported any other error
+        """
+        if max_rows is not None:
+            query = self._limit_query(query, max_rows)
+
+        output_started = False
+        if execute is not None:
+            run = execute
+
+            def execute(cursor, sql):
+                nonlocal output_started
+                output_started = True
+                return run(cursor, sql)
+
+        for replica in self._replica_candidates(read_only and use_replica):
+            try:
+                result = self._execute_on(
+                    replica.pool,
+                    query,
+                    fetch,
+                    statement_timeout_ms,
+                    operation,
+                    cursor_factory,
+                    execute,
+                )
+            except Exception as e:
+                # COPY output may already be written once it started
+                if output_started or not self._fail_over(replica, e):
+                    raise
+                continue
+            self.replicas.record_query(replica)
+            return result
+
+        # Read-only queries are idempotent, so they can be retried after a
+        # transient failure (unless COPY output may already be written)
+        attempts = 1
+        if read_only:
+            attempts += self.config.DB_QUERY_RETRIES
+        for attempt in range(attempts):
+            self.breaker.before_call()
+            try:
+                result = self._execute_on(
+                    self.pool,
+                    query,
+                    fetch,
+                    statement_timeout_ms,
+                    operation,
+                    cursor_factory,
+                    execute,
+                )
+            except DatabaseUnavailableError as e:
+                self.breaker.record_failure()
+                # Idle connections most likely died with the server
+                self.pool.clear()
+                if attempt + 1 == attempts or output_started:
+                    raise
+                delay = self._retry_delay(attempt)
+                DB_RETRIES.inc(operation="query")
+                logger.warning(f"{e}; retrying query in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            except Exception:
+                # A query error, timeout or busy pool: the server is up
+                self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def _execute_on(
+        self,
+        pool: ConnectionPool,
+        query: str,
+        fetch: Callable[[Any, Any], Any],
+        statement_timeout_ms: Optional[int],
+        operation: str,
+        cursor_factory: Any,
+        execute: Optional[Callable[[Any, str], Any]],
+    ) -> Any:
+        """Run a query on a connection from ``pool`` (see ``_execute``)."""
+        import psycopg2.extensions
+
+        with pool.connection() as connection:
+            cursor = None
+            try:
+                cursor = connection.cursor(cursor_factory=cursor_factory)
+                self._set_statement_timeout(cursor, statement_timeout_ms)
+                with OPERATION_LATENCY.time(component="db", operation=operation):
+                    if execute is None:
+                        cursor.execute(query)
+                    else:
+                        execute(cursor, query)
+                    return fetch(cursor, connection)
+            except psycopg2.extensions.QueryCanceledError as e:
+                connection.rollback()
+                raise QueryTimeoutError(
+                    f"Query cancelled after {statement_timeout_ms} ms: {str(e).strip()}"
+                )
+            except Exception as e:
+                if not connection.closed:
+                    try:
+                        connection.rollback()
+                    except Exception as rollback_error:
+                        logger.debug(f"Rollback failed: {rollback_error}")
+                raise self._execution_error(e) from e
+            finally:
+                if cursor and not cursor.closed:
+                    try:
+                        cursor.close()
+                    except Exception as close_error:
+                        logger.debug(f"Error closing cursor: {close_error}")
+
+    @staticmethod
+    def _execution_error(error: Exception) -> QueryExecutionError:
+        """Wrap a driver error, telling connection problems from query errors."""
+        error_class = (
+            DatabaseUnavailableError if _is_transient(error) else QueryExecutionError
+        )
+        return error_class(
+            f"Query execution failed: {str(error)}", getattr(error, "pgcode", None)
+        )
+
+    @contextmanager
+    def _checkout(self, read_only: bool) -> Iterator[Any]:
+        """Check out a connection, from a usable replica for read-only work."""
+        for replica in self._replica_candidates(read_only):
+            try:
+                connection = replica.pool.getconn()
+            except PoolTimeoutError:
+                raise
+            except Exception as e:
+                self.replicas.mark_down(replica, e)
+                continue
+            self.replicas.record_query(replica)
+            try:
+                yield connection
+            finally:
+                replica.pool.putconn(connection)
+            return
+        self.breaker.before_call()
+        try:
+            connection = self.pool.getconn()
+        except DatabaseUnavailableError:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        try:
+            yield connection
         finally:
-            if cursor:
-                cursor.close()
+            self.pool.putconn(connection)
+
+    def _replica_candidates(self, read_only: bool) -> List[Replica]:
+        """Replicas to try, in order, before the primary."""
+        if not read_only or self.replicas is None:
+            return []
+        return self.replicas.candidates()
+
+    def _fail_over(self, replica: Replica, error: Exception) -> bool:
+        """Decide whether a query that failed on a replica is retried elsewhere.
+
+        Connection failures mark the replica down. Queries cancelled because
+        of a recovery conflict (SQLSTATE class 40 on a standby) are retried
+        without marking it down. Errors in the query itself are not retried.
+
+        Returns:
+            True if the query should be retried on the next endpoint
+        """
+        if isinstance(error, DatabaseUnavailableError):
+            self.replicas.mark_down(replica, error)
+            return True
+        pgcode = getattr(error, "pgcode", None) or ""
+        if isinstance(error, QueryExecutionError) and pgcode.startswith("40"):
+            logger.warning(
+                f"Query cancelled on replica {replica.name} ({pgcode}); "
+                "retrying elsewhere"
+            )
+            return True
+        return False
+
+    def stream_sql(
+        self,
+        query: str,
+        batch_size: int = 1000,
+        statement_timeout_ms: Optional[int] = None,
+        read_only: bool = False,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Execute a SELECT with a server-side cursor and yield rows in batches.
+
+        Only one batch is held in memory at a time, so arbitrarily large
+        results can be streamed. The pooled connection stays checked out
+        until the generator is exhausted or closed.
+
+        Args:
+            query: SELECT query to execute
+            batch_size: Rows fetched from the server per round trip
+            statement_timeout_ms: Cancel any single fetch running longer than
+                this many milliseconds
+            read_only: The query does not write, so it may run on a replica
+                (a replica that can't be connected to is skipped; a stream
+                failing midway is not retried)
+
+        Yields:
+            Lists of up to ``batch_size`` rows as dictionaries
+
+        Raises:
+            QueryTimeoutError: If the statement timeout cancelled a fetch
+        """
+        import psycopg2.extensions
+        import psycopg2.extras
+
+        with self._checkout(read_only) as connection:
+            cursor = connection.cursor(
+                name=f"stream_{uuid.uuid4().hex}",
+                cursor_factory=psycopg2.extras.RealDictCursor,
+            )
+            cursor.itersize = batch_size
+            try:
+                with connection.cursor() as settings_cursor:
+                    self._set_statement_timeout(settings_cursor, statement_timeout_ms)
+                with OPERATION_LATENCY.time(component="db", operation="stream_open"):
+                    cursor.execute(query)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield [dict(row) for row in rows]
+            except psycopg2.extensions.QueryCanceledError as e:
+                raise QueryTimeoutError(
+                    f"Query cancelled after {statement_timeout_ms} ms: {str(e).strip()}"
+                )
+            except Exception as e:
+                raise self._execution_error(e) from e
+            finally:
+                if not connection.closed:
+                    try:
+                        cursor.close()
+                    except Exception as e:
+                        logger.debug(f"Error closing streaming cursor: {e}")
+
+    @staticmethod
+    def _limit_query(query: str, max_rows: int) -> str:
+        """Wrap a SELECT so the server returns at most ``max_rows`` rows.
+
+        The newline before the closing parenthesis keeps a trailing ``--``
+        comment from swallowing it.
+        """
+        inner = query.strip().rstrip(";").rstrip()
+        return f"SELECT * FROM (\n{inner}\n) AS limited_query LIMIT {int(max_rows)}"
+
+    @staticmethod
+    def _copy_query(query: str) -> str:
+        """Wrap a SELECT in a CSV ``COPY ... TO STDOUT`` (see ``_limit_query``)."""
+        inner = query.strip().rstrip(";").rstrip()
+        return f"COPY (\n{inner}\n) TO STDOUT WITH (FORMAT csv, HEADER true)"
+
+    @staticmethod
+    def _set_statement_timeout(cursor, statement_timeout_ms: Optional[int]) -> None:
+        """Apply a statement timeout for the rest of the current transaction."""
+        if statement_timeout_ms:
+            cursor.execute(
+                "SET LOCAL statement_timeout = %s", (int(statement_timeout_ms),)
+            )
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Get connection pool metrics (sizes, in-use count, wait times)."""
+        return self.pool.stats()
+
+    def breaker_stats(self) -> Dict[str, Any]:
+        """Get the state of the primary's circuit breaker."""
+        return self.breaker.stats()
+
+    def replica_stats(self) -> Optional[List[Dict[str, Any]]]:
+        """Get the state of each read replica (None if none is configured)."""
+        return self.replicas.stats() if self.replicas else None
 
     def close(self):
-        """Close the database connection."""
-        if self.connection:
+        """Close the connection pools and their idle connections."""
+        if self.replicas:
+            self.replicas.close()
+        if not self.pool.closed:
             try:
-                self.connection.close()
-                logger.info("Database connection closed")
+                self.pool.close()
+                logger.info("Database connection pool closed")
             except Exception as e:
-                logger.error(f"Error closing connection: {e}")
+                logger.error(f"Error closing connection pool: {e}")
         else:
-            logger.warning("No active connection to close")
+            logger.warning("Connection pool already closed")
@@ -0,0 +1,247 @@
+"""Bulk export of query results with COPY, as CSV or Parquet."""
+
+import io
+import os
+import queue
+import threading
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional
+from .db_client import DbClient
+
+# Export formats and their media types
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Arrow type names for PostgreSQL type OIDs when building Parquet from CSV;
+# other types are exported as strings
+_ARROW_TYPE_NAMES = {
+    16: "bool_",
+    20: "int64",
+    21: "int16",
+    23: "int32",
+    26: "int64",
+    700: "float32",
+    701: "float64",
+    1700: "float64",
+    1082: "date32",
+    1114: "timestamp",
+    1184: "timestamptz",
+}
+
+
+def export_query(
+    db_client: DbClient,
+    query: str,
+    destination: BinaryIO,
+    format: str = "csv",
+    statement_timeout_ms: Optional[int] = None,
+) -> int:
+    """Write the full result of a query to a binary file-like object.
+
+    CSV is produced by the server (``COPY ... TO STDOUT``) and written
+    through unchanged. The query may run on a read replica. Parquet is
+    converted from the same CSV stream by pyarrow's streaming CSV reader, so
+    no Python object is built per row in either case. Parquet column types
+    come from the query's result types; ``numeric`` becomes a double and
+    types without an Arrow equivalent are written as strings.
+
+    Args:
+        db_client: Database client running the COPY
+        query: Validated SELECT query
+        destination: Binary file-like object receiving the export
+        format: "csv" or "parquet"
+        statement_timeout_ms: Cancel the export after this many milliseconds
+
+    Returns:
+        Number of rows exported
+
+    Raises:
+        ValueError: If the format is unknown
+        ImportError: If Parquet is requested and pyarrow is not installed
+    """
+    if format == "csv":
+        return db_client.copy_to(
+            query, destination, statement_timeout_ms, read_only=True
+        )
+    if format == "parquet":
+        return _export_parquet(db_client, query, destination, statement_timeout_ms)
+    raise ValueError(
+        f"Unknown export format '{format}': use one of {', '.join(EXPORT_FORMATS)}"
+    )
+
+
+def _export_parquet(
+    db_client: DbClient,
+    query: str,
+    destination: BinaryIO,
+    statement_timeout_ms: Optional[int],
+) -> int:
+    """Pipe a CSV COPY through pyarrow into a Parquet file."""
+    import pyarrow as pa
+    import pyarrow.csv
+    import pyarrow.parquet
+
+    # Result column types, without fetching any row
+    described = db_client.run_sql_columnar(
+        query, max_rows=0, statement_timeout_ms=statement_timeout_ms, read_only=True
+    )
+    column_types = {
+        name: _arrow_type(pa, type_code)
+        for name, type_code in zip(described.columns, described.type_codes)
+    }
+    convert_options = pyarrow.csv.ConvertOptions(
+        column_types=column_types,
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=False,
+        true_values=["t"],
+        false_values=["f"],
+    )
+
+    # COPY writes into a pipe on a worker thread while this thread converts
+    read_fd, write_fd = os.pipe()
+    outcome: Dict[str, Any] = {}
+
+    def copy() -> None:
+        try:
+            with os.fdopen(write_fd, "wb") as pipe:
+                outcome["rows"] = db_client.copy_to(
+                    query, pipe, statement_timeout_ms, read_only=True
+                )
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=copy, name="copy-export", daemon=True)
+    thread.start()
+    try:
+        with os.fdopen(read_fd, "rb") as pipe:
+            reader = pyarrow.csv.open_csv(pipe, convert_options=convert_options)
+            with pyarrow.parquet.ParquetWriter(destination, reader.schema) as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+    except Exception:
+        thread.join()
+        # A failed COPY explains a broken CSV stream better than the parser
+        if "error" in outcome:
+            raise outcome["error"]
+        raise
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["rows"]
+
+
+def _arrow_type(pa: Any, type_code: int) -> Any:
+    """Arrow type for a PostgreSQL type OID."""
+    name = _ARROW_TYPE_NAMES.get(type_code)
+    if name == "timestamp":
+        return pa.timestamp("us")
+    if name == "timestamptz":
+        return pa.timestamp("us", tz="UTC")
+    if name is None:
+        return pa.string()
+    return getattr(pa, name)()
+
+
+class ExportCancelledError(Exception):
+    """Raised inside an export when its reader stopped consuming the bytes."""
+
+
+class _ChunkWriter(io.RawIOBase):
+    """File-like object handing written bytes to a reader thread in chunks.
+
+    Writes are buffered into chunks of ``chunk_size`` bytes and put on a
+    bounded queue, so a slow reader slows the export down instead of letting
+    it buffer the whole result in memory.
+    """
+
+    def __init__(self, chunk_size: int, max_chunks: int):
+        super().__init__()
+        self.chunk_size = chunk_size
+        self.chunks: "queue.Queue[Optional[bytes]]" = queue.Queue(max_chunks)
+        self.error: Optional[BaseException] = None
+        self._buffer = bytearray()
+        self._position = 0
+        self._abandoned = threading.Event()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self._buffer += data
+        self._position += len(data)
+        if len(self._buffer) >= self.chunk_size:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def run(self, export: Callable[[BinaryIO], Any]) -> None:
+        """Run the export into this writer, then signal the end of the stream."""
+        try:
+            export(self)
+            if self._buffer:
+                self._put(bytes(self._buffer))
+        except BaseException as e:
+            self.error = e
+        finally:
+            self._buffer.clear()
+            try:
+                self._put(None)
+            except ExportCancelledError:
+                pass
+
+    def abandon(self) -> None:
+        """Stop the export: the reader will not take any more chunks."""
+        self._abandoned.set()
+
+    def _put(self, chunk: Optional[bytes]) -> None:
+        while True:
+            if self._abandoned.is_set():
+                raise ExportCancelledError("Export reader went away")
+            try:
+                self.chunks.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+def iter_export(
+    export: Callable[[BinaryIO], Any],
+    chunk_size: int = 64 * 1024,
+    max_chunks: int = 16,
+) -> Iterator[bytes]:
+    """Run an export on a worker thread and yield its bytes as they arrive.
+
+    Used to stream an export to an HTTP client. Closing the iterator early
+    (e.g. on client disconnect) cancels the export.
+
+    Args:
+        export: Writes the export to the binary file-like object it is given
+        chunk_size: Bytes per yielded chunk
+        max_chunks: Chunks buffered before the export waits for the reader
+
+    Yields:
+        Chunks of the export
+
+    Raises:
+        Exception: Whatever the export raised, after the bytes written so far
+    """
+    writer = _ChunkWriter(chunk_size, max_chunks)
+    thread = threading.Thread(
+        target=writer.run, args=(export,), name="export-stream", daemon=True
+    )
+    thread.start()
+    try:
+        while True:
+            chunk = writer.chunks.get()
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        writer.abandon()
+        thread.join()
+    if writer.error is not None:
+        raise writer.error
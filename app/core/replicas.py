@@ -0,0 +1,196 @@
+"""Read replicas with health checks and lag-aware round-robin selection."""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from .connection_pool import ConnectionPool
+from ..utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Seconds a replica is behind its primary. A replica streaming from its
+# primary that has replayed everything it received is not lagging, even if
+# the primary has been idle (the last replayed transaction is then old but
+# nothing is missing). Without a streaming WAL receiver, having replayed
+# everything received proves nothing, so the age of the last replayed
+# transaction is used. The receiver's status is hidden from roles without
+# pg_read_all_stats; a running receiver then counts as streaming.
+REPLICA_LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+        AND EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver
+            WHERE COALESCE(status, 'streaming') = 'streaming'
+        ) THEN 0
+    ELSE COALESCE(
+        EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+    )
+END AS lag_seconds
+"""
+
+
+class Replica:
+    """One read replica: its connection pool and last observed state.
+
+    Attributes:
+        name: ``host:port`` of the replica
+        pool: Connection pool to the replica
+        healthy: Whether the last check or query reached the server
+        lag: Replication lag in seconds at the last check (None if unknown)
+        error: Last connection error, if unhealthy
+        checked_at: Monotonic time of the last check (0 = never checked)
+        queries: Queries routed to the replica
+        failures: Times the replica was marked down
+    """
+
+    def __init__(self, name: str, pool: ConnectionPool):
+        self.name = name
+        self.pool = pool
+        self.healthy = True
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at = 0.0
+        self.queries = 0
+        self.failures = 0
+
+
+class ReplicaSet:
+    """Spreads read-only queries over healthy replicas that are not too far behind.
+
+    Each replica is checked (reachability and replication lag) at most once
+    per ``check_interval``, on the first query after the interval elapses. A
+    replica that fails a check or a query is marked down and skipped until
+    its next check succeeds; one lagging more than ``max_lag`` seconds is
+    skipped until it catches up. The caller falls back to the primary when
+    no replica is usable.
+    """
+
+    def __init__(
+        self,
+        replicas: List[Replica],
+        max_lag: Optional[float] = None,
+        check_interval: float = 5.0,
+    ):
+        """Initialize the set.
+
+        Args:
+            replicas: Replicas to route to
+            max_lag: Highest replication lag (seconds) a replica may have to
+                receive queries (no limit if None)
+            check_interval: Seconds between checks of a replica
+        """
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def candidates(self) -> List[Replica]:
+        """Usable replicas in the order to try them.
+
+        Consecutive calls start with a different replica (round-robin), so
+        load is spread while the rest of the list serves as failover.
+
+        Returns:
+            Healthy replicas within the lag limit (empty if none)
+        """
+        for replica in self._due_for_check():
+            self.check(replica)
+        with self._lock:
+            usable = [replica for replica in self.replicas if self._usable(replica)]
+            if not usable:
+                return []
+            start = self._next % len(usable)
+            self._next += 1
+        return usable[start:] + usable[:start]
+
+    def check(self, replica: Replica) -> None:
+        """Measure a replica's replication lag, marking it down if unreachable."""
+        try:
+            with replica.pool.connection() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(REPLICA_LAG_QUERY)
+                    lag = float(cursor.fetchone()[0])
+        except Exception as e:
+            self.mark_down(replica, e)
+            return
+        with self._lock:
+            if not replica.healthy:
+                logger.info(f"Replica {replica.name} is back up")
+            replica.healthy = True
+            replica.error = None
+            replica.lag = lag
+            replica.checked_at = time.monotonic()
+        if self.max_lag is not None and lag > self.max_lag:
+            logger.warning(
+                f"Replica {replica.name} is {lag:.1f}s behind "
+                f"(limit {self.max_lag:.1f}s); not routing to it"
+            )
+
+    def mark_down(self, replica: Replica, error: Exception) -> None:
+        """Stop routing to a replica until its next successful check.
+
+        Its idle connections are dropped, as they most likely died with it.
+        """
+        with self._lock:
+            replica.healthy = False
+            replica.error = str(error).strip()
+            replica.checked_at = time.monotonic()
+            replica.failures += 1
+        logger.warning(f"Replica {replica.name} marked down: {replica.error}")
+        replica.pool.clear()
+
+    def record_query(self, replica: Replica) -> None:
+        """Count a query served by a replica."""
+        with self._lock:
+            replica.queries += 1
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """State of each replica, for health reporting."""
+        with self._lock:
+            return [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "usable": self._usable(replica),
+                    "lag_seconds": replica.lag,
+                    "error": replica.error,
+                    "queries": replica.queries,
+                    "failures": replica.failures,
+                    "pool": replica.pool.stats(),
+                }
+                for replica in self.replicas
+            ]
+
+    def close(self) -> None:
+        """Close every replica's connection pool."""
+        for replica in self.replicas:
+            if not replica.pool.closed:
+                replica.pool.close()
+
+    def _due_for_check(self) -> List[Replica]:
+        """Claim the replicas whose check interval elapsed.
+
+        Claiming (moving ``checked_at`` forward) under the lock makes only one
+        of several concurrent callers run each check.
+        """
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                replica
+                for replica in self.replicas
+                if now - replica.checked_at >= self.check_interval
+                or replica.checked_at == 0.0
+            ]
+            for replica in due:
+                replica.checked_at = now
+        return due
+
+    def _usable(self, replica: Replica) -> bool:
+        """Whether a replica may receive queries (call with the lock held)."""
+        if not replica.healthy:
+            return False
+        if self.max_lag is None or replica.lag is None:
+            return True
+        return replica.lag <= self.max_lag
@@ -0,0 +1,171 @@
+"""Retry backoff and circuit breaking for database calls."""
+
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+from ..utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Seconds to wait before a retry, with exponential backoff and full jitter.
+
+    The delay is drawn uniformly between 0 and ``base * 2**attempt`` (capped),
+    so clients retrying after the same outage spread out instead of hitting
+    the recovering server together.
+
+    Args:
+        attempt: Number of the retry, starting at 0
+        base: Upper bound of the first delay, in seconds
+        cap: Largest upper bound, in seconds
+
+    Returns:
+        Delay in seconds
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency the circuit breaker considers down.
+
+    Attributes:
+        retry_after: Seconds until the breaker lets a call through again
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Fails calls fast while a dependency keeps failing.
+
+    The breaker is *closed* (calls go through) until ``failure_threshold``
+    consecutive calls fail; it then *opens* and rejects calls for
+    ``reset_timeout`` seconds. After that it is *half-open*: one call is let
+    through as a probe, and closes the breaker if it succeeds or reopens it
+    if it fails. Only failures meaning the dependency is unreachable should
+    be recorded as failures; a call rejected for its own reasons (e.g. a SQL
+    error) proves the dependency is up.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = 5,
+        reset_timeout: float = 30.0,
+    ):
+        """Initialize the breaker.
+
+        Args:
+            name: Dependency name used in errors and logs
+            failure_threshold: Consecutive failures that open the breaker
+                (never opens if None)
+            reset_timeout: Seconds the breaker stays open before a probe
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._rejected = 0
+        self._times_opened = 0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Check that a call may go ahead.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with its
+                probe call still running
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self._state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - now
+                if remaining > 0:
+                    self._rejected += 1
+                    raise CircuitOpenError(
+                        f"{self.name} is unavailable; retry in {remaining:.0f}s",
+                        retry_after=remaining,
+                    )
+                self._state = self.HALF_OPEN
+                self._probe_started = None
+            # Half-open: one probe at a time (a probe that never reported
+            # back is replaced after reset_timeout)
+            if (
+                self._probe_started is not None
+                and now - self._probe_started < self.reset_timeout
+            ):
+                self._rejected += 1
+                raise CircuitOpenError(
+                    f"{self.name} is unavailable; checking whether it recovered",
+                    retry_after=1.0,
+                )
+            self._probe_started = now
+
+    def record_success(self) -> None:
+        """Report a call that reached the dependency."""
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed: dependency is back")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        """Report a call that could not reach the dependency."""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED
+                and self.failure_threshold is not None
+                and self._failures >= self.failure_threshold
+            ):
+                if self._state == self.CLOSED:
+                    self._times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_started = None
+                logger.warning(
+                    f"Circuit for {self.name} opened after {self._failures} "
+                    f"consecutive failures; failing fast for {self.reset_timeout:.0f}s"
+                )
+
+    @property
+    def state(self) -> str:
+        """Current state: "closed", "open" or "half_open"."""
+        with self._lock:
+            if (
+                self._state == self.OPEN
+                and time.monotonic() - self._opened_at >= self.reset_timeout
+            ):
+                return self.HALF_OPEN
+            return self._state
+
+    def stats(self) -> Dict[str, Any]:
+        """State and counters, for health reporting."""
+        state = self.state
+        with self._lock:
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = round(
+                    self._opened_at + self.reset_timeout - time.monotonic(), 1
+                )
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "times_opened": self._times_opened,
+                "rejected": self._rejected,
+                "retry_in_seconds": retry_in,
+            }
@@ -0,0 +1,357 @@
+"""Prometheus metrics for the text-to-SQL pipeline.
+
+A small registry of counters, gauges and histograms rendered in the
+Prometheus text exposition format, so ``/metrics`` needs no extra dependency.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans cache lookups (sub-millisecond) to slow LLM calls
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)  # fmt: skip
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value (integers without a trailing .0)."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """Base class for a named metric family with optional labels."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """Initialize the metric.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Names of the labels every sample must provide
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelKey:
+        """Turn label keyword arguments into an ordered key."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.labelnames}, "
+                f"got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+        """Render a label set as ``{a="1",b="2"}`` (empty if no labels)."""
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+    def render(self) -> List[str]:
+        """Render the HELP/TYPE header and all samples."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing value."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        """Increase the counter.
+
+        Args:
+            amount: Non-negative increment
+            **labels: Label values
+        """
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        """Current value for a label set (0 if never incremented)."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{self._labels(key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels: object) -> None:
+        """Set the gauge for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels: object) -> float:
+        """Current value for a label set (0 if never set)."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{self._labels(key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(Metric):
+    """Distribution of observations in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        """Initialize the histogram.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Names of the labels every sample must provide
+            buckets: Upper bounds of the buckets (+Inf is added automatically)
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # key -> (per-bucket counts, sum, count)
+        self._values: Dict[LabelKey, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        """Record an observation.
+
+        Args:
+            value: Observed value (seconds for latencies)
+            **labels: Label values
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        """Observe the duration of a block in seconds, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: object) -> int:
+        """Number of observations for a label set."""
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def sum(self, **labels: object) -> float:
+        """Sum of observations for a label set."""
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return entry[1] if entry else 0.0
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{self._labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metric families and renders them for a scrape."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: Dict[str, Callable[[], None]] = {}
+        self._lock = threading.Lock()
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """Get or create a counter."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        """Get or create a gauge."""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Get or create a histogram."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def set_collector(self, name: str, collector: Optional[Callable[[], None]]) -> None:
+        """Register (or with None, remove) a callback run before each scrape.
+
+        Collectors refresh gauges that mirror state owned elsewhere, such as
+        connection pool occupancy.
+        """
+        with self._lock:
+            if collector is None:
+                self._collectors.pop(name, None)
+            else:
+                self._collectors[name] = collector
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        with self._lock:
+            collectors = list(self._collectors.values())
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            collector()
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} already registered")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "text2sql_stage_duration_seconds",
+    "Latency of each text-to-SQL pipeline stage.",
+    ["stage"],
+)
+OPERATION_LATENCY = REGISTRY.histogram(
+    "text2sql_operation_duration_seconds",
+    "Latency of schema introspection, LLM and database calls.",
+    ["component", "operation"],
+)
+LLM_TOKENS = REGISTRY.counter(
+    "text2sql_llm_tokens_total",
+    "LLM tokens consumed (input includes prompt cache reads and writes).",
+    ["type"],
+)
+ROWS_RETURNED = REGISTRY.histogram(
+    "text2sql_rows_returned",
+    "Rows returned per answered question.",
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000),
+)
+QUESTIONS = REGISTRY.counter(
+    "text2sql_questions_total", "Questions processed by outcome.", ["status"]
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "text2sql_cache_lookups_total",
+    "Cache lookups by cache and result.",
+    ["cache", "result"],
+)
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "text2sql_cache_hit_ratio", "Share of cache lookups served from cache.", ["cache"]
+)
+COALESCED_QUESTIONS = REGISTRY.counter(
+    "text2sql_coalesced_questions_total",
+    "Questions answered by joining an identical in-flight question.",
+)
+COST_GATE_CHECKS = REGISTRY.counter(
+    "text2sql_cost_gate_checks_total",
+    "EXPLAIN cost gate outcomes (passed, reprompted, rejected).",
+    ["outcome"],
+)
+SQL_REPAIRS = REGISTRY.counter(
+    "text2sql_sql_repairs_total",
+    "SQL repair attempts after database errors, and questions that ended "
+    "repaired (succeeded) or still failing (failed).",
+    ["outcome"],
+)
+DB_RETRIES = REGISTRY.counter(
+    "text2sql_db_retries_total",
+    "Database connection attempts and read-only queries retried after a "
+    "transient failure.",
+    ["operation"],
+)
+POOL_CONNECTIONS = REGISTRY.gauge(
+    "text2sql_pool_connections", "Database pool connections by state.", ["state"]
+)
+
+
+def record_cache_lookup(cache: str, result: str) -> None:
+    """Count a cache lookup and refresh that cache's hit ratio.
+
+    Args:
+        cache: Cache name (e.g. ``sql``, ``schema``)
+        result: ``hit``, ``near_hit`` or ``miss``
+    """
+    CACHE_LOOKUPS.inc(cache=cache, result=result)
+    hits = CACHE_LOOKUPS.value(cache=cache, result="hit") + CACHE_LOOKUPS.value(
+        cache=cache, result="near_hit"
+    )
+    total = hits + CACHE_LOOKUPS.value(cache=cache, result="miss")
+    CACHE_HIT_RATIO.set(hits / total if total else 0.0, cache=cache)
@@ -0,0 +1,109 @@
+"""Single-flight execution: concurrent identical calls share one result."""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the work; callers arriving
+    while it is in flight (followers) wait for and receive the leader's
+    result or exception. Nothing is cached: once the leader finishes, the
+    next call runs again.
+
+    Sync (thread) and async callers share the same in-flight table, so a
+    request on the event loop can join one started from a worker thread and
+    vice versa.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "followers": 0}
+
+    def do(self, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run ``func`` unless an identical call is in flight.
+
+        Args:
+            key: Identity of the call
+            func: Work to run if this caller is the leader
+
+        Returns:
+            Tuple of (result, shared) where shared is True for followers
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result(), True
+        try:
+            result = func()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result, False
+
+    async def ado(
+        self, key: str, func: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """Async counterpart of ``do``.
+
+        Args:
+            key: Identity of the call
+            func: Coroutine function to await if this caller is the leader
+
+        Returns:
+            Tuple of (result, shared) where shared is True for followers
+        """
+        future, leader = self._join(key)
+        if not leader:
+            # Shielded so a cancelled follower doesn't cancel the shared
+            # future under the leader and the other followers
+            return await asyncio.shield(asyncio.wrap_future(future)), True
+        try:
+            result = await func()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result, False
+
+    def in_flight(self) -> int:
+        """Number of calls currently running."""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        """Leader/follower counters and the number of calls in flight."""
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls)}
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Register as leader for a key, or get the leader's future."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._stats["followers"] += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self._stats["leaders"] += 1
+            return future, True
+
+    def _finish(
+        self, key: str, future: Future, result: Any = None, error: BaseException = None
+    ) -> None:
+        """Publish the leader's outcome and stop sharing the key."""
+        with self._lock:
+            self._calls.pop(key, None)
+        if future.done():
+            return
+        if error is None:
+            future.set_result(result)
+        elif isinstance(error, asyncio.CancelledError):
+            # Followers did not ask to be cancelled; give them a real error
+            future.set_exception(RuntimeError("Shared in-flight request was cancelled"))
+        else:
+            future.set_exception(error)
@@ -0,0 +1 @@
+"""Benchmark harness for the text-to-SQL pipeline."""
@@ -0,0 +1,193 @@
+"""Run the text-to-SQL benchmarks.
+
+Seeds a Pagila-shaped dataset in a dedicated database, starts the API
+application with a deterministic stub LLM, drives the agent and HTTP layers
+with concurrent questions and writes the measurements as JSON::
+
+    python -m benchmarks --requests 500 --concurrency 16 --output run.json
+    python -m benchmarks --env SQL_CACHE_BACKEND=none --baseline run.json
+
+Database connection settings come from the usual environment variables
+(``DB_HOST``, ``DB_USER``...); ``DB_NAME`` is only used to create the
+benchmark database.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import platform
+import subprocess
+from typing import Any, Dict, List
+from app.config import Config
+from .dataset import connect, ensure_database, seed_dataset, table_counts
+from .runner import agent_call, application, compare, http_call, run_load
+from .stub_llm import StubLLMClient
+from .workload import WORKLOAD, stub_responses
+
+LAYERS = ("agent", "http")
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--database", default="text2sql_bench")
+    parser.add_argument("--scale", type=int, default=1, help="dataset size factor")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--warmup", type=int, default=len(WORKLOAD), help="unmeasured requests"
+    )
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--layers", default=",".join(LAYERS))
+    parser.add_argument(
+        "--queries", default="", help="comma-separated workload names (default all)"
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="measure the peak Python heap (slows the run down)",
+    )
+    parser.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="application setting for this run, e.g. SQL_CACHE_BACKEND=none",
+    )
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare with")
+    parser.add_argument("--log-level", default="ERROR")
+    return parser.parse_args(argv)
+
+
+def environment(connection: Any) -> Dict[str, Any]:
+    """Versions of the software under test."""
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW server_version")
+        server_version = cursor.fetchone()[0]
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "postgres": server_version,
+        "cpus": os.cpu_count(),
+    }
+
+
+async def run_layers(args: argparse.Namespace) -> Dict[str, Any]:
+    """Benchmark each requested layer with a fresh application."""
+    queries = [
+        query
+        for query in WORKLOAD
+        if not args.queries or query.name in args.queries.split(",")
+    ]
+    layers = {}
+    for layer in args.layers.split(","):
+        if layer not in LAYERS:
+            raise SystemExit(f"Unknown layer '{layer}': use {', '.join(LAYERS)}")
+        llm_client = StubLLMClient(
+            stub_responses(queries),
+            latency_ms=args.llm_latency_ms,
+            jitter_ms=args.llm_jitter_ms,
+            seed=args.seed,
+        )
+        async with application(llm_client) as agent:
+            if layer == "agent":
+                results = await measure(agent_call(agent), queries, args)
+            else:
+                async with http_call() as call:
+                    results = await measure(call, queries, args)
+        results["llm_calls"] = llm_client.calls
+        layers[layer] = results
+    return layers
+
+
+async def measure(call: Any, queries: List[Any], args: argparse.Namespace) -> dict:
+    """Warm up, then run the measured load."""
+    if args.warmup:
+        await run_load(call, queries, args.warmup, concurrency=1)
+    load = await run_load(
+        call, queries, args.requests, args.concurrency, args.trace_memory
+    )
+    return load.to_dict()
+
+
+def report(layers: Dict[str, Any]) -> None:
+    """Print the headline numbers of each layer."""
+    for layer, results in layers.items():
+        latency = results["latency_ms"]
+        print(
+            f"{layer:>6}: {results['throughput_rps']:8.1f} req/s  "
+            f"p50 {latency['p50']:8.2f} ms  p99 {latency['p99']:8.2f} ms  "
+            f"errors {sum(results['errors'].values())}  "
+            f"rss {results['memory']['rss_high_water_mb']} MB"
+        )
+        stages = ", ".join(
+            f"{stage} {summary['p50']:.2f}"
+            for stage, summary in results["stages_ms"].items()
+        )
+        print(f"        stage p50 (ms): {stages}")
+
+
+def main(argv: List[str] = None) -> None:
+    """Seed the dataset, run the benchmarks and write the results."""
+    args = parse_args(argv)
+    for setting in args.env:
+        key, _, value = setting.partition("=")
+        os.environ[key] = value
+    # The stub LLM needs no key, but the application requires one
+    os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark-stub")
+    logging.disable(logging.getLevelName(args.log_level.upper()) - 1)
+
+    config = Config()
+    ensure_database(config, args.database)
+    connection = connect(config, args.database)
+    try:
+        seed_dataset(connection, args.scale, args.seed)
+        dataset = {
+            "database": args.database,
+            "scale": args.scale,
+            "seed": args.seed,
+            "rows": table_counts(connection),
+        }
+        versions = environment(connection)
+    finally:
+        connection.close()
+    os.environ["DB_NAME"] = args.database
+
+    document = {
+        "benchmark": "text2sql",
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "parameters": vars(args),
+        "environment": versions,
+        "dataset": dataset,
+        "layers": asyncio.run(run_layers(args)),
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            document["comparison"] = compare(document, json.load(f))
+
+    with open(args.output, "w") as f:
+        json.dump(document, f, indent=2)
+    report(document["layers"])
+    if "comparison" in document:
+        print(f"change vs {args.baseline} (%): {document['comparison']}")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
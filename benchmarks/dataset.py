@@ -0,0 +1,367 @@
+"""Seeded, Pagila-shaped dataset for the benchmarks.
+
+The dataset lives in its own database so seeding never touches application
+data. Rows are generated server-side with ``generate_series`` and a seeded
+``random()``, so the same scale and seed always produce the same data.
+"""
+
+from typing import Any, Dict
+from app.config import Config
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Tables of the dataset, in dependency order
+DATASET_TABLES = (
+    "language",
+    "category",
+    "country",
+    "city",
+    "address",
+    "actor",
+    "film",
+    "film_actor",
+    "film_category",
+    "store",
+    "staff",
+    "customer",
+    "inventory",
+    "rental",
+    "payment",
+)
+
+# Rows per table at scale 1 (Pagila sizes); lookup tables do not scale
+SCALED_ROWS = {
+    "actor": 200,
+    "film": 1000,
+    "customer": 599,
+    "inventory": 4581,
+    "rental": 16044,
+}
+
+FIRST_NAMES = (
+    "PENELOPE NICK ED JENNIFER JOHNNY BETTE GRACE MATTHEW JOE CHRISTIAN "
+    "ZERO KARL UMA VIVIEN CUBA FRED HELEN DAN BOB LUCILLE KIRSTEN ELVIS SANDRA"
+).split()
+LAST_NAMES = (
+    "GUINESS WAHLBERG CHASE DAVIS LOLLOBRIGIDA NICHOLSON MOSTEL JOHANSSON "
+    "SWANK GABLE CAGE BERRY WOOD BERGEN OLIVIER COSTNER VOIGHT TORN HOPKINS"
+).split()
+WORDS = (
+    "ACADEMY DINOSAUR ACE GOLDFINGER ADAPTATION HOLES AFFAIR PREJUDICE AGENT "
+    "TRUMAN AIRPLANE SIERRA ALABAMA DEVIL ALADDIN CALENDAR ALAMO VIDEOTAPE"
+).split()
+CATEGORIES = (
+    "Action Animation Children Classics Comedy Documentary Drama Family "
+    "Foreign Games Horror Music New Sci-Fi Sports Travel"
+).split()
+
+
+def _pick(values: Any) -> str:
+    """SQL expression choosing a random element of a Python string list."""
+    array = ",".join(f"'{value}'" for value in values)
+    return f"(ARRAY[{array}])[1 + floor(random() * {len(values)})::int]"
+
+
+def _schema_sql(scale: int) -> str:
+    """DDL and INSERTs creating the dataset at a scale factor."""
+    rows = {table: count * scale for table, count in SCALED_ROWS.items()}
+    first, last, word = _pick(FIRST_NAMES), _pick(LAST_NAMES), _pick(WORDS)
+    categories = ",".join(f"('{name}')" for name in CATEGORIES)
+    return f"""
+CREATE TABLE language (language_id serial PRIMARY KEY, name text NOT NULL);
+INSERT INTO language (name) VALUES
+    ('English'), ('Italian'), ('Japanese'), ('Mandarin'), ('French'), ('German');
+
+CREATE TABLE category (category_id serial PRIMARY KEY, name text NOT NULL);
+INSERT INTO category (name) VALUES {categories};
+
+CREATE TABLE country (country_id serial PRIMARY KEY, country text NOT NULL);
+INSERT INTO country (country)
+    SELECT 'Country ' || g FROM generate_series(1, 109) g;
+
+CREATE TABLE city (
+    city_id serial PRIMARY KEY,
+    city text NOT NULL,
+    country_id int NOT NULL REFERENCES country
+);
+INSERT INTO city (city, country_id)
+    SELECT 'City ' || g, 1 + floor(random() * 109)::int
+    FROM generate_series(1, 600) g;
+
+CREATE TABLE address (
+    address_id serial PRIMARY KEY,
+    address text NOT NULL,
+    district text NOT NULL,
+    city_id int NOT NULL REFERENCES city,
+    postal_code text,
+    phone text NOT NULL
+);
+INSERT INTO address (address, district, city_id, postal_code, phone)
+    SELECT g || ' ' || {word} || ' Street', 'District ' || (g % 378),
+        1 + floor(random() * 600)::int, lpad((g * 7919 % 99999)::text, 5, '0'),
+        lpad((g * 104729 % 1000000000)::text, 10, '0')
+    FROM generate_series(1, {rows["customer"] + 4}) g;
+
+CREATE TABLE actor (
+    actor_id serial PRIMARY KEY,
+    first_name text NOT NULL,
+    last_name text NOT NULL
+);
+INSERT INTO actor (first_name, last_name)
+    SELECT {first}, {last} FROM generate_series(1, {rows["actor"]});
+
+CREATE TABLE film (
+    film_id serial PRIMARY KEY,
+    title text NOT NULL,
+    description text,
+    release_year int,
+    language_id int NOT NULL REFERENCES language,
+    rental_duration smallint NOT NULL,
+    rental_rate numeric(4, 2) NOT NULL,
+    length smallint,
+    replacement_cost numeric(5, 2) NOT NULL,
+    rating text
+);
+INSERT INTO film (title, description, release_year, language_id,
+        rental_duration, rental_rate, length, replacement_cost, rating)
+    SELECT {word} || ' ' || {word} || ' ' || g,
+        'A ' || lower({word}) || ' story of a ' || lower({word}),
+        2000 + floor(random() * 23)::int, 1 + floor(random() * 6)::int,
+        3 + floor(random() * 5)::int, (ARRAY[0.99, 2.99, 4.99])[1 + g % 3],
+        46 + floor(random() * 140)::int, 9.99 + floor(random() * 21),
+        (ARRAY['G', 'PG', 'PG-13', 'R', 'NC-17'])[1 + floor(random() * 5)::int]
+    FROM generate_series(1, {rows["film"]}) g;
+CREATE INDEX idx_film_title ON film (title);
+
+CREATE TABLE film_actor (
+    actor_id int NOT NULL REFERENCES actor,
+    film_id int NOT NULL REFERENCES film,
+    PRIMARY KEY (actor_id, film_id)
+);
+INSERT INTO film_actor (actor_id, film_id)
+    SELECT 1 + floor(random() * {rows["actor"]})::int, f
+    FROM generate_series(1, {rows["film"]}) f, generate_series(1, 6)
+    ON CONFLICT DO NOTHING;
+CREATE INDEX idx_film_actor_film_id ON film_actor (film_id);
+
+CREATE TABLE film_category (
+    film_id int PRIMARY KEY REFERENCES film,
+    category_id int NOT NULL REFERENCES category
+);
+INSERT INTO film_category (film_id, category_id)
+    SELECT f, 1 + floor(random() * 16)::int
+    FROM generate_series(1, {rows["film"]}) f;
+
+CREATE TABLE store (
+    store_id serial PRIMARY KEY,
+    address_id int NOT NULL REFERENCES address
+);
+INSERT INTO store (address_id) VALUES (1), (2);
+
+CREATE TABLE staff (
+    staff_id serial PRIMARY KEY,
+    first_name text NOT NULL,
+    last_name text NOT NULL,
+    address_id int NOT NULL REFERENCES address,
+    email text,
+    store_id int NOT NULL REFERENCES store,
+    active boolean NOT NULL
+);
+INSERT INTO staff (first_name, last_name, address_id, email, store_id, active)
+    VALUES ('Mike', 'Hillyer', 3, 'mike.hillyer@example.com', 1, true),
+        ('Jon', 'Stephens', 4, 'jon.stephens@example.com', 2, true);
+
+CREATE TABLE customer (
+    customer_id serial PRIMARY KEY,
+    store_id int NOT NULL REFERENCES store,
+    first_name text NOT NULL,
+    last_name text NOT NULL,
+    email text,
+    address_id int NOT NULL REFERENCES address,
+    active boolean NOT NULL,
+    create_date date NOT NULL
+);
+INSERT INTO customer (store_id, first_name, last_name, email, address_id,
+        active, create_date)
+    SELECT 1 + g % 2, {first}, {last}, 'customer' || g || '@example.com', g + 4,
+        random() > 0.03, date '2022-02-14' + floor(random() * 90)::int
+    FROM generate_series(1, {rows["customer"]}) g;
+
+CREATE TABLE inventory (
+    inventory_id serial PRIMARY KEY,
+    film_id int NOT NULL REFERENCES film,
+    store_id int NOT NULL REFERENCES store
+);
+INSERT INTO inventory (film_id, store_id)
+    SELECT 1 + floor(random() * {rows["film"]})::int, 1 + g % 2
+    FROM generate_series(1, {rows["inventory"]}) g;
+CREATE INDEX idx_inventory_film_id ON inventory (film_id);
+
+CREATE TABLE rental (
+    rental_id serial PRIMARY KEY,
+    rental_date timestamptz NOT NULL,
+    inventory_id int NOT NULL REFERENCES inventory,
+    customer_id int NOT NULL REFERENCES customer,
+    return_date timestamptz,
+    staff_id int NOT NULL REFERENCES staff
+);
+INSERT INTO rental (rental_date, inventory_id, customer_id, return_date,
+        staff_id)
+    SELECT d, i, c, CASE WHEN random() < 0.99
+            THEN d + (1 + floor(random() * 9)) * interval '1 day' END,
+        1 + floor(random() * 2)::int
+    FROM (
+        SELECT timestamptz '2022-05-24 00:00+00'
+                + random() * interval '90 days' AS d,
+            1 + floor(random() * {rows["inventory"]})::int AS i,
+            1 + floor(random() * {rows["customer"]})::int AS c
+        FROM generate_series(1, {rows["rental"]})
+        ORDER BY 1
+    ) r;
+CREATE INDEX idx_rental_customer_id ON rental (customer_id);
+CREATE INDEX idx_rental_inventory_id ON rental (inventory_id);
+
+CREATE TABLE payment (
+    payment_id serial PRIMARY KEY,
+    customer_id int NOT NULL REFERENCES customer,
+    staff_id int NOT NULL REFERENCES staff,
+    rental_id int NOT NULL REFERENCES rental,
+    amount numeric(5, 2) NOT NULL,
+    payment_date timestamptz NOT NULL
+);
+INSERT INTO payment (customer_id, staff_id, rental_id, amount, payment_date)
+    SELECT customer_id, staff_id, rental_id,
+        (ARRAY[0.99, 1.99, 2.99, 3.99, 4.99, 5.99, 7.99, 9.99])
+            [1 + floor(random() * 8)::int],
+        coalesce(return_date, rental_date) + interval '1 hour'
+    FROM rental ORDER BY rental_id;
+CREATE INDEX idx_payment_customer_id ON payment (customer_id);
+CREATE INDEX idx_payment_rental_id ON payment (rental_id);
+"""
+
+
+def dataset_marker(scale: int, seed: int) -> str:
+    """Database comment identifying a seeded benchmark dataset."""
+    return f"text2sql benchmark dataset (scale={scale}, seed={seed})"
+
+
+def connect(config: Config, database: str) -> Any:
+    """Open a psycopg2 connection to a database of the configured server."""
+    import psycopg2
+
+    return psycopg2.connect(
+        host=config.DB_HOST,
+        port=config.DB_PORT,
+        database=database,
+        user=config.DB_USER,
+        password=config.DB_PASSWORD,
+    )
+
+
+def ensure_database(config: Config, database: str) -> bool:
+    """Create the benchmark database if it does not exist.
+
+    Args:
+        config: Configuration of the server; its ``DB_NAME`` is used as the
+            maintenance database to connect to
+        database: Name of the benchmark database
+
+    Returns:
+        True if the database was created
+    """
+    from psycopg2 import sql
+
+    connection = connect(config, config.DB_NAME)
+    try:
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (database,))
+            if cursor.fetchone():
+                return False
+            cursor.execute(
+                sql.SQL("CREATE DATABASE {}").format(sql.Identifier(database))
+            )
+            logger.info(f"Created benchmark database {database}")
+            return True
+    finally:
+        connection.close()
+
+
+def seed_dataset(connection: Any, scale: int = 1, seed: int = 42) -> bool:
+    """Create and fill the dataset unless it is already seeded identically.
+
+    Args:
+        connection: psycopg2 connection to the benchmark database
+        scale: Multiplier of the Pagila row counts of the main tables
+        seed: Seed of the server-side random generator
+
+    Returns:
+        True if the dataset was (re)created, False if it was already there
+
+    Raises:
+        RuntimeError: If the database holds tables of the same names that
+            were not created by this module
+    """
+    from psycopg2 import sql
+
+    marker = dataset_marker(scale, seed)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT shobj_description(oid, 'pg_database') FROM pg_database "
+            "WHERE datname = current_database()"
+        )
+        comment = cursor.fetchone()[0]
+        if comment == marker:
+            return False
+        cursor.execute(
+            "SELECT count(*) FROM pg_tables "
+            "WHERE schemaname = 'public' AND tablename = ANY(%s)",
+            (list(DATASET_TABLES),),
+        )
+        existing = cursor.fetchone()[0]
+        if existing and not (comment or "").startswith("text2sql benchmark"):
+            raise RuntimeError(
+                "Refusing to seed: the database already has tables named like "
+                "the benchmark dataset; use a dedicated database"
+            )
+
+        logger.info(f"Seeding {marker}")
+        for table in reversed(DATASET_TABLES):
+            cursor.execute(
+                sql.SQL("DROP TABLE IF EXISTS {} CASCADE").format(sql.Identifier(table))
+            )
+        # setseed takes a value in [-1, 1]
+        cursor.execute("SELECT setseed(%s)", ((seed % 2000) / 1000 - 1,))
+        cursor.execute(_schema_sql(scale))
+        cursor.execute(
+            sql.SQL("COMMENT ON DATABASE {} IS {}").format(
+                sql.Identifier(connection.info.dbname), sql.Literal(marker)
+            )
+        )
+    connection.commit()
+
+    # Planner statistics, as on a database that has been running a while
+    autocommit = connection.autocommit
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+    finally:
+        connection.autocommit = autocommit
+    return True
+
+
+def table_counts(connection: Any) -> Dict[str, int]:
+    """Row count of every dataset table."""
+    from psycopg2 import sql
+
+    counts = {}
+    with connection.cursor() as cursor:
+        for table in DATASET_TABLES:
+            cursor.execute(
+                sql.SQL("SELECT count(*) FROM {}").format(sql.Identifier(table))
+            )
+            counts[table] = cursor.fetchone()[0]
+    connection.rollback()
+    return counts
@@ -0,0 +1,266 @@
+"""Load generation and latency statistics for the benchmarks."""
+
+import asyncio
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+)
+from app.agents.llm_client import LLMClient
+from app.agents.text_to_sql_agent import TextToSQLAgent
+from .workload import BenchmarkQuery
+
+# Sends one question and returns the per-stage timings (ms) of its run
+Call = Callable[[str], Awaitable[Dict[str, float]]]
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Percentile with linear interpolation between closest ranks.
+
+    Args:
+        values: Samples (any order)
+        q: Percentile in [0, 100]
+
+    Returns:
+        The percentile, or 0.0 for no samples
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    """Count, mean, p50, p90, p99 and max of latency samples (ms)."""
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3) if values else 0.0,
+        "p50": round(percentile(values, 50), 3),
+        "p90": round(percentile(values, 90), 3),
+        "p99": round(percentile(values, 99), 3),
+        "max": round(max(values), 3) if values else 0.0,
+    }
+
+
+def rss_high_water_mb() -> float:
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+@dataclass
+class LoadResult:
+    """Measurements of one load run against one layer.
+
+    Attributes:
+        concurrency: Requests in flight at any time
+        duration_s: Wall-clock time of the run
+        latencies_ms: End-to-end latency of each successful request
+        by_query: Latencies grouped by workload query name
+        stages_ms: Agent stage timings grouped by stage name
+        errors: Failed requests counted by exception type
+        python_peak_mb: Peak traced Python heap (None if not traced)
+    """
+
+    concurrency: int
+    duration_s: float = 0.0
+    latencies_ms: List[float] = field(default_factory=list)
+    by_query: Dict[str, List[float]] = field(default_factory=dict)
+    stages_ms: Dict[str, List[float]] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+    python_peak_mb: Optional[float] = None
+
+    def record(self, name: str, latency_ms: float, timings: Dict[str, float]) -> None:
+        """Add a successful request."""
+        self.latencies_ms.append(latency_ms)
+        self.by_query.setdefault(name, []).append(latency_ms)
+        for stage, value in timings.items():
+            self.stages_ms.setdefault(stage, []).append(value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Machine-readable summary of the run."""
+        requests = len(self.latencies_ms) + sum(self.errors.values())
+        return {
+            "requests": requests,
+            "errors": dict(self.errors),
+            "concurrency": self.concurrency,
+            "duration_s": round(self.duration_s, 3),
+            "throughput_rps": (
+                round(len(self.latencies_ms) / self.duration_s, 2)
+                if self.duration_s
+                else 0.0
+            ),
+            "latency_ms": summarize(self.latencies_ms),
+            "queries_ms": {
+                name: summarize(values) for name, values in self.by_query.items()
+            },
+            "stages_ms": {
+                stage: summarize(values) for stage, values in self.stages_ms.items()
+            },
+            "memory": {
+                "python_peak_mb": self.python_peak_mb,
+                "rss_high_water_mb": rss_high_water_mb(),
+            },
+        }
+
+
+async def run_load(
+    call: Call,
+    queries: Sequence[BenchmarkQuery],
+    requests: int,
+    concurrency: int,
+    trace_memory: bool = False,
+) -> LoadResult:
+    """Send ``requests`` questions, cycling over the workload.
+
+    Args:
+        call: Sends one question to the layer under test
+        queries: Workload to cycle over, in order
+        requests: Total number of requests
+        concurrency: Requests in flight at any time
+        trace_memory: Record the peak Python heap with tracemalloc (slows
+            allocation-heavy code down, so latencies are not comparable with
+            untraced runs)
+
+    Returns:
+        Measurements of the run
+    """
+    result = LoadResult(concurrency=concurrency)
+    schedule = iter(queries[i % len(queries)] for i in range(requests))
+
+    async def worker() -> None:
+        for query in schedule:
+            start = time.perf_counter()
+            try:
+                timings = await call(query.question)
+            except Exception as e:
+                name = type(e).__name__
+                result.errors[name] = result.errors.get(name, 0) + 1
+                continue
+            result.record(query.name, (time.perf_counter() - start) * 1000, timings)
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        result.duration_s = time.perf_counter() - start
+        if trace_memory:
+            result.python_peak_mb = round(
+                tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1
+            )
+            tracemalloc.stop()
+    return result
+
+
+@asynccontextmanager
+async def application(llm_client: LLMClient) -> AsyncIterator[TextToSQLAgent]:
+    """Start the API application with its LLM client replaced.
+
+    The agent is wired exactly as in production (configuration from the
+    environment), so settings such as caches can be compared between runs.
+
+    Args:
+        llm_client: Client to generate SQL with (e.g. a ``StubLLMClient``)
+
+    Yields:
+        The application's agent
+    """
+    from app.api import routes
+
+    await routes.startup_event()
+    routes.agent.llm_client = llm_client
+    try:
+        yield routes.agent
+    finally:
+        await routes.shutdown_event()
+
+
+def agent_call(agent: TextToSQLAgent) -> Call:
+    """Call answering questions directly with the agent's async pipeline."""
+
+    async def call(question: str) -> Dict[str, float]:
+        result = await agent.aanswer(question)
+        return result.timings
+
+    return call
+
+
+@asynccontextmanager
+async def http_call() -> AsyncIterator[Call]:
+    """Call posting questions to ``/ask_question`` through the ASGI app.
+
+    Requests go through FastAPI routing, validation and JSON serialization
+    in-process (no socket), so the difference with the agent layer is the
+    cost of the HTTP layer itself. Requires ``httpx``.
+
+    Yields:
+        The call; its timings include ``http_overhead``, the latency not
+        spent in the agent pipeline
+    """
+    import httpx
+    from app.api import routes
+
+    transport = httpx.ASGITransport(app=routes.app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://benchmark", timeout=None
+    ) as client:
+
+        async def call(question: str) -> Dict[str, float]:
+            start = time.perf_counter()
+            response = await client.post(
+                "/ask_question",
+                params={"include_timings": "true"},
+                json={"question": question},
+            )
+            response.raise_for_status()
+            elapsed = (time.perf_counter() - start) * 1000
+            timings = response.json()["timings"] or {}
+            timings["http_overhead"] = round(elapsed - timings.get("total", 0.0), 3)
+            return timings
+
+        yield call
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Relative change of the headline numbers against a baseline run.
+
+    Args:
+        current: Results document of this run
+        baseline: Results document of an earlier run
+
+    Returns:
+        Per layer, the percent change of throughput and p50/p99 latency
+        (positive latency changes are slowdowns)
+    """
+    changes = {}
+    for layer, results in current["layers"].items():
+        before = baseline.get("layers", {}).get(layer)
+        if not before:
+            continue
+        pairs = {
+            "throughput_rps": (before["throughput_rps"], results["throughput_rps"]),
+            "p50_ms": (before["latency_ms"]["p50"], results["latency_ms"]["p50"]),
+            "p99_ms": (before["latency_ms"]["p99"], results["latency_ms"]["p99"]),
+        }
+        changes[layer] = {
+            metric: round((new - old) / old * 100, 1) if old else None
+            for metric, (old, new) in pairs.items()
+        }
+    return changes
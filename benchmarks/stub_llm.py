@@ -0,0 +1,104 @@
+"""Deterministic stand-in for the LLM client, used by the benchmarks."""
+
+import asyncio
+import random
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, Optional
+from app.agents.llm_client import LLMClient, SystemContent
+
+
+class StubLLMClient(LLMClient):
+    """LLM client that answers known questions with fixed SQL after a delay.
+
+    The delay is ``latency_ms`` plus a uniform ``jitter_ms`` drawn from a
+    seeded generator, so two runs with the same parameters see the same
+    sequence of delays. No network call is made and no API key is needed.
+    """
+
+    def __init__(
+        self,
+        responses: Dict[str, str],
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        seed: int = 0,
+        default_sql: str = "SELECT 1",
+        chunk_chars: int = 8,
+    ):
+        """Initialize the stub.
+
+        Args:
+            responses: SQL to return for each question; a question is
+                matched when it appears in the user message
+            latency_ms: Simulated generation time in milliseconds
+            jitter_ms: Maximum random deviation from ``latency_ms``
+            seed: Seed of the delay generator
+            default_sql: SQL returned for unknown questions
+            chunk_chars: Characters per fragment when streaming
+        """
+        self.model = "stub"
+        self.temperature = 0.0
+        # Longest first, so a question containing another one wins
+        self.responses = dict(
+            sorted(responses.items(), key=lambda item: len(item[0]), reverse=True)
+        )
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.default_sql = default_sql
+        self.chunk_chars = chunk_chars
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def respond(self, message: str) -> str:
+        """SQL for the question found in a prompt or user message."""
+        for question, sql_query in self.responses.items():
+            if question in message:
+                return sql_query
+        return self.default_sql
+
+    def delay(self) -> float:
+        """Seconds the next call takes, counting the call."""
+        with self._lock:
+            self.calls += 1
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(self.latency_ms + jitter, 0.0) / 1000
+
+    def generate_sql(self, prompt: str) -> str:
+        time.sleep(self.delay())
+        return self.respond(prompt)
+
+    async def agenerate_sql(self, prompt: str) -> str:
+        await asyncio.sleep(self.delay())
+        return self.respond(prompt)
+
+    def generate_with_system_message(
+        self, system_message: SystemContent, user_message: str
+    ) -> str:
+        time.sleep(self.delay())
+        return self.respond(user_message)
+
+    async def agenerate_with_system_message(
+        self, system_message: SystemContent, user_message: str
+    ) -> str:
+        await asyncio.sleep(self.delay())
+        return self.respond(user_message)
+
+    def stream_with_system_message(
+        self, system_message: SystemContent, user_message: str
+    ) -> Iterator[str]:
+        time.sleep(self.delay())
+        yield from self._chunks(self.respond(user_message))
+
+    async def astream_with_system_message(
+        self, system_message: SystemContent, user_message: str
+    ) -> AsyncIterator[str]:
+        await asyncio.sleep(self.delay())
+        for chunk in self._chunks(self.respond(user_message)):
+            yield chunk
+
+    def _chunks(self, text: str, size: Optional[int] = None) -> Iterator[str]:
+        """Split a response into streaming fragments."""
+        size = size or self.chunk_chars
+        for start in range(0, len(text), size):
+            yield text[start : start + size]
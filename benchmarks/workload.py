@@ -0,0 +1,67 @@
+"""Questions the benchmarks ask, with the SQL the stub LLM answers."""
+
+from typing import Dict, List, NamedTuple
+
+
+class BenchmarkQuery(NamedTuple):
+    """One benchmark question.
+
+    Attributes:
+        name: Short identifier used in reports
+        question: Natural language question sent to the pipeline
+        sql: SQL returned by the stub LLM for the question
+    """
+
+    name: str
+    question: str
+    sql: str
+
+
+WORKLOAD: List[BenchmarkQuery] = [
+    BenchmarkQuery(
+        "point_lookup",
+        "What is the title of film 42?",
+        "SELECT title FROM film WHERE film_id = 42",
+    ),
+    BenchmarkQuery(
+        "count",
+        "How many customers are active?",
+        "SELECT count(*) AS active_customers FROM customer WHERE active",
+    ),
+    BenchmarkQuery(
+        "group_by",
+        "How many films are there per rating?",
+        "SELECT rating, count(*) AS films FROM film GROUP BY rating ORDER BY rating",
+    ),
+    BenchmarkQuery(
+        "join_aggregate",
+        "Which 10 actors appear in the most films?",
+        "SELECT a.actor_id, a.first_name, a.last_name, count(*) AS films "
+        "FROM actor a JOIN film_actor fa ON fa.actor_id = a.actor_id "
+        "GROUP BY a.actor_id ORDER BY films DESC, a.actor_id LIMIT 10",
+    ),
+    BenchmarkQuery(
+        "multi_join",
+        "What is the total revenue per film category?",
+        "SELECT c.name AS category, sum(p.amount) AS revenue "
+        "FROM payment p JOIN rental r ON r.rental_id = p.rental_id "
+        "JOIN inventory i ON i.inventory_id = r.inventory_id "
+        "JOIN film_category fc ON fc.film_id = i.film_id "
+        "JOIN category c ON c.category_id = fc.category_id "
+        "GROUP BY c.name ORDER BY revenue DESC",
+    ),
+    BenchmarkQuery(
+        "wide_result",
+        "List every rental with its customer and film",
+        "SELECT r.rental_id, r.rental_date, r.return_date, c.first_name, "
+        "c.last_name, c.email, f.title, f.rental_rate "
+        "FROM rental r JOIN customer c ON c.customer_id = r.customer_id "
+        "JOIN inventory i ON i.inventory_id = r.inventory_id "
+        "JOIN film f ON f.film_id = i.film_id ORDER BY r.rental_id",
+    ),
+]
+
+
+def stub_responses(workload: List[BenchmarkQuery]) -> Dict[str, str]:
+    """Question-to-SQL mapping for ``StubLLMClient``."""
+    return {query.question: query.sql for query in workload}
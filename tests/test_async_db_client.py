@@ -0,0 +1,55 @@
+"""Unit tests for AsyncDbClient."""
+
+import asyncio
+import threading
+import pytest
+from unittest.mock import Mock
+from app.core.async_db_client import AsyncDbClient
+
+
+class TestAsyncDbClient:
+    """Test suite for AsyncDbClient."""
+
+    @pytest.fixture
+    def mock_db_client(self):
+        """Create a mock database client with a pool of two connections."""
+        mock = Mock()
+        mock.pool.max_size = 2
+        return mock
+
+    def test_run_sql_delegates_to_db_client(self, mock_db_client):
+        """Test that run_sql returns the DbClient result."""
+        mock_db_client.run_sql.return_value = [{"id": 1}]
+        client = AsyncDbClient(mock_db_client)
+
+        result = asyncio.run(client.run_sql("SELECT 1;"))
+
+        assert result == [{"id": 1}]
+        mock_db_client.run_sql.assert_called_once_with("SELECT 1;")
+        client.close()
+
+    def test_blocking_calls_run_off_the_event_loop(self, mock_db_client):
+        """Test that blocking work runs on a worker thread."""
+        client = AsyncDbClient(mock_db_client)
+
+        thread_name = asyncio.run(
+            client.run_sync(lambda: threading.current_thread().name)
+        )
+
+        assert thread_name.startswith("db")
+        client.close()
+
+    def test_workers_default_to_pool_size(self, mock_db_client):
+        """Test that the worker count matches the connection pool size."""
+        client = AsyncDbClient(mock_db_client)
+
+        async def main():
+            return await asyncio.gather(
+                *[client.run_sync(lambda: None) for _ in range(5)]
+            )
+
+        asyncio.run(main())
+
+        assert client._executor._max_workers == 2
+        client.close()
+        assert client._executor is None
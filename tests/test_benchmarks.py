@@ -0,0 +1,150 @@
+"""Unit tests for the benchmark harness (no database needed)."""
+
+import asyncio
+import pytest
+from benchmarks.runner import compare, percentile, run_load, summarize
+from benchmarks.stub_llm import StubLLMClient
+from benchmarks.workload import WORKLOAD, BenchmarkQuery, stub_responses
+
+
+class TestStubLLMClient:
+    """Test suite for StubLLMClient."""
+
+    @pytest.fixture
+    def llm_client(self):
+        """Create a stub answering two questions."""
+        return StubLLMClient(
+            {"How many films?": "SELECT count(*) FROM film", "films": "SELECT 2"},
+            latency_ms=0,
+        )
+
+    def test_returns_sql_for_question_in_message(self, llm_client):
+        """Test that the longest matching question wins."""
+        sql_query = llm_client.generate_with_system_message(
+            "schema", "Generate a SQL query to answer: How many films?"
+        )
+
+        assert sql_query == "SELECT count(*) FROM film"
+        assert llm_client.calls == 1
+
+    def test_unknown_question_gets_default_sql(self, llm_client):
+        """Test the fallback response."""
+        assert llm_client.generate_sql("Who are you?") == "SELECT 1"
+
+    def test_stream_joins_to_response(self, llm_client):
+        """Test that streamed fragments add up to the SQL."""
+
+        async def collect():
+            return [
+                chunk
+                async for chunk in llm_client.astream_with_system_message(
+                    "schema", "How many films?"
+                )
+            ]
+
+        chunks = asyncio.run(collect())
+
+        assert len(chunks) > 1
+        assert "".join(chunks) == "SELECT count(*) FROM film"
+
+    def test_delays_are_seeded(self):
+        """Test that the same seed gives the same delays within the jitter."""
+        first = StubLLMClient({}, latency_ms=50, jitter_ms=10, seed=7)
+        second = StubLLMClient({}, latency_ms=50, jitter_ms=10, seed=7)
+
+        delays = [first.delay() for _ in range(5)]
+
+        assert delays == [second.delay() for _ in range(5)]
+        assert all(0.04 <= delay <= 0.06 for delay in delays)
+
+
+class TestStatistics:
+    """Test suite for the latency statistics."""
+
+    def test_percentile_interpolates(self):
+        """Test percentiles between samples."""
+        values = [40.0, 10.0, 30.0, 20.0]
+
+        assert percentile(values, 0) == 10.0
+        assert percentile(values, 50) == 25.0
+        assert percentile(values, 100) == 40.0
+        assert percentile([], 99) == 0.0
+
+    def test_summarize(self):
+        """Test the summary of a sample."""
+        summary = summarize([float(value) for value in range(1, 101)])
+
+        assert summary["count"] == 100
+        assert summary["mean"] == 50.5
+        assert summary["p50"] == 50.5
+        assert summary["p99"] == 99.01
+        assert summary["max"] == 100.0
+
+    def test_compare_reports_percent_change(self):
+        """Test the comparison with a baseline run."""
+        baseline = {
+            "layers": {
+                "agent": {
+                    "throughput_rps": 100.0,
+                    "latency_ms": {"p50": 10.0, "p99": 20.0},
+                }
+            }
+        }
+        current = {
+            "layers": {
+                "agent": {
+                    "throughput_rps": 80.0,
+                    "latency_ms": {"p50": 12.0, "p99": 20.0},
+                },
+                "http": {"throughput_rps": 1.0, "latency_ms": {"p50": 1, "p99": 1}},
+            }
+        }
+
+        changes = compare(current, baseline)
+
+        assert changes == {
+            "agent": {"throughput_rps": -20.0, "p50_ms": 20.0, "p99_ms": 0.0}
+        }
+
+
+class TestRunLoad:
+    """Test suite for run_load."""
+
+    def test_records_latencies_stages_and_errors(self):
+        """Test that every request is measured or counted as an error."""
+        # Arrange
+        queries = [
+            BenchmarkQuery("ok", "good question", "SELECT 1"),
+            BenchmarkQuery("bad", "bad question", "SELECT 1"),
+        ]
+
+        async def call(question):
+            await asyncio.sleep(0)
+            if question == "bad question":
+                raise ValueError("no")
+            return {"llm": 1.0, "execute": 2.0}
+
+        # Act
+        result = asyncio.run(
+            run_load(call, queries, requests=10, concurrency=3, trace_memory=True)
+        )
+        summary = result.to_dict()
+
+        # Assert
+        assert summary["requests"] == 10
+        assert summary["errors"] == {"ValueError": 5}
+        assert summary["latency_ms"]["count"] == 5
+        assert summary["stages_ms"]["execute"]["p50"] == 2.0
+        assert set(summary["queries_ms"]) == {"ok"}
+        assert summary["memory"]["python_peak_mb"] is not None
+
+
+class TestWorkload:
+    """Test suite for the benchmark workload."""
+
+    def test_names_and_questions_are_unique(self):
+        """Test that workload entries can be told apart in reports."""
+        names = [query.name for query in WORKLOAD]
+
+        assert len(names) == len(set(names))
+        assert len(stub_responses(WORKLOAD)) == len(WORKLOAD)
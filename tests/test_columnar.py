@@ -0,0 +1,88 @@
+"""Unit tests for ColumnarResult."""
+
+import json
+import pytest
+from collections import namedtuple
+from decimal import Decimal
+from unittest.mock import Mock
+from app.core.columnar import ColumnarResult
+
+Column = namedtuple("Column", ["name", "type_code"])
+
+
+class TestColumnarResult:
+    """Test suite for ColumnarResult."""
+
+    @pytest.fixture
+    def cursor(self):
+        """Create a mock tuple cursor with two columns and three rows."""
+        cursor = Mock()
+        cursor.description = [Column("id", 23), Column("price", 1700)]
+        cursor.fetchall.return_value = [
+            (1, Decimal("2.99")),
+            (2, None),
+            (3, Decimal("4.99")),
+        ]
+        return cursor
+
+    def test_from_cursor_transposes_rows(self, cursor):
+        """Test that tuple rows become one array per column."""
+        # Act
+        result = ColumnarResult.from_cursor(cursor)
+
+        # Assert
+        assert result.columns == ["id", "price"]
+        assert list(result.data[0]) == [1, 2, 3]
+        assert list(result.data[1]) == [Decimal("2.99"), None, Decimal("4.99")]
+        assert result.type_codes == [23, 1700]
+        assert result.row_count == 3
+
+    def test_empty_result_keeps_columns(self, cursor):
+        """Test that a query with no rows still reports its columns."""
+        cursor.fetchall.return_value = []
+
+        result = ColumnarResult.from_cursor(cursor)
+
+        assert result.columns == ["id", "price"]
+        assert result.row_count == 0
+
+    def test_truncate(self, cursor):
+        """Test that truncation cuts every column."""
+        result = ColumnarResult.from_cursor(cursor).truncate(2)
+
+        assert result.row_count == 2
+        assert all(len(values) == 2 for values in result.data)
+
+    def test_to_json(self, cursor):
+        """Test the compact column-oriented JSON encoding."""
+        # Act
+        body = ColumnarResult.from_cursor(cursor).to_json({"sql_query": "q"}, str)
+
+        # Assert
+        assert json.loads(body) == {
+            "sql_query": "q",
+            "columns": ["id", "price"],
+            "data": [[1, 2, 3], ["2.99", None, "4.99"]],
+        }
+
+    def test_to_arrow_ipc_round_trip(self, cursor):
+        """Test that the Arrow stream reads back with types and metadata."""
+        # Arrange
+        pa = pytest.importorskip("pyarrow")
+        cursor.description.append(Column("extra", 114))
+        cursor.fetchall.return_value = [
+            (1, Decimal("2.99"), {"a": 1}),
+            (2, None, [1, 2]),
+        ]
+
+        # Act
+        body = ColumnarResult.from_cursor(cursor).to_arrow_ipc({"sql_query": "q"})
+
+        # Assert
+        table = pa.ipc.open_stream(body).read_all()
+        assert table.column_names == ["id", "price", "extra"]
+        assert table.column("id").to_pylist() == [1, 2]
+        assert table.column("price").to_pylist() == [Decimal("2.99"), None]
+        # Values without a common type fall back to strings
+        assert table.column("extra").to_pylist() == ["{'a': 1}", "[1, 2]"]
+        assert table.schema.metadata == {b"sql_query": b"q"}
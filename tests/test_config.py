@@ -0,0 +1,53 @@
+"""Unit tests for configuration loading."""
+
+import pytest
+from app.config import Config
+
+
+class TestDatabaseConfig:
+    """Test suite for Config.database_config."""
+
+    @pytest.fixture
+    def config(self, monkeypatch):
+        """Create a configuration with a default and two named databases."""
+        monkeypatch.setenv("DB_HOST", "primary")
+        monkeypatch.setenv("DB_NAME", "app")
+        monkeypatch.setenv("DB_USER", "reader")
+        monkeypatch.setenv("DB_PASSWORD", "secret")
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "key")
+        monkeypatch.setenv("DB_REPLICAS", "replica-1, replica-2:5433")
+        monkeypatch.setenv("DB_DATABASES", "sales,hr-archive")
+        monkeypatch.setenv("DB_HR_ARCHIVE_HOST", "archive")
+        monkeypatch.setenv("DB_HR_ARCHIVE_NAME", "hr")
+        monkeypatch.setenv("SQL_CACHE_PATH", "cache/sql.db")
+        return Config(env_file="/nonexistent/.env")
+
+    def test_lists_are_parsed(self, config):
+        """Test comma-separated settings."""
+        assert config.DB_REPLICAS == ["replica-1", "replica-2:5433"]
+        assert config.DB_DATABASES == ["sales", "hr-archive"]
+
+    def test_same_server_database_inherits_connection(self, config):
+        """Test a named database on the default server."""
+        sales = config.database_config("sales")
+
+        assert (sales.DB_HOST, sales.DB_NAME, sales.DB_USER) == (
+            "primary",
+            "sales",
+            "reader",
+        )
+        assert sales.DB_REPLICAS == ["replica-1", "replica-2:5433"]
+        assert sales.SQL_CACHE_PATH == "cache/sql.sales.db"
+        assert config.DB_NAME == "app"
+
+    def test_other_server_database_does_not_inherit_replicas(self, config):
+        """Test a named database with its own host."""
+        archive = config.database_config("hr-archive")
+
+        assert (archive.DB_HOST, archive.DB_NAME) == ("archive", "hr")
+        assert archive.DB_REPLICAS == []
+
+    def test_unknown_database(self, config):
+        """Test that only configured names are accepted."""
+        with pytest.raises(ValueError, match="Unknown database"):
+            config.database_config("payroll")
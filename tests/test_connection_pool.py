@@ -0,0 +1,137 @@
+"""Unit tests for ConnectionPool."""
+
+import threading
+import pytest
+from unittest.mock import MagicMock
+from app.core.connection_pool import ConnectionPool, PoolTimeoutError
+
+
+def make_connection():
+    """Create a fake psycopg2 connection."""
+    connection = MagicMock()
+    connection.closed = 0
+    return connection
+
+
+class TestConnectionPool:
+    """Test suite for ConnectionPool."""
+
+    @pytest.fixture
+    def connect(self):
+        """Connection factory that records every connection it opens."""
+        factory = MagicMock(side_effect=lambda: make_connection())
+        return factory
+
+    def test_open_prefills_min_size(self, connect):
+        """Test that open() creates the minimum number of connections."""
+        pool = ConnectionPool(connect, min_size=2, max_size=4)
+
+        pool.open()
+
+        assert connect.call_count == 2
+        stats = pool.stats()
+        assert stats["size"] == 2
+        assert stats["idle"] == 2
+        assert stats["in_use"] == 0
+
+    def test_connections_are_reused(self, connect):
+        """Test that a returned connection is handed out again."""
+        pool = ConnectionPool(connect, min_size=0, max_size=2)
+
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        assert first is second
+        assert connect.call_count == 1
+        assert pool.stats()["checkouts"] == 2
+
+    def test_returned_connection_is_reset(self, connect):
+        """Test that returning a connection rolls back and resets session state."""
+        pool = ConnectionPool(connect, min_size=0, max_size=1)
+
+        with pool.connection() as connection:
+            pass
+
+        connection.rollback.assert_called_once()
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.execute.assert_called_once_with("RESET ALL")
+        assert connection.autocommit is False
+
+    def test_unhealthy_connection_is_discarded(self, connect):
+        """Test that a connection failing the reset is closed and not reused."""
+        pool = ConnectionPool(connect, min_size=0, max_size=1)
+
+        with pool.connection() as broken:
+            broken.rollback.side_effect = Exception("server closed the connection")
+        with pool.connection() as fresh:
+            pass
+
+        assert fresh is not broken
+        broken.close.assert_called_once()
+        assert pool.stats()["discarded"] == 1
+
+    def test_closed_connection_is_discarded(self, connect):
+        """Test that a connection closed during use is not put back."""
+        pool = ConnectionPool(connect, min_size=0, max_size=1)
+
+        with pool.connection() as connection:
+            connection.closed = 1
+
+        assert pool.stats()["size"] == 0
+        connection.rollback.assert_not_called()
+
+    def test_checkout_times_out_when_exhausted(self, connect):
+        """Test that checkout fails after the timeout when the pool is full."""
+        pool = ConnectionPool(connect, min_size=0, max_size=1, timeout=0.05)
+        held = pool.getconn()
+
+        with pytest.raises(PoolTimeoutError):
+            pool.getconn()
+
+        assert pool.stats()["timeouts"] == 1
+        pool.putconn(held)
+
+    def test_waiting_checkout_gets_returned_connection(self, connect):
+        """Test that a blocked checkout proceeds once a connection is returned."""
+        pool = ConnectionPool(connect, min_size=0, max_size=1, timeout=2)
+        held = pool.getconn()
+        received = []
+
+        waiter = threading.Thread(target=lambda: received.append(pool.getconn()))
+        waiter.start()
+        pool.putconn(held)
+        waiter.join(timeout=2)
+
+        assert received == [held]
+        assert pool.stats()["wait_time_max"] > 0
+
+    def test_failed_connect_releases_slot(self):
+        """Test that a failing connection factory does not leak pool capacity."""
+        connect = MagicMock(side_effect=Exception("connection refused"))
+        pool = ConnectionPool(connect, min_size=0, max_size=1)
+
+        with pytest.raises(Exception, match="connection refused"):
+            pool.getconn()
+
+        stats = pool.stats()
+        assert stats["size"] == 0
+        assert stats["in_use"] == 0
+
+    def test_close_closes_idle_connections(self, connect):
+        """Test that closing the pool closes idle connections."""
+        pool = ConnectionPool(connect, min_size=2, max_size=2)
+        pool.open()
+
+        pool.close()
+
+        assert pool.closed
+        assert pool.stats()["size"] == 0
+        with pytest.raises(PoolTimeoutError):
+            pool.getconn()
+
+    def test_invalid_sizes_rejected(self, connect):
+        """Test that inconsistent size bounds are rejected."""
+        with pytest.raises(ValueError):
+            ConnectionPool(connect, min_size=5, max_size=2)
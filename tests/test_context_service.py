@@ -1,7 +1,7 @@
 """Unit tests for ContextService."""
 
 import pytest
-from unittest.mock import Mock, MagicMock
+from unittest.mock import Mock, MagicMock, patch
 from app.agents.context_service import ContextService
 
 
@@ -19,6 +19,54 @@ class TestContextService:
         """Create a ContextService instance with mock db client."""
         return ContextService(mock_db_client)
 
+    @pytest.fixture
+    def schema_rows(self):
+        """Column rows returned by the schema query."""
+        return [
+            {
+                "table_name": "users",
+                "column_name": "id",
+                "data_type": "integer",
+                "is_nullable": "NO",
+            },
+        ]
+
+    @staticmethod
+    def route_queries(
+        mock_db_client,
+        schema_rows,
+        fingerprints,
+        foreign_keys=(),
+        comments=(),
+        indexes=(),
+        table_stats=(),
+    ):
+        """Answer fingerprint, schema and metadata queries separately."""
+        fingerprint_iter = iter(fingerprints)
+
+        def run_sql(query):
+            if "AS fingerprint" in query:
+                return [{"fingerprint": next(fingerprint_iter)}]
+            if "pg_constraint" in query:
+                return list(foreign_keys)
+            if "pg_description" in query:
+                return list(comments)
+            if "pg_index ix" in query:
+                return list(indexes)
+            if "reltuples" in query:
+                return list(table_stats)
+            return schema_rows
+
+        mock_db_client.run_sql.side_effect = run_sql
+
+    @staticmethod
+    def schema_query_count(mock_db_client):
+        """Count how many times the full schema query was run."""
+        return sum(
+            "information_schema.columns" in call.args[0]
+            for call in mock_db_client.run_sql.call_args_list
+        )
+
     def test_get_schema_info(self, context_service, mock_db_client):
         """Test getting schema information."""
         # Arrange
@@ -70,7 +118,7 @@ class TestContextService:
                 "is_nullable": "NO",
             },
         ]
-        mock_db_client.run_sql.return_value = mock_schema
+        self.route_queries(mock_db_client, mock_schema, ["abc"])
 
         # Act
         result = context_service.format_schema_for_llm()
@@ -82,6 +130,278 @@ class TestContextService:
         assert "id (integer) NOT NULL" in result
         assert "email (varchar) NULL" in result
 
+    def test_format_schema_is_cached_between_checks(
+        self, context_service, mock_db_client, schema_rows
+    ):
+        """Test that the schema is not re-introspected within the check interval."""
+        self.route_queries(mock_db_client, schema_rows, ["abc"])
+
+        first = context_service.format_schema_for_llm()
+        second = context_service.format_schema_for_llm()
+
+        assert first == second
+        assert self.schema_query_count(mock_db_client) == 1
+        assert (
+            mock_db_client.run_sql.call_count == 6
+        )  # fingerprint, schema, FKs, comments, indexes, table stats
+        assert context_service.schema_fingerprint == "abc"
+
+    def test_unchanged_fingerprint_keeps_cache(self, mock_db_client, schema_rows):
+        """Test that an unchanged fingerprint does not reload the schema."""
+        service = ContextService(mock_db_client, check_interval=0)
+        self.route_queries(mock_db_client, schema_rows, ["abc", "abc", "abc"])
+
+        service.format_schema_for_llm()
+        service.format_schema_for_llm()
+        service.format_schema_for_llm()
+
+        assert self.schema_query_count(mock_db_client) == 1
+
+    def test_changed_fingerprint_reloads_schema(self, mock_db_client, schema_rows):
+        """Test that a changed fingerprint triggers a schema reload."""
+        service = ContextService(mock_db_client, check_interval=0)
+        self.route_queries(mock_db_client, schema_rows, ["abc", "def", "def"])
+
+        service.format_schema_for_llm()
+        service.format_schema_for_llm()
+
+        assert self.schema_query_count(mock_db_client) == 2
+        assert service.schema_fingerprint == "def"
+
+    def test_ttl_expiry_reloads_schema(self, mock_db_client, schema_rows):
+        """Test that the schema is reloaded once the TTL expires."""
+        service = ContextService(mock_db_client, cache_ttl=60, check_interval=600)
+        self.route_queries(mock_db_client, schema_rows, ["abc", "abc"])
+
+        with patch("app.agents.context_service.time.monotonic") as monotonic:
+            monotonic.return_value = 1000.0
+            service.format_schema_for_llm()
+            monotonic.return_value = 1059.0
+            service.format_schema_for_llm()
+            assert self.schema_query_count(mock_db_client) == 1
+
+            monotonic.return_value = 1061.0
+            service.format_schema_for_llm()
+            assert self.schema_query_count(mock_db_client) == 2
+
+    def test_invalidate_schema_cache(
+        self, context_service, mock_db_client, schema_rows
+    ):
+        """Test that manual invalidation forces a reload."""
+        self.route_queries(mock_db_client, schema_rows, ["abc", "abc"])
+
+        context_service.format_schema_for_llm()
+        context_service.invalidate_schema_cache()
+        assert context_service.schema_fingerprint is None
+        context_service.format_schema_for_llm()
+
+        assert self.schema_query_count(mock_db_client) == 2
+
+    def test_render_schema_subset(self, context_service, mock_db_client):
+        """Test rendering only some tables in the full-schema layout."""
+        rows = [
+            {
+                "table_name": table,
+                "column_name": "id",
+                "data_type": "integer",
+                "is_nullable": "NO",
+            }
+            for table in ["actor", "film", "store"]
+        ]
+        self.route_queries(mock_db_client, rows, ["abc"])
+
+        full = context_service.format_schema_for_llm()
+        subset = context_service.render_schema(["store", "actor", "missing"])
+
+        assert subset.startswith("Database Schema:")
+        assert "Table: actor" in subset and "Table: store" in subset
+        assert "Table: film" not in subset
+        assert len(subset) < len(full)
+
+    def test_catalog_includes_foreign_keys(
+        self, context_service, mock_db_client, schema_rows
+    ):
+        """Test that foreign keys are loaded into the catalog."""
+        foreign_keys = [
+            {
+                "table_name": "posts",
+                "column_name": "user_id",
+                "referenced_table": "users",
+                "referenced_column": "id",
+            }
+        ]
+        self.route_queries(mock_db_client, schema_rows, ["abc"], foreign_keys)
+
+        catalog = context_service.get_catalog()
+
+        assert catalog.foreign_keys == foreign_keys
+        assert catalog.table_names == ["users"]
+
+    def test_rich_schema_rendering(self, context_service, mock_db_client):
+        """Test that keys, indexes, comments and row estimates are rendered."""
+        # Arrange
+        rows = [
+            {
+                "table_name": table,
+                "column_name": column,
+                "data_type": "integer",
+                "is_nullable": "NO",
+            }
+            for table, column in [
+                ("posts", "id"),
+                ("posts", "user_id"),
+                ("users", "id"),
+                ("users_view", "id"),
+            ]
+        ]
+        foreign_keys = [
+            {
+                "table_name": "posts",
+                "column_name": "user_id",
+                "referenced_table": "users",
+                "referenced_column": "id",
+            }
+        ]
+        comments = [
+            {"table_name": "posts", "column_name": None, "description": "Blog posts"},
+            {
+                "table_name": "posts",
+                "column_name": "user_id",
+                "description": "Author of\n  the post",
+            },
+        ]
+        indexes = [
+            {
+                "table_name": table,
+                "index_name": f"{table}_pkey",
+                "is_primary": True,
+                "is_unique": True,
+                "method": "btree",
+                "columns": ["id"],
+                "predicate": None,
+            }
+            for table in ["posts", "users"]
+        ] + [
+            {
+                "table_name": "posts",
+                "index_name": "posts_user_id_idx",
+                "is_primary": False,
+                "is_unique": False,
+                "method": "btree",
+                "columns": ["user_id"],
+                "predicate": None,
+            },
+            {
+                "table_name": "posts",
+                "index_name": "posts_user_id_live",
+                "is_primary": False,
+                "is_unique": True,
+                "method": "hash",
+                "columns": ["user_id"],
+                "predicate": "id > 0",
+            },
+        ]
+        table_stats = [
+            {"table_name": "posts", "kind": "r", "row_estimate": 1200000},
+            {"table_name": "users", "kind": "r", "row_estimate": None},
+            {"table_name": "users_view", "kind": "v", "row_estimate": None},
+        ]
+        self.route_queries(
+            mock_db_client,
+            rows,
+            ["abc"],
+            foreign_keys,
+            comments,
+            indexes,
+            table_stats,
+        )
+
+        # Act
+        catalog = context_service.get_catalog()
+
+        # Assert
+        assert catalog.table_blocks["posts"] == (
+            "Table: posts (~1,200,000 rows) -- Blog posts\n"
+            "  - id (integer) NOT NULL PK\n"
+            "  - user_id (integer) NOT NULL FK -> users.id -- Author of the post\n"
+            "  Indexes: (user_id); UNIQUE hash (user_id) WHERE id > 0"
+        )
+        assert catalog.table_blocks["users"] == (
+            "Table: users\n  - id (integer) NOT NULL PK"
+        )
+        assert catalog.table_blocks["users_view"].startswith("Table: users_view (view)")
+        assert catalog.indexes == indexes
+        assert catalog.table_stats == table_stats
+
+    def test_long_comments_are_shortened(self, context_service, mock_db_client):
+        """Test that long comments are cut at a word boundary."""
+        # Arrange
+        rows = [
+            {
+                "table_name": "users",
+                "column_name": "id",
+                "data_type": "integer",
+                "is_nullable": "NO",
+            }
+        ]
+        comments = [
+            {"table_name": "users", "column_name": "id", "description": "word " * 100}
+        ]
+        self.route_queries(mock_db_client, rows, ["abc"], comments=comments)
+
+        # Act
+        block = context_service.get_catalog().table_blocks["users"]
+
+        # Assert
+        comment = block.split(" -- ", 1)[1]
+        assert comment.endswith("word...")
+        assert len(comment) <= 163
+
+    def test_schema_format_applies_to_subsets(self, mock_db_client):
+        """Test that the configured format is used for full and pruned schemas."""
+        # Arrange
+        service = ContextService(mock_db_client, schema_format="compact")
+        rows = [
+            {
+                "table_name": table,
+                "column_name": "id",
+                "data_type": "integer",
+                "is_nullable": "NO",
+            }
+            for table in ["actor", "film"]
+        ]
+        self.route_queries(mock_db_client, rows, ["abc"])
+
+        # Act
+        full = service.format_schema_for_llm()
+        subset = service.render_schema(["film"])
+
+        # Assert
+        assert full.splitlines()[-2:] == ["actor: id int!", "film: id int!"]
+        assert subset.splitlines()[-1] == "film: id int!"
+        assert "actor" not in subset
+
+    def test_format_sizes(self, context_service, mock_db_client, schema_rows):
+        """Test that every format is measured in chars and estimated tokens."""
+        # Arrange
+        self.route_queries(mock_db_client, schema_rows, ["abc"])
+
+        # Act
+        sizes = context_service.format_sizes()
+
+        # Assert
+        assert set(sizes) == {"verbose", "ddl", "compact"}
+        assert sizes["verbose"]["chars"] == len(context_service.format_schema_for_llm())
+        assert all(size["tokens"] > 0 for size in sizes.values())
+        assert context_service.format_sizes(["missing"])["verbose"]["chars"] == len(
+            "Database Schema:"
+        )
+
+    def test_unknown_schema_format_raises(self, mock_db_client):
+        """Test that an unknown schema format is rejected up front."""
+        with pytest.raises(ValueError, match="Unknown schema format"):
+            ContextService(mock_db_client, schema_format="yaml")
+
     def test_get_sample_data(self, context_service, mock_db_client):
         """Test getting sample data from a table."""
         # Arrange
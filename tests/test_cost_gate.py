@@ -0,0 +1,77 @@
+"""Unit tests for CostGate and PlanSummary."""
+
+import json
+import pytest
+from unittest.mock import Mock
+from app.agents.cost_gate import CostGate, PlanSummary
+
+
+def explain_rows(plan):
+    """Build the row psycopg2 returns for EXPLAIN (FORMAT JSON)."""
+    return [{"QUERY PLAN": json.dumps([{"Plan": plan}])}]
+
+
+CROSS_JOIN_PLAN = {
+    "Node Type": "Nested Loop",
+    "Startup Cost": 0.0,
+    "Total Cost": 12525.5,
+    "Plan Rows": 1000000,
+    "Plans": [
+        {"Node Type": "Seq Scan", "Relation Name": "film", "Schema": "public"},
+        {
+            "Node Type": "Materialize",
+            "Plans": [
+                {"Node Type": "Seq Scan", "Relation Name": "actor", "Schema": "public"}
+            ],
+        },
+        {
+            "Node Type": "Index Scan",
+            "Relation Name": "payment",
+            "Schema": "billing",
+        },
+    ],
+}
+
+
+class TestCostGate:
+    """Test suite for CostGate."""
+
+    @pytest.fixture
+    def db_client(self):
+        """Create a mock database client returning the cross join plan."""
+        mock = Mock()
+        mock.run_sql.return_value = explain_rows(CROSS_JOIN_PLAN)
+        return mock
+
+    def test_explain_summarizes_plan(self, db_client):
+        """Test that the plan's estimates and scanned relations are extracted."""
+        # Act
+        plan = CostGate(db_client).explain("SELECT * FROM film, actor", 5000)
+
+        # Assert
+        db_client.run_sql.assert_called_once_with(
+            "EXPLAIN (FORMAT JSON) SELECT * FROM film, actor",
+            statement_timeout_ms=5000,
+            read_only=True,
+        )
+        assert plan.total_cost == 12525.5
+        assert plan.plan_rows == 1000000
+        assert plan.node_type == "Nested Loop"
+        assert plan.relations == ("film", "actor", "billing.payment")
+        assert plan.seq_scans == ("film", "actor")
+
+    def test_explain_accepts_parsed_json(self, db_client):
+        """Test plans already decoded by the driver."""
+        db_client.run_sql.return_value = [{"QUERY PLAN": [{"Plan": CROSS_JOIN_PLAN}]}]
+
+        assert CostGate(db_client).explain("SELECT 1").plan_rows == 1000000
+
+    def test_violation_checks_cost_then_rows(self):
+        """Test each threshold independently."""
+        plan = PlanSummary(
+            total_cost=500.0, startup_cost=0.0, plan_rows=50, node_type=""
+        )
+
+        assert CostGate(Mock(), max_cost=1000, max_rows=100).violation(plan) is None
+        assert "cost 500" in CostGate(Mock(), max_cost=100).violation(plan)
+        assert "50 rows" in CostGate(Mock(), max_rows=10).violation(plan)
@@ -4,9 +4,17 @@ These tests require a running PostgreSQL database.
 They test actual database connections and queries.
 """
 
+import io
 import pytest
+from unittest.mock import Mock
 from app.config import Config
-from app.core.db_client import DbClient
+from app.core.db_client import (
+    DatabaseUnavailableError,
+    DbClient,
+    QueryExecutionError,
+    QueryTimeoutError,
+)
+from app.core.resilience import CircuitOpenError
 
 
 @pytest.mark.integration
@@ -27,9 +35,10 @@ class TestDbClientIntegration:
         client.close()
 
     def test_connection_is_established(self, db_client):
-        """Test that database connection is successfully established."""
-        assert db_client.connection is not None
-        assert db_client.connection.closed == 0  # 0 means connection is open
+        """Test that the pool opened its minimum number of connections."""
+        stats = db_client.pool_stats()
+        assert stats["size"] >= stats["min_size"]
+        assert stats["in_use"] == 0
 
     def test_run_simple_query(self, db_client):
         """Test running a simple SELECT query."""
@@ -65,13 +74,49 @@ class TestDbClientIntegration:
         with pytest.raises(Exception, match="Query execution failed"):
             db_client.run_sql("SELECT * FROM nonexistent_table_xyz;")
 
+    def test_run_sql_columnar(self, db_client):
+        """Test fetching a result as column arrays."""
+        result = db_client.run_sql_columnar(
+            "SELECT * FROM (VALUES (1, 'a'), (2, 'b')) AS t(id, name)"
+        )
+
+        assert result.columns == ["id", "name"]
+        assert [list(values) for values in result.data] == [[1, 2], ["a", "b"]]
+
+    def test_copy_to_writes_csv(self, db_client):
+        """Test exporting a result with COPY as CSV with a header."""
+        destination = io.BytesIO()
+
+        rows = db_client.copy_to(
+            "SELECT * FROM (VALUES (1, 'a'), (2, NULL)) AS t(id, name);", destination
+        )
+
+        assert rows == 2
+        assert destination.getvalue() == b"id,name\n1,a\n2,\n"
+
+    def test_invalid_query_reports_sqlstate(self, db_client):
+        """Test that database errors carry their SQLSTATE."""
+        with pytest.raises(QueryExecutionError) as error:
+            db_client.run_sql("SELECT missing_column FROM pg_class")
+        assert error.value.pgcode == "42703"
+
     def test_connection_close(self, config):
-        """Test that connection can be closed properly."""
+        """Test that the connection pool can be closed properly."""
         client = DbClient(config)
-        assert client.connection is not None
+        assert not client.pool.closed
 
         client.close()
-        assert client.connection.closed == 1  # 1 means connection is closed
+        assert client.pool.closed
+        assert client.pool_stats()["idle"] == 0
+
+    def test_connections_are_reset_between_checkouts(self, db_client):
+        """Test that session settings do not leak into the next query."""
+        db_client.run_sql("SELECT set_config('application_name', 'leak', false);")
+        result = db_client.run_sql(
+            "SELECT current_setting('application_name') AS name;"
+        )
+
+        assert result[0]["name"] != "leak"
 
     def test_query_after_close_raises_exception(self, config):
         """Test that querying after close raises an exception."""
@@ -81,6 +126,181 @@ class TestDbClientIntegration:
         with pytest.raises(Exception):
             client.run_sql("SELECT 1;")
 
+    def test_stream_sql_yields_batches(self, db_client):
+        """Test streaming a result through a server-side cursor."""
+        batches = list(
+            db_client.stream_sql(
+                "SELECT g AS n FROM generate_series(1, 25) g;", batch_size=10
+            )
+        )
+
+        assert [len(batch) for batch in batches] == [10, 10, 5]
+        assert batches[-1][-1]["n"] == 25
+        assert db_client.pool_stats()["in_use"] == 0
+
+    def test_stream_sql_releases_connection_when_closed_early(self, db_client):
+        """Test that abandoning a stream returns its connection to the pool."""
+        stream = db_client.stream_sql(
+            "SELECT g FROM generate_series(1, 100) g;", batch_size=10
+        )
+        next(stream)
+        assert db_client.pool_stats()["in_use"] == 1
+
+        stream.close()
+
+        assert db_client.pool_stats()["in_use"] == 0
+
+    def test_max_rows_limits_result(self, db_client):
+        """Test that the row cap is applied on the server."""
+        result = db_client.run_sql(
+            "SELECT g FROM generate_series(1, 100) g ORDER BY g -- all rows",
+            max_rows=5,
+        )
+
+        assert [row["g"] for row in result] == [1, 2, 3, 4, 5]
+
+    def test_statement_timeout_raises_timeout_error(self, db_client):
+        """Test that a query over its timeout fails with QueryTimeoutError."""
+        with pytest.raises(QueryTimeoutError):
+            db_client.run_sql("SELECT pg_sleep(2);", statement_timeout_ms=50)
+
+        # The timeout is transaction-scoped and must not leak
+        result = db_client.run_sql("SELECT current_setting('statement_timeout') AS t;")
+        assert result[0]["t"] == "0"
+
+    def test_read_only_queries_go_to_replicas(self, config):
+        """Test that read-only queries run on a replica unless kept off them."""
+        # Arrange: the primary doubles as its own replica
+        config.DB_REPLICAS = [config.DB_HOST]
+        client = DbClient(config)
+
+        # Act
+        try:
+            client.run_sql("SELECT 1;", read_only=True)
+            client.run_sql("SELECT 1;")
+            client.run_sql("SELECT 1;", read_only=True, use_replica=False)
+            [replica] = client.replica_stats()
+        finally:
+            client.close()
+
+        # Assert
+        assert replica["healthy"]
+        assert replica["lag_seconds"] == 0.0
+        assert replica["queries"] == 1
+
+    def test_unreachable_replica_fails_over_to_primary(self, config):
+        """Test that a replica that can't be reached is skipped and marked down."""
+        config.DB_REPLICAS = ["127.0.0.1:1"]
+        client = DbClient(config)
+
+        try:
+            result = client.run_sql("SELECT 1 AS x;", read_only=True)
+            [replica] = client.replica_stats()
+        finally:
+            client.close()
+
+        assert result == [{"x": 1}]
+        assert not replica["healthy"]
+        assert replica["failures"] == 1
+
+    def test_dropped_replica_connection_fails_over(self, config):
+        """Test that a query on a dead replica connection is retried on the primary."""
+        # Arrange: kill the replica's pooled connection from the primary
+        config.DB_REPLICAS = [config.DB_HOST]
+        client = DbClient(config)
+        try:
+            pid = client.run_sql("SELECT pg_backend_pid() AS pid;", read_only=True)
+            client.run_sql(f"SELECT pg_terminate_backend({pid[0]['pid']});")
+
+            # Act
+            result = client.run_sql("SELECT 1 AS x;", read_only=True)
+            [replica] = client.replica_stats()
+        finally:
+            client.close()
+
+        # Assert
+        assert result == [{"x": 1}]
+        assert not replica["healthy"]
+        assert replica["queries"] == 1
+
+    def test_export_fails_over_when_replica_refuses_connections(self, config):
+        """Test that COPY moves on when a healthy replica stops accepting."""
+        # Arrange: the replica passed its check, then refuses new connections
+        config.DB_REPLICAS = [config.DB_HOST]
+        client = DbClient(config)
+        destination = io.BytesIO()
+        try:
+            client.run_sql("SELECT 1;", read_only=True)
+            [replica] = client.replicas.replicas
+            replica.pool.clear()
+            replica.pool._connect = Mock(
+                side_effect=DatabaseUnavailableError("connection refused")
+            )
+
+            # Act
+            rows = client.copy_to("SELECT 1 AS x", destination, read_only=True)
+            [stats] = client.replica_stats()
+        finally:
+            client.close()
+
+        # Assert
+        assert rows == 1
+        assert destination.getvalue() == b"x\n1\n"
+        assert not stats["healthy"]
+
+    def test_started_export_is_not_retried(self, config):
+        """Test that COPY failing once it started is not repeated elsewhere."""
+        # Arrange: kill the replica's pooled connection from the primary
+        config.DB_REPLICAS = [config.DB_HOST]
+        client = DbClient(config)
+        destination = io.BytesIO()
+        try:
+            pid = client.run_sql("SELECT pg_backend_pid() AS pid;", read_only=True)
+            client.run_sql(f"SELECT pg_terminate_backend({pid[0]['pid']});")
+
+            # Act & Assert
+            with pytest.raises(DatabaseUnavailableError):
+                client.copy_to("SELECT 1 AS x", destination, read_only=True)
+        finally:
+            client.close()
+
+    def test_read_only_query_is_retried_after_connection_loss(self, db_client):
+        """Test that an idempotent query survives its connection being killed."""
+        # Arrange: the server terminates the pooled connection
+        pid = db_client.run_sql("SELECT pg_backend_pid() AS pid;")[0]["pid"]
+        killer = DbClient(Config())
+        try:
+            killer.run_sql(f"SELECT pg_terminate_backend({pid});")
+        finally:
+            killer.close()
+
+        # Act
+        result = db_client.run_sql("SELECT 1 AS x;", read_only=True)
+
+        # Assert
+        assert result == [{"x": 1}]
+        assert db_client.breaker_stats()["state"] == "closed"
+
+    def test_breaker_fails_fast_while_database_is_down(self, config):
+        """Test that the circuit breaker rejects calls after repeated failures."""
+        # Arrange
+        config.DB_PORT = 1
+        config.DB_HOST = "127.0.0.1"
+        config.DB_CONNECT_RETRIES = 0
+        config.DB_QUERY_RETRIES = 0
+        config.DB_BREAKER_THRESHOLD = 2
+        client = DbClient(config)
+
+        # Act
+        with pytest.raises(DatabaseUnavailableError):
+            client.run_sql("SELECT 1;")
+
+        # Assert
+        with pytest.raises(CircuitOpenError):
+            client.run_sql("SELECT 1;")
+        assert client.breaker_stats()["state"] == "open"
+        client.close()
+
     def test_config_initialization(self, config):
         """Test that Config object is properly initialized."""
         assert hasattr(config, "DB_HOST")
@@ -103,8 +323,10 @@ class TestDbClientIntegration:
         config = Config()
         client = DbClient(config)
 
-        # Connection should fail, so connection should be None
-        assert client.connection is None
+        # Connection should fail, so the pool has nothing open
+        assert client.pool_stats()["size"] == 0
+        with pytest.raises(Exception):
+            client.run_sql("SELECT 1;")
 
 
 # Instructions for running these tests:
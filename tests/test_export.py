@@ -0,0 +1,119 @@
+"""Unit tests for COPY-based exports."""
+
+import io
+import threading
+import pytest
+from unittest.mock import Mock
+from app.core.columnar import ColumnarResult
+from app.core.export import ExportCancelledError, export_query, iter_export
+
+CSV = b'id,name,price,active,note\n1,Ada,2.50,t,\n2,Bob,,f,""\n'
+
+
+@pytest.fixture
+def db_client():
+    """Create a mock client whose COPY writes a fixed CSV document."""
+
+    def copy_to(query, destination, statement_timeout_ms=None, read_only=False):
+        for line in CSV.splitlines(keepends=True):
+            destination.write(line)
+        return 2
+
+    mock = Mock()
+    mock.copy_to.side_effect = copy_to
+    mock.run_sql_columnar.return_value = ColumnarResult(
+        columns=["id", "name", "price", "active", "note"],
+        data=[(), (), (), (), ()],
+        type_codes=[23, 25, 1700, 16, 25],
+    )
+    return mock
+
+
+class TestExportQuery:
+    """Test suite for export_query."""
+
+    def test_csv_is_written_through(self, db_client):
+        """Test that the server's CSV bytes reach the destination unchanged."""
+        destination = io.BytesIO()
+
+        rows = export_query(db_client, "SELECT 1", destination, "csv", 1000)
+
+        assert rows == 2
+        assert destination.getvalue() == CSV
+        db_client.copy_to.assert_called_once_with(
+            "SELECT 1", destination, 1000, read_only=True
+        )
+
+    def test_parquet_uses_result_types(self, db_client):
+        """Test CSV-to-Parquet conversion with types and NULL handling."""
+        # Arrange
+        pq = pytest.importorskip("pyarrow.parquet")
+        destination = io.BytesIO()
+
+        # Act
+        rows = export_query(db_client, "SELECT 1", destination, "parquet")
+
+        # Assert
+        assert rows == 2
+        table = pq.read_table(io.BytesIO(destination.getvalue()))
+        assert str(table.schema.field("id").type) == "int32"
+        assert table.to_pylist() == [
+            {"id": 1, "name": "Ada", "price": 2.5, "active": True, "note": None},
+            {"id": 2, "name": "Bob", "price": None, "active": False, "note": ""},
+        ]
+
+    def test_unknown_format(self, db_client):
+        """Test that only CSV and Parquet are accepted."""
+        with pytest.raises(ValueError, match="Unknown export format"):
+            export_query(db_client, "SELECT 1", io.BytesIO(), "xlsx")
+
+
+class TestIterExport:
+    """Test suite for iter_export."""
+
+    def test_yields_bytes_in_chunks(self):
+        """Test that small writes are grouped into chunks."""
+
+        def export(destination):
+            for _ in range(10):
+                destination.write(b"x" * 3)
+
+        chunks = list(iter_export(export, chunk_size=8))
+
+        assert b"".join(chunks) == b"x" * 30
+        assert all(len(chunk) >= 8 for chunk in chunks[:-1])
+
+    def test_export_error_is_raised_after_the_data(self):
+        """Test that a failing export surfaces its error to the reader."""
+
+        def export(destination):
+            destination.write(b"partial")
+            raise RuntimeError("COPY failed")
+
+        chunks = []
+        with pytest.raises(RuntimeError, match="COPY failed"):
+            for chunk in iter_export(export, chunk_size=4):
+                chunks.append(chunk)
+        assert chunks == [b"partial"]
+
+    def test_closing_the_iterator_cancels_the_export(self):
+        """Test that a reader going away stops the writing thread."""
+        # Arrange
+        cancelled = threading.Event()
+
+        def export(destination):
+            try:
+                while True:
+                    destination.write(b"x" * 10)
+            except ExportCancelledError:
+                cancelled.set()
+                raise
+
+        chunks = iter_export(export, chunk_size=10, max_chunks=1)
+
+        # Act
+        next(chunks)
+        chunks.close()
+
+        # Assert
+        assert cancelled.is_set()
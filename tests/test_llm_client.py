@@ -0,0 +1,75 @@
+"""Unit tests for LLMClient."""
+
+import pytest
+from unittest.mock import Mock
+from app.agents.llm_client import LLMClient
+from app.utils.metrics import LLM_TOKENS
+
+
+class TestLLMClient:
+    """Test suite for LLMClient."""
+
+    @pytest.fixture
+    def llm_client(self):
+        """Create an LLMClient whose model is a mock."""
+        client = LLMClient(api_key="test-key")
+        client.llm = Mock()
+        return client
+
+    def test_records_prompt_cache_tokens(self, llm_client):
+        """Test that cache reads and writes are counted separately."""
+        # Arrange
+        before = {
+            token_type: LLM_TOKENS.value(type=token_type)
+            for token_type in ("input", "output", "cache_read", "cache_write")
+        }
+        llm_client.llm.invoke.return_value = Mock(
+            content="SELECT 1",
+            usage_metadata={
+                "input_tokens": 1210,
+                "output_tokens": 5,
+                "input_token_details": {
+                    "cache_read": 1200,
+                    "cache_creation": 0,
+                    "ephemeral_5m_input_tokens": None,
+                },
+            },
+        )
+
+        # Act
+        sql_query = llm_client.generate_with_system_message(
+            [
+                {
+                    "type": "text",
+                    "text": "System",
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
+            "Question",
+        )
+
+        # Assert
+        assert sql_query == "SELECT 1"
+        assert LLM_TOKENS.value(type="input") - before["input"] == 1210
+        assert LLM_TOKENS.value(type="output") - before["output"] == 5
+        assert LLM_TOKENS.value(type="cache_read") - before["cache_read"] == 1200
+        assert LLM_TOKENS.value(type="cache_write") == before["cache_write"]
+        messages = llm_client.llm.invoke.call_args.args[0]
+        assert messages[0][1][0]["cache_control"] == {"type": "ephemeral"}
+
+    def test_stream_yields_text_of_chunks(self, llm_client):
+        """Test that streamed string and content-block chunks become text."""
+        # Arrange
+        llm_client.llm.stream.return_value = iter(
+            [
+                Mock(content="SELECT ", usage_metadata=None),
+                Mock(content=[{"type": "text", "text": "1"}], usage_metadata=None),
+                Mock(content="", usage_metadata=None),
+            ]
+        )
+
+        # Act
+        fragments = list(llm_client.stream_with_system_message("System", "Question"))
+
+        # Assert
+        assert fragments == ["SELECT ", "1"]
@@ -0,0 +1,92 @@
+"""Unit tests for the Prometheus metrics registry."""
+
+import pytest
+from app.utils.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry:
+    """Test suite for MetricsRegistry and its metric types."""
+
+    @pytest.fixture
+    def registry(self):
+        """Create an empty registry."""
+        return MetricsRegistry()
+
+    def test_counter_renders_labelled_samples(self, registry):
+        """Test that counters accumulate per label set."""
+        # Arrange
+        counter = registry.counter("requests_total", "Requests.", ["status"])
+
+        # Act
+        counter.inc(status="ok")
+        counter.inc(2, status="ok")
+        counter.inc(status="error")
+        output = registry.render()
+
+        # Assert
+        assert "# TYPE requests_total counter" in output
+        assert 'requests_total{status="ok"} 3' in output
+        assert 'requests_total{status="error"} 1' in output
+
+    def test_counter_rejects_negative_increment(self, registry):
+        """Test that counters cannot decrease."""
+        counter = registry.counter("requests_total", "Requests.")
+
+        with pytest.raises(ValueError):
+            counter.inc(-1)
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        """Test bucket, sum and count samples of a histogram."""
+        # Arrange
+        histogram = registry.histogram(
+            "latency_seconds", "Latency.", ["stage"], buckets=(0.1, 1.0)
+        )
+
+        # Act
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, stage="llm")
+        output = registry.render()
+
+        # Assert
+        assert 'latency_seconds_bucket{stage="llm",le="0.1"} 1' in output
+        assert 'latency_seconds_bucket{stage="llm",le="1"} 2' in output
+        assert 'latency_seconds_bucket{stage="llm",le="+Inf"} 3' in output
+        assert 'latency_seconds_sum{stage="llm"} 5.55' in output
+        assert 'latency_seconds_count{stage="llm"} 3' in output
+
+    def test_histogram_time_observes_on_error(self, registry):
+        """Test that timed blocks are recorded even when they raise."""
+        histogram = registry.histogram("latency_seconds", "Latency.")
+
+        with pytest.raises(RuntimeError):
+            with histogram.time():
+                raise RuntimeError("boom")
+
+        assert histogram.count() == 1
+
+    def test_wrong_labels_rejected(self, registry):
+        """Test that samples must provide exactly the declared labels."""
+        counter = registry.counter("requests_total", "Requests.", ["status"])
+
+        with pytest.raises(ValueError):
+            counter.inc(code="200")
+
+    def test_registering_twice_returns_same_metric(self, registry):
+        """Test that metrics are registered once per name."""
+        first = registry.counter("requests_total", "Requests.")
+
+        assert registry.counter("requests_total", "Requests.") is first
+        with pytest.raises(ValueError):
+            registry.gauge("requests_total", "Requests.")
+
+    def test_collectors_run_before_render(self, registry):
+        """Test that collectors refresh gauges on every scrape."""
+        # Arrange
+        gauge = registry.gauge("pool_connections", "Connections.", ["state"])
+        registry.set_collector("pool", lambda: gauge.set(4, state="idle"))
+
+        # Act
+        output = registry.render()
+
+        # Assert
+        assert 'pool_connections{state="idle"} 4' in output
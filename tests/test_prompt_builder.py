@@ -60,3 +60,54 @@ Table: posts
         guidelines = ["SELECT", "read-only", "PostgreSQL", "JOINs", "WHERE", "LIMIT"]
         for guideline in guidelines:
             assert guideline in result
+
+    def test_cached_system_message_marks_cache_breakpoint(
+        self, prompt_builder, sample_schema
+    ):
+        """Test that the schema prompt is one cacheable content block."""
+        blocks = prompt_builder.build_cached_system_message(sample_schema, "v1")
+
+        assert len(blocks) == 1
+        assert blocks[0]["text"] == prompt_builder.build_system_message(sample_schema)
+        assert blocks[0]["cache_control"] == {"type": "ephemeral"}
+
+    def test_cached_system_message_rebuilt_only_on_schema_change(
+        self, prompt_builder, sample_schema
+    ):
+        """Test that the prefix is reused until the fingerprint changes."""
+        # Act
+        first = prompt_builder.build_cached_system_message(sample_schema, "v1")
+        second = prompt_builder.build_cached_system_message(sample_schema, "v1")
+        changed = prompt_builder.build_cached_system_message(sample_schema, "v2")
+
+        # Assert
+        assert second is first
+        assert changed is not first
+
+    def test_build_retry_message(self, prompt_builder):
+        """Test that a retry carries the question, rejected SQL and problem."""
+        result = prompt_builder.build_retry_message(
+            "Show me all users", "SELECT * FROM users, posts", "Too expensive"
+        )
+
+        assert "Show me all users" in result
+        assert "SELECT * FROM users, posts" in result
+        assert "Problem: Too expensive" in result
+
+    def test_build_rejection_message(self, prompt_builder):
+        """Test that the rejection names the SQL and problem, not the question."""
+        result = prompt_builder.build_rejection_message(
+            "SELECT * FROM users, posts", "Too expensive"
+        )
+
+        assert result.startswith("This query was rejected:\nSELECT * FROM users, posts")
+        assert "Problem: Too expensive" in result
+
+    def test_add_value_hints(self, prompt_builder):
+        """Test appending profiled column values to a user message."""
+        message = prompt_builder.build_user_message("How many active users?")
+
+        result = prompt_builder.add_value_hints(message, "- users.status: 'active'")
+
+        assert result.startswith(message)
+        assert result.endswith("exact spellings):\n- users.status: 'active'")
@@ -0,0 +1,90 @@
+"""Unit tests for read replica selection."""
+
+import pytest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, Mock
+from app.core.replicas import Replica, ReplicaSet
+
+
+def make_replica(name, lag=0.0, fail=False):
+    """Create a replica whose pool answers the lag query (or fails to connect)."""
+    cursor = MagicMock()
+    cursor.__enter__.return_value = cursor
+    cursor.fetchone.return_value = (lag,)
+    connection = Mock()
+    connection.cursor.return_value = cursor
+
+    @contextmanager
+    def checkout():
+        if fail:
+            raise Exception("connection refused")
+        yield connection
+
+    pool = Mock()
+    pool.connection.side_effect = checkout
+    pool.stats.return_value = {}
+    return Replica(name, pool)
+
+
+class TestReplicaSet:
+    """Test suite for ReplicaSet."""
+
+    @pytest.fixture
+    def replicas(self):
+        """Create two healthy replicas and one lagging behind."""
+        return [
+            make_replica("a:5432"),
+            make_replica("b:5432"),
+            make_replica("c:5432", lag=120.0),
+        ]
+
+    def test_candidates_rotate_and_skip_lagging(self, replicas):
+        """Test round-robin order over replicas within the lag limit."""
+        replica_set = ReplicaSet(replicas, max_lag=30, check_interval=60)
+
+        first = [replica.name for replica in replica_set.candidates()]
+        second = [replica.name for replica in replica_set.candidates()]
+
+        assert first == ["a:5432", "b:5432"]
+        assert second == ["b:5432", "a:5432"]
+
+    def test_replicas_are_checked_once_per_interval(self, replicas):
+        """Test that the lag query is not run on every selection."""
+        replica_set = ReplicaSet(replicas, check_interval=60)
+
+        replica_set.candidates()
+        replica_set.candidates()
+
+        assert replicas[0].pool.connection.call_count == 1
+        assert replica_set.stats()[2]["lag_seconds"] == 120.0
+
+    def test_unreachable_replica_is_marked_down(self):
+        """Test that a failed check excludes the replica and drops its connections."""
+        # Arrange
+        down = make_replica("down:5432", fail=True)
+        replica_set = ReplicaSet([down, make_replica("up:5432")])
+
+        # Act
+        candidates = replica_set.candidates()
+
+        # Assert
+        assert [replica.name for replica in candidates] == ["up:5432"]
+        assert replica_set.stats()[0]["error"] == "connection refused"
+        down.pool.clear.assert_called_once()
+
+    def test_marked_down_replica_returns_after_successful_check(self, replicas):
+        """Test that a replica is used again once a check reaches it."""
+        replica_set = ReplicaSet(replicas[:1], check_interval=0)
+        replica_set.mark_down(replicas[0], Exception("server closed the connection"))
+
+        candidates = replica_set.candidates()
+
+        assert candidates == replicas[:1]
+        assert replicas[0].healthy
+        assert replicas[0].failures == 1
+
+    def test_no_usable_replica(self, replicas):
+        """Test that an empty list is returned when every replica lags."""
+        replica_set = ReplicaSet(replicas[2:], max_lag=30)
+
+        assert replica_set.candidates() == []
@@ -0,0 +1,95 @@
+"""Unit tests for retry backoff and the circuit breaker."""
+
+import pytest
+from unittest.mock import patch
+from app.core.resilience import CircuitBreaker, CircuitOpenError, backoff_delay
+
+
+class TestBackoffDelay:
+    """Test suite for backoff_delay."""
+
+    def test_delay_grows_exponentially_up_to_cap(self):
+        """Test the upper bound of the jittered delay."""
+        with patch("app.core.resilience.random.uniform", side_effect=lambda a, b: b):
+            delays = [backoff_delay(attempt, 0.1, 0.5) for attempt in range(4)]
+
+        assert delays == pytest.approx([0.1, 0.2, 0.4, 0.5])
+
+    def test_delay_is_jittered(self):
+        """Test that delays fall anywhere between zero and the bound."""
+        delays = {backoff_delay(3, 1.0, 10.0) for _ in range(20)}
+
+        assert len(delays) > 1
+        assert all(0 <= delay <= 8.0 for delay in delays)
+
+
+class TestCircuitBreaker:
+    """Test suite for CircuitBreaker."""
+
+    @pytest.fixture
+    def clock(self):
+        """Patch the monotonic clock with a controllable one."""
+        now = [1000.0]
+        with patch("app.core.resilience.time.monotonic", side_effect=lambda: now[0]):
+            yield now
+
+    @pytest.fixture
+    def breaker(self, clock):
+        """Create a breaker opening after 3 failures for 30 seconds."""
+        return CircuitBreaker("Database test", failure_threshold=3, reset_timeout=30)
+
+    def fail(self, breaker, times):
+        """Record several failed calls."""
+        for _ in range(times):
+            breaker.before_call()
+            breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self, breaker):
+        """Test that calls are rejected once the threshold is reached."""
+        # Arrange
+        self.fail(breaker, 2)
+        breaker.record_success()
+        self.fail(breaker, 3)
+
+        # Act / Assert
+        with pytest.raises(CircuitOpenError) as error:
+            breaker.before_call()
+        assert error.value.retry_after == 30
+        assert breaker.stats()["state"] == "open"
+        assert breaker.stats()["rejected"] == 1
+
+    def test_half_open_lets_one_probe_through(self, breaker, clock):
+        """Test that one call probes the dependency after the reset timeout."""
+        # Arrange
+        self.fail(breaker, 3)
+        clock[0] += 30
+
+        # Act
+        breaker.before_call()
+
+        # Assert: a second caller is rejected while the probe runs
+        assert breaker.state == "half_open"
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == "closed"
+        breaker.before_call()
+
+    def test_failed_probe_reopens(self, breaker, clock):
+        """Test that a failing probe opens the breaker for another period."""
+        self.fail(breaker, 3)
+        clock[0] += 30
+
+        self.fail(breaker, 1)
+
+        assert breaker.state == "open"
+        assert breaker.stats()["retry_in_seconds"] == 30.0
+
+    def test_disabled_breaker_never_opens(self, clock):
+        """Test a breaker without a threshold."""
+        breaker = CircuitBreaker("Database test", failure_threshold=None)
+
+        self.fail(breaker, 100)
+
+        breaker.before_call()
+        assert breaker.state == "closed"
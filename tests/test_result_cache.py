@@ -0,0 +1,183 @@
+"""Unit tests for ResultCache and TableVersionTracker."""
+
+import pytest
+from unittest.mock import Mock, patch
+from app.agents.result_cache import (
+    ResultCache,
+    TableChangeListener,
+    TableVersionTracker,
+    estimate_size,
+)
+
+
+def stats_rows(**versions):
+    """Build pg_stat_user_tables rows for public tables."""
+    return [
+        {"schemaname": "public", "relname": table, "version": version}
+        for table, version in versions.items()
+    ]
+
+
+class TestTableVersionTracker:
+    """Test suite for TableVersionTracker."""
+
+    def test_versions_keyed_with_and_without_schema(self):
+        """Test that public tables resolve both qualified and bare."""
+        # Arrange
+        db_client = Mock()
+        db_client.run_sql.return_value = stats_rows(film="1:0:0:1:0")
+
+        # Act
+        versions = TableVersionTracker(db_client).versions()
+
+        # Assert
+        assert versions == {"public.film": "1:0:0:1:0", "film": "1:0:0:1:0"}
+
+    def test_polls_at_most_once_per_interval(self):
+        """Test that the statistics view is not queried on every lookup."""
+        # Arrange
+        db_client = Mock()
+        db_client.run_sql.return_value = stats_rows(film="1")
+        tracker = TableVersionTracker(db_client, check_interval=60)
+
+        # Act
+        tracker.versions()
+        tracker.versions()
+
+        # Assert
+        db_client.run_sql.assert_called_once()
+
+
+class TestResultCache:
+    """Test suite for ResultCache."""
+
+    @pytest.fixture
+    def tracker(self):
+        """Tracker stub whose table versions tests can change."""
+        tracker = Mock()
+        tracker.versions.return_value = {"film": "1", "actor": "1"}
+        return tracker
+
+    @pytest.fixture
+    def cache(self, tracker):
+        """Create a ResultCache with a small budget."""
+        return ResultCache(tracker, max_bytes=100_000, ttl=60)
+
+    def store(self, cache, key, rows, tables=("film",)):
+        """Snapshot and store rows, as the agent does around execution."""
+        return cache.put(key, rows, cache.snapshot(tables))
+
+    def test_hit_after_store(self, cache):
+        """Test that stored rows are returned for the same key."""
+        # Arrange
+        rows = [{"film_id": 1}]
+        self.store(cache, "k", rows)
+
+        # Act
+        cached = cache.get("k")
+
+        # Assert
+        assert cached == rows
+        assert cache.stats()["hits"] == 1
+
+    def test_table_change_invalidates(self, cache, tracker):
+        """Test that an entry is dropped once a table it reads changes."""
+        # Arrange
+        self.store(cache, "films", [{"film_id": 1}], tables=("film",))
+        self.store(cache, "actors", [{"actor_id": 1}], tables=("actor",))
+        tracker.versions.return_value = {"film": "2", "actor": "1"}
+
+        # Act & Assert
+        assert cache.get("films") is None
+        assert cache.get("actors") == [{"actor_id": 1}]
+        assert cache.stats()["invalidations"] == 1
+
+    def test_ttl_expiry(self, cache):
+        """Test that entries expire after the TTL."""
+        with patch("app.agents.result_cache.time.monotonic", return_value=1000.0):
+            self.store(cache, "k", [{"film_id": 1}])
+
+        with patch("app.agents.result_cache.time.monotonic", return_value=1061.0):
+            assert cache.get("k") is None
+
+    def test_untracked_tables_are_not_cached(self, cache):
+        """Test that queries over views or unknown relations are skipped."""
+        # Act
+        stored = self.store(cache, "k", [{"n": 1}], tables=("film_list",))
+
+        # Assert
+        assert not stored
+        assert cache.get("k") is None
+        assert cache.stats()["uncacheable"] == 1
+
+    def test_queries_without_tables_are_not_cached(self, cache):
+        """Test that a query reading no tracked table is never stored."""
+        # Act
+        stored = self.store(cache, "k", [{"n": 1}], tables=())
+
+        # Assert
+        assert not stored
+        assert cache.get("k") is None
+        assert cache.stats()["uncacheable"] == 1
+
+    def test_memory_budget_evicts_least_recently_used(self, tracker):
+        """Test LRU eviction once the byte budget is exceeded."""
+        # Arrange
+        rows = [{"title": "x" * 100} for _ in range(10)]
+        budget = int(estimate_size(rows) * 2.5)
+        cache = ResultCache(tracker, max_bytes=budget, max_entry_fraction=1.0)
+        self.store(cache, "a", rows)
+        self.store(cache, "b", rows)
+        cache.get("a")
+
+        # Act
+        self.store(cache, "c", rows)
+
+        # Assert
+        assert cache.get("b") is None
+        assert cache.get("a") == rows
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["bytes"] <= budget
+
+    def test_oversized_results_are_not_cached(self, tracker):
+        """Test that one result cannot take more than its share of the budget."""
+        cache = ResultCache(tracker, max_bytes=1000, max_entry_fraction=0.5)
+
+        assert not self.store(cache, "k", [{"title": "x" * 1000}])
+        assert cache.stats()["oversized"] == 1
+
+    def test_invalidate_table(self, cache):
+        """Test explicit invalidation of every entry reading a table."""
+        self.store(cache, "films", [{"film_id": 1}], tables=("film", "actor"))
+        self.store(cache, "other", [{"n": 1}], tables=("film",))
+
+        assert cache.invalidate_table("actor") == 1
+        assert cache.get("films") is None
+        assert cache.get("other") == [{"n": 1}]
+
+    def test_volatile_functions_are_not_deterministic(self):
+        """Test detection of SQL whose result changes on every run."""
+        assert not ResultCache.is_deterministic("select now ( )")
+        assert ResultCache.is_deterministic("select count ( * ) from film")
+
+
+class TestTableChangeListener:
+    """Test suite for TableChangeListener."""
+
+    def test_handle_invalidates_qualified_and_bare_names(self):
+        """Test that a notification drops entries however the table was named."""
+        # Arrange
+        tracker = Mock()
+        tracker.versions.return_value = {"film": "1", "public.film": "1"}
+        cache = ResultCache(tracker)
+        cache.put("bare", [{"n": 1}], cache.snapshot(["film"]))
+        cache.put("qualified", [{"n": 1}], cache.snapshot(["public.film"]))
+        listener = TableChangeListener(Mock(), cache)
+
+        # Act
+        dropped = listener.handle("public.film")
+
+        # Assert
+        assert dropped == 2
+        assert cache.stats()["entries"] == 0
@@ -0,0 +1,336 @@
+"""Unit tests for the API routes, with a mocked agent."""
+
+import json
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, Mock
+from app.agents.text_to_sql_agent import BatchItem, QueryResult
+from app.api import routes
+from app.core.columnar import ARROW_STREAM_MEDIA_TYPE, ColumnarResult
+from app.core.connection_pool import PoolTimeoutError
+from app.core.db_client import DatabaseUnavailableError, QueryTimeoutError
+from app.core.resilience import CircuitOpenError
+
+
+class TestRoutes:
+    """Test suite for the API routes."""
+
+    @pytest.fixture
+    def mock_agent(self):
+        """Create a mock agent without caches or a cost gate."""
+        return Mock()
+
+    @pytest.fixture
+    def client(self, monkeypatch, mock_agent):
+        """Create a TestClient serving the mock agent as the default database.
+
+        The startup hook is not run, so no database or LLM is needed.
+        """
+        monkeypatch.setattr(routes, "agents", {routes.DEFAULT_DATABASE: mock_agent})
+        monkeypatch.setattr(
+            routes, "config", Mock(BATCH_MAX_QUESTIONS=3, BATCH_MAX_CONCURRENCY=2)
+        )
+        return TestClient(routes.app)
+
+    @staticmethod
+    def sse(response):
+        """Parse a text/event-stream body into (event, data) pairs."""
+        events = []
+        for block in response.text.strip().split("\n\n"):
+            event, data = block.split("\n")
+            events.append((event[len("event: ") :], json.loads(data[len("data: ") :])))
+        return events
+
+    @staticmethod
+    def prepared(sql_query, *tokens, error=None):
+        """Fake ``astream_prepare`` yielding tokens, then a result or an error."""
+
+        async def astream_prepare(question):
+            for token in tokens:
+                yield "token", token
+            if error is not None:
+                raise error
+            yield "validated", QueryResult(question, sql_query)
+
+        return astream_prepare
+
+    def test_ask_questions_maps_errors_per_item(self, client, mock_agent):
+        """Test that each failed question carries its own HTTP status."""
+        # Arrange
+        mock_agent.aexecute_many = AsyncMock(
+            return_value=[
+                BatchItem(
+                    "How many users?",
+                    result=QueryResult(
+                        "How many users?", "SELECT count(*) FROM users", [{"n": 2}]
+                    ),
+                ),
+                BatchItem("Drop users", error=ValueError("Only SELECT queries")),
+                BatchItem("All events", error=QueryTimeoutError("Query cancelled")),
+            ]
+        )
+
+        # Act
+        response = client.post(
+            "/ask_questions",
+            json={"questions": ["How many users?", "Drop users", "All events"]},
+        )
+
+        # Assert
+        assert response.status_code == 200
+        body = response.json()
+        assert [item["status_code"] for item in body["results"]] == [200, 400, 504]
+        assert body["results"][0]["results"] == [{"n": 2}]
+        assert body["results"][1]["error"] == "Only SELECT queries"
+        assert body["results"][1]["sql_query"] is None
+        assert (body["count"], body["unique_count"], body["failed"]) == (3, 3, 2)
+        mock_agent.aexecute_many.assert_awaited_once_with(
+            ["How many users?", "Drop users", "All events"], max_concurrency=2
+        )
+
+    def test_ask_questions_counts_operator_variants_as_unique(self, client, mock_agent):
+        """Test that questions differing only by an operator are not duplicates."""
+        # Arrange
+        questions = ["Orders over > 100", "Orders over < 100", "orders over > 100?"]
+        mock_agent.aexecute_many = AsyncMock(
+            return_value=[BatchItem(q, error=ValueError("no")) for q in questions]
+        )
+
+        # Act
+        response = client.post("/ask_questions", json={"questions": questions})
+
+        # Assert
+        assert response.json()["unique_count"] == 2
+
+    @pytest.mark.parametrize(
+        "questions, detail",
+        [([], "No questions provided"), (["a", "b", "c", "d"], "at most 3")],
+    )
+    def test_ask_questions_rejects_empty_and_oversized_batches(
+        self, client, mock_agent, questions, detail
+    ):
+        """Test that batches outside the limits are rejected with 400."""
+        response = client.post("/ask_questions", json={"questions": questions})
+
+        assert response.status_code == 400
+        assert detail in response.json()["detail"]
+        mock_agent.aexecute_many.assert_not_called()
+
+    def test_sse_streams_tokens_then_rows(self, client, mock_agent):
+        """Test the event order: tokens, validated SQL, row batches, end."""
+        # Arrange
+        mock_agent.astream_prepare = self.prepared("SELECT id FROM t", "SELECT", " id")
+        mock_agent.stream_rows.return_value = iter(
+            [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+        )
+
+        # Act
+        response = client.post(
+            "/ask_question/sse?batch_size=2", json={"question": "Ids"}
+        )
+
+        # Assert
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = self.sse(response)
+        assert [event for event, _ in events] == [
+            "token",
+            "token",
+            "validated",
+            "rows",
+            "rows",
+            "end",
+        ]
+        assert events[0][1] == {"text": "SELECT"}
+        assert events[2][1]["sql_query"] == "SELECT id FROM t"
+        assert events[4][1] == [{"id": 3}]
+        assert events[5][1] == {"row_count": 3}
+        assert mock_agent.stream_rows.call_args.kwargs["batch_size"] == 2
+
+    def test_sse_reports_rejected_sql_in_band(self, client, mock_agent):
+        """Test that a validation failure after tokens becomes an error event."""
+        # Arrange
+        mock_agent.astream_prepare = self.prepared(
+            None, "DROP", error=ValueError("Only SELECT queries are allowed")
+        )
+
+        # Act
+        response = client.post("/ask_question/sse", json={"question": "Drop it"})
+
+        # Assert
+        assert response.status_code == 200
+        assert self.sse(response) == [
+            ("token", {"text": "DROP"}),
+            (
+                "error",
+                {"status_code": 400, "detail": "Only SELECT queries are allowed"},
+            ),
+        ]
+        mock_agent.stream_rows.assert_not_called()
+
+    def test_sse_reports_failed_fetch_in_band(self, client, mock_agent):
+        """Test that a timeout while streaming rows ends with an error event."""
+        # Arrange
+        mock_agent.astream_prepare = self.prepared("SELECT id FROM t")
+
+        def rows(result, batch_size):
+            yield [{"id": 1}]
+            raise QueryTimeoutError("Query cancelled after 10 ms")
+
+        mock_agent.stream_rows.side_effect = rows
+
+        # Act
+        response = client.post("/ask_question/sse", json={"question": "Ids"})
+
+        # Assert
+        events = self.sse(response)
+        assert [event for event, _ in events] == ["validated", "rows", "error"]
+        assert events[-1][1]["status_code"] == 504
+
+    @pytest.mark.parametrize(
+        "format, accept, expected",
+        [
+            (None, None, "rows"),
+            (None, "application/json", "rows"),
+            (None, routes.COLUMNS_MEDIA_TYPE, "columns"),
+            (None, f"{ARROW_STREAM_MEDIA_TYPE}, application/json", "arrow"),
+            ("rows", routes.COLUMNS_MEDIA_TYPE, "rows"),
+            ("columns", ARROW_STREAM_MEDIA_TYPE, "columns"),
+        ],
+    )
+    def test_negotiate_format(self, format, accept, expected):
+        """Test that the query parameter wins over the Accept header."""
+        assert routes.negotiate_format(format, accept) == expected
+
+    def test_negotiate_format_rejects_unknown_format(self):
+        """Test that an unknown format is a 400."""
+        with pytest.raises(HTTPException) as error:
+            routes.negotiate_format("xml", None)
+        assert error.value.status_code == 400
+
+    def test_negotiate_format_needs_pyarrow_for_arrow(self, monkeypatch):
+        """Test that Arrow is refused with 406 when pyarrow is missing."""
+        monkeypatch.setattr(routes.importlib.util, "find_spec", lambda name: None)
+
+        with pytest.raises(HTTPException) as error:
+            routes.negotiate_format(None, ARROW_STREAM_MEDIA_TYPE)
+        assert error.value.status_code == 406
+        assert routes.negotiate_format("columns", None) == "columns"
+
+    def test_ask_question_returns_columns_for_accept_header(self, client, mock_agent):
+        """Test that the Accept header selects column arrays end to end."""
+        # Arrange
+        result = QueryResult("Ids", "SELECT id FROM t")
+        result.columnar = ColumnarResult(columns=["id"], data=[[1, 2]], type_codes=[23])
+        mock_agent.aanswer = AsyncMock(return_value=result)
+
+        # Act
+        response = client.post(
+            "/ask_question",
+            json={"question": "Ids"},
+            headers={"Accept": routes.COLUMNS_MEDIA_TYPE},
+        )
+
+        # Assert
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["columns"], body["data"], body["row_count"]) == (
+            ["id"],
+            [[1, 2]],
+            2,
+        )
+        mock_agent.aanswer.assert_awaited_once_with("Ids", columnar=True)
+
+    def test_ask_question_rejects_unknown_format(self, client, mock_agent):
+        """Test that a bad format fails before the question is answered."""
+        response = client.post("/ask_question?format=xml", json={"question": "Ids"})
+
+        assert response.status_code == 400
+        mock_agent.aanswer.assert_not_called()
+
+    def test_export_streams_file_with_sql_header(self, client, mock_agent):
+        """Test that an export is sent as an attachment with the SQL in a header."""
+        # Arrange
+        mock_agent.aprepare = AsyncMock(
+            return_value=QueryResult("Ids", "SELECT id\nFROM t")
+        )
+        mock_agent.iter_export.return_value = iter([b"id\n", b"1\n2\n"])
+
+        # Act
+        response = client.post("/ask_question/export", json={"question": "Ids"})
+
+        # Assert
+        assert response.status_code == 200
+        assert response.content == b"id\n1\n2\n"
+        assert response.headers["content-type"].startswith("text/csv")
+        assert response.headers["content-disposition"] == (
+            'attachment; filename="result.csv"'
+        )
+        assert response.headers["x-sql-query"] == "SELECT%20id%20FROM%20t"
+        mock_agent.iter_export.assert_called_once_with(
+            mock_agent.aprepare.return_value, "csv"
+        )
+
+    def test_export_rejects_unknown_format(self, client, mock_agent):
+        """Test that an unknown export format is a 400."""
+        response = client.post(
+            "/ask_question/export?format=xlsx", json={"question": "Ids"}
+        )
+
+        assert response.status_code == 400
+        mock_agent.aprepare.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "path",
+        [
+            "/ask_question",
+            "/ask_question/stream",
+            "/ask_question/export",
+            "/ask_question/sse",
+        ],
+    )
+    def test_unknown_database_is_not_found(self, client, mock_agent, path):
+        """Test that naming a database that is not configured is a 404."""
+        response = client.post(path, json={"question": "Ids", "database": "sales"})
+
+        assert response.status_code == 404
+        assert "Unknown database 'sales'" in response.json()["detail"]
+        mock_agent.aanswer.assert_not_called()
+
+    def test_named_database_gets_its_own_agent(self, client, mock_agent):
+        """Test that a request is answered by the named database's agent."""
+        # Arrange
+        sales_agent = Mock()
+        sales_agent.aanswer = AsyncMock(return_value=QueryResult("Ids", "SELECT 1"))
+        routes.agents["sales"] = sales_agent
+
+        # Act
+        response = client.post(
+            "/ask_question", json={"question": "Ids", "database": "sales"}
+        )
+
+        # Assert
+        assert response.status_code == 200
+        sales_agent.aanswer.assert_awaited_once()
+        mock_agent.aanswer.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "error, retry_after",
+        [
+            (CircuitOpenError("Database app is unavailable", retry_after=4.2), "5"),
+            (DatabaseUnavailableError("Failed to connect to PostgreSQL"), None),
+            (PoolTimeoutError("No connection available within 5s"), None),
+        ],
+    )
+    def test_unavailable_database_is_503(self, client, mock_agent, error, retry_after):
+        """Test that an unreachable database is a 503, with Retry-After if known."""
+        # Arrange
+        mock_agent.aanswer = AsyncMock(side_effect=error)
+
+        # Act
+        response = client.post("/ask_question", json={"question": "Ids"})
+
+        # Assert
+        assert response.status_code == 503
+        assert response.json()["detail"] == str(error)
+        assert response.headers.get("retry-after") == retry_after
@@ -0,0 +1,200 @@
+"""Unit tests for the schema renderers and the token estimator."""
+
+import pytest
+from app.agents.schema_formats import (
+    SCHEMA_FORMATS,
+    build_tables,
+    estimate_tokens,
+    render_schema,
+    shared_columns,
+)
+
+
+class TestSchemaFormats:
+    """Test suite for schema_formats."""
+
+    @pytest.fixture
+    def tables(self):
+        """A small schema with keys, an index, a comment and a shared column."""
+        columns = [
+            ("actor", "actor_id", "integer", "NO"),
+            ("actor", "name", "character varying", "NO"),
+            ("actor", "last_update", "timestamp with time zone", "NO"),
+            ("film", "film_id", "integer", "NO"),
+            ("film", "title", "text", "NO"),
+            ("film", "rating", "text", "YES"),
+            ("film", "last_update", "timestamp with time zone", "NO"),
+            ("film_actor", "actor_id", "integer", "NO"),
+            ("film_actor", "film_id", "integer", "NO"),
+            ("film_actor", "last_update", "timestamp with time zone", "NO"),
+        ]
+        schema_info = [
+            {
+                "table_name": table,
+                "column_name": column,
+                "data_type": data_type,
+                "is_nullable": nullable,
+            }
+            for table, column, data_type, nullable in columns
+        ]
+        foreign_keys = [
+            {
+                "table_name": "film_actor",
+                "column_name": column,
+                "referenced_table": table,
+                "referenced_column": column,
+            }
+            for table, column in [("actor", "actor_id"), ("film", "film_id")]
+        ]
+        comments = [
+            {"table_name": "film", "column_name": "rating", "description": "MPAA"}
+        ]
+        indexes = [
+            {
+                "table_name": table,
+                "index_name": f"{table}_pkey",
+                "is_primary": True,
+                "is_unique": True,
+                "method": "btree",
+                "columns": key,
+                "predicate": None,
+            }
+            for table, key in [
+                ("actor", ["actor_id"]),
+                ("film", ["film_id"]),
+                ("film_actor", ["actor_id", "film_id"]),
+            ]
+        ] + [
+            {
+                "table_name": "film",
+                "index_name": "film_title_idx",
+                "is_primary": False,
+                "is_unique": False,
+                "method": "btree",
+                "columns": ["title"],
+                "predicate": None,
+            }
+        ]
+        table_stats = [
+            {"table_name": "film", "kind": "r", "row_estimate": 16044},
+        ]
+        return build_tables(
+            schema_info, foreign_keys, comments, indexes, table_stats
+        ).values()
+
+    def test_build_tables_combines_catalog(self, tables):
+        """Test that keys, comments and estimates end up on the right table."""
+        actor, film, film_actor = tables
+
+        assert [column.name for column in film.columns] == [
+            "film_id",
+            "title",
+            "rating",
+            "last_update",
+        ]
+        assert film.row_estimate == 16044
+        assert film.columns[2].comment == "MPAA"
+        assert [index["index_name"] for index in film.indexes] == ["film_title_idx"]
+        assert all(column.primary_key for column in film_actor.columns[:2])
+        assert film_actor.columns[0].references == ["actor.actor_id"]
+        assert actor.row_estimate is None
+
+    def test_verbose_format(self, tables):
+        """Test the one-line-per-column layout."""
+        schema = render_schema(tables, "verbose")
+
+        assert schema.startswith("Database Schema:\n\nTable: actor\n")
+        assert "Table: film (~16,044 rows)\n  - film_id (integer) NOT NULL PK" in schema
+        assert "  - rating (text) NULL -- MPAA" in schema
+        assert "  - actor_id (integer) NOT NULL PK FK -> actor.actor_id" in schema
+        assert "  Indexes: (title)" in schema
+
+    def test_ddl_format(self, tables):
+        """Test CREATE TABLE statements with abbreviated types."""
+        schema = render_schema(tables, "ddl")
+
+        assert (
+            "-- ~16,044 rows\n"
+            "CREATE TABLE film (\n"
+            "  film_id int PRIMARY KEY,\n"
+            "  title text NOT NULL,\n"
+            "  rating text, -- MPAA\n"
+            "  last_update timestamptz NOT NULL\n"
+            ");\n"
+            "CREATE INDEX ON film (title);"
+        ) in schema
+        assert "  PRIMARY KEY (actor_id, film_id)\n);" in schema
+        assert "actor_id int NOT NULL REFERENCES actor(actor_id)," in schema
+
+    def test_compact_format_types_shared_columns_once(self, tables):
+        """Test one line per table with shared columns typed in the header."""
+        schema = render_schema(tables, "compact")
+
+        lines = schema.splitlines()
+        assert lines[2] == "Shared columns, typed here once: last_update timestamptz!"
+        assert lines[3] == "actor: actor_id int PK, name varchar!, last_update"
+        assert lines[4] == (
+            'film ~16k: film_id int PK, title text!, rating text "MPAA", '
+            "last_update; idx (title)"
+        )
+        assert lines[5] == (
+            "film_actor: actor_id int PK -> actor.actor_id, "
+            "film_id int PK -> film.film_id, last_update"
+        )
+
+    def test_user_defined_and_array_types_are_named(self):
+        """Test that enums, extension types and arrays show their real type."""
+        # Arrange
+        schema_info = [
+            {
+                "table_name": "orders",
+                "column_name": column,
+                "data_type": data_type,
+                "udt_name": udt_name,
+                "is_nullable": "NO",
+            }
+            for column, data_type, udt_name in [
+                ("status", "USER-DEFINED", "order_status"),
+                ("email", "USER-DEFINED", "citext"),
+                ("item_ids", "ARRAY", "_int4"),
+                ("tags", "ARRAY", "_varchar"),
+            ]
+        ]
+        [orders] = build_tables(schema_info).values()
+
+        # Act & Assert
+        assert "  - item_ids (integer[]) NOT NULL" in render_schema([orders])
+        assert render_schema([orders], "compact").splitlines()[-1] == (
+            "orders: status order_status!, email citext!, item_ids int[]!, "
+            "tags varchar[]!"
+        )
+
+    def test_shared_columns_need_enough_tables(self, tables):
+        """Test that a column in fewer tables than the minimum stays typed."""
+        assert shared_columns(tables) == [
+            ("last_update", "timestamp with time zone", False)
+        ]
+        assert shared_columns(tables, min_tables=4) == []
+        assert "Shared columns" not in render_schema(list(tables)[:2], "compact")
+
+    def test_compact_is_smallest(self, tables):
+        """Test that the estimator ranks the formats by size."""
+        tokens = {
+            schema_format: estimate_tokens(render_schema(tables, schema_format))
+            for schema_format in SCHEMA_FORMATS
+        }
+
+        assert tokens["compact"] < tokens["ddl"] < tokens["verbose"]
+
+    def test_estimate_tokens(self):
+        """Test the estimate on words, long identifiers, digits and symbols."""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("select name") == 2
+        assert estimate_tokens("replacement_cost") == 4  # 11 letters, _, 4 letters
+        assert estimate_tokens("~16,044") == 4
+        assert estimate_tokens("a\n    b") == 4
+
+    def test_unknown_format_raises(self, tables):
+        """Test that an unknown format is rejected."""
+        with pytest.raises(ValueError, match="Unknown schema format 'yaml'"):
+            render_schema(tables, "yaml")
@@ -0,0 +1,112 @@
+"""Unit tests for SchemaRetriever."""
+
+import pytest
+from app.agents.context_service import SchemaCatalog
+from app.agents.schema_retriever import SchemaRetriever, tokenize
+
+
+def column(table, name):
+    """Build an information_schema column row."""
+    return {
+        "table_name": table,
+        "column_name": name,
+        "data_type": "text",
+        "is_nullable": "YES",
+    }
+
+
+class TestSchemaRetriever:
+    """Test suite for SchemaRetriever."""
+
+    @pytest.fixture
+    def catalog(self):
+        """A small Pagila-like catalog."""
+        schema_info = [
+            column("actor", "actor_id"),
+            column("actor", "first_name"),
+            column("film", "film_id"),
+            column("film", "title"),
+            column("film", "rental_rate"),
+            column("film_actor", "actor_id"),
+            column("film_actor", "film_id"),
+            column("payment", "amount"),
+            column("payment", "customer_id"),
+            column("customer", "customer_id"),
+            column("customer", "email"),
+            column("store", "store_id"),
+        ]
+        foreign_keys = [
+            {
+                "table_name": "film_actor",
+                "column_name": "actor_id",
+                "referenced_table": "actor",
+                "referenced_column": "actor_id",
+            },
+            {
+                "table_name": "film_actor",
+                "column_name": "film_id",
+                "referenced_table": "film",
+                "referenced_column": "film_id",
+            },
+            {
+                "table_name": "payment",
+                "column_name": "customer_id",
+                "referenced_table": "customer",
+                "referenced_column": "customer_id",
+            },
+        ]
+        comments = [
+            {
+                "table_name": "store",
+                "column_name": None,
+                "description": "Physical rental shops",
+            }
+        ]
+        tables = sorted({row["table_name"] for row in schema_info})
+        return SchemaCatalog(
+            schema_info=schema_info,
+            formatted="",
+            fingerprint="v1",
+            loaded_at=0.0,
+            table_blocks={table: f"Table: {table}" for table in tables},
+            foreign_keys=foreign_keys,
+            comments=comments,
+        )
+
+    def test_tokenize_splits_identifiers(self):
+        """Test identifier splitting, plural folding and stopwords."""
+        assert tokenize("film_actor") == {"film", "actor"}
+        assert tokenize("rentalRate") == {"rental", "rate"}
+        assert tokenize("How many categories are there?") == {"category"}
+
+    def test_table_name_match_ranks_highest(self, catalog):
+        """Test that a table named in the question outranks column matches."""
+        scores = SchemaRetriever().score_tables("total payment amount", catalog)
+
+        assert max(scores, key=scores.get) == "payment"
+
+    def test_select_tables_adds_join_partners(self, catalog):
+        """Test that junction tables linking selected tables are included."""
+        retriever = SchemaRetriever(top_k=2)
+
+        tables = retriever.select_tables("Which actors appear in each film?", catalog)
+
+        assert tables == ["actor", "film", "film_actor"]
+
+    def test_select_tables_uses_comments(self, catalog):
+        """Test that table comments contribute to relevance."""
+        tables = SchemaRetriever(top_k=1).select_tables("list shops", catalog)
+
+        assert tables == ["store"]
+
+    def test_max_tables_caps_selection(self, catalog):
+        """Test that join partners never exceed the table budget."""
+        tables = SchemaRetriever(top_k=1, max_tables=1).select_tables(
+            "payment amounts", catalog
+        )
+
+        assert tables == ["payment"]
+
+    def test_no_match_returns_none(self, catalog):
+        """Test that an unrelated question falls back to the full schema."""
+        assert SchemaRetriever().select_tables("hello there", catalog) is None
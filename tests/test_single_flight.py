@@ -0,0 +1,137 @@
+"""Unit tests for SingleFlight."""
+
+import asyncio
+import threading
+import pytest
+from app.utils.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test suite for SingleFlight."""
+
+    @pytest.fixture
+    def flight(self):
+        """Create an empty SingleFlight."""
+        return SingleFlight()
+
+    def test_threads_share_one_call(self, flight):
+        """Test that concurrent callers of one key run the work once."""
+        # Arrange
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def work():
+            calls.append(1)
+            release.wait(5)
+            return "rows"
+
+        def call():
+            results.append(flight.do("k", work))
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        while flight.stats()["followers"] < 3:
+            pass
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        assert len(calls) == 1
+        assert sorted(shared for _, shared in results) == [False, True, True, True]
+        assert all(result == "rows" for result, _ in results)
+        assert flight.in_flight() == 0
+
+    def test_async_callers_share_one_call(self, flight):
+        """Test coalescing of coroutines on the event loop."""
+        # Arrange
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        async def run():
+            return await asyncio.gather(*(flight.ado("k", work) for _ in range(3)))
+
+        # Act
+        results = asyncio.run(run())
+
+        # Assert
+        assert calls == 1
+        assert [result for result, _ in results] == [1, 1, 1]
+        assert flight.stats() == {"leaders": 1, "followers": 2, "in_flight": 0}
+
+    def test_different_keys_run_separately(self, flight):
+        """Test that only identical keys are coalesced."""
+
+        async def run():
+            return await asyncio.gather(
+                flight.ado("a", lambda: asyncio.sleep(0.01, "a")),
+                flight.ado("b", lambda: asyncio.sleep(0.01, "b")),
+            )
+
+        assert asyncio.run(run()) == [("a", False), ("b", False)]
+
+    def test_exception_reaches_every_caller(self, flight):
+        """Test that followers receive the leader's error."""
+
+        # Arrange
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("bad sql")
+
+        async def run():
+            return await asyncio.gather(
+                flight.ado("k", work), flight.ado("k", work), return_exceptions=True
+            )
+
+        # Act
+        errors = asyncio.run(run())
+
+        # Assert
+        assert all(isinstance(error, ValueError) for error in errors)
+        assert flight.in_flight() == 0
+
+    def test_cancelled_follower_leaves_others_unaffected(self, flight):
+        """Test that cancelling a waiting caller doesn't touch the shared call."""
+
+        # Arrange
+        async def work():
+            await asyncio.sleep(0.05)
+            return "rows"
+
+        async def run():
+            leader = asyncio.ensure_future(flight.ado("k", work))
+            await asyncio.sleep(0)
+            cancelled = asyncio.ensure_future(flight.ado("k", work))
+            follower = asyncio.ensure_future(flight.ado("k", work))
+            await asyncio.sleep(0.01)
+            cancelled.cancel()
+            return await asyncio.gather(
+                leader, cancelled, follower, return_exceptions=True
+            )
+
+        # Act
+        leader, cancelled, follower = asyncio.run(run())
+
+        # Assert
+        assert leader == ("rows", False)
+        assert isinstance(cancelled, asyncio.CancelledError)
+        assert follower == ("rows", True)
+        assert flight.in_flight() == 0
+
+    def test_finished_calls_are_not_cached(self, flight):
+        """Test that a call after the leader finishes runs again."""
+        calls = []
+
+        flight.do("k", lambda: calls.append(1))
+        flight.do("k", lambda: calls.append(1))
+
+        assert len(calls) == 2
@@ -0,0 +1,121 @@
+"""Unit tests for the generated SQL cache."""
+
+import pytest
+from unittest.mock import patch
+from app.agents.sql_cache import (
+    InMemorySQLCacheBackend,
+    SQLCache,
+    SQLiteSQLCacheBackend,
+    normalize_question,
+)
+
+
+class TestSQLCache:
+    """Test suite for SQLCache and its backends."""
+
+    @pytest.fixture(params=["memory", "sqlite"])
+    def backend(self, request, tmp_path):
+        """Each storage backend with room for two entries."""
+        if request.param == "memory":
+            return InMemorySQLCacheBackend(max_entries=2)
+        return SQLiteSQLCacheBackend(str(tmp_path / "cache.db"), max_entries=2)
+
+    def test_normalize_question(self):
+        """Test that case, whitespace and trailing punctuation are normalized away."""
+        assert (
+            normalize_question("  How many ACTORS are there?? ")
+            == "how many actors are there"
+        )
+
+    @pytest.mark.parametrize(
+        "first, second",
+        [
+            ("Orders with total > 100", "Orders with total < 100"),
+            ("Users with balance -5", "Users with balance 5"),
+            ("Products rated 1.5", "Products rated 15"),
+        ],
+    )
+    def test_normalize_question_keeps_operators_signs_and_decimals(self, first, second):
+        """Test that questions differing only by a literal get different keys."""
+        scope = SQLCache.make_scope("v1", "m", 0.0)
+
+        assert normalize_question(first) != normalize_question(second)
+        assert SQLCache.make_key(normalize_question(first), scope) != SQLCache.make_key(
+            normalize_question(second), scope
+        )
+
+    def test_exact_hit_after_put(self, backend):
+        """Test that a stored question is found again after normalization."""
+        cache = SQLCache(backend)
+        cache.put("How many actors?", "SELECT COUNT(*) FROM actor;", "v1", "m", 0.0)
+
+        entry = cache.get("how many actors", "v1", "m", 0.0)
+
+        assert entry.sql_query == "SELECT COUNT(*) FROM actor;"
+        assert cache.stats()["hits"] == 1
+
+    def test_scope_change_misses(self, backend):
+        """Test that schema, model or temperature changes never hit."""
+        cache = SQLCache(backend)
+        cache.put("How many actors?", "SELECT 1;", "v1", "m", 0.0)
+
+        assert cache.get("How many actors?", "v2", "m", 0.0) is None
+        assert cache.get("How many actors?", "v1", "other", 0.0) is None
+        assert cache.get("How many actors?", "v1", "m", 0.5) is None
+        assert cache.stats()["misses"] == 3
+
+    def test_lru_eviction(self, backend):
+        """Test that the least recently used entry is evicted when full."""
+        cache = SQLCache(backend)
+        cache.put("first", "SELECT 1;", "v1", "m", 0.0)
+        cache.put("second", "SELECT 2;", "v1", "m", 0.0)
+        assert cache.get("first", "v1", "m", 0.0) is not None
+
+        cache.put("third", "SELECT 3;", "v1", "m", 0.0)
+
+        assert cache.get("second", "v1", "m", 0.0) is None
+        assert cache.get("first", "v1", "m", 0.0) is not None
+        assert cache.get("third", "v1", "m", 0.0) is not None
+
+    def test_ttl_expiry(self, backend):
+        """Test that entries older than the TTL are not served."""
+        backend.ttl = 60
+        cache = SQLCache(backend)
+        with patch("app.agents.sql_cache.time.time", return_value=1000.0):
+            cache.put("first", "SELECT 1;", "v1", "m", 0.0)
+        with patch("app.agents.sql_cache.time.time", return_value=1059.0):
+            assert cache.get("first", "v1", "m", 0.0) is not None
+        with patch("app.agents.sql_cache.time.time", return_value=1061.0):
+            assert cache.get("first", "v1", "m", 0.0) is None
+
+    def test_near_duplicate_lookup(self, backend):
+        """Test that similar questions hit only above the threshold."""
+        cache = SQLCache(backend, similarity_threshold=0.6)
+        cache.put("how many actors are there in total", "SELECT 1;", "v1", "m", 0.0)
+
+        near = cache.get("how many actors are there in total now", "v1", "m", 0.0)
+        different = cache.get("how many films are there in total", "v1", "m", 0.0)
+
+        assert near is not None and near.sql_query == "SELECT 1;"
+        assert different is None
+        assert cache.stats()["near_hits"] == 1
+
+    def test_near_duplicate_needs_identical_literals(self, backend):
+        """Test that a near-duplicate never differs by a number or operator."""
+        cache = SQLCache(backend, similarity_threshold=0.5)
+        cache.put("list all orders with a total > 100", "SELECT 1;", "v1", "m", 0.0)
+
+        flipped = cache.get("list all orders with a total < 100", "v1", "m", 0.0)
+        near = cache.get("list all the orders with a total > 100", "v1", "m", 0.0)
+
+        assert flipped is None
+        assert near is not None and near.sql_query == "SELECT 1;"
+
+    def test_sqlite_backend_persists(self, tmp_path):
+        """Test that the SQLite backend survives reopening."""
+        path = str(tmp_path / "cache.db")
+        SQLCache(SQLiteSQLCacheBackend(path)).put("q", "SELECT 1;", "v1", "m", 0.0)
+
+        reopened = SQLCache(SQLiteSQLCacheBackend(path))
+
+        assert reopened.get("q", "v1", "m", 0.0).sql_query == "SELECT 1;"
@@ -0,0 +1,145 @@
+"""Unit tests for SQLValidator."""
+
+import pytest
+from app.agents.sql_validator import SQLSyntaxError, SQLValidator, tokenize
+
+
+class TestSQLValidator:
+    """Test suite for SQLValidator."""
+
+    @pytest.fixture
+    def validator(self):
+        """Create a SQLValidator instance."""
+        return SQLValidator()
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "SELECT created_at, updated_by FROM orders",
+            "select * from users;",
+            "WITH recent AS (SELECT * FROM orders) SELECT count(*) FROM recent",
+            "WITH RECURSIVE n(x) AS (VALUES (1) UNION ALL SELECT x + 1 FROM n) "
+            "SELECT x FROM n",
+            "(SELECT 1) UNION (SELECT 2)",
+            "VALUES (1, 'a'), (2, 'b')",
+            "SELECT 'DROP TABLE users; DELETE FROM x' AS text",
+            'SELECT "update" FROM "Delete Log"',
+            "SELECT 1 -- DROP TABLE users",
+            "SELECT /* DELETE /* nested */ FROM t */ 1",
+            "SELECT $body$ INSERT INTO t $body$",
+            "SELECT E'it\\'s; DROP TABLE t'",
+        ],
+    )
+    def test_accepts_read_only_queries(self, validator, sql):
+        """Test that read-only queries are accepted, whatever they mention."""
+        # Act
+        result = validator.validate(sql)
+
+        # Assert
+        assert result.is_valid, result.reason
+
+    @pytest.mark.parametrize(
+        "sql, reason",
+        [
+            (
+                "WITH gone AS (DELETE FROM users RETURNING *) SELECT * FROM gone",
+                "DELETE",
+            ),
+            ("SELECT 1; DROP TABLE users", "Multiple statements"),
+            ("SELECT * INTO backup FROM users", "INTO"),
+            ("SELECT * FROM users FOR UPDATE", "UPDATE"),
+            ("SELECT * FROM users FOR SHARE", "Row-locking"),
+            ("SELECT pg_terminate_backend(123)", "pg_terminate_backend"),
+            ("SELECT nextval('users_id_seq')", "nextval"),
+            ("SELECT \"set_config\"('role', 'admin', false)", "set_config"),
+            ("SELECT pg_catalog.\"pg_read_file\"('/etc/passwd')", "pg_read_file"),
+            ("SELECT pg_try_advisory_lock(42)", "pg_try_advisory_lock"),
+            (
+                "SELECT pg_try_advisory_xact_lock_shared(1, 2)",
+                "pg_try_advisory_xact_lock_shared",
+            ),
+            ("SELECT pg_advisory_lock_shared(42)", "pg_advisory_lock_shared"),
+            ("SELECT lo_create(0)", "lo_create"),
+            ("SELECT lo_from_bytea(0, 'data'::bytea)", "lo_from_bytea"),
+            ("SELECT lo_put(16384, 0, 'data'::bytea)", "lo_put"),
+            ("SHOW search_path", "Only SELECT"),
+            ("EXPLAIN ANALYZE DELETE FROM users", "DELETE"),
+            ("SELECT 'unterminated", "unterminated"),
+            ("SELECT (1", "Unbalanced"),
+            ("-- only a comment", "Empty"),
+        ],
+    )
+    def test_rejects_unsafe_queries(self, validator, sql, reason):
+        """Test that writes, locks, side effects and malformed SQL are rejected."""
+        # Act
+        result = validator.validate(sql)
+
+        # Assert
+        assert not result.is_valid
+        assert reason in result.reason
+
+    def test_statement_tree(self, validator):
+        """Test that CTEs and referenced tables are extracted."""
+        # Act
+        result = validator.validate(
+            "WITH top AS (SELECT actor_id FROM film_actor) "
+            "SELECT a.name FROM public.actor a JOIN top t ON t.actor_id = a.id, "
+            "generate_series(1, 3) g, film"
+        )
+
+        # Assert
+        assert result.statement.kind == "SELECT"
+        assert [cte.name for cte in result.statement.ctes] == ["top"]
+        assert result.tables == ("film_actor", "public.actor", "film")
+        assert result.functions == ("generate_series",)
+
+    def test_from_inside_function_arguments_is_not_a_table(self, validator):
+        """Test that FROM in extract/substring/trim/overlay names no table."""
+        # Act
+        result = validator.validate(
+            "SELECT extract(year FROM rental_date), substring(title FROM 1 FOR 3), "
+            "trim(both ' ' FROM name), overlay(title placing 'x' FROM 2), "
+            "(SELECT max(amount) FROM payment) "
+            "FROM rental JOIN (SELECT trim(FROM code) FROM film) f ON true"
+        )
+
+        # Assert
+        assert result.tables == ("payment", "rental", "film")
+        assert result.functions == ()
+
+    def test_normalized_form_ignores_layout(self, validator):
+        """Test that case, whitespace, comments and semicolons do not matter."""
+        # Act
+        first = validator.validate("SELECT name\n  FROM Users -- all of them\n;")
+        second = validator.validate("select name from users")
+
+        # Assert
+        assert first.normalized == second.normalized == "select name from users"
+        assert first.fingerprint == second.fingerprint
+
+    def test_fingerprint_ignores_literals(self, validator):
+        """Test that queries differing only in constants share a fingerprint."""
+        # Act
+        first = validator.validate("SELECT * FROM users WHERE id = 1")
+        second = validator.validate("SELECT * FROM users WHERE id = 42")
+        other = validator.validate("SELECT * FROM users WHERE age = 1")
+
+        # Assert
+        assert first.normalized != second.normalized
+        assert first.fingerprint == second.fingerprint
+        assert first.fingerprint != other.fingerprint
+
+    def test_trimmed_sql_drops_surrounding_comments_and_semicolons(self, validator):
+        """Test that the trimmed statement can be wrapped in a subquery."""
+        # Act
+        result = validator.validate(
+            "-- ratings\nSELECT rating /* kept */ FROM film; -- done\n;"
+        )
+
+        # Assert
+        assert result.trimmed_sql == "SELECT rating /* kept */ FROM film"
+
+    def test_tokenize_rejects_unterminated_comment(self):
+        """Test that an unterminated block comment is a syntax error."""
+        with pytest.raises(SQLSyntaxError):
+            tokenize("SELECT 1 /* DROP TABLE users")
@@ -1,8 +1,17 @@
 """Unit tests for TextToSQLAgent."""
 
+import asyncio
+import threading
 import pytest
-from unittest.mock import Mock, MagicMock
-from app.agents.text_to_sql_agent import TextToSQLAgent
+from unittest.mock import AsyncMock, Mock, MagicMock
+from app.agents.cost_gate import CostGate, PlanSummary, QueryCostError
+from app.agents.result_cache import ResultCache
+from app.agents.sql_cache import SQLCache
+from app.agents.text_to_sql_agent import QueryResult, TextToSQLAgent
+from app.agents.value_profiler import ColumnProfile
+from app.core.columnar import ColumnarResult
+from app.core.db_client import DbClient, QueryExecutionError
+from app.utils.metrics import QUESTIONS, STAGE_LATENCY
 
 
 class TestTextToSQLAgent:
@@ -11,7 +20,9 @@ class TestTextToSQLAgent:
     @pytest.fixture
     def mock_db_client(self):
         """Create a mock database client."""
-        return Mock()
+        mock = Mock()
+        mock.pool.max_size = 2
+        return mock
 
     @pytest.fixture
     def mock_llm_client(self):
@@ -94,7 +105,338 @@ class TestTextToSQLAgent:
 
         # Assert
         assert results == expected_results
-        mock_db_client.run_sql.assert_called_once_with(sql_query)
+        mock_db_client.run_sql.assert_called_once_with(
+            "SELECT * FROM users LIMIT 5",
+            max_rows=None,
+            statement_timeout_ms=None,
+            read_only=True,
+        )
+
+    def test_execute_query_generates_sql_once(
+        self, agent, mock_db_client, mock_llm_client, mock_context_service
+    ):
+        """Test that executing a question costs a single LLM call."""
+        mock_llm_client.generate_with_system_message.return_value = "SELECT 1;"
+        mock_db_client.run_sql.return_value = [{"?column?": 1}]
+
+        agent.execute_query("One")
+
+        mock_llm_client.generate_with_system_message.assert_called_once()
+        mock_context_service.format_schema_for_llm.assert_called_once()
+
+    def test_answer_returns_query_result(self, agent, mock_db_client, mock_llm_client):
+        """Test that the pipeline returns the executed SQL, rows and timings."""
+        # Arrange
+        sql_query = "SELECT id FROM users; -- every user"
+        rows = [{"id": 1}, {"id": 2}]
+        mock_llm_client.generate_with_system_message.return_value = sql_query
+        mock_db_client.run_sql.return_value = rows
+
+        # Act
+        result = agent.answer("List user ids")
+
+        # Assert
+        assert isinstance(result, QueryResult)
+        assert result.question == "List user ids"
+        assert result.sql_query == sql_query
+        assert result.results == rows
+        assert result.row_count == 2
+        # The trailing semicolon and comment are dropped so the SQL can be wrapped
+        mock_db_client.run_sql.assert_called_once_with(
+            "SELECT id FROM users",
+            max_rows=None,
+            statement_timeout_ms=None,
+            read_only=True,
+        )
+        for stage in ["schema", "prompt", "llm", "validate", "execute", "total"]:
+            assert stage in result.timings
+            assert result.timings[stage] >= 0
+
+    def test_aanswer_uses_async_llm_call(self, agent, mock_db_client, mock_llm_client):
+        """Test that the async pipeline awaits the LLM and runs SQL off-loop."""
+        # Arrange
+        sql_query = "SELECT id FROM users;"
+        rows = [{"id": 1}]
+        mock_llm_client.agenerate_with_system_message = AsyncMock(
+            return_value=sql_query
+        )
+        mock_db_client.run_sql.return_value = rows
+
+        # Act
+        result = asyncio.run(agent.aanswer("List user ids"))
+
+        # Assert
+        assert result.sql_query == sql_query
+        assert result.results == rows
+        mock_llm_client.agenerate_with_system_message.assert_awaited_once()
+        mock_llm_client.generate_with_system_message.assert_not_called()
+        mock_db_client.run_sql.assert_called_once_with(
+            "SELECT id FROM users",
+            max_rows=None,
+            statement_timeout_ms=None,
+            read_only=True,
+        )
+        assert "execute" in result.timings
+
+    def test_aanswer_rejects_unsafe_queries(self, agent, mock_llm_client):
+        """Test that the async pipeline applies the same safety check."""
+        mock_llm_client.agenerate_with_system_message = AsyncMock(
+            return_value="DELETE FROM users;"
+        )
+
+        with pytest.raises(ValueError, match="Only SELECT queries are allowed"):
+            asyncio.run(agent.aanswer("Delete all users"))
+
+    def test_sql_cache_hit_skips_llm(
+        self,
+        mock_db_client,
+        mock_llm_client,
+        mock_context_service,
+        mock_prompt_builder,
+    ):
+        """Test that a repeated question is answered from the SQL cache."""
+        # Arrange
+        agent = TextToSQLAgent(
+            db_client=mock_db_client,
+            llm_client=mock_llm_client,
+            context_service=mock_context_service,
+            prompt_builder=mock_prompt_builder,
+            sql_cache=SQLCache(),
+        )
+        mock_context_service.schema_fingerprint = "v1"
+        mock_llm_client.generate_with_system_message.return_value = "SELECT 1;"
+        mock_db_client.run_sql.return_value = [{"?column?": 1}]
+
+        # Act
+        first = agent.answer("How many actors are there?")
+        second = agent.answer("how many actors are there")
+
+        # Assert
+        mock_llm_client.generate_with_system_message.assert_called_once()
+        assert not first.sql_cache_hit
+        assert second.sql_cache_hit
+        assert second.sql_query == "SELECT 1;"
+        assert "llm" not in second.timings
+
+    def test_sql_cache_skips_unsafe_sql(
+        self, mock_db_client, mock_llm_client, mock_context_service
+    ):
+        """Test that SQL failing validation is never cached."""
+        agent = TextToSQLAgent(
+            db_client=mock_db_client,
+            llm_client=mock_llm_client,
+            context_service=mock_context_service,
+            sql_cache=SQLCache(),
+        )
+        mock_llm_client.generate_with_system_message.return_value = "DROP TABLE x;"
+
+        with pytest.raises(ValueError):
+            agent.answer("Drop it")
+
+        assert agent.sql_cache.stats()["entries"] == 0
+
+    def test_async_sql_cache_access_stays_off_the_event_loop(
+        self, mock_db_client, mock_llm_client, mock_context_service
+    ):
+        """Test that the async pipeline reads and writes the SQL cache on threads."""
+        # Arrange
+        sql_cache = SQLCache()
+        threads = []
+        for method in ("get", "put"):
+            original = getattr(sql_cache, method)
+
+            def record(*args, original=original, **kwargs):
+                threads.append(threading.current_thread())
+                return original(*args, **kwargs)
+
+            setattr(sql_cache, method, record)
+        agent = TextToSQLAgent(
+            db_client=mock_db_client,
+            llm_client=mock_llm_client,
+            context_service=mock_context_service,
+            sql_cache=sql_cache,
+        )
+        mock_llm_client.agenerate_with_system_message = AsyncMock(
+            return_value="SELECT 1"
+        )
+        mock_db_client.run_sql.return_value = [{"?column?": 1}]
+
+        # Act
+        asyncio.run(agent.aanswer("One"))
+        second = asyncio.run(agent.aanswer("One"))
+
+        # Assert
+        assert second.sql_cache_hit
+        assert len(threads) == 3  # miss, store, hit
+        assert threading.main_thread() not in threads
+
+    def test_schema_retriever_prunes_prompt(
+        self, mock_db_client, mock_llm_client, mock_context_service
+    ):
+        """Test that a retriever narrows the schema and reports the reduction."""
+        # Arrange
+        catalog = Mock(table_names=["actor", "film", "store"], formatted="x" * 100)
+        mock_context_service.get_catalog.return_value = catalog
+        mock_context_service.render_schema.return_value = "x" * 25
+        retriever = Mock()
+        retriever.select_tables.return_value = ["actor"]
+        agent = TextToSQLAgent(
+            db_client=mock_db_client,
+            llm_client=mock_llm_client,
+            context_service=mock_context_service,
+            schema_retriever=retriever,
+        )
+        mock_llm_client.generate_with_system_message.return_value = "SELECT 1;"
+        mock_db_client.run_sql.return_value = []
+
+        # Act
+        result = agent.answer("How many actors?")
+
+        # Assert
+        mock_context_service.render_schema.assert_called_once_with(["actor"])
+        mock_context_service.format_schema_for_llm.assert_not_called()
+        assert result.metadata["schema_pruning"] == {
+            "tables_total": 3,
+            "tables_selected": 1,
+            "schema_chars_full": 100,
+            "schema_chars_sent": 25,
+            "schema_tokens_sent": 4,
+            "reduction": 0.75,
+        }
+
+    def test_value_hints_are_added_to_the_prompt(
+        self, mock_db_client, mock_llm_client, mock_context_service
+    ):
+        """Test that profiled values matching the question reach the LLM."""
+        # Arrange
+        profile = ColumnProfile("users", "status", ["active"], 10, 0.0, True)
+        profiler = Mock()
+        profiler.relevant_values.return_value = [(profile, ["active"])]
+        profiler.render_hints.return_value = "- users.status: 'active'"
+        agent = TextToSQLAgent(
+            db_client=mock_db_client,
+            llm_client=mock_llm_client,
+            context_service=mock_context_service,
+            value_profiler=profiler,
+        )
+        mock_llm_client.generate_with_system_message.return_value = "SELECT 1;"
+        mock_db_client.run_sql.return_value = []
+
+        # Act
+        result = agent.answer("How many Active users?")
+
+        # Assert
+        profiler.relevant_values.assert_called_once_with("How many Active users?")
+        user_message = mock_llm_client.generate_with_system_message.call_args.args[1]
+        assert user_message.endswith("- users.status: 'active'")
+        assert result.metadata["value_hints"] == ["users.status"]
+
+    def test_prepare_validates_without_executing(
+        self, agent, mock_db_client, mock_llm_client
+    ):
+        """Test that prepare generates and validates SQL but runs nothing."""
+        mock_llm_client.generate_with_system_message.return_value = "SELECT 1;"
+
+        result = agent.prepare("One")
+
+        assert result.sql_query == "SELECT 1;"
+        assert result.results == []
+        mock_db_client.run_sql.assert_not_called()
+
+    def test_stream_rows_uses_server_side_streaming(
+        self, agent, mock_db_client, mock_llm_client
+    ):
+        """Test that prepared SQL is streamed in batches from the DB client."""
+        mock_llm_client.agenerate_with_system_message = AsyncMock(
+            return_value="SELECT id FROM users;"
+        )
+        mock_db_client.stream_sql.return_value = iter([[{"id": 1}], [{"id": 2}]])
+
+        result = asyncio.run(agent.aprepare("List user ids"))
+        batches = list(agent.stream_rows(result, batch_size=1))
+
+        assert batches == [[{"id": 1}], [{"id": 2}]]
+        mock_db_client.stream_sql.assert_called_once_with(
+            "SELECT id FROM users",
+            batch_size=1,
+            statement_timeout_ms=None,
+            read_only=True,
+        )
+
+    def test_streamed_sql_is_cached_only_after_it_runs(
+        self, mock_db_client, mock_llm_client, mock_context_service
+    ):
+        """Test that prepared SQL reaches the SQL cache once all rows streamed."""
+        # Arrange
+        agent = TextToSQLAgent(
+            db_client=mock_db_client,
+            llm_client=mock_llm_client,
+            context_service=mock_context_service,
+            sql_cache=SQLCache(),
+        )
+        mock_llm_client.generate_with_system_message.return_value = "SELECT 1;"
+
+        def failing_stream(*args, **kwargs):
+            yield [{"?column?": 1}]
+            raise Exception("canceling statement due to statement timeout")
+
+        mock_db_client.stream_sql.side_effect = failing_stream
+
+        # Act & Assert
+        result = agent.prepare("One")
+        assert agent.sql_cache.stats()["entries"] == 0
+
+        with pytest.raises(Exception, match="statement timeout"):
+            list(agent.stream_rows(result))
+        assert agent.sql_cache.stats()["entries"] == 0
+
+        mock_db_client.stream_sql.side_effect = None
+        mock_db_client.stream_sql.return_value = iter([[{"?column?": 1}]])
+        list(agent.stream_rows(result))
+        assert agent.sql_cache.stats()["entries"] == 1
+
+    def test_row_cap_truncates_results(
+        self, mock_db_client, mock_llm_client, mock_context_service
+    ):
+        """Test that results over the row cap are cut and flagged."""
+        # Arrange
+        agent = TextToSQLAgent(
+            db_client=mock_db_client,
+            llm_client=mock_llm_client,
+            context_service=mock_context_service,
+            statement_timeout_ms=5000,
+            max_rows=2,
+        )
+        mock_llm_client.generate_with_system_message.return_value = "SELECT id FROM t;"
+        mock_db_client.run_sql.return_value = [{"id": 1}, {"id": 2}, {"id": 3}]
+
+        # Act
+        result = agent.answer("All ids")
+
+        # Assert
+        mock_db_client.run_sql.assert_called_once_with(
+            "SELECT id FROM t", max_rows=3, statement_timeout_ms=5000, read_only=True
+        )
+        assert result.results == [{"id": 1}, {"id": 2}]
+        assert result.truncated
+
+    def test_row_cap_not_reached(
+        self, mock_db_client, mock_llm_client, mock_context_service
+    ):
+        """Test that results at or under the cap are not flagged."""
+        agent = TextToSQLAgent(
+            db_client=mock_db_client,
+            llm_client=mock_llm_client,
+            context_service=mock_context_service,
+            max_rows=2,
+        )
+        mock_llm_client.generate_with_system_message.return_value = "SELECT id FROM t;"
+        mock_db_client.run_sql.return_value = [{"id": 1}, {"id": 2}]
+
+        result = agent.answer("All ids")
+
+        assert result.row_count == 2
+        assert not result.truncated
 
     def test_execute_query_rejects_unsafe_queries(self, agent, mock_llm_client):
         """Test that unsafe queries are rejected."""
@@ -127,6 +469,216 @@ class TestTextToSQLAgent:
         for query in dangerous_queries:
             assert not agent._is_safe_query(query)
 
+    def test_is_safe_query_ignores_keywords_inside_identifiers(self, agent):
+        """Test that keywords embedded in names or literals are not flagged."""
+        assert agent._is_safe_query("SELECT created_at, updated_at FROM users;")
+        assert agent._is_safe_query("SELECT * FROM logs WHERE action = 'DELETE'")
+
+    def test_answer_records_stage_metrics(self, agent, mock_db_client, mock_llm_client):
+        """Test that each pipeline stage is observed in the latency histogram."""
+        # Arrange
+        mock_llm_client.generate_with_system_message.return_value = "SELECT 1"
+        mock_db_client.run_sql.return_value = [{"?column?": 1}]
+        before = {stage: STAGE_LATENCY.count(stage=stage) for stage in ("llm", "total")}
+        answered = QUESTIONS.value(status="ok")
+
+        # Act
+        agent.answer("One")
+
+        # Assert
+        for stage, count in before.items():
+            assert STAGE_LATENCY.count(stage=stage) == count + 1
+        assert QUESTIONS.value(status="ok") == answered + 1
+
+    def test_result_cache_hit_skips_execution(
+        self, mock_db_client, mock_llm_client, mock_context_service
+    ):
+        """Test that the same SQL is served from the result cache."""
+        # Arrange
+        tracker = Mock()
+        tracker.versions.return_value = {"users": "1"}
+        agent = TextToSQLAgent(
+            db_client=mock_db_client,
+            llm_client=mock_llm_client,
+            context_service=mock_context_service,
+            result_cache=ResultCache(tracker),
+        )
+        mock_llm_client.generate_with_system_message.return_value = (
+            "SELECT id FROM users"
+        )
+        mock_db_client.run_sql.return_value = [{"id": 1}]
+
+        # Act
+        first = agent.answer("User ids")
+        second = agent.answer("Which ids do users have?")
+
+        # Assert
+        mock_db_client.run_sql.assert_called_once()
+        # Cached rows must match the versions read on the primary
+        assert mock_db_client.run_sql.call_args.kwargs["use_replica"] is False
+        assert not first.result_cache_hit
+        assert second.result_cache_hit
+        assert second.results == [{"id": 1}]
+        assert "execute" not in second.timings
+
+    def test_result_cache_skips_volatile_sql(
+        self, mock_db_client, mock_llm_client, mock_context_service
+    ):
+        """Test that SQL calling now() always runs against the database."""
+        # Arrange
+        agent = TextToSQLAgent(
+            db_client=mock_db_client,
+            llm_client=mock_llm_client,
+            context_service=mock_context_service,
+            result_cache=ResultCache(Mock()),
+        )
+        mock_llm_client.generate_with_system_message.return_value = "SELECT now()"
+        mock_db_client.run_sql.return_value = [{"now": "2024-01-01"}]
+
+        # Act
+        agent.answer("What time is it?")
+        agent.answer("What time is it?")
+
+        # Assert
+        assert mock_db_client.run_sql.call_count == 2
+        assert "use_replica" not in mock_db_client.run_sql.call_args.kwargs
+
+    @pytest.mark.parametrize(
+        "sql_query",
+        ["SELECT * FROM get_orders()", "SELECT * FROM users, get_orders() o"],
+    )
+    def test_result_cache_skips_sql_reading_functions(
+        self, mock_db_client, mock_llm_client, mock_context_service, sql_query
+    ):
+        """Test that rows read from a function are never served from the cache."""
+        # Arrange
+        tracker = Mock()
+        tracker.versions.return_value = {"users": "1"}
+        agent = TextToSQLAgent(
+            db_client=mock_db_client,
+            llm_client=mock_llm_client,
+            context_service=mock_context_service,
+            result_cache=ResultCache(tracker),
+        )
+        mock_llm_client.generate_with_system_message.return_value = sql_query
+        mock_db_client.run_sql.return_value = [{"id": 1}]
+
+        # Act
+        agent.answer("Orders")
+        second = agent.answer("Orders")
+
+        # Assert
+        assert mock_db_client.run_sql.call_count == 2
+        assert not second.result_cache_hit
+        assert agent.result_cache.stats()["entries"] == 0
+
+    def test_execute_many_collapses_duplicates(
+        self, agent, mock_db_client, mock_llm_client, mock_context_service
+    ):
+        """Test that a batch answers each distinct question once, in order."""
+        # Arrange
+        mock_llm_client.agenerate_with_system_message = AsyncMock(
+            return_value="SELECT 1"
+        )
+        mock_db_client.run_sql.return_value = [{"?column?": 1}]
+        questions = ["How many users?", "how many users", "How many posts?"]
+
+        # Act
+        items = agent.execute_many(questions)
+
+        # Assert
+        assert [item.question for item in items] == questions
+        assert all(item.ok for item in items)
+        assert items[0].result is items[1].result
+        assert mock_llm_client.agenerate_with_system_message.await_count == 2
+        mock_context_service.get_catalog.assert_called()
+
+    def test_execute_many_keeps_questions_differing_by_operator(
+        self, agent, mock_db_client, mock_llm_client
+    ):
+        """Test that questions differing only by an operator are both answered."""
+
+        # Arrange
+        async def generate(system_message, user_message):
+            operator = ">" if "> 100" in user_message else "<"
+            return f"SELECT id FROM orders WHERE total {operator} 100"
+
+        mock_llm_client.agenerate_with_system_message = generate
+        agent.prompt_builder.build_user_message.side_effect = lambda q: q
+        mock_db_client.run_sql.return_value = []
+        questions = ["Orders with total > 100", "Orders with total < 100"]
+
+        # Act
+        items = agent.execute_many(questions)
+
+        # Assert
+        assert [item.result.sql_query for item in items] == [
+            "SELECT id FROM orders WHERE total > 100",
+            "SELECT id FROM orders WHERE total < 100",
+        ]
+        assert items[0].result is not items[1].result
+
+    def test_execute_many_reports_errors_per_item(
+        self, agent, mock_db_client, mock_llm_client
+    ):
+        """Test that one failing question does not fail the batch."""
+
+        # Arrange
+        async def generate(system_message, user_message):
+            return "DELETE FROM users" if "delete" in user_message else "SELECT 1"
+
+        mock_llm_client.agenerate_with_system_message = generate
+        agent.prompt_builder.build_user_message.side_effect = lambda q: q
+        mock_db_client.run_sql.return_value = [{"?column?": 1}]
+
+        # Act
+        items = agent.execute_many(["delete everything", "count users"])
+
+        # Assert
+        assert not items[0].ok
+        assert isinstance(items[0].error, ValueError)
+        assert items[1].ok
+        assert items[1].result.results == [{"?column?": 1}]
+
+    def test_execute_many_bounds_concurrency(self, agent, mock_db_client):
+        """Test that no more than max_concurrency questions run at once."""
+        # Arrange
+        running, peak = 0, 0
+
+        async def generate(system_message, user_message):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "SELECT 1"
+
+        agent.llm_client.agenerate_with_system_message = generate
+        agent.prompt_builder.build_user_message.side_effect = lambda q: q
+        mock_db_client.run_sql.return_value = []
+
+        # Act
+        items = agent.execute_many([f"question {i}" for i in range(6)], 2)
+
+        # Assert
+        assert len(items) == 6
+        assert peak == 2
+
+    def test_answer_runs_cte_query(self, agent, mock_db_client, mock_llm_client):
+        """Test that read-only CTE queries pass validation and carry their parse."""
+        # Arrange
+        sql_query = "WITH recent AS (SELECT * FROM users) SELECT * FROM recent"
+        mock_llm_client.generate_with_system_message.return_value = sql_query
+        mock_db_client.run_sql.return_value = [{"id": 1}]
+
+        # Act
+        result = agent.answer("Recent users")
+
+        # Assert
+        assert result.results == [{"id": 1}]
+        assert result.validation.tables == ("users",)
+        assert "validate" in result.timings
+
     def test_clean_sql_query_removes_markdown(self, agent):
         """Test SQL query cleaning."""
         test_cases = [
@@ -147,3 +699,400 @@ class TestTextToSQLAgent:
         # Assert
         assert agent.context_service is not None
         assert agent.prompt_builder is not None
+
+    def test_concurrent_identical_questions_share_one_run(self, agent, mock_db_client):
+        """Test that identical in-flight questions make one LLM call."""
+        # Arrange
+        calls = 0
+
+        async def generate(system_message, user_message):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "SELECT 1"
+
+        agent.llm_client.agenerate_with_system_message = generate
+        mock_db_client.run_sql.return_value = [{"?column?": 1}]
+
+        async def ask_twice():
+            return await asyncio.gather(
+                agent.aanswer("How many users?"), agent.aanswer("how many users")
+            )
+
+        # Act
+        leader, follower = asyncio.run(ask_twice())
+
+        # Assert
+        assert calls == 1
+        assert mock_db_client.run_sql.call_count == 1
+        assert follower.question == "how many users"
+        assert follower.results == leader.results
+        assert follower.metadata["coalesced"]
+        assert "coalesced" not in leader.metadata
+        assert agent.single_flight.in_flight() == 0
+
+    def test_concurrent_questions_differing_by_operator_run_separately(
+        self, agent, mock_db_client
+    ):
+        """Test that in-flight questions differing only by an operator don't join."""
+        # Arrange
+        calls = 0
+
+        async def generate(system_message, user_message):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            operator = ">" if "> 100" in user_message else "<"
+            return f"SELECT id FROM orders WHERE total {operator} 100"
+
+        agent.llm_client.agenerate_with_system_message = generate
+        agent.prompt_builder.build_user_message.side_effect = lambda q: q
+        mock_db_client.run_sql.return_value = []
+
+        async def ask_both():
+            return await asyncio.gather(
+                agent.aanswer("Orders with total > 100"),
+                agent.aanswer("Orders with total < 100"),
+            )
+
+        # Act
+        over, under = asyncio.run(ask_both())
+
+        # Assert
+        assert calls == 2
+        assert over.sql_query.endswith("> 100")
+        assert under.sql_query.endswith("< 100")
+        assert "coalesced" not in over.metadata
+        assert "coalesced" not in under.metadata
+
+    def test_single_flight_can_be_disabled(self, mock_db_client, mock_llm_client):
+        """Test that each call runs on its own without single-flight."""
+        # Arrange
+        agent = TextToSQLAgent(
+            db_client=mock_db_client,
+            llm_client=mock_llm_client,
+            context_service=Mock(),
+            single_flight=False,
+        )
+
+        # Assert
+        assert agent.single_flight is None
+
+    def test_astream_prepare_yields_tokens_then_validated(self, agent, mock_db_client):
+        """Test that SQL fragments arrive before the validated result."""
+
+        # Arrange
+        async def stream(system_message, user_message):
+            for text in ["```sql\nSELECT ", "* FROM ", "users\n```"]:
+                yield text
+
+        agent.llm_client.astream_with_system_message = stream
+
+        async def collect():
+            return [event async for event in agent.astream_prepare("All users")]
+
+        # Act
+        events = asyncio.run(collect())
+
+        # Assert
+        assert [kind for kind, _ in events] == ["token"] * 3 + ["validated"]
+        result = events[-1][1]
+        assert result.sql_query == "SELECT * FROM users"
+        assert "llm_first_token" in result.timings
+        mock_db_client.run_sql.assert_not_called()
+
+    def test_astream_prepare_rejects_unsafe_sql(self, agent):
+        """Test that validation still runs after streaming."""
+
+        # Arrange
+        async def stream(system_message, user_message):
+            yield "DROP TABLE users"
+
+        agent.llm_client.astream_with_system_message = stream
+
+        async def collect():
+            return [event async for event in agent.astream_prepare("Drop users")]
+
+        # Act & Assert
+        with pytest.raises(ValueError, match="Only SELECT queries are allowed"):
+            asyncio.run(collect())
+
+    def test_prompt_caching_sends_cached_prefix(
+        self, mock_db_client, mock_llm_client, mock_context_service
+    ):
+        """Test that the system message goes out as cacheable content blocks."""
+        # Arrange
+        mock_context_service.schema_fingerprint = "v1"
+        mock_llm_client.generate_with_system_message.return_value = "SELECT 1"
+        agent = TextToSQLAgent(
+            db_client=mock_db_client,
+            llm_client=mock_llm_client,
+            context_service=mock_context_service,
+            prompt_caching=True,
+        )
+
+        # Act
+        agent.generate_sql("How many users?")
+
+        # Assert
+        system_message = mock_llm_client.generate_with_system_message.call_args[0][0]
+        assert system_message[0]["cache_control"] == {"type": "ephemeral"}
+        assert "Table: users" in system_message[0]["text"]
+
+    def test_cost_gate_reprompts_for_cheaper_query(
+        self, agent, mock_db_client, mock_llm_client, mock_prompt_builder
+    ):
+        """Test that an expensive query is rewritten before it runs."""
+        # Arrange
+        plans = iter(
+            [
+                PlanSummary(total_cost=1e6, startup_cost=0, plan_rows=10, node_type=""),
+                PlanSummary(total_cost=10, startup_cost=0, plan_rows=10, node_type=""),
+            ]
+        )
+        agent.cost_gate = CostGate(mock_db_client, max_cost=1000)
+        agent.cost_gate.explain = Mock(side_effect=lambda *args: next(plans))
+        mock_llm_client.generate_with_system_message.side_effect = [
+            "SELECT * FROM users, posts",
+            "SELECT * FROM users JOIN posts ON posts.user_id = users.id",
+        ]
+        mock_prompt_builder.build_rejection_message.return_value = "Cheaper please"
+        mock_db_client.run_sql.return_value = [{"id": 1}]
+
+        # Act
+        result = agent.answer("Users and their posts")
+
+        # Assert
+        assert result.sql_query.endswith("ON posts.user_id = users.id")
+        assert result.plan.total_cost == 10
+        assert result.metadata["reprompts"] == 1
+        problem = mock_prompt_builder.build_rejection_message.call_args[0][1]
+        assert "exceeds the limit" in problem
+        mock_db_client.run_sql.assert_called_once()
+
+    def test_cost_gate_explains_the_capped_query_for_answers(
+        self, agent, mock_db_client, mock_llm_client
+    ):
+        """Test that EXPLAIN sees the same LIMIT-wrapped SQL that runs."""
+        # Arrange
+        plan = PlanSummary(total_cost=10, startup_cost=0, plan_rows=6, node_type="")
+        agent.max_rows = 5
+        agent.cost_gate = CostGate(mock_db_client, max_cost=1000)
+        agent.cost_gate.explain = Mock(return_value=plan)
+        mock_llm_client.generate_with_system_message.return_value = "SELECT id FROM t;"
+        mock_db_client.run_sql.return_value = [{"id": 1}]
+
+        # Act
+        agent.answer("Ids")
+        agent.prepare("Ids")
+
+        # Assert
+        answered, prepared = agent.cost_gate.explain.call_args_list
+        assert answered.args[0] == DbClient._limit_query("SELECT id FROM t", 6)
+        assert prepared.args[0] == "SELECT id FROM t"
+
+    def test_cost_gate_rejects_when_still_too_expensive(
+        self, agent, mock_db_client, mock_llm_client
+    ):
+        """Test that the query is not executed once re-prompts run out."""
+        # Arrange
+        plan = PlanSummary(total_cost=1e6, startup_cost=0, plan_rows=10, node_type="")
+        agent.cost_gate = CostGate(mock_db_client, max_cost=1000, max_reprompts=0)
+        agent.cost_gate.explain = Mock(return_value=plan)
+        mock_llm_client.generate_with_system_message.return_value = "SELECT 1"
+
+        # Act & Assert
+        with pytest.raises(QueryCostError) as error:
+            agent.answer("Everything")
+        assert error.value.plan is plan
+        mock_db_client.run_sql.assert_not_called()
+
+    def test_cost_gate_runs_explain_off_the_event_loop(
+        self, agent, mock_db_client, mock_llm_client
+    ):
+        """Test the async pipeline's cost check."""
+        # Arrange
+        plan = PlanSummary(total_cost=5, startup_cost=0, plan_rows=1, node_type="")
+        agent.cost_gate = CostGate(mock_db_client, max_cost=1000)
+        agent.cost_gate.explain = Mock(return_value=plan)
+        mock_llm_client.agenerate_with_system_message = AsyncMock(
+            return_value="SELECT 1"
+        )
+        mock_db_client.run_sql.return_value = [{"?column?": 1}]
+
+        # Act
+        result = asyncio.run(agent.aanswer("One"))
+
+        # Assert
+        assert result.plan is plan
+        assert "explain" in result.timings
+
+    def test_answer_repairs_sql_the_database_rejects(
+        self, agent, mock_db_client, mock_llm_client, mock_prompt_builder
+    ):
+        """Test that a database error is sent back to the LLM to fix the SQL."""
+        # Arrange
+        agent.max_repair_attempts = 2
+        mock_llm_client.generate_with_system_message.side_effect = [
+            "SELECT nme FROM users",
+            "SELECT name FROM users",
+        ]
+        mock_prompt_builder.build_rejection_message.return_value = "Fix it"
+        mock_db_client.run_sql.side_effect = [
+            QueryExecutionError('column "nme" does not exist', "42703"),
+            [{"name": "Ada"}],
+        ]
+
+        # Act
+        result = agent.answer("User names")
+
+        # Assert
+        assert result.sql_query == "SELECT name FROM users"
+        assert result.results == [{"name": "Ada"}]
+        [repair] = result.metadata["repairs"]
+        assert repair["sql_query"] == "SELECT nme FROM users"
+        assert "does not exist" in repair["error"]
+        assert "repair" in result.timings
+        problem = mock_prompt_builder.build_rejection_message.call_args[0][1]
+        assert 'column "nme" does not exist' in problem
+
+    def test_repair_reuses_the_first_prompt(
+        self,
+        agent,
+        mock_db_client,
+        mock_llm_client,
+        mock_context_service,
+        mock_prompt_builder,
+    ):
+        """Test that a repair appends to the first prompt instead of rebuilding it."""
+        # Arrange
+        agent.max_repair_attempts = 2
+        mock_llm_client.generate_with_system_message.side_effect = [
+            "SELECT nme FROM users",
+            "SELECT name FROM users",
+        ]
+        mock_prompt_builder.build_rejection_message.return_value = "Fix it"
+        mock_db_client.run_sql.side_effect = [
+            QueryExecutionError('column "nme" does not exist', "42703"),
+            [{"name": "Ada"}],
+        ]
+
+        # Act
+        result = agent.answer("User names")
+
+        # Assert
+        mock_context_service.format_schema_for_llm.assert_called_once()
+        mock_prompt_builder.build_system_message.assert_called_once()
+        mock_prompt_builder.build_user_message.assert_called_once()
+        first, repair = mock_llm_client.generate_with_system_message.call_args_list
+        assert repair.args == ("System message", "User question\n\nFix it")
+        assert first.args == ("System message", "User question")
+        assert {"schema", "repair"} <= result.timings.keys()
+
+    def test_answer_stops_repairing_after_max_attempts(
+        self, agent, mock_db_client, mock_llm_client
+    ):
+        """Test that the repair loop is bounded."""
+        # Arrange
+        agent.max_repair_attempts = 2
+        mock_llm_client.generate_with_system_message.return_value = "SELECT x"
+        mock_db_client.run_sql.side_effect = QueryExecutionError("bad", "42703")
+
+        # Act & Assert
+        with pytest.raises(QueryExecutionError):
+            agent.answer("Broken")
+        assert mock_llm_client.generate_with_system_message.call_count == 3
+        assert mock_db_client.run_sql.call_count == 3
+
+    def test_answer_does_not_repair_other_errors(
+        self, agent, mock_db_client, mock_llm_client
+    ):
+        """Test that connection and permission errors are not sent to the LLM."""
+        # Arrange
+        agent.max_repair_attempts = 2
+        mock_llm_client.generate_with_system_message.return_value = "SELECT 1"
+        mock_db_client.run_sql.side_effect = QueryExecutionError("denied", "42501")
+
+        # Act & Assert
+        with pytest.raises(QueryExecutionError):
+            agent.answer("Secret")
+        mock_llm_client.generate_with_system_message.assert_called_once()
+
+    def test_answer_stops_repairing_after_timeout(
+        self, agent, mock_db_client, mock_llm_client
+    ):
+        """Test that no repair starts once the time budget is spent."""
+        # Arrange
+        agent.max_repair_attempts = 5
+        agent.repair_timeout = 0.0
+        mock_llm_client.generate_with_system_message.return_value = "SELECT x"
+        mock_db_client.run_sql.side_effect = QueryExecutionError("bad", "42703")
+
+        # Act & Assert
+        with pytest.raises(QueryExecutionError):
+            agent.answer("Broken")
+        mock_llm_client.generate_with_system_message.assert_called_once()
+
+    def test_aanswer_repairs_sql(self, agent, mock_db_client, mock_llm_client):
+        """Test the async pipeline's repair loop."""
+        # Arrange
+        agent.max_repair_attempts = 1
+        mock_llm_client.agenerate_with_system_message = AsyncMock(
+            side_effect=["SELECT 1/0", "SELECT 1"]
+        )
+        mock_db_client.run_sql.side_effect = [
+            QueryExecutionError("division by zero", "22012"),
+            [{"?column?": 1}],
+        ]
+
+        # Act
+        result = asyncio.run(agent.aanswer("One"))
+
+        # Assert
+        assert result.sql_query == "SELECT 1"
+        assert len(result.metadata["repairs"]) == 1
+
+    def test_answer_columnar_applies_row_cap(
+        self, agent, mock_db_client, mock_llm_client
+    ):
+        """Test the columnar path fetches column arrays and truncates them."""
+        # Arrange
+        agent.max_rows = 2
+        mock_llm_client.generate_with_system_message.return_value = (
+            "SELECT id FROM users"
+        )
+        mock_db_client.run_sql_columnar.return_value = ColumnarResult(
+            columns=["id"], data=[(1, 2, 3)], type_codes=[23]
+        )
+
+        # Act
+        result = agent.answer("User ids", columnar=True)
+
+        # Assert
+        mock_db_client.run_sql.assert_not_called()
+        assert mock_db_client.run_sql_columnar.call_args.kwargs["max_rows"] == 3
+        assert result.results == []
+        assert list(result.columnar.data[0]) == [1, 2]
+        assert result.row_count == 2
+        assert result.truncated
+
+    def test_export_writes_prepared_sql_with_export_timeout(
+        self, agent, mock_db_client, mock_llm_client
+    ):
+        """Test that an export runs COPY for the prepared SQL."""
+        # Arrange
+        agent.export_timeout_ms = 60000
+        mock_llm_client.generate_with_system_message.return_value = "SELECT 1"
+        mock_db_client.copy_to.return_value = 1
+        result = agent.prepare("One")
+        destination = Mock()
+
+        # Act
+        row_count = agent.export(result, destination)
+
+        # Assert
+        assert row_count == 1
+        mock_db_client.copy_to.assert_called_once_with(
+            "SELECT 1", destination, 60000, read_only=True
+        )
+        assert "export" in result.timings
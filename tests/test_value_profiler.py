@@ -0,0 +1,190 @@
+"""Unit tests for ValueProfiler."""
+
+import pytest
+from unittest.mock import Mock
+from app.agents.schema_formats import ColumnInfo, TableInfo
+from app.agents.value_profiler import ColumnProfile, ValueProfiler
+
+
+class TestValueProfiler:
+    """Test suite for ValueProfiler."""
+
+    @pytest.fixture
+    def film(self):
+        """A film table with a key, two text columns and a number."""
+        return TableInfo(
+            name="film",
+            row_estimate=50000,
+            columns=[
+                ColumnInfo("film_id", "integer", False, primary_key=True),
+                ColumnInfo("title", "text", False),
+                ColumnInfo("rating", "USER-DEFINED", True),
+                ColumnInfo("length", "smallint", True),
+            ],
+        )
+
+    @pytest.fixture
+    def mock_db_client(self):
+        """Create a mock database client."""
+        return Mock()
+
+    @pytest.fixture
+    def mock_context_service(self, film):
+        """Create a mock context service serving the film table."""
+        mock = Mock()
+        mock.get_catalog.return_value = Mock(tables={"film": film}, fingerprint="abc")
+        return mock
+
+    @pytest.fixture
+    def profiler(self, mock_db_client, mock_context_service):
+        """Create a ValueProfiler with mock dependencies."""
+        return ValueProfiler(
+            mock_db_client, mock_context_service, sample_rows=1000, max_distinct=10
+        )
+
+    @staticmethod
+    def sample_row(sampled_rows, *columns):
+        """Result row of a sampling query: (distinct, non_null, max_length, values)."""
+        row = {"sampled_rows": sampled_rows}
+        for position, (distinct, non_null, max_length, values) in enumerate(columns):
+            row[f"distinct_{position}"] = distinct
+            row[f"non_null_{position}"] = non_null
+            row[f"max_length_{position}"] = max_length
+            row[f"values_{position}"] = values
+        return row
+
+    def test_candidate_columns_are_plain_text_columns(self, film):
+        """Test that keys, non-text columns and views are not sampled."""
+        assert [column.name for column in ValueProfiler.candidate_columns(film)] == [
+            "title",
+            "rating",
+        ]
+
+        view = TableInfo(name="film_list", kind="v", columns=film.columns)
+        assert ValueProfiler.candidate_columns(view) == []
+
+    def test_profile_table_samples_large_tables(self, profiler, mock_db_client, film):
+        """Test that a large table is sampled and only repeating values kept."""
+        # Arrange
+        mock_db_client.run_sql.return_value = [
+            self.sample_row(
+                1000,
+                (990, 1000, 40, ["A title"] * 10),
+                (5, 900, 5, ["G", "NC-17", "PG", "PG-13", "R"]),
+            )
+        ]
+
+        # Act
+        profiles = profiler.profile_table(film)
+
+        # Assert
+        query = mock_db_client.run_sql.call_args.args[0]
+        assert 'FROM public."film" TABLESAMPLE SYSTEM (2.000000) LIMIT 1000' in query
+        assert '"rating"::text AS c1' in query
+        assert mock_db_client.run_sql.call_args.kwargs["read_only"] is True
+        assert profiles == [
+            ColumnProfile(
+                table="film",
+                column="rating",
+                values=["G", "NC-17", "PG", "PG-13", "R"],
+                sampled_rows=1000,
+                null_fraction=0.1,
+                complete=False,
+            )
+        ]
+
+    def test_profile_table_reads_small_tables_whole(
+        self, profiler, mock_db_client, film
+    ):
+        """Test that a small table is read without sampling and kept complete."""
+        # Arrange
+        film.row_estimate = 20
+        mock_db_client.run_sql.return_value = [
+            self.sample_row(
+                20,
+                (20, 20, 12, [f"Film {i}" for i in range(20)]),
+                (3, 20, 200, ["x" * 200, "y", "z"]),
+            )
+        ]
+
+        # Act
+        profiles = profiler.profile_table(film)
+
+        # Assert
+        assert "TABLESAMPLE" not in mock_db_client.run_sql.call_args.args[0]
+        # title has too many values, rating values are too long
+        assert profiles == []
+
+    def test_refresh_keeps_profiles_of_failing_tables(self, profiler, mock_db_client):
+        """Test that a failed sample keeps the table's previous profiles."""
+        # Arrange
+        mock_db_client.run_sql.return_value = [
+            self.sample_row(100, (50, 100, 10, []), (2, 100, 2, ["G", "R"]))
+        ]
+        profiler.refresh()
+        mock_db_client.run_sql.side_effect = Exception("statement timeout")
+
+        # Act
+        count = profiler.refresh()
+
+        # Assert
+        assert count == 1
+        assert profiler.stats()["failures"] == 1
+        assert profiler.stats()["values"] == 2
+
+    def test_relevant_values_match_regardless_of_case(self, profiler):
+        """Test that values are found by their words, whatever the case."""
+        # Arrange
+        profiler._profiles = {
+            ("customer", "status"): ColumnProfile(
+                "customer", "status", ["active", "inactive"], 100, 0.0, True
+            ),
+            ("film", "rating"): ColumnProfile(
+                "film", "rating", ["G", "NC-17", "PG", "PG-13", "R"], 100, 0.0, True
+            ),
+        }
+
+        # Act & Assert
+        assert profiler.relevant_values("How many Active customers?") == [
+            (profiler._profiles[("customer", "status")], ["active"])
+        ]
+        assert profiler.relevant_values("Count PG-13 films") == [
+            (profiler._profiles[("film", "rating")], ["PG-13"])
+        ]
+        assert profiler.relevant_values("Average length of films") == []
+
+    def test_relevant_values_include_named_columns(self, profiler):
+        """Test that naming a table's column brings in all its values."""
+        # Arrange
+        rating = ColumnProfile("film", "rating", ["G", "PG", "R"], 100, 0.0, True)
+        profiler._profiles = {("film", "rating"): rating}
+
+        # Act & Assert
+        assert profiler.relevant_values("Number of films per rating") == [
+            (rating, ["G", "PG", "R"])
+        ]
+        assert profiler.relevant_values("Customer rating") == []
+
+    def test_relevant_values_are_capped(self, profiler):
+        """Test that at most max_prompt_values values are returned."""
+        # Arrange
+        profiler.max_prompt_values = 2
+        rating = ColumnProfile("film", "rating", ["G", "PG", "R"], 100, 0.0, True)
+        profiler._profiles = {("film", "rating"): rating}
+
+        # Act
+        matches = profiler.relevant_values("films by rating")
+
+        # Assert
+        assert matches == [(rating, ["G", "PG"])]
+        assert ValueProfiler.render_hints(matches) == (
+            "- film.rating: 'G', 'PG' (and 1 more)"
+        )
+
+    def test_render_hints_quotes_values(self):
+        """Test that values are rendered as SQL string literals."""
+        profile = ColumnProfile("store", "name", ["Bob's"], 10, 0.0, True)
+
+        assert ValueProfiler.render_hints([(profile, ["Bob's"])]) == (
+            "- store.name: 'Bob''s'"
+        )